@@ -25,6 +25,7 @@ from .routes.presupuestos import bp as presupuestos_bp
 from .routes.notificaciones import bp as notificaciones_bp
 from .routes.abastecimiento import bp as abastecimiento_bp
 from .routes.archivos import bp as archivos_bp
+from .routes.exportaciones import bp as exportaciones_bp
 # from .export_solicitudes import bp as export_bp  # TODO: Crear este módulo o agregar funciones al blueprint
 # from .files import files_bp  # TODO: Descomentar cuando el módulo exista
 from .services.auth.jwt_utils import verify_token
@@ -65,6 +66,13 @@ def _bootstrap_database() -> None:
         from .core.init_db import build_db
 
         build_db(force=True)
+    else:
+        from .core.init_db import migrate_db
+
+        # Instalaciones actualizadas: las tablas nuevas llegan por MIGRATIONS
+        applied = migrate_db()
+        if applied:
+            logging.getLogger(__name__).info("Migraciones aplicadas: %s", applied)
 
 
 def _setup_logging(app: Flask) -> None:
@@ -233,6 +241,7 @@ def create_app() -> Flask:
     app.register_blueprint(notificaciones_bp)
     app.register_blueprint(abastecimiento_bp)
     app.register_blueprint(archivos_bp)
+    app.register_blueprint(exportaciones_bp)
     # app.register_blueprint(export_bp)  # TODO: Descomentar cuando se cree el módulo
     # app.register_blueprint(files_bp)  # TODO: Descomentar cuando el módulo exista
 
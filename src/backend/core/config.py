@@ -24,6 +24,36 @@ class Settings:
 
     DB_PATH = os.getenv("SPM_DB_PATH", os.path.join(DATA_DIR, "spm.db"))
     LOG_PATH = os.getenv("SPM_LOG_PATH", os.path.join(LOGS_DIR, "app.log"))
+    DB_POOL_SIZE = int(os.getenv("SPM_DB_POOL_SIZE", "8"))
+    DB_POOL_TIMEOUT = float(os.getenv("SPM_DB_POOL_TIMEOUT", "30"))
+    # Segundos de inactividad a partir de los cuales se verifica la conexión con SELECT 1
+    DB_POOL_HEALTH_IDLE = float(os.getenv("SPM_DB_POOL_HEALTH_IDLE", "30"))
+    # Cola de exportaciones: 0 procesos = render en línea (tests / entornos chicos)
+    EXPORT_WORKERS = int(os.getenv("SPM_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+    EXPORT_TTL = int(os.getenv("SPM_EXPORT_TTL", "3600"))
+    # Segundos sin latido tras los cuales un trabajo en cola/en curso se da por abandonado
+    EXPORT_STALE_AFTER = int(os.getenv("SPM_EXPORT_STALE_AFTER", "300"))
+    MATERIAL_CODE_CACHE_TTL = int(os.getenv("SPM_MATERIAL_CODE_CACHE_TTL", "300"))
+    ORG_CACHE_TTL = int(os.getenv("SPM_ORG_CACHE_TTL", "60"))
+    USER_CACHE_TTL = int(os.getenv("SPM_USER_CACHE_TTL", "30"))
+    USER_CACHE_SIZE = int(os.getenv("SPM_USER_CACHE_SIZE", "1024"))
+    # Rate limiting: "sqlite" (compartido entre workers) o "memory" (un solo proceso)
+    RATELIMIT_BACKEND = os.getenv("SPM_RATELIMIT_BACKEND", "sqlite").strip().lower()
+    RATELIMIT_DB_PATH = os.getenv("SPM_RATELIMIT_DB", "")
+    # Hashing de contraseñas: 0 procesos = en línea; QUEUE_MAX acota logins concurrentes
+    PASSWORD_WORKERS = int(os.getenv("SPM_PASSWORD_WORKERS", str(min(2, os.cpu_count() or 1))))
+    PASSWORD_QUEUE_MAX = int(os.getenv("SPM_PASSWORD_QUEUE_MAX", "16"))
+    PASSWORD_TIMEOUT = float(os.getenv("SPM_PASSWORD_TIMEOUT", "10"))
+    # Notificaciones en tiempo real (SSE): intervalo de lectura del hub y vida de cada stream
+    SSE_POLL_INTERVAL = float(os.getenv("SPM_SSE_POLL_INTERVAL", "1"))
+    SSE_KEEPALIVE = float(os.getenv("SPM_SSE_KEEPALIVE", "15"))
+    SSE_MAX_SECONDS = float(os.getenv("SPM_SSE_MAX_SECONDS", "300"))
+    SSE_RETRY_MS = int(os.getenv("SPM_SSE_RETRY_MS", "3000"))
+    # Cada stream ocupa un hilo del worker durante SSE_MAX_SECONDS: el tope debe quedar por
+    # debajo de --threads de gunicorn (el Dockerfile usa 64) para dejar hilos a los pedidos
+    # normales. Por encima, el endpoint responde 503 y el cliente consulta
+    # /notificaciones?since_id= (0 = sin tope)
+    SSE_MAX_STREAMS = int(os.getenv("SPM_SSE_MAX_STREAMS", "50"))
 
     ENV = os.getenv("SPM_ENV", "development")
     DEBUG = _env_flag("SPM_DEBUG", "1" if ENV.lower() != "production" else "0")
@@ -55,6 +85,8 @@ class Settings:
     }
 
     REFRESH_GRACE_PERIOD = int(os.getenv("SPM_REFRESH_GRACE_PERIOD", "300"))
+    TOKEN_CACHE_TTL = int(os.getenv("SPM_TOKEN_CACHE_TTL", "15"))
+    JWT_CACHE_SIZE = int(os.getenv("SPM_JWT_CACHE_SIZE", "4096"))
 
     FRONTEND_ORIGIN = os.getenv("SPM_FRONTEND_ORIGIN", "http://localhost:5173")
     ALLOWED_EXTENSIONS = {"txt", "pdf", "png", "jpg", "jpeg", "gif", "doc", "docx", "xls", "xlsx", "csv"}
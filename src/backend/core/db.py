@@ -1,5 +1,5 @@
 from __future__ import annotations
-import sqlite3, threading
+import sqlite3, threading, time
 from contextlib import contextmanager
 from typing import Iterator, Any, Dict
 from .config import Settings
@@ -14,17 +14,244 @@ def _apply_pragmas(con: sqlite3.Connection) -> None:
     con.execute("PRAGMA foreign_keys=ON;")
     con.execute("PRAGMA synchronous=NORMAL;")
 
+def _connect(path: str, *, shared: bool = False) -> sqlite3.Connection:
+    con = sqlite3.connect(path, timeout=30, check_same_thread=not shared)
+    con.row_factory = _row_factory
+    _apply_pragmas(con)
+    return con
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections with per-thread affinity.
+
+    Connections are created lazily up to ``max_size`` and configured once
+    (row factory + PRAGMAs). A thread gets back the connection it returned last
+    whenever it is still idle, so sequential ``get_connection()`` calls inside a
+    request reuse the same handle. Nested checkouts on the same thread are
+    reentrant: they get the connection the thread already holds (tracked with a
+    depth counter) instead of a second one, so a handler that calls a helper
+    which opens its own ``get_connection()`` never waits on itself when the pool
+    is exhausted. Only the outermost release rolls back and returns the handle.
+
+    The ``SELECT 1`` health probe runs only on connections that sat idle for
+    more than ``health_check_after`` seconds; freshly returned handles are
+    handed out without an extra round-trip.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 8,
+        timeout: float = 30.0,
+        health_check_after: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.max_size = max(1, int(max_size))
+        self.timeout = float(timeout)
+        self.health_check_after = max(0.0, float(health_check_after))
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: list[sqlite3.Connection] = []
+        self._idle_since: dict[sqlite3.Connection, float] = {}
+        self._local = threading.local()
+        self._closed = False
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._reused_same_thread = 0
+        self._nested = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._health_failures = 0
+        self._health_checks = 0
+
+    def _take_idle(self) -> sqlite3.Connection | None:
+        if not self._idle:
+            return None
+        preferred = getattr(self._local, "last", None)
+        if preferred is not None:
+            for idx, con in enumerate(self._idle):
+                if con is preferred:
+                    self._reused_same_thread += 1
+                    return self._idle.pop(idx)
+        return self._idle.pop()
+
+    def acquire(self) -> sqlite3.Connection:
+        current = getattr(self._local, "current", None)
+        if current is not None:
+            self._local.depth += 1
+            with self._cond:
+                self._checkouts += 1
+                self._nested += 1
+            return current
+
+        started = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                con = self._take_idle()
+                if con is not None:
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    con = None
+                    break
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._created >= self.max_size:
+                        self._record_wait(started)
+                        raise PoolTimeout(
+                            f"No SQLite connection available after {self.timeout:.1f}s (pool size {self.max_size})"
+                        )
+            self._in_use += 1
+            self._checkouts += 1
+            if waited:
+                self._record_wait(started)
+            idle_for = None
+            if con is not None:
+                idle_for = time.monotonic() - self._idle_since.pop(con, 0.0)
+            probe = idle_for is not None and idle_for > self.health_check_after
+            if probe:
+                self._health_checks += 1
+
+        try:
+            if con is None:
+                con = _connect(self.path, shared=True)
+            elif probe and not self._is_healthy(con):
+                with self._cond:
+                    self._health_failures += 1
+                self._discard(con)
+                con = _connect(self.path, shared=True)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._created -= 1
+                self._cond.notify()
+            raise
+        self._local.last = con
+        self._local.current = con
+        self._local.depth = 1
+        return con
+
+    def _record_wait(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self._waits += 1
+        self._wait_total += elapsed
+        self._wait_max = max(self._wait_max, elapsed)
+
+    @staticmethod
+    def _is_healthy(con: sqlite3.Connection) -> bool:
+        try:
+            con.execute("SELECT 1;").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _discard(con: sqlite3.Connection) -> None:
+        try:
+            con.close()
+        except sqlite3.Error:
+            pass
+
+    def release(self, con: sqlite3.Connection) -> None:
+        if getattr(self._local, "current", None) is con:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.current = None
+        healthy = True
+        try:
+            if con.in_transaction:
+                con.rollback()
+            con.row_factory = _row_factory
+        except sqlite3.Error:
+            healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                self._idle.append(con)
+                self._idle_since[con] = time.monotonic()
+            else:
+                self._created -= 1
+            self._cond.notify()
+        if not healthy or self._closed:
+            self._discard(con)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._idle_since.clear()
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for con in idle:
+            self._discard(con)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "same_thread_reuse": self._reused_same_thread,
+                "nested_checkouts": self._nested,
+                "waits": self._waits,
+                "wait_time_total_ms": round(self._wait_total * 1000, 2),
+                "wait_time_max_ms": round(self._wait_max * 1000, 2),
+                "health_checks": self._health_checks,
+                "health_check_failures": self._health_failures,
+            }
+
+
+_pool: ConnectionPool | None = None
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is not None and pool.path == Settings.DB_PATH:
+        return pool
+    with _lock:
+        if _pool is None or _pool.path != Settings.DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            Settings.ensure_dirs()
+            _pool = ConnectionPool(
+                Settings.DB_PATH,
+                Settings.DB_POOL_SIZE,
+                Settings.DB_POOL_TIMEOUT,
+                Settings.DB_POOL_HEALTH_IDLE,
+            )
+        return _pool
+
+def close_pool() -> None:
+    """Close every idle pooled connection (e.g. before replacing the DB file)."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
+
 @contextmanager
 def get_connection() -> Iterator[sqlite3.Connection]:
-    Settings.ensure_dirs()
-    with _lock:
-        con = sqlite3.connect(Settings.DB_PATH, timeout=30)
+    pool = get_pool()
+    con = pool.acquire()
     try:
-        con.row_factory = _row_factory
-        _apply_pragmas(con)
         yield con
     finally:
-        con.close()
+        pool.release(con)
 
 def health_ok() -> bool:
     try:
@@ -37,10 +264,7 @@ def health_ok() -> bool:
 def get_db():
     from flask import g
     if 'db' not in g:
-        con = sqlite3.connect(Settings.DB_PATH, timeout=30)
-        con.row_factory = _row_factory
-        _apply_pragmas(con)
-        g.db = con
+        g.db = _connect(Settings.DB_PATH)
     return g.db
 
 class User:
@@ -60,4 +284,3 @@ def get_user_by_username(username: str) -> User | None:
         if not row:
             return None
         return User(row["id"], row["username"], row["password_hash"])
-
@@ -7,11 +7,62 @@ import unicodedata
 from typing import Callable, Iterable, Sequence
 
 from .config import Settings
-from .db import get_connection
+from .db import close_pool, get_connection
 from ..services.db.security import hash_password
+from ..services import export_jobs, material_catalog, notification_store, org_directory, solicitud_items
+from ..services.dashboard import status_summary
 
 MigrationFn = Callable[[sqlite3.Connection], None]
-MIGRATIONS: Sequence[tuple[int, MigrationFn]] = ()
+
+
+def _run_script(con: sqlite3.Connection, script: str) -> None:
+    """Como ``executescript`` pero sin confirmar: la migración queda en la transacción abierta."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            con.execute(statement)
+            statement = ""
+    if statement.strip():
+        con.execute(statement)
+
+
+def _migrate_solicitud_items(con: sqlite3.Connection) -> None:
+    """Tabla normalizada de ítems, completada desde data_json."""
+    _run_script(con, solicitud_items.SCHEMA_SQL)
+    solicitud_items.backfill(con)
+
+
+def _migrate_notificaciones_unread(con: sqlite3.Connection) -> None:
+    """Destinatarios en minúsculas, índice por fecha y contador de no leídas."""
+    _run_script(con, notification_store.SCHEMA_SQL)
+    notification_store.backfill(con)
+
+
+def _migrate_status_summary(con: sqlite3.Connection) -> None:
+    """Resumen de solicitudes por usuario y estado para los dashboards."""
+    _run_script(con, status_summary.SCHEMA_SQL)
+    status_summary.backfill(con)
+
+
+def _migrate_export_jobs(con: sqlite3.Connection) -> None:
+    """Registro de exportaciones en segundo plano (estado, latido y vencimiento)."""
+    _run_script(con, export_jobs.SCHEMA_SQL)
+
+
+def _migrate_export_jobs_active(con: sqlite3.Connection) -> None:
+    """Un solo trabajo de exportación activo por pedido (índice único parcial)."""
+    export_jobs.close_duplicate_active(con)
+    _run_script(con, export_jobs.SCHEMA_SQL)
+
+
+MIGRATIONS: Sequence[tuple[int, MigrationFn]] = (
+    (1, _migrate_solicitud_items),
+    (2, _migrate_notificaciones_unread),
+    (3, _migrate_status_summary),
+    (4, _migrate_export_jobs),
+    (5, _migrate_export_jobs_active),
+)
 
 CATEGORY_FALSE_TOKENS = {"0", "false", "no", "off", "inactivo", "inactive"}
 
@@ -61,18 +112,36 @@ def _get_applied_versions(con: sqlite3.Connection) -> set[int]:
     return {int(row["version"]) for row in rows}
 
 
-def _apply_migrations(con: sqlite3.Connection) -> None:
-    applied = _get_applied_versions(con)
+def _apply_migrations(con: sqlite3.Connection) -> list[int]:
+    """Aplica las migraciones pendientes; devuelve las versiones aplicadas.
+
+    Cada migración corre en su propia transacción ``BEGIN IMMEDIATE`` y vuelve a
+    leer las versiones ya aplicadas, así dos workers que arrancan a la vez sobre
+    la misma base no aplican dos veces la misma migración.
+    """
+    _ensure_migration_table(con)
+    con.commit()
+    done: list[int] = []
     for version, migration_fn in MIGRATIONS:
-        if version in applied:
-            continue
+        con.execute("BEGIN IMMEDIATE")
         try:
+            if version in _get_applied_versions(con):
+                con.rollback()
+                continue
             migration_fn(con)
             con.execute("INSERT INTO schema_migrations(version) VALUES (?)", (version,))
             con.commit()
         except Exception:
             con.rollback()
             raise
+        done.append(version)
+    return done
+
+
+def migrate_db() -> list[int]:
+    """Lleva una base existente al esquema actual (migraciones pendientes de ``MIGRATIONS``)."""
+    with get_connection() as con:
+        return _apply_migrations(con)
 
 
 def _normalize_key(value: str) -> str:
@@ -353,9 +422,51 @@ def _backfill_catalog_tables(con: sqlite3.Connection) -> None:
     _insert_ignore_many(con, "catalog_sectores", ("nombre", "descripcion", "activo"), sector_rows)
 
 
+MATERIALES_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS materiales_fts USING fts5(
+    codigo,
+    descripcion,
+    descripcion_larga,
+    content='materiales',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3 4'
+);
+CREATE TRIGGER IF NOT EXISTS trg_materiales_fts_ai AFTER INSERT ON materiales BEGIN
+    INSERT INTO materiales_fts(rowid, codigo, descripcion, descripcion_larga)
+    VALUES (new.rowid, new.codigo, new.descripcion, new.descripcion_larga);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_materiales_fts_ad AFTER DELETE ON materiales BEGIN
+    INSERT INTO materiales_fts(materiales_fts, rowid, codigo, descripcion, descripcion_larga)
+    VALUES ('delete', old.rowid, old.codigo, old.descripcion, old.descripcion_larga);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_materiales_fts_au AFTER UPDATE ON materiales BEGIN
+    INSERT INTO materiales_fts(materiales_fts, rowid, codigo, descripcion, descripcion_larga)
+    VALUES ('delete', old.rowid, old.codigo, old.descripcion, old.descripcion_larga);
+    INSERT INTO materiales_fts(rowid, codigo, descripcion, descripcion_larga)
+    VALUES (new.rowid, new.codigo, new.descripcion, new.descripcion_larga);
+END;
+"""
+
+
+def _ensure_materiales_fts(con: sqlite3.Connection) -> bool:
+    """Crea el índice FTS5 de materiales y sus triggers; False si SQLite no trae FTS5."""
+    try:
+        con.executescript(MATERIALES_FTS_SQL)
+    except sqlite3.OperationalError:
+        # Build de SQLite sin FTS5: la búsqueda sigue funcionando con LIKE
+        return False
+    return True
+
+
+def _rebuild_materiales_fts(con: sqlite3.Connection) -> None:
+    con.execute("INSERT INTO materiales_fts(materiales_fts) VALUES ('rebuild')")
+
+
 def build_db(force: bool = False) -> None:
     Settings.ensure_dirs()
     if force and os.path.exists(Settings.DB_PATH):
+        close_pool()
         os.remove(Settings.DB_PATH)
     with get_connection() as con:
         con.executescript(
@@ -448,6 +559,10 @@ def build_db(force: bool = False) -> None:
             );
             CREATE INDEX IF NOT EXISTS idx_mat_desc ON materiales(descripcion);
             CREATE INDEX IF NOT EXISTS idx_sol_user ON solicitudes(id_usuario, created_at);
+            CREATE INDEX IF NOT EXISTS idx_sol_user_lower_created ON solicitudes(lower(id_usuario), created_at);
+            CREATE INDEX IF NOT EXISTS idx_sol_planner_lower_status ON solicitudes(lower(planner_id), status);
+            CREATE INDEX IF NOT EXISTS idx_usuarios_lower_id ON usuarios(lower(id_spm));
+            CREATE INDEX IF NOT EXISTS idx_usuarios_lower_mail ON usuarios(lower(mail));
             CREATE TABLE IF NOT EXISTS notificaciones(
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 destinatario_id TEXT NOT NULL,
@@ -661,6 +776,7 @@ def build_db(force: bool = False) -> None:
             con.execute("ALTER TABLE solicitudes ADD COLUMN fecha_necesidad TEXT")
 
         _apply_migrations(con)
+        has_fts = _ensure_materiales_fts(con)
 
         data_dir = Settings.DATA_DIR
         usuarios_csv = os.path.join(data_dir, "Usuarios.csv")
@@ -912,7 +1028,11 @@ def build_db(force: bool = False) -> None:
                 )
 
         _backfill_catalog_tables(con)
+        if has_fts:
+            _rebuild_materiales_fts(con)
         con.commit()
+    material_catalog.invalidate()
+    org_directory.invalidate()
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from functools import wraps
 import os
+import jwt
 from flask import request, jsonify
 from typing import Any, Callable, TypeVar
 
@@ -52,7 +53,10 @@ def require_roles(*allowed):
             token = request.cookies.get('spm_token')
             if not token:
                 return jsonify({'error':'unauthorized'}), 401
-            payload = verify_token(token)
+            try:
+                payload = verify_token(token)
+            except jwt.InvalidTokenError:
+                payload = None
             if not payload:
                 return jsonify({'error':'unauthorized'}), 401
             roles = payload.get('roles', [])
@@ -1,33 +1,219 @@
+"""
+Rate limiting por ventana fija con backend compartido entre procesos.
+
+Cada clave guarda un único contador por ventana (``window_start``, ``count``) en
+lugar de una cola de timestamps. El backend por defecto es SQLite
+(``SPM_RATELIMIT_BACKEND=sqlite``, archivo ``SPM_RATELIMIT_DB`` o
+``DATA_DIR/ratelimit.db``), así el límite es el mismo con N workers de gunicorn;
+``memory`` queda como reemplazo local para un solo proceso. Otro backend (p.ej. Redis)
+solo necesita implementar ``hit``, ``evict``, ``metrics`` y ``reset``.
+Las claves inactivas se purgan cada ``_EVICT_INTERVAL`` segundos.
+
+Si SQLite no responde (base bloqueada u ocupada más allá del timeout) el limitador
+deja pasar el pedido sin contarlo y registra el error: la contención en el archivo
+de contadores no debe convertirse en errores 500 del login.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
 import time
-from collections import deque, defaultdict
 from functools import wraps
-from flask import request, jsonify
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from flask import jsonify, request
+
+from ..core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_EVICT_INTERVAL = 60.0
+
+
+class Hit(NamedTuple):
+    allowed: bool
+    count: int
+    reset_at: float
+
+
+def _window_start(now: float, window: int) -> int:
+    return int(now // window) * window
+
+
+class MemoryBackend:
+    """Contadores en memoria del proceso (tests / despliegues de un solo worker)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, List[Any]] = {}  # key -> [window_start, count, expires_at, blocked]
+
+    def hit(self, key: str, limit: int, window: int, now: float) -> Hit:
+        start = _window_start(now, window)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[0] != start:
+                blocked = entry[3] if entry else 0
+                entry = self._counters[key] = [start, 0, start + window, blocked]
+            entry[1] += 1
+            allowed = entry[1] <= limit
+            if not allowed:
+                entry[3] += 1
+            return Hit(allowed, entry[1], entry[2])
+
+    def evict(self, now: float) -> int:
+        with self._lock:
+            stale = [key for key, entry in self._counters.items() if entry[2] <= now]
+            for key in stale:
+                del self._counters[key]
+        return len(stale)
+
+    def metrics(self, prefix: str = "") -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                key: {"window_start": entry[0], "count": entry[1], "reset_at": entry[2], "blocked": entry[3]}
+                for key, entry in self._counters.items()
+                if key.startswith(prefix)
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteBackend:
+    """Contadores en un archivo SQLite (WAL) compartido por todos los workers."""
 
-_buckets = defaultdict(deque)  # key -> deque[timestamps]
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            window_start INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            blocked INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits(expires_at);
+    """
 
-def _now(): return time.monotonic()
+    # Un solo UPSERT atómico: reinicia el contador al cambiar de ventana
+    _HIT_SQL = """
+        INSERT INTO rate_limits (key, window_start, count, expires_at, blocked)
+        VALUES (?, ?, 1, ?, 0)
+        ON CONFLICT(key) DO UPDATE SET
+            count = CASE WHEN window_start = excluded.window_start THEN count + 1 ELSE 1 END,
+            blocked = blocked + (CASE WHEN window_start = excluded.window_start THEN count + 1 ELSE 1 END > ?),
+            window_start = excluded.window_start,
+            expires_at = excluded.expires_at
+        RETURNING count
+    """
 
-def _check(key, limit, window):
-    q = _buckets[key]
+    def __init__(self, path: str, timeout: float = 5.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            con = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.executescript(self._SCHEMA)
+            self._local.con = con
+        return con
+
+    def hit(self, key: str, limit: int, window: int, now: float) -> Hit:
+        start = _window_start(now, window)
+        try:
+            count = self._con().execute(self._HIT_SQL, (key, start, start + window, limit)).fetchone()[0]
+        except sqlite3.Error as exc:
+            # Fail open: sin contador disponible se deja pasar (count 0 = no contado)
+            logger.warning("Rate limit no disponible para %s: %s", key, exc)
+            return Hit(True, 0, start + window)
+        return Hit(count <= limit, count, start + window)
+
+    def evict(self, now: float) -> int:
+        try:
+            return self._con().execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,)).rowcount
+        except sqlite3.Error as exc:
+            logger.warning("No se pudieron purgar los contadores de rate limit: %s", exc)
+            return 0
+
+    def metrics(self, prefix: str = "") -> Dict[str, Dict[str, Any]]:
+        rows = self._con().execute(
+            "SELECT key, window_start, count, expires_at, blocked FROM rate_limits WHERE key >= ? AND key < ?",
+            (prefix, prefix + "\uffff"),
+        ).fetchall()
+        return {
+            key: {"window_start": start, "count": count, "reset_at": expires, "blocked": blocked}
+            for key, start, count, expires, blocked in rows
+        }
+
+    def reset(self) -> None:
+        self._con().execute("DELETE FROM rate_limits")
+
+
+_backend_lock = threading.Lock()
+_backend: Optional[Any] = None
+_last_evict = 0.0
+
+
+def _db_path() -> str:
+    return Settings.RATELIMIT_DB_PATH or os.path.join(Settings.DATA_DIR, "ratelimit.db")
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if Settings.RATELIMIT_BACKEND == "memory":
+                _backend = MemoryBackend()
+            else:
+                _backend = SQLiteBackend(_db_path())
+        return _backend
+
+
+def set_backend(backend) -> None:
+    """Reemplaza el backend (``None`` vuelve a elegirlo según la configuración)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _now(): return time.time()
+
+
+def _check(key, limit, window) -> Hit:
+    global _last_evict
+    backend = get_backend()
     t = _now()
-    # purga
-    cutoff = t - window
-    while q and q[0] <= cutoff:
-        q.popleft()
-    if len(q) >= limit:
-        return False
-    q.append(t)
-    return True
+    if t - _last_evict >= _EVICT_INTERVAL:
+        _last_evict = t
+        backend.evict(t)
+    return backend.hit(key, int(limit), max(int(window), 1), t)
+
+
+def metrics(prefix: str = "") -> Dict[str, Dict[str, Any]]:
+    """Estado por clave: contador de la ventana actual, fin de ventana y rechazos."""
+    return get_backend().metrics(prefix)
+
 
 def limit(key='rl', limit=30, window=60):
-    """Token bucket simple por IP: limit reqs cada window segundos."""
+    """Ventana fija por IP: limit reqs cada window segundos."""
     def deco(f):
         @wraps(f)
         def w(*a, **kw):
             ip = (request.headers.get('X-Forwarded-For') or request.remote_addr or 'na').split(',')[0].strip()
             k = f'{key}:{ip}'
-            if not _check(k, limit, window):
-                return jsonify({'error':'rate_limited'}), 429
+            hit = _check(k, limit, window)
+            if not hit.allowed:
+                resp = jsonify({'error':'rate_limited'})
+                resp.headers['Retry-After'] = str(max(int(hit.reset_at - _now()), 1))
+                return resp, 429
             return f(*a, **kw)
         return w
     return deco
@@ -7,10 +7,19 @@ from flask import Blueprint, request
 from typing import Any, Dict, List, Optional
 from ..core.config import Settings
 from ..core.db import get_connection
-from ..services.auth.auth import authenticate_request, get_current_user, get_current_user_id
+from ..services.auth.auth import authenticate_request, get_current_user, get_current_user_id, invalidate_user_cache
 from ..services.db.security import hash_password
-from ..routes.solicitudes import STATUS_PENDING, STATUS_CANCEL_PENDING, STATUS_CANCEL_REJECTED
+from ..routes.solicitudes import (
+    STATUS_CANCEL_PENDING,
+    STATUS_CANCEL_REJECTED,
+    STATUS_PENDING,
+    export_filters,
+    file_export_response,
+)
+from ..services import material_catalog, org_directory
+from ..services.dashboard import status_summary
 from ..services.health import get_system_status
+from ..services.solicitud_items import aggregate_demand
 
 bp = Blueprint("admin", __name__, url_prefix="/api/admin")
 
@@ -84,13 +93,7 @@ def _require_admin(con) -> tuple[Dict[str, Any] | None, Dict[str, Any] | None]:
     role = (user.get("rol") or "").lower()
     if "admin" not in role:
         return None, {"status": 403, "body": {"ok": False, "error": {"code": "FORBIDDEN", "message": "Acceso restringido a administradores"}}}
-    row = con.execute(
-        "SELECT id_spm, nombre, apellido, rol FROM usuarios WHERE lower(id_spm)=?",
-        (uid.lower(),),
-    ).fetchone()
-    if not row:
-        return None, {"status": 401, "body": {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}}
-    return row, None
+    return user, None
 
 
 def _split_centros(value: str | None) -> List[str]:
@@ -239,18 +242,7 @@ def resumen():
         _, error = _require_admin(con)
         if error:
             return error["body"], error["status"]
-        stats = con.execute(
-            """
-            SELECT
-                COUNT(*) AS total,
-                SUM(CASE WHEN status IN (?, ?) THEN 1 ELSE 0 END) AS pendientes,
-                SUM(CASE WHEN status='finalizada' THEN 1 ELSE 0 END) AS finalizadas,
-                SUM(CASE WHEN status='cancelada' THEN 1 ELSE 0 END) AS canceladas,
-                SUM(CASE WHEN status='draft' THEN 1 ELSE 0 END) AS borradores
-            FROM solicitudes
-            """,
-            (STATUS_PENDING, STATUS_CANCEL_PENDING),
-        ).fetchone()
+        counts = status_summary.status_counts(con)
         roles = con.execute(
             "SELECT rol, COUNT(*) AS cantidad FROM usuarios GROUP BY rol ORDER BY cantidad DESC"
         ).fetchall()
@@ -274,18 +266,18 @@ def resumen():
              LIMIT 6
             """
         ).fetchall()
-        materiales = con.execute("SELECT COUNT(*) AS total FROM materiales").fetchone()
+        materiales = material_catalog.material_count(con)
         usuarios = con.execute("SELECT COUNT(*) AS total FROM usuarios").fetchone()
     return {
         "ok": True,
         "totals": {
-            "solicitudes": stats["total"] if stats else 0,
-            "pendientes": stats["pendientes"] if stats else 0,
-            "finalizadas": stats["finalizadas"] if stats else 0,
-            "canceladas": stats["canceladas"] if stats else 0,
-            "borradores": stats["borradores"] if stats else 0,
+            "solicitudes": sum(counts.values()),
+            "pendientes": counts.get(STATUS_PENDING, 0) + counts.get(STATUS_CANCEL_PENDING, 0),
+            "finalizadas": counts.get("finalizada", 0),
+            "canceladas": counts.get("cancelada", 0),
+            "borradores": counts.get("draft", 0),
             "usuarios": usuarios["total"] if usuarios else 0,
-            "materiales": materiales["total"] if materiales else 0,
+            "materiales": materiales,
         },
         "roles": roles,
         "top_centros": top_centros,
@@ -399,6 +391,8 @@ def actualizar_usuario(user_id: str):
                 params,
             )
             con.commit()
+            org_directory.invalidate()
+            invalidate_user_cache(existing["id_spm"])
         refreshed = con.execute(
             """
                         SELECT id_spm, nombre, apellido, rol, mail, sector, posicion, centros, jefe, gerente1, gerente2
@@ -459,6 +453,22 @@ def administrar_solicitudes():
     }
 
 
+@bp.get("/solicitudes/export/excel")
+def exportar_solicitudes_excel():
+    try:
+        filters = export_filters()
+    except ValueError as exc:
+        return {"ok": False, "error": {"code": "BAD_REQUEST", "message": str(exc)}}, 400
+    with get_connection() as con:
+        _, error = _require_admin(con)
+        if error:
+            return error["body"], error["status"]
+    response = file_export_response("excel", filters, title="Solicitudes", filename="solicitudes", include_owner=True)
+    if response is None:
+        return {"ok": False, "error": {"code": "NO_DATA", "message": "No hay solicitudes para exportar"}}, 404
+    return response
+
+
 @bp.get("/materiales")
 def administrar_materiales():
     q = (request.args.get("q") or "").strip().lower()
@@ -491,6 +501,19 @@ def administrar_materiales():
     return {"ok": True, "total": total, "items": rows}
 
 
+@bp.get("/materiales/demanda")
+def demanda_materiales():
+    centro = (request.args.get("centro") or "").strip() or None
+    statuses = [part.strip().lower() for part in (request.args.get("status") or "").split(",") if part.strip()]
+    limit = _safe_limit(request.args.get("limit"), 100, 500)
+    with get_connection() as con:
+        _, error = _require_admin(con)
+        if error:
+            return error["body"], error["status"]
+        rows = aggregate_demand(con, centro=centro, statuses=statuses, limit=limit)
+    return {"ok": True, "items": rows}
+
+
 @bp.route("/materiales/<codigo>", methods=["PUT", "OPTIONS"])
 def actualizar_material(codigo: str):
     if request.method == "OPTIONS":
@@ -530,6 +553,7 @@ def actualizar_material(codigo: str):
             (descripcion, descripcion_larga, unidad, precio_value, codigo),
         )
         con.commit()
+        material_catalog.invalidate()
         row = con.execute(
             "SELECT codigo, descripcion, descripcion_larga, unidad, precio_usd, centro, sector FROM materiales WHERE codigo=?",
             (codigo,),
@@ -619,6 +643,8 @@ def crear_configuracion(resource: str):
                 values,
             )
             con.commit()
+            if table == "materiales":
+                material_catalog.invalidate()
         except sqlite3.IntegrityError:
             return {
                 "ok": False,
@@ -668,6 +694,8 @@ def actualizar_configuracion(resource: str, item_id: int):
                 params,
             )
             con.commit()
+            if table == "materiales":
+                material_catalog.invalidate()
         except sqlite3.IntegrityError:
             return {
                 "ok": False,
@@ -699,6 +727,8 @@ def eliminar_configuracion(resource: str, item_id: int):
         if cursor.rowcount == 0:
             return {"ok": False, "error": {"code": "NOTFOUND", "message": "Registro no encontrado"}}, 404
         con.commit()
+        if table == "materiales":
+            material_catalog.invalidate()
         if meta.get("csv"):
             try:
                 _sync_catalog_csv(con, meta)
@@ -909,6 +939,8 @@ def procesar_solicitud_perfil(request_id):
             message = "Solicitud rechazada"
 
         con.commit()
+        org_directory.invalidate()
+        invalidate_user_cache(usuario_id)
 
     return {"ok": True, "message": message}
 
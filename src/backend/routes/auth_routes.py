@@ -13,12 +13,16 @@ from ..services.auth.auth import (
     clear_auth_cookie,
     get_current_user,
     get_current_user_id,
+    invalidate_user_cache,
     issue_token,
     set_auth_cookie,
 )
 from ..core.db import get_connection
 from ..models.schemas import AdditionalCentersRequest, RegisterRequest, UpdateMailRequest, UpdatePhoneRequest
-from ..services.db.security import hash_password
+from ..services import org_directory
+from ..services.notification_hub import notify_later
+from ..services.auth import password_pool
+from ..services.auth.password_pool import PasswordPoolBusy
 
 bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 logger = logging.getLogger(__name__)
@@ -32,6 +36,12 @@ def _inject_auth_context() -> None:
     authenticate_request()
 
 
+def _busy_response(exc: PasswordPoolBusy):
+    response = jsonify(error="busy", message=str(exc))
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response, 429
+
+
 def _public_profile(user: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": user.get("id"),
@@ -59,7 +69,10 @@ def login():
     password = payload.get("password") or payload.get("contrasena") or ""
     if not username or not password:
         return jsonify(error="invalid_credentials"), 401
-    user = authenticate_user(username, password)
+    try:
+        user = authenticate_user(username, password)
+    except PasswordPoolBusy as exc:
+        return _busy_response(exc)
     if not user:
         return jsonify(error="invalid_credentials"), 401
     extra_claims = {"rol": user.get("rol"), "mail": user.get("mail")}
@@ -84,6 +97,10 @@ def refresh():
 @bp.route("/register", methods=["POST"])
 def register():
     payload = RegisterRequest(**request.get_json(force=True))
+    try:
+        password_hash = password_pool.hash_password(payload.password)
+    except PasswordPoolBusy as exc:
+        return _busy_response(exc)
     with get_connection() as con:
         try:
             mail = None
@@ -99,12 +116,13 @@ def register():
                     payload.nombre,
                     payload.apellido,
                     payload.rol,
-                    hash_password(payload.password),
+                    password_hash,
                     mail,
                     "Pendiente",
                 ),
             )
             con.commit()
+            org_directory.invalidate()
             return {"ok": True}, 201
         except Exception:
             con.rollback()
@@ -148,6 +166,8 @@ def _update_profile_fields(data: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any
     with get_connection() as con:
         con.execute(f"UPDATE usuarios SET {assignments} WHERE id_spm=?", values)
         con.commit()
+        org_directory.invalidate()
+    invalidate_user_cache(uid)
     authenticate_request()  # refresh cached user/profile
     updated = get_current_user()
     return updated, None
@@ -207,6 +227,8 @@ def _persist_additional_centers(uid: str, payload: AdditionalCentersRequest) ->
             )
             notified.add(dest)
         con.commit()
+    if notified:
+        notify_later()
 
 
 @bp.post("/me/change-requests")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from flask import Blueprint, Response, request
+
+from ..models.roles import has_role
+from ..services import export_jobs
+from ..services.auth.auth import authenticate_request, get_current_user, get_current_user_id
+from ..services.exports import EXPORT_FORMATS, stream_file
+from .solicitudes import export_filters
+
+bp = Blueprint("exportaciones", __name__, url_prefix="/api/exportaciones")
+
+
+def _require_auth() -> str | None:
+    uid = get_current_user_id()
+    if uid:
+        return uid
+    authenticate_request()
+    uid = get_current_user_id()
+    return uid
+
+
+def _error(code: str, message: str, status: int):
+    return {"ok": False, "error": {"code": code, "message": message}}, status
+
+
+def _is_admin() -> bool:
+    return has_role(get_current_user(), "admin")
+
+
+@bp.post("")
+def crear_exportacion():
+    """Encola una exportación. Body/query: ``formato`` (excel|pdf), ``alcance``
+    (mias|todas, esta última solo admin) y los filtros de ``export_filters``."""
+    uid = _require_auth()
+    if not uid:
+        return _error("NOAUTH", "No autenticado", 401)
+    payload = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+    formato = str(payload.get("formato") or "excel").strip().lower()
+    if formato not in EXPORT_FORMATS:
+        return _error("BAD_REQUEST", "Formato inválido (excel o pdf)", 400)
+    todas = str(payload.get("alcance") or "mias").strip().lower() == "todas"
+    if todas and not _is_admin():
+        return _error("FORBIDDEN", "Acceso restringido a administradores", 403)
+    try:
+        filters = export_filters(payload) if todas else export_filters(payload, id_usuario=uid)
+    except ValueError as exc:
+        return _error("BAD_REQUEST", str(exc), 400)
+    try:
+        job = export_jobs.submit(
+            formato,
+            uid,
+            filters,
+            title="Solicitudes - SPM" if todas else "Mis Solicitudes - SPM",
+            include_owner=todas,
+        )
+    except export_jobs.ExportJobError as exc:
+        return _error("EXPORT_ERROR", str(exc), 500)
+    return {"ok": True, "job": job}, 202
+
+
+@bp.get("/<job_id>")
+def estado_exportacion(job_id: str):
+    uid = _require_auth()
+    if not uid:
+        return _error("NOAUTH", "No autenticado", 401)
+    job = export_jobs.get_job(job_id, owner=uid)
+    if not job:
+        return _error("NOTFOUND", "Exportación no encontrada", 404)
+    return {"ok": True, "job": job}
+
+
+@bp.get("/<job_id>/descarga")
+def descargar_exportacion(job_id: str):
+    uid = _require_auth()
+    if not uid:
+        return _error("NOAUTH", "No autenticado", 401)
+    job, path = export_jobs.result_file(job_id, owner=uid)
+    if not job:
+        return _error("NOTFOUND", "Exportación no encontrada", 404)
+    if job["status"] == export_jobs.STATUS_EXPIRED:
+        return _error("EXPIRED", "La exportación venció, vuelva a solicitarla", 410)
+    if path is None:
+        return _error("NOT_READY", f"La exportación está en estado {job['status']}", 409)
+    meta = EXPORT_FORMATS[job["formato"]]
+    return Response(
+        stream_file(path, remove=False),
+        mimetype=meta["mimetype"],
+        headers={"Content-Disposition": f'attachment; filename="solicitudes_{job_id[:8]}{meta["suffix"]}"'},
+        direct_passthrough=True,
+    )
@@ -1,40 +1,130 @@
 from __future__ import annotations
+import re
+import sqlite3
 from flask import Blueprint, request
 from ..core.db import get_connection
 from ..models.schemas import MaterialSearchQuery
 
 bp = Blueprint("materiales", __name__, url_prefix="/api")
 
-@bp.get("/materiales")
-def search_materiales():
-    params = MaterialSearchQuery(**request.args.to_dict())
-    clauses: list[str] = []
-    args: list[str] = []
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Pesos bm25 por columna: codigo, descripcion, descripcion_larga
+_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
 
+def _fts_match(text: str, columns: tuple[str, ...] | None = None) -> str | None:
+    """Arma una expresión MATCH con prefijo por término (todos requeridos)."""
+    tokens = _TOKEN_RE.findall(text or "")
+    if not tokens:
+        return None
+    terms = " AND ".join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    if columns:
+        return "{%s} : (%s)" % (" ".join(columns), terms)
+    return terms
+
+
+def _search_fts(con, params: MaterialSearchQuery) -> list[dict] | None:
+    matches: list[str] = []
+    if params.q:
+        match = _fts_match(params.q)
+        if match is None:
+            return None
+        matches.append(f"({match})")
+    if params.descripcion:
+        match = _fts_match(params.descripcion, ("descripcion", "descripcion_larga"))
+        if match is None:
+            return None
+        matches.append(f"({match})")
+    if not matches:
+        return None
+
+    clauses = ["materiales_fts MATCH ?"]
+    args: list[object] = [" AND ".join(matches)]
     if params.codigo:
-        # Usar búsqueda de prefijo para códigos, es más rápido y relevante.
-        like_code = f"{params.codigo}%"
-        clauses.append("codigo LIKE ?")
-        args.append(like_code)
-    
+        clauses.append("m.codigo LIKE ?")
+        args.append(f"{params.codigo}%")
+    try:
+        cur = con.execute(
+            f"""
+            SELECT m.codigo, m.descripcion, m.descripcion_larga, m.unidad, m.precio_usd
+            FROM materiales_fts
+            JOIN materiales m ON m.rowid = materiales_fts.rowid
+            WHERE {" AND ".join(clauses)}
+            ORDER BY bm25(materiales_fts, ?, ?, ?), m.codigo
+            LIMIT ?
+            """, (*args, *_BM25_WEIGHTS, params.limit)
+        )
+    except sqlite3.OperationalError:
+        # Índice FTS ausente (base antigua o SQLite sin FTS5): usar LIKE
+        return None
+    rows = [dict(r) for r in cur.fetchall()]
+    if params.q and len(rows) < params.limit and len(_TOKEN_RE.findall(params.q)) == 1:
+        rows.extend(_search_codigo_substring(con, params, clauses[1:], args[1:], rows))
+    return rows
+
+
+def _search_codigo_substring(con, params: MaterialSearchQuery, clauses, args, seen_rows) -> list[dict]:
+    """Completa con códigos que contienen ``q`` en el medio (p.ej. ``q=00003``).
+
+    FTS5 solo encuentra prefijos de término; la búsqueda anterior con LIKE ``%q%``
+    también aceptaba fragmentos internos del código y se conserva para ``q`` de un
+    solo término, detrás de los resultados rankeados.
+    """
+    where = ["m.codigo LIKE ?", *clauses]
+    where_args: list[object] = [f"%{params.q}%", *args]
     if params.descripcion:
-        like_desc = f"%{params.descripcion}%"
-        clauses.append("descripcion LIKE ?")
-        args.append(like_desc)
+        match = _fts_match(params.descripcion, ("descripcion", "descripcion_larga"))
+        where.append("m.rowid IN (SELECT rowid FROM materiales_fts WHERE materiales_fts MATCH ?)")
+        where_args.append(match)
+    seen = {row["codigo"] for row in seen_rows}
+    cur = con.execute(
+        f"""
+        SELECT m.codigo, m.descripcion, m.descripcion_larga, m.unidad, m.precio_usd
+        FROM materiales m
+        WHERE {" AND ".join(where)}
+        ORDER BY m.codigo
+        LIMIT ?
+        """, (*where_args, params.limit)
+    )
+    extra = [dict(r) for r in cur.fetchall() if r["codigo"] not in seen]
+    return extra[: params.limit - len(seen_rows)]
 
-    if params.q:
-        like_any = f"%{params.q}%"
-        clauses.append("(codigo LIKE ? OR descripcion LIKE ?)")
-        args.extend([like_any, like_any])
 
-    if not clauses:
-        # Si no hay filtros, devolver todos (limitados)
-        where = "1=1"
-    else:
-        where = " AND ".join(clauses)
-    limit = params.limit
+@bp.get("/materiales")
+def search_materiales():
+    params = MaterialSearchQuery(**request.args.to_dict())
 
     with get_connection() as con:
+        ranked = _search_fts(con, params)
+        if ranked is not None:
+            return ranked
+
+        clauses: list[str] = []
+        args: list[str] = []
+
+        if params.codigo:
+            # Usar búsqueda de prefijo para códigos, es más rápido y relevante.
+            like_code = f"{params.codigo}%"
+            clauses.append("codigo LIKE ?")
+            args.append(like_code)
+
+        if params.descripcion:
+            like_desc = f"%{params.descripcion}%"
+            clauses.append("descripcion LIKE ?")
+            args.append(like_desc)
+
+        if params.q:
+            like_any = f"%{params.q}%"
+            clauses.append("(codigo LIKE ? OR descripcion LIKE ?)")
+            args.extend([like_any, like_any])
+
+        if not clauses:
+            # Si no hay filtros, devolver todos (limitados)
+            where = "1=1"
+        else:
+            where = " AND ".join(clauses)
+        limit = params.limit
+
         cur = con.execute(
             f"""
             SELECT codigo, descripcion, descripcion_larga, unidad, precio_usd
@@ -44,4 +134,4 @@ def search_materiales():
             LIMIT ?
             """, (*args, limit)
         )
-        return [dict(r) for r in cur.fetchall()]
\ No newline at end of file
+        return [dict(r) for r in cur.fetchall()]
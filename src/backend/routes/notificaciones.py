@@ -1,14 +1,25 @@
 from __future__ import annotations
 import json
+import math
 from datetime import datetime
-from flask import Blueprint, request
+from flask import Blueprint, Response, request, stream_with_context
+from ..core.config import Settings
 from ..core.db import get_connection
+from ..services import notification_hub, notification_store
+from ..services.db.paging import decode_cursor, encode_cursor
 from ..models.schemas import CentroRequestDecision
-from ..services.auth.auth import authenticate_request, get_current_user_id
+from ..services.auth.auth import (
+    authenticate_request,
+    get_current_user,
+    get_current_user_id,
+    invalidate_user_cache,
+)
 from .solicitudes import STATUS_PENDING
 
 bp = Blueprint("notificaciones", __name__, url_prefix="/api")
 
+_PAGE_DEFAULT = 50
+
 
 def _parse_centros_value(raw) -> list[str]:
     """Normalise the stored centres list into a clean sequence."""
@@ -47,44 +58,104 @@ def _require_auth() -> str | None:
     return uid
 
 
+@bp.after_app_request
+def _wake_notification_hub(response):
+    # Las notificaciones creadas en el pedido ya están confirmadas: avisar a los streams
+    notification_hub.flush_pending()
+    return response
+
+
+@bp.get("/notificaciones/stream")
+def stream_notificaciones():
+    """Server-Sent Events con las notificaciones nuevas y el contador de no leídas.
+
+    ``Last-Event-ID`` (o ``?last_event_id=``) reenvía lo creado desde ese id;
+    ``?canal=unread`` emite solo el contador. Con ``Settings.SSE_MAX_STREAMS``
+    streams abiertos en el proceso responde 503 con ``Retry-After``.
+    """
+    uid = _require_auth()
+    if not uid:
+        return {"ok": False, "error": {"code": "NOAUTH", "message": "No autenticado"}}, 401
+    raw_last = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    last_event_id = None
+    if raw_last:
+        try:
+            last_event_id = max(int(raw_last), 0)
+        except (TypeError, ValueError):
+            return {"ok": False, "error": {"code": "BAD_REQUEST", "message": "Last-Event-ID inválido"}}, 400
+    unread_only = (request.args.get("canal") or "").strip().lower() == "unread"
+    hub = notification_hub.get_hub()
+    try:
+        sub = hub.subscribe(notification_store.normalize_id(uid))
+    except notification_hub.StreamLimitReached as exc:
+        # Sin hilos libres para otro stream: el cliente pasa a consultar con since_id
+        retry_after = max(math.ceil(Settings.SSE_RETRY_MS / 1000), 1)
+        body = {
+            "ok": False,
+            "error": {"code": "STREAMS_BUSY", "message": str(exc)},
+            "fallback": {"poll": "/api/notificaciones", "since_id": last_event_id},
+        }
+        return body, 503, {"Retry-After": str(retry_after)}
+    stream = notification_hub.event_stream(
+        uid, last_event_id=last_event_id, unread_only=unread_only, sub=sub
+    )
+    response = Response(stream_with_context(stream), mimetype="text/event-stream")
+    # Si el generador nunca arranca, su finally no corre: liberar el lugar al cerrar
+    response.call_on_close(lambda: hub.unsubscribe(sub))
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _page_args():
+    """``(limit, before, since_id)`` desde la query; ValueError si algo no es válido."""
+    limit = None
+    raw_limit = request.args.get("limit")
+    if raw_limit is not None:
+        limit = min(max(int(raw_limit), 1), notification_store.MAX_PAGE)
+    before = None
+    cursor = decode_cursor(request.args.get("cursor"))
+    if cursor:
+        try:
+            before = (str(cursor["c"]), int(cursor["i"]))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError("Cursor inválido") from exc
+        limit = limit or _PAGE_DEFAULT
+    since_id = request.args.get("since_id")
+    return limit, before, (max(int(since_id), 0) if since_id is not None else None)
+
+
 @bp.get("/notificaciones")
 def listar_notificaciones():
+    """Notificaciones del usuario, contador de no leídas y pendientes.
+
+    Sin parámetros devuelve todas las notificaciones (compatibilidad). ``limit`` y
+    ``cursor`` paginan por keyset sobre ``(created_at, id)``; ``since_id`` devuelve
+    solo las creadas después de ese id (delta para clientes que ya tienen la lista).
+    """
     uid = _require_auth()
     if not uid:
         return {"ok": False, "error": {"code": "NOAUTH", "message": "No autenticado"}}, 401
+    try:
+        limit, before, since_id = _page_args()
+    except ValueError:
+        return {"ok": False, "error": {"code": "BAD_REQUEST", "message": "Parámetros de paginación inválidos"}}, 400
     with get_connection() as con:
-        user_row = con.execute(
-            "SELECT id_spm, nombre, apellido, rol, mail FROM usuarios WHERE lower(id_spm)=?",
-            (uid.lower(),),
-        ).fetchone()
+        user_row = get_current_user()
         if not user_row:
             return {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}, 404
         role_value = (user_row.get("rol") or "").lower()
         is_admin = "admin" in role_value
-        rows = con.execute(
-            """
-            SELECT id, solicitud_id, mensaje, leido, created_at
-            FROM notificaciones
-            WHERE lower(destinatario_id)=?
-            ORDER BY datetime(created_at) DESC, id DESC
-            """,
-            (uid.lower(),),
-        ).fetchall()
-        items = []
-        unread = 0
-        for row in rows:
-            leido = bool(row.get("leido"))
-            if not leido:
-                unread += 1
-            items.append(
-                {
-                    "id": row["id"],
-                    "solicitud_id": row["solicitud_id"],
-                    "mensaje": row["mensaje"],
-                    "leido": leido,
-                    "created_at": row["created_at"],
-                }
-            )
+        next_cursor = None
+        if since_id is not None:
+            rows = notification_store.list_since(con, uid, since_id, limit=limit or notification_store.MAX_PAGE)
+        else:
+            rows = notification_store.list_page(con, uid, limit=limit + 1 if limit else None, before=before)
+            if limit and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor({"c": rows[-1]["created_at"], "i": rows[-1]["id"]})
+        items = [notification_store.serialize(row) for row in rows]
+        unread = notification_store.unread_count(con, uid)
         if is_admin:
             pending_query = """
                 SELECT id, centro, sector, justificacion, total_monto, created_at, status, id_usuario, aprobador_id
@@ -179,6 +250,7 @@ def listar_notificaciones():
         "ok": True,
         "unread": unread,
         "items": items,
+        "next_cursor": next_cursor,
         "pending": pendientes,
         "admin": admin_summary,
         "borradores": borradores_pendientes,
@@ -202,10 +274,7 @@ def decidir_solicitud_centros(request_id: int):
         return {"ok": False, "error": {"code": "NOAUTH", "message": "No autenticado"}}, 401
     decision = CentroRequestDecision(**(request.get_json(force=True) or {}))
     with get_connection() as con:
-        actor_row = con.execute(
-            "SELECT id_spm, rol, nombre, apellido FROM usuarios WHERE lower(id_spm)=?",
-            (uid.lower(),),
-        ).fetchone()
+        actor_row = get_current_user()
         if not actor_row:
             return {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}, 404
         role_value = (actor_row.get("rol") or "").lower()
@@ -311,6 +380,9 @@ def decidir_solicitud_centros(request_id: int):
             (solicitante_id.lower(), mensaje),
         )
         con.commit()
+    notification_hub.notify_later()
+    if centros_actualizados is not None:
+        invalidate_user_cache(solicitante_id)
 
     return {
         "ok": True,
@@ -337,22 +409,9 @@ def marcar_notificaciones():
         except (TypeError, ValueError):
             continue
     with get_connection() as con:
-        if mark_all or not cleaned_ids:
-            con.execute(
-                "UPDATE notificaciones SET leido=1 WHERE lower(destinatario_id)=?",
-                (uid.lower(),),
-            )
-        else:
-            placeholders = ",".join(["?"] * len(cleaned_ids))
-            con.execute(
-                f"UPDATE notificaciones SET leido=1 WHERE lower(destinatario_id)=? AND id IN ({placeholders})",
-                (uid.lower(), *cleaned_ids),
-            )
+        remaining = notification_store.mark_read(con, uid, None if mark_all or not cleaned_ids else cleaned_ids)
         con.commit()
-        remaining = con.execute(
-            "SELECT COUNT(*) AS c FROM notificaciones WHERE lower(destinatario_id)=? AND leido=0",
-            (uid.lower(),),
-        ).fetchone()["c"]
+    notification_hub.get_hub().publish_unread(uid, remaining)
     return {"ok": True, "unread": remaining}
 
 
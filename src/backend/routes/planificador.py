@@ -5,6 +5,8 @@ from flask import Blueprint, request
 
 from ..services.auth.auth import authenticate_request, get_current_user, get_current_user_id
 from ..core.db import get_connection
+from ..services.notification_hub import notify_later
+from ..services.solicitud_items import load_items
 
 bp = Blueprint("spm_planner_blueprint", __name__, url_prefix="/api/planificador")
 
@@ -18,13 +20,10 @@ def _require_planner():
     uid = (get_current_user_id() or "").strip()
     if not uid:
         return None, ({"ok": False, "error": {"code": "unauthorized", "message": "Unauthorized"}}, 401)
-    with get_connection() as con:
-        row = con.execute("SELECT rol FROM usuarios WHERE lower(id_spm)=?", (uid.lower(),)).fetchone()
-        if not row:
-            return None, ({"ok": False, "error": {"code": "forbidden", "message": "Forbidden"}}, 403)
-        role = (row["rol"] or "").lower()
-        if not any(r in role for r in ["planner", "planificador", "admin", "administrador"]):
-            return None, ({"ok": False, "error": {"code": "forbidden", "message": "Forbidden"}}, 403)
+    # El perfil ya viene cargado (y cacheado) por authenticate_request
+    role = (user.get("rol") or "").lower()
+    if not any(r in role for r in ["planner", "planificador", "admin", "administrador"]):
+        return None, ({"ok": False, "error": {"code": "forbidden", "message": "Forbidden"}}, 403)
     return uid, None
 
 def _log_event(con, solicitud_id, planner_id, tipo, payload: dict | None = None):
@@ -34,6 +33,15 @@ def _log_event(con, solicitud_id, planner_id, tipo, payload: dict | None = None)
         VALUES (?, ?, ?, ?)
     """, (solicitud_id, planner_id.lower(), tipo, pj))
 
+def _items_originales(con, solicitud_id, data_json=None):
+    # Ítems normalizados; data_json solo como respaldo para filas sin migrar
+    items = load_items(con, [solicitud_id]).get(solicitud_id)
+    if items is None:
+        if data_json is None:
+            data_json = con.execute("SELECT data_json FROM solicitudes WHERE id = ?", (solicitud_id,)).fetchone()["data_json"]
+        items = json.loads(data_json or "{}").get("items", [])
+    return items
+
 def _recalcular_total(con, solicitud_id, items_originales):
     # Leer rows de solicitud_items_tratamiento y combinar con items_originales
     # Para 'stock' usar 0, para 'compra'/'equivalente' usar precio estimado o el original
@@ -177,6 +185,7 @@ def tomar_solicitud(solicitud_id):
                 INSERT INTO notificaciones (destinatario_id, solicitud_id, mensaje)
                 VALUES (?, ?, ?)
             """, (sol_row["id_usuario"], solicitud_id, f"Solicitud #{solicitud_id} tomada por planificador"))
+            notify_later()
     return {"ok": True}
 
 @bp.route("/solicitudes/<int:solicitud_id>/liberar", methods=["PATCH"])
@@ -223,7 +232,7 @@ def update_items(solicitud_id):
         sol = con.execute("SELECT status, planner_id, data_json FROM solicitudes WHERE id = ?", (solicitud_id,)).fetchone()
         if not sol or sol["status"] != "en_tratamiento" or sol["planner_id"].lower() != uid.lower():
             return {"ok": False, "error": {"code": "forbidden", "message": "No autorizado"}}, 403
-        items_originales = json.loads(sol["data_json"])["items"]
+        items_originales = _items_originales(con, solicitud_id, sol["data_json"])
         for item in items:
             idx = item["item_index"]
             if idx < 0 or idx >= len(items_originales):
@@ -239,6 +248,7 @@ def update_items(solicitud_id):
             ))
         _recalcular_total(con, solicitud_id, items_originales)
         _log_event(con, solicitud_id, uid, "editar_item", {"items": items})
+        con.commit()
     return {"ok": True}
 
 @bp.route("/solicitudes/<int:solicitud_id>/finalizar", methods=["POST"])
@@ -247,15 +257,14 @@ def finalizar_solicitud(solicitud_id):
     if err:
         return err
     with get_connection() as con:
-        sol = con.execute("SELECT status, planner_id, id_usuario, aprobador_id FROM solicitudes WHERE id = ?", (solicitud_id,)).fetchone()
+        sol = con.execute("SELECT status, planner_id, id_usuario, aprobador_id, total_monto FROM solicitudes WHERE id = ?", (solicitud_id,)).fetchone()
         if not sol or sol["status"] != "en_tratamiento" or sol["planner_id"].lower() != uid.lower():
             return {"ok": False, "error": {"code": "forbidden", "message": "No autorizado"}}, 403
         # Verificar que hay decisiones
         count = con.execute("SELECT COUNT(*) FROM solicitud_items_tratamiento WHERE solicitud_id = ?", (solicitud_id,)).fetchone()[0]
         if count == 0:
             # Aplicar defaults: compra con cantidades originales
-            data_json = json.loads(con.execute("SELECT data_json FROM solicitudes WHERE id = ?", (solicitud_id,)).fetchone()["data_json"])
-            for idx, it in enumerate(data_json["items"]):
+            for idx, it in enumerate(_items_originales(con, solicitud_id)):
                 con.execute("""
                     INSERT INTO solicitud_items_tratamiento
                     (solicitud_id, item_index, decision, cantidad_aprobada, precio_unitario_estimado, updated_by)
@@ -270,6 +279,8 @@ def finalizar_solicitud(solicitud_id):
                     INSERT INTO notificaciones (destinatario_id, solicitud_id, mensaje)
                     VALUES (?, ?, ?)
                 """, (dest, solicitud_id, f"Solicitud #{solicitud_id} finalizada por planificador"))
+                notify_later()
+        con.commit()
     return {"ok": True}
 
 @bp.route("/solicitudes/<int:solicitud_id>/rechazar", methods=["POST"])
@@ -294,6 +305,7 @@ def rechazar_solicitud(solicitud_id):
                     INSERT INTO notificaciones (destinatario_id, solicitud_id, mensaje)
                     VALUES (?, ?, ?)
                 """, (dest, solicitud_id, f"Solicitud #{solicitud_id} rechazada: {motivo}"))
+                notify_later()
     return {"ok": True}
 
 @bp.route("/estadisticas", methods=["GET"])
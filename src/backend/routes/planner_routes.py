@@ -6,6 +6,7 @@ Gestión de abastecimiento de Solicitudes de Materiales
 from flask import Blueprint, request, jsonify, current_app
 from ..services.auth.auth import auth_required, get_current_user
 from ..core.db import get_connection
+from ..services.dashboard import status_summary
 import logging
 
 bp = Blueprint('planner', __name__, url_prefix='/api/planner')
@@ -33,35 +34,14 @@ def get_dashboard():
     """Obtener dashboard de planificación con estadísticas"""
     try:
         with get_connection() as con:
-            # Solicitudes pendientes
-            pending = con.execute(
-                'SELECT COUNT(*) as count FROM solicitudes WHERE status = ? AND created_at IS NOT NULL',
-                ('pending_approval',)
-            ).fetchone()
-            
-            # Solicitudes en proceso
-            in_process = con.execute(
-                'SELECT COUNT(*) as count FROM solicitudes WHERE status = ? AND created_at IS NOT NULL',
-                ('in_process',)
-            ).fetchone()
-            
-            # Solicitudes aprobadas
-            approved = con.execute(
-                'SELECT COUNT(*) as count FROM solicitudes WHERE status = ? AND created_at IS NOT NULL',
-                ('approved',)
-            ).fetchone()
-            
-            # Solicitudes completadas
-            completed = con.execute(
-                'SELECT COUNT(*) as count FROM solicitudes WHERE status = ? AND created_at IS NOT NULL',
-                ('completed',)
-            ).fetchone()
+            # Sin filtro por created_at: la columna es NOT NULL con default
+            counts = status_summary.status_counts(con)
         
         return jsonify({
-            'pending': pending['count'] if pending else 0,
-            'in_process': in_process['count'] if in_process else 0,
-            'approved': approved['count'] if approved else 0,
-            'completed': completed['count'] if completed else 0
+            'pending': counts.get('pending_approval', 0),
+            'in_process': counts.get('in_process', 0),
+            'approved': counts.get('approved', 0),
+            'completed': counts.get('completed', 0)
         }), 200
     except Exception as e:
         logger.error(f'Error en dashboard: {e}')
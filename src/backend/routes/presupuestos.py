@@ -4,7 +4,7 @@ from datetime import datetime, date
 import unicodedata
 from flask import Blueprint, request
 from ..core.db import get_connection
-from ..services.auth.auth import authenticate_request, get_current_user_id
+from ..services.auth.auth import authenticate_request, get_current_user, get_current_user_id
 from ..models.schemas import BudgetIncreaseCreate, BudgetIncreaseDecision
 
 bp = Blueprint("presupuestos", __name__, url_prefix="/api")
@@ -101,10 +101,7 @@ def obtener_presupuestos_propios():
         return {"ok": False, "error": {"code": "NOAUTH", "message": "No autenticado"}}, 401
     inc_rows: list[dict[str, object]] = []
     with get_connection() as con:
-        user = con.execute(
-            "SELECT id_spm, rol, posicion, centros FROM usuarios WHERE lower(id_spm)=?",
-            (uid.lower(),),
-        ).fetchone()
+        user = get_current_user()
         if not user:
             return {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}, 404
         if not _is_budget_manager(user):
@@ -279,10 +276,7 @@ def crear_incorporacion_presupuesto():
         return {"ok": False, "error": {"code": "NOAUTH", "message": "No autenticado"}}, 401
     data = BudgetIncreaseCreate(**request.get_json(force=True))
     with get_connection() as con:
-        user = con.execute(
-            "SELECT id_spm, rol, posicion, centros FROM usuarios WHERE lower(id_spm)=?",
-            (uid.lower(),),
-        ).fetchone()
+        user = get_current_user()
         if not user:
             return {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}, 404
         if not _can_request_increase(user):
@@ -321,10 +315,7 @@ def resolver_incorporacion_presupuesto(inc_id: int):
     accion = payload.accion.lower()
     comentario = payload.comentario
     with get_connection() as con:
-        user = con.execute(
-            "SELECT id_spm, rol, posicion, centros FROM usuarios WHERE lower(id_spm)=?",
-            (uid.lower(),),
-        ).fetchone()
+        user = get_current_user()
         if not user:
             return {"ok": False, "error": {"code": "NOUSER", "message": "Usuario no encontrado"}}, 404
         if not _can_approve_increase(user):
@@ -1,23 +1,25 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
+import os
+import threading
+import time
+from datetime import datetime, timedelta
 from typing import Any, Iterable
-from io import BytesIO
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, Response, jsonify, request
 
 from ..core.db import get_connection
 from ..models.schemas import BudgetIncreaseDecision, SolicitudCreate, SolicitudDraft
-from ..services.auth.auth import authenticate_request, get_current_user_id
+from ..services.auth.auth import authenticate_request, current_profile_for, get_current_user_id
+from ..services.db.paging import decode_cursor, encode_cursor
+from ..services.exports import EXPORT_FORMATS, iter_solicitudes, stream_file, temp_export_path
+from ..services.material_catalog import material_details
+from ..services.notification_hub import notify_later
+from ..services.org_directory import get_directory, is_active
+from ..services.solicitud_items import load_items, replace_items
 from ..models.roles import has_role
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
 
 bp = Blueprint("solicitudes", __name__, url_prefix="/api")
@@ -63,6 +65,14 @@ def _coerce_str(value: Any) -> str:
     return str(value).strip() if value is not None else ""
 
 
+def _safe_int(raw: Any, default: int, minimum: int, maximum: int) -> int:
+    try:
+        value = int(raw) if raw is not None else default
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(value, maximum))
+
+
 def _map_criticidad(value: Any) -> str | None:
     """Normaliza valores de criticidad del frontend a lo que espera el modelo Pydantic."""
     v = _coerce_str(value).lower()
@@ -106,6 +116,9 @@ def _get_payload_from_request() -> dict[str, Any]:
 def _fetch_user(con, uid: str | None):
     if not uid:
         return None
+    current = current_profile_for(uid)
+    if current is not None:
+        return current
     return con.execute(
         """
         SELECT id_spm, nombre, apellido, rol, centros, jefe, gerente1, gerente2
@@ -126,6 +139,8 @@ def _ensure_user_exists(con, uid: str | None) -> str | None:
     normalized = _normalize_uid(uid)
     if not normalized:
         return None
+    if get_directory(con).by_id(normalized):
+        return normalized
     row = con.execute(
         "SELECT 1 FROM usuarios WHERE lower(id_spm)=?",
         (normalized,),
@@ -147,39 +162,39 @@ def _validar_material_existe(con, codigo: str) -> bool:
     return row is not None
 
 
+def _directory_user(con, ref: str, *, by_mail: bool = False) -> dict[str, Any] | None:
+    """Usuario desde el directorio cacheado; si falta, se confirma contra la base."""
+    directory = get_directory(con)
+    user = directory.by_mail(ref) if by_mail else directory.find(ref)
+    if user is not None:
+        return user
+    where = "lower(mail) = ?" if by_mail else "lower(id_spm) = ? OR lower(mail) = ?"
+    params = (ref.lower(),) if by_mail else (ref.lower(), ref.lower())
+    return con.execute(
+        f"SELECT id_spm, mail, rol, estado_registro FROM usuarios WHERE {where} LIMIT 1",
+        params,
+    ).fetchone()
+
+
 def _resolve_approver(con, user: dict[str, Any] | None, total_monto: float = 0.0) -> str | None:
     if not user:
         return None
     
-    # Determinar el aprobador basado en el monto total
+    # Determinar el aprobador basado en el monto total; luego los demás campos como fallback
     approver_field, _, _ = _get_approver_config(total_monto)
-    
-    approver_email = _coerce_str(user.get(approver_field))
-    if approver_email:
-        # Buscar el id_spm del usuario con este email
-        approver_user = con.execute(
-            "SELECT id_spm FROM usuarios WHERE lower(mail) = ?",
-            (approver_email.lower(),)
-        ).fetchone()
-        if approver_user:
-            approver_id = approver_user["id_spm"]
-            # FIX #2: Validar que el aprobador existe y está activo
-            if _ensure_approver_exists_and_active(con, approver_id):
-                return approver_id
-    
-    # Fallback: buscar en otros campos si el campo específico no está disponible
-    for field in ("jefe", "gerente1", "gerente2"):
+    for field in dict.fromkeys((approver_field, "jefe", "gerente1", "gerente2")):
         approver_email = _coerce_str(user.get(field))
-        if approver_email:
-            approver_user = con.execute(
-                "SELECT id_spm FROM usuarios WHERE lower(mail) = ?",
-                (approver_email.lower(),)
-            ).fetchone()
-            if approver_user:
-                approver_id = approver_user["id_spm"]
-                # FIX #2: Validar que el aprobador existe y está activo
-                if _ensure_approver_exists_and_active(con, approver_id):
-                    return approver_id
+        if not approver_email:
+            continue
+        approver_user = _directory_user(con, approver_email, by_mail=True)
+        # FIX #2: Validar que el aprobador existe y está activo. El snapshot puede tener
+        # hasta ORG_CACHE_TTL segundos: el estado del elegido se confirma contra la base
+        if (
+            approver_user
+            and is_active(approver_user)
+            and _ensure_approver_exists_and_active(con, approver_user["id_spm"])
+        ):
+            return approver_user["id_spm"]
     return None
 
 
@@ -192,7 +207,8 @@ def _resolve_planner(user: dict[str, Any] | None, con=None) -> str | None:
             planner_id = value.lower()
             # FIX #3: Validar que el planificador existe y está disponible
             if con is not None:
-                if _ensure_planner_exists_and_available(con, planner_id):
+                planner = _directory_user(con, planner_id)
+                if planner and _planner_profile_ok(planner) and _planner_has_capacity(con, planner_id):
                     return planner_id
             else:
                 # Si no hay conexión, retornar el valor como estaba antes
@@ -201,23 +217,34 @@ def _resolve_planner(user: dict[str, Any] | None, con=None) -> str | None:
 
 
 def _normalize_items(raw_items: Iterable[Any], con=None) -> tuple[list[dict[str, Any]], float]:
+    """Normaliza los ítems y, con ``con``, valida todos los códigos en lote.
+
+    Una sola consulta ``IN (...)`` verifica que existan y trae descripción, unidad y
+    precio para completar lo que falte en cada ítem.
+    """
+    candidates = [
+        raw for raw in raw_items or []
+        if isinstance(raw, dict) and _coerce_str(raw.get("codigo"))
+    ]
+    catalog: dict[str, dict[str, Any]] = {}
+    invalid_materials: list[str] = []
+    if con is not None and candidates:
+        catalog = material_details(con, (_coerce_str(raw.get("codigo")) for raw in candidates))
+        for raw in candidates:
+            codigo = _coerce_str(raw.get("codigo"))
+            if codigo not in catalog and codigo not in invalid_materials:
+                invalid_materials.append(codigo)
+        if invalid_materials:
+            raise ValueError(
+                f"Los siguientes códigos de material no existen en el catálogo: {', '.join(invalid_materials)}"
+            )
+
     items: list[dict[str, Any]] = []
     total = 0.0
-    invalid_materials = []
-    
-    for raw in raw_items or []:
-        if not isinstance(raw, dict):
-            continue
+    for raw in candidates:
         codigo = _coerce_str(raw.get("codigo"))
-        if not codigo:
-            continue
-        
-        # FIX #1: Validar que el material exista en el catálogo
-        if con is not None and not _validar_material_existe(con, codigo):
-            invalid_materials.append(codigo)
-            continue
-            
-        descripcion = _coerce_str(raw.get("descripcion"))
+        material = catalog.get(codigo) or {}
+        descripcion = _coerce_str(raw.get("descripcion")) or _coerce_str(material.get("descripcion"))
         try:
             cantidad = int(raw.get("cantidad", 0))
         except (TypeError, ValueError):
@@ -227,6 +254,8 @@ def _normalize_items(raw_items: Iterable[Any], con=None) -> tuple[list[dict[str,
         precio_raw = raw.get("precio_unitario")
         if precio_raw is None:
             precio_raw = raw.get("precio")
+        if precio_raw is None:
+            precio_raw = material.get("precio_usd")
         try:
             precio = float(precio_raw)
         except (TypeError, ValueError):
@@ -242,16 +271,12 @@ def _normalize_items(raw_items: Iterable[Any], con=None) -> tuple[list[dict[str,
             "comentario": raw.get("comentario"),
             "subtotal": subtotal,
         }
-        unidad = raw.get("unidad") or raw.get("uom") or raw.get("unidad_medida")
+        unidad = raw.get("unidad") or raw.get("uom") or raw.get("unidad_medida") or material.get("unidad")
         if unidad:
             item["unidad"] = _coerce_str(unidad)
         items.append(item)
         total += subtotal
-    
-    # Si hay materiales inválidos y se validaba, lanzar error
-    if invalid_materials and con is not None:
-        raise ValueError(f"Los siguientes códigos de material no existen en el catálogo: {', '.join(invalid_materials)}")
-    
+
     return items, round(total, 2)
 
 
@@ -382,56 +407,14 @@ def _ensure_totals(data: dict[str, Any], fallback: float) -> float:
 
 
 def _assign_planner_automatically(con, centro: str, sector: str, almacen_virtual: str) -> str | None:
-    """Asigna automáticamente un planificador basado en Centro, Sector y Almacén Virtual."""
+    """Asigna automáticamente un planificador basado en Centro, Sector y Almacén Virtual.
+
+    Prioridad: asignación por centro+sector+almacén, luego centro+sector y por último
+    solo centro (la más antigua en cada nivel), resuelta sobre el directorio cacheado.
+    """
     if not centro or not sector or not almacen_virtual:
         return None
-    
-    # Buscar asignación específica por centro, sector y almacen
-    row = con.execute(
-        """
-        SELECT p.usuario_id
-          FROM planificador_asignaciones pa
-          JOIN planificadores p ON pa.planificador_id = p.usuario_id
-         WHERE pa.centro = ? AND pa.sector = ? AND pa.almacen_virtual = ?
-         ORDER BY pa.created_at ASC
-         LIMIT 1
-        """,
-        (centro, sector, almacen_virtual),
-    ).fetchone()
-    
-    if row:
-        return row["usuario_id"]
-    
-    # Si no hay asignación específica, buscar por centro y sector
-    row = con.execute(
-        """
-        SELECT p.usuario_id
-          FROM planificador_asignaciones pa
-          JOIN planificadores p ON pa.planificador_id = p.usuario_id
-         WHERE pa.centro = ? AND pa.sector = ? AND pa.almacen_virtual IS NULL
-         ORDER BY pa.created_at ASC
-         LIMIT 1
-        """,
-        (centro, sector),
-    ).fetchone()
-    
-    if row:
-        return row["usuario_id"]
-    
-    # Si no hay asignación por centro y sector, buscar solo por centro
-    row = con.execute(
-        """
-        SELECT p.usuario_id
-          FROM planificador_asignaciones pa
-          JOIN planificadores p ON pa.planificador_id = p.usuario_id
-         WHERE pa.centro = ? AND pa.sector IS NULL AND pa.almacen_virtual IS NULL
-         ORDER BY pa.created_at ASC
-         LIMIT 1
-        """,
-        (centro,),
-    ).fetchone()
-    
-    return row["usuario_id"] if row else None
+    return get_directory(con).planner_for(centro, sector, almacen_virtual)
 
 
 def _get_approver_config(total_monto: float = 0.0) -> tuple[str, float, float]:
@@ -491,6 +474,37 @@ def _ensure_approver_exists_and_active(con, approver_id: str | None) -> bool:
     return True
 
 
+_PLANNER_ROLES = ("planificador", "planner", "gerente", "gerente1", "gerente2", "admin", "administrador")
+MAX_ACTIVE_SOLICITUDES = 20
+
+
+def _planner_profile_ok(row: dict[str, Any]) -> bool:
+    """Activo y con rol de planificador (o sin rol cargado)."""
+    estado = _coerce_str(row.get("estado_registro", "")).lower()
+    rol = _coerce_str(row.get("rol", "")).lower()
+    if estado and estado not in ("activo", "active", "a", "1", "true"):
+        return False
+    return not rol or rol in _PLANNER_ROLES
+
+
+def _planner_has_capacity(con, planner_id: str) -> bool:
+    """Máximo MAX_ACTIVE_SOLICITUDES solicitudes aprobadas o en tratamiento por planificador."""
+    count_result = con.execute(
+        """
+        SELECT COUNT(*) as count
+        FROM solicitudes
+        WHERE lower(planner_id) = ? AND status IN (?, ?)
+        """,
+        (planner_id, STATUS_IN_TREATMENT, STATUS_APPROVED)
+    ).fetchone()
+    
+    if hasattr(count_result, 'get'):
+        active_count = count_result.get("count", 0) if count_result else 0
+    else:
+        active_count = count_result[0] if count_result else 0
+    return active_count < MAX_ACTIVE_SOLICITUDES
+
+
 def _ensure_planner_exists_and_available(con, planner_id: str | None) -> bool:
     """Verificar que el planificador existe, está activo y disponible en el sistema.
     
@@ -517,42 +531,14 @@ def _ensure_planner_exists_and_available(con, planner_id: str | None) -> bool:
         return False
     
     # Convertir a dict si es necesario
-    if hasattr(row, 'get'):
-        estado = _coerce_str(row.get("estado_registro", "")).lower()
-        rol = _coerce_str(row.get("rol", "")).lower()
-    else:
+    if not hasattr(row, 'get'):
         # Acceso por índice si es tupla
-        estado = _coerce_str(row[1] if len(row) > 1 else "").lower()
-        rol = _coerce_str(row[2] if len(row) > 2 else "").lower()
-    
-    # Verificar que el usuario esté activo
-    if estado and estado not in ("activo", "active", "a", "1", "true"):
-        return False
-    
-    # Verificar que tenga rol de planificador
-    if rol and rol not in ("planificador", "planner", "gerente", "gerente1", "gerente2", "admin", "administrador"):
+        row = {"estado_registro": row[1] if len(row) > 1 else "", "rol": row[2] if len(row) > 2 else ""}
+    if not _planner_profile_ok(row):
         return False
     
-    # Verificar que no esté sobrecargado (máximo N solicitudes en tratamiento por planificador)
-    MAX_ACTIVE_SOLICITUDES = 20
-    count_result = con.execute(
-        """
-        SELECT COUNT(*) as count
-        FROM solicitudes
-        WHERE lower(planner_id) = ? AND status IN (?, ?)
-        """,
-        (planner_id, STATUS_IN_TREATMENT, STATUS_APPROVED)
-    ).fetchone()
-    
-    if hasattr(count_result, 'get'):
-        active_count = count_result.get("count", 0) if count_result else 0
-    else:
-        active_count = count_result[0] if count_result else 0
-    
-    if active_count >= MAX_ACTIVE_SOLICITUDES:
-        return False
-    
-    return True
+    # Verificar que no esté sobrecargado
+    return _planner_has_capacity(con, planner_id)
 
 
 def _pre_validar_aprobacion(con, row: dict[str, Any], approver_user: dict[str, Any] | None) -> tuple[bool, str | None]:
@@ -617,10 +603,17 @@ def _pre_validar_aprobacion(con, row: dict[str, Any], approver_user: dict[str, A
     return True, None
 
 
-def _serialize_row(row: dict[str, Any], *, detailed: bool) -> dict[str, Any]:
+def _serialize_row(
+    row: dict[str, Any],
+    *,
+    detailed: bool,
+    items: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    """Serializa una solicitud; ``items`` viene de solicitud_items si ya se cargó."""
     data = _json_load(row.get("data_json"))
     data.setdefault("items", [])
-    items = _serialize_items(data.get("items"))
+    if items is None:
+        items = _serialize_items(data.get("items"))
     data["items"] = items
     total = _ensure_totals(data, float(row.get("total_monto") or 0.0))
     base: dict[str, Any] = {
@@ -655,6 +648,11 @@ def _serialize_row(row: dict[str, Any], *, detailed: bool) -> dict[str, Any]:
     return base
 
 
+def _serialize_loaded(con, row: dict[str, Any]) -> dict[str, Any]:
+    items = load_items(con, [row["id"]]).get(row["id"])
+    return _serialize_row(row, detailed=True, items=items)
+
+
 def _load_solicitud(con, sol_id: int):
     return con.execute(
         """
@@ -676,6 +674,7 @@ def _create_notification(con, destinatario: str | None, solicitud_id: int, mensa
         "INSERT INTO notificaciones (destinatario_id, solicitud_id, mensaje, leido) VALUES (?,?,?,0)",
         (dest, solicitud_id, mensaje),
     )
+    notify_later()
 
 
 def _can_view(user: dict[str, Any] | None, row: dict[str, Any]) -> bool:
@@ -719,26 +718,130 @@ def _can_resolve(user: dict[str, Any] | None, row: dict[str, Any]) -> bool:
     return has_role(user, "planner", "planificador", "admin", "administrador", "aprobador")
 
 
+_LIST_COLUMNS = """
+    SELECT id, id_usuario, centro, sector, justificacion, centro_costos, almacen_virtual,
+           data_json, status, aprobador_id, total_monto, notificado_at,
+           created_at, updated_at, criticidad, fecha_necesidad, planner_id
+      FROM solicitudes
+"""
+_LIST_DEFAULT_LIMIT = 20
+_LIST_MAX_LIMIT = 200
+_COUNT_CACHE_SECONDS = 30
+_count_cache_lock = threading.Lock()
+_count_cache: dict[tuple, tuple[float, int]] = {}
+
+
+def _invalidate_count_cache(uid: str | None) -> None:
+    owner = _coerce_str(uid).lower()
+    if not owner:
+        return
+    with _count_cache_lock:
+        for key in [key for key in _count_cache if key[0] == owner]:
+            _count_cache.pop(key, None)
+
+
+def _cached_count(con, cache_key: tuple, where: str, params: list[Any]) -> int:
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return cached[1]
+    row = con.execute(f"SELECT COUNT(*) AS total FROM solicitudes WHERE {where}", params).fetchone()
+    total = int(row["total"] if row else 0)
+    with _count_cache_lock:
+        _count_cache[cache_key] = (now + _COUNT_CACHE_SECONDS, total)
+    return total
+
+
+def _parse_date_bound(raw: str, *, upper: bool) -> str | None:
+    value = _coerce_str(raw)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise ValueError(f"Fecha inválida: {value}") from exc
+    if upper and len(value) == 10:
+        # Fecha sin hora: incluir el día completo
+        return (parsed + timedelta(days=1)).strftime("%Y-%m-%d")
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _list_filters(uid: str) -> tuple[list[str], list[Any], tuple]:
+    clauses = ["lower(id_usuario)=?"]
+    params: list[Any] = [uid.lower()]
+    statuses = sorted(
+        {part.strip().lower() for part in (request.args.get("status") or "").split(",") if part.strip()}
+    )
+    if statuses:
+        clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    desde = _parse_date_bound(request.args.get("desde", ""), upper=False)
+    if desde:
+        clauses.append("created_at >= ?")
+        params.append(desde)
+    hasta = _parse_date_bound(request.args.get("hasta", ""), upper=True)
+    if hasta:
+        clauses.append("created_at < ?")
+        params.append(hasta)
+    cache_key = (uid.lower(), tuple(statuses), desde, hasta)
+    return clauses, params, cache_key
+
+
 @bp.get("/solicitudes")
 def listar_solicitudes():
+    """Lista las solicitudes del usuario.
+
+    Sin ``limit`` ni ``cursor`` devuelve la lista completa (compatibilidad). Con
+    ellos pagina por keyset sobre ``(created_at, id)``; ``next_cursor`` es opaco.
+    Filtros: ``status`` (separado por comas), ``desde`` y ``hasta`` (ISO).
+    ``count=1`` agrega ``total``, cacheado unos segundos por usuario y filtro.
+    """
     uid = _require_auth()
     if not uid:
         return _json_error("NOAUTH", "No autenticado", 401)
+    paginated = "limit" in request.args or "cursor" in request.args
+    try:
+        clauses, params, cache_key = _list_filters(uid)
+        cursor = decode_cursor(request.args.get("cursor"))
+    except ValueError as exc:
+        return _json_error("BAD_REQUEST", str(exc), 400)
+    filter_where = " AND ".join(clauses)
+    filter_params = list(params)
+    if cursor:
+        try:
+            cursor_created = str(cursor["c"])
+            cursor_id = int(cursor["i"])
+        except (KeyError, TypeError, ValueError):
+            return _json_error("BAD_REQUEST", "Cursor inválido", 400)
+        clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params.extend([cursor_created, cursor_created, cursor_id])
+    limit = _safe_int(request.args.get("limit"), _LIST_DEFAULT_LIMIT, 1, _LIST_MAX_LIMIT)
+    sql = f"{_LIST_COLUMNS} WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC"
+    if paginated:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+    want_count = _coerce_str(request.args.get("count")).lower() in {"1", "true", "yes"}
     with get_connection() as con:
-        con.row_factory = lambda cursor, row: {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-        rows = con.execute(
-            """
-            SELECT id, id_usuario, centro, sector, justificacion, centro_costos, almacen_virtual,
-                   data_json, status, aprobador_id, total_monto, notificado_at,
-                   created_at, updated_at, criticidad, fecha_necesidad, planner_id
-              FROM solicitudes
-             WHERE lower(id_usuario)=?
-          ORDER BY datetime(created_at) DESC, id DESC
-            """,
-            (uid.lower(),),
-        ).fetchall()
-    items = [_serialize_row(row, detailed=False) for row in rows]
-    return {"ok": True, "items": items, "total": len(items)}
+        rows = con.execute(sql, params).fetchall()
+        total = _cached_count(con, cache_key, filter_where, filter_params) if paginated and want_count else None
+        has_more = paginated and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
+        stored_items = load_items(con, [row["id"] for row in rows])
+    items = [_serialize_row(row, detailed=False, items=stored_items.get(row["id"])) for row in rows]
+    if not paginated:
+        return {"ok": True, "items": items, "total": len(items)}
+    body: dict[str, Any] = {
+        "ok": True,
+        "items": items,
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": encode_cursor({"c": rows[-1]["created_at"], "i": rows[-1]["id"]}) if has_more else None,
+    }
+    if total is not None:
+        body["total"] = total
+    return body
 
 
 @bp.get("/solicitudes/<int:sol_id>")
@@ -754,7 +857,7 @@ def obtener_solicitud(sol_id: int):
         user = _fetch_user(con, uid)
         if not _can_view(user, row):
             return _json_error("FORBIDDEN", "No tienes acceso a esta solicitud", 403)
-        solicitud = _serialize_row(row, detailed=True)
+        solicitud = _serialize_loaded(con, row)
         # Agregar nombre del aprobador si existe
         aprobador_id = solicitud.get("aprobador_id")
         if aprobador_id:
@@ -847,6 +950,7 @@ def crear_borrador():
         except Exception as exc:
             con.rollback()
             return _json_error("DB_ERROR", f"No se pudo crear el borrador: {exc}", 500)
+    _invalidate_count_cache(uid)
     return {"ok": True, "id": sol_id, "solicitud_id": sol_id, "status": STATUS_DRAFT}
 
 
@@ -938,19 +1042,20 @@ def actualizar_borrador(sol_id: int):
             "status": STATUS_DRAFT,
         }
 
-        set_clause = \", \".join(f\"{col}=?\" for col in update_fields)
+        set_clause = ", ".join(f"{col}=?" for col in update_fields)
         params = list(update_fields.values()) + [sol_id]
 
         con.execute(
-            f\"UPDATE solicitudes SET {set_clause}, updated_at=CURRENT_TIMESTAMP WHERE id=?\",
+            f"UPDATE solicitudes SET {set_clause}, updated_at=CURRENT_TIMESTAMP WHERE id=?",
             params,
         )
+        replace_items(con, sol_id, merged["items"])
         con.commit()
 
         updated = _load_solicitud(con, sol_id)
-        serialized = _serialize_row(updated, detailed=True)
+        serialized = _serialize_loaded(con, updated)
 
-    return _json_ok({\"solicitud\": serialized})
+    return _json_ok({"solicitud": serialized})
 
 
 def _finalizar_solicitud(con, row: dict[str, Any], final_data: dict[str, Any], user: dict[str, Any] | None, *, is_new: bool) -> tuple[int, dict[str, Any]]:
@@ -1028,6 +1133,7 @@ def _finalizar_solicitud(con, row: dict[str, Any], final_data: dict[str, Any], u
             ),
         )
         sol_id = row["id"]
+    replace_items(con, sol_id, final_payload.get("items"))
     if approver:
         _create_notification(con, approver, sol_id, f"Solicitud #{sol_id} pendiente de aprobación")
     return sol_id, final_payload
@@ -1121,15 +1227,17 @@ def finalizar_solicitud(sol_id: int):
             f"UPDATE solicitudes SET {set_clause}, updated_at=CURRENT_TIMESTAMP WHERE id=?",
             params,
         )
+        replace_items(con, sol_id, merged["items"])
         con.commit()
 
         updated = _load_solicitud(con, sol_id)
-        serialized = _serialize_row(updated, detailed=True)
+        serialized = _serialize_loaded(con, updated)
 
         if approver_id:
             _create_notification(con, approver_id, sol_id, f"Nueva solicitud #{sol_id} pendiente de aprobación")
             con.commit()
 
+    _invalidate_count_cache(user_id)
     return _json_ok({"solicitud": serialized})
 
 
@@ -1167,6 +1275,7 @@ def crear_solicitud():
         except Exception as exc:
             con.rollback()
             return _json_error("DB_ERROR", f"No se pudo crear la solicitud: {exc}", 500)
+    _invalidate_count_cache(user_id)
     return {"ok": True, "id": solicitud_id, "status": STATUS_PENDING, "total_monto": final_payload.get("total_monto")}
 
 
@@ -1293,6 +1402,7 @@ def decidir_solicitud(sol_id: int):
             con.rollback()
             return _json_error("DB_ERROR", f"No se pudo registrar la decisión: {exc}", 500)
 
+    _invalidate_count_cache(row.get("id_usuario"))
     return {"ok": True, "status": status_final, "decision": decision_payload}
 
 
@@ -1318,6 +1428,7 @@ def cancelar_solicitud(sol_id: int):
             if status in (STATUS_DRAFT, STATUS_CANCEL_REJECTED):
                 data = _handle_direct_cancel(con, row, reason)
                 con.commit()
+                _invalidate_count_cache(uid)
                 return {"ok": True, "status": STATUS_CANCELLED, "cancel_reason": data.get("cancel_reason")}
             if status == STATUS_CANCELLED:
                 return _json_error("INVALID_STATE", "La solicitud ya está cancelada", 409)
@@ -1341,6 +1452,7 @@ def cancelar_solicitud(sol_id: int):
         except Exception as exc:
             con.rollback()
             return _json_error("DB_ERROR", f"No se pudo cancelar la solicitud: {exc}", 500)
+    _invalidate_count_cache(uid)
     return {"ok": True, "status": STATUS_CANCEL_PENDING}
 
 
@@ -1409,315 +1521,93 @@ def decidir_cancelacion(sol_id: int):
         except Exception as exc:
             con.rollback()
             return _json_error("DB_ERROR", f"No se pudo registrar la decisión: {exc}", 500)
+    _invalidate_count_cache(owner)
     return {"ok": True, "status": result_status, "accion": accion}
 
 
+def export_filters(source: Any = None, **base: Any) -> dict[str, Any]:
+    """Filtros de exportación (``status``, ``centro``, ``desde``, ``hasta``, ``q``).
+
+    ``source`` es un mapeo con esas claves; por defecto, la query string.
+    """
+    args = request.args if source is None else source
+    filters = dict(base)
+    statuses = sorted(
+        {part.strip().lower() for part in _coerce_str(args.get("status")).split(",") if part.strip()}
+    )
+    if statuses and "todos" not in statuses:
+        filters["status"] = statuses
+    for key in ("centro", "q"):
+        value = _coerce_str(args.get(key)).strip()
+        if value:
+            filters[key] = value
+    filters["desde"] = _parse_date_bound(_coerce_str(args.get("desde")), upper=False)
+    filters["hasta"] = _parse_date_bound(_coerce_str(args.get("hasta")), upper=True)
+    return filters
+
+
+def file_export_response(kind: str, filters: dict[str, Any], *, title: str, filename: str, include_owner: bool = False):
+    """Genera el archivo en disco (memoria constante) y lo envía como respuesta chunked.
+
+    Devuelve ``None`` si no hay solicitudes para los filtros dados.
+    """
+    path = temp_export_path(EXPORT_FORMATS[kind]["suffix"])
+    try:
+        with get_connection() as con:
+            count = EXPORT_FORMATS[kind]["writer"](
+                path, iter_solicitudes(con, filters), title=title, include_owner=include_owner
+            )
+    except Exception:
+        os.remove(path)
+        raise
+    if not count:
+        os.remove(path)
+        return None
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return Response(
+        stream_file(path),
+        mimetype=EXPORT_FORMATS[kind]["mimetype"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}_{stamp}{EXPORT_FORMATS[kind]["suffix"]}"'},
+        direct_passthrough=True,
+    )
+
+
 @bp.get("/solicitudes/export/excel")
 def export_solicitudes_excel():
-    """Exportar todas las solicitudes del usuario autenticado a Excel"""
+    """Exportar las solicitudes del usuario autenticado a Excel"""
     user_id = _require_auth()
     if not user_id:
         return _json_error("UNAUTHORIZED", "Autenticación requerida", 401)
-
     try:
-        with get_connection() as con:
-            # Obtener todas las solicitudes del usuario
-            solicitudes = con.execute("""
-                SELECT id, centro, sector, centro_costos, almacen_virtual, criticidad,
-                       fecha_necesidad, justificacion, status, created_at, updated_at,
-                       total_monto, aprobador_id, data_json
-                FROM solicitudes
-                WHERE id_usuario = ?
-                ORDER BY created_at DESC
-            """, (user_id,)).fetchall()
-
-            if not solicitudes:
-                return _json_error("NO_DATA", "No hay solicitudes para exportar", 404)
-
-            # Crear workbook de Excel
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Mis Solicitudes"
-
-            # Estilos
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            alignment = Alignment(horizontal="center", vertical="center")
-
-            # Headers principales
-            headers = [
-                "ID", "Centro", "Sector", "Centro de Costos", "Almacén Virtual",
-                "Criticidad", "Fecha Necesidad", "Justificación", "Estado",
-                "Fecha Creación", "Última Actualización", "Total Estimado", "Aprobador"
-            ]
-
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = alignment
-
-            # Datos de solicitudes
-            current_row = 2
-            for sol in solicitudes:
-                try:
-                    # Asegurarse de que sol sea una tupla/lista
-                    if not isinstance(sol, (tuple, list)):
-                        continue
-                    
-                    # Datos principales de la solicitud
-                    ws.cell(row=current_row, column=1, value=sol[0])  # ID
-                    ws.cell(row=current_row, column=2, value=sol[1] or "")  # Centro
-                    ws.cell(row=current_row, column=3, value=sol[2] or "")  # Sector
-                    ws.cell(row=current_row, column=4, value=sol[3] or "")  # Centro Costos
-                    ws.cell(row=current_row, column=5, value=sol[4] or "")  # Almacén Virtual
-                    ws.cell(row=current_row, column=6, value=sol[5] or "")  # Criticidad
-                    ws.cell(row=current_row, column=7, value=sol[6] or "")  # Fecha Necesidad
-                    ws.cell(row=current_row, column=8, value=sol[7] or "")  # Justificación
-                    ws.cell(row=current_row, column=9, value=sol[8] or "")  # Estado
-                    ws.cell(row=current_row, column=10, value=sol[9] or "")  # Fecha Creación
-                    ws.cell(row=current_row, column=11, value=sol[10] or "")  # Última Actualización
-                    ws.cell(row=current_row, column=12, value=sol[11] or 0)  # Total Estimado
-
-                    # Obtener nombre del aprobador si existe
-                    aprobador_name = ""
-                    if len(sol) > 12 and sol[12]:  # aprobador_id
-                        try:
-                            aprobador = con.execute("SELECT nombre FROM usuarios WHERE id = ?", (sol[12],)).fetchone()
-                            if aprobador:
-                                aprobador_name = aprobador[0] or ""
-                        except Exception:
-                            aprobador_name = ""
-                    ws.cell(row=current_row, column=13, value=aprobador_name)
-
-                    current_row += 1
-
-                    # Agregar items de la solicitud en filas separadas
-                    data_json = sol[13] if len(sol) > 13 else None
-                    if data_json and isinstance(data_json, str):
-                        try:
-                            data = json.loads(data_json)
-                            items = data.get('items', [])
-                            if items:
-                                # Agregar fila de separación
-                                ws.cell(row=current_row, column=1, value=f"Items de Solicitud #{sol[0]}")
-                                ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=13)
-                                current_row += 1
-
-                                # Headers de items
-                                item_headers = ["Código", "Descripción", "Unidad", "Precio Unitario", "Cantidad", "Subtotal"]
-                                for col_num, header in enumerate(item_headers, 1):
-                                    cell = ws.cell(row=current_row, column=col_num, value=header)
-                                    cell.font = Font(bold=True)
-                                current_row += 1
-
-                                # Datos de items
-                                for item in items:
-                                    if isinstance(item, dict):
-                                        ws.cell(row=current_row, column=1, value=item.get('codigo', ''))
-                                        ws.cell(row=current_row, column=2, value=item.get('descripcion', ''))
-                                        ws.cell(row=current_row, column=3, value=item.get('unidad', ''))
-                                        ws.cell(row=current_row, column=4, value=item.get('precio_unitario', 0))
-                                        ws.cell(row=current_row, column=5, value=item.get('cantidad', 0))
-                                        ws.cell(row=current_row, column=6, value=item.get('subtotal', 0))
-                                        current_row += 1
-                        except (json.JSONDecodeError, KeyError, TypeError):
-                            # Si hay problemas con el JSON, continuar sin items
-                            pass
-                except Exception as row_error:
-                    # Si hay error en una fila específica, continuar con la siguiente
-                    print(f"Error procesando solicitud: {row_error}")
-                    continue
-
-            # Ajustar ancho de columnas
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if cell.value:
-                            cell_length = len(str(cell.value))
-                            if cell_length > max_length:
-                                max_length = cell_length
-                    except Exception:
-                        pass
-                adjusted_width = min(max_length + 2, 50)  # Máximo 50 caracteres de ancho
-                ws.column_dimensions[column_letter].width = adjusted_width
-
-            # Guardar en buffer
-            buffer = BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=f"mis_solicitudes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-
+        filters = export_filters(id_usuario=user_id)
+    except ValueError as exc:
+        return _json_error("BAD_REQUEST", str(exc), 400)
+    try:
+        response = file_export_response("excel", filters, title="Mis Solicitudes", filename="mis_solicitudes")
     except Exception as exc:
         print(f"Error en export_solicitudes_excel: {exc}")
-        import traceback
-        traceback.print_exc()
         return _json_error("EXPORT_ERROR", f"Error al exportar a Excel: {exc}", 500)
+    if response is None:
+        return _json_error("NO_DATA", "No hay solicitudes para exportar", 404)
+    return response
 
 
 @bp.get("/solicitudes/export/pdf")
 def export_solicitudes_pdf():
-    """Exportar todas las solicitudes del usuario autenticado a PDF"""
+    """Exportar las solicitudes del usuario autenticado a PDF"""
     user_id = _require_auth()
     if not user_id:
         return _json_error("UNAUTHORIZED", "Autenticación requerida", 401)
-
     try:
-        with get_connection() as con:
-            # Obtener todas las solicitudes del usuario
-            solicitudes = con.execute("""
-                SELECT id, centro, sector, centro_costos, almacen_virtual, criticidad,
-                       fecha_necesidad, justificacion, status, created_at, updated_at,
-                       total_monto, aprobador_id, data_json
-                FROM solicitudes
-                WHERE id_usuario = ?
-                ORDER BY created_at DESC
-            """, (user_id,)).fetchall()
-
-            if not solicitudes:
-                return _json_error("NO_DATA", "No hay solicitudes para exportar", 404)
-
-            # Crear buffer para el PDF
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-
-            # Estilos personalizados
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=16,
-                spaceAfter=30,
-                alignment=1  # Centrado
-            )
-
-            subtitle_style = ParagraphStyle(
-                'CustomSubtitle',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=20,
-                alignment=0  # Izquierda
-            )
-
-            normal_style = styles['Normal']
-
-            story = []
-
-            # Título del documento
-            story.append(Paragraph("Mis Solicitudes - SPM", title_style))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph(f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", normal_style))
-            story.append(Spacer(1, 20))
-
-            for sol in solicitudes:
-                # Información de la solicitud
-                story.append(Paragraph(f"Solicitud #{sol[0]}", subtitle_style))
-
-                solicitud_data = [
-                    ["Centro:", sol[1] or "-"],
-                    ["Sector:", sol[2] or "-"],
-                    ["Centro de Costos:", sol[3] or "-"],
-                    ["Almacén Virtual:", sol[4] or "-"],
-                    ["Criticidad:", sol[5] or "-"],
-                    ["Fecha Necesidad:", sol[6] or "-"],
-                    ["Estado:", sol[8] or "-"],
-                    ["Fecha Creación:", sol[9] or "-"],
-                    ["Total Estimado:", f"${sol[11] or 0:.2f}" if sol[11] else "-"],
-                ]
-
-                # Obtener nombre del aprobador
-                if sol[12]:
-                    aprobador = con.execute("SELECT nombre FROM usuarios WHERE id = ?", (sol[12],)).fetchone()
-                    if aprobador:
-                        solicitud_data.append(["Aprobador:", aprobador[0]])
-
-                solicitud_table = Table(solicitud_data, colWidths=[100, 300])
-                solicitud_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-                    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('BACKGROUND', (1, 0), (1, -1), colors.white),
-                ]))
-                story.append(solicitud_table)
-                story.append(Spacer(1, 12))
-
-                # Justificación
-                if sol[7]:
-                    story.append(Paragraph("Justificación:", styles['Heading3']))
-                    story.append(Paragraph(sol[7], normal_style))
-                    story.append(Spacer(1, 12))
-
-                # Items de la solicitud
-                data_json = sol[13]
-                if data_json and isinstance(data_json, str):
-                    try:
-                        data = json.loads(data_json)
-                        items = data.get('items', [])
-                        if items:
-                            story.append(Paragraph("Items Solicitados:", styles['Heading3']))
-
-                            item_data = [["Código", "Descripción", "Unidad", "Precio Unit.", "Cantidad", "Subtotal"]]
-                            for item in items:
-                                item_data.append([
-                                    item.get('codigo', ''),
-                                    item.get('descripcion', ''),
-                                    item.get('unidad', ''),
-                                    f"${item.get('precio_unitario', 0):.2f}",
-                                    str(item.get('cantidad', 0)),
-                                    f"${item.get('subtotal', 0):.2f}"
-                                ])
-
-                            item_table = Table(item_data, colWidths=[60, 150, 50, 70, 60, 70])
-                            item_table.setStyle(TableStyle([
-                                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                                ('ALIGN', (3, 1), (5, -1), 'RIGHT'),
-                                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                            ]))
-                            story.append(item_table)
-                            story.append(Spacer(1, 20))
-                    except json.JSONDecodeError:
-                        pass
-
-                # Separador entre solicitudes
-                story.append(Paragraph("-" * 80, normal_style))
-                story.append(Spacer(1, 20))
-
-            # Generar PDF
-            doc.build(story)
-            buffer.seek(0)
-
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=f"mis_solicitudes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                mimetype="application/pdf"
-            )
-
+        filters = export_filters(id_usuario=user_id)
+    except ValueError as exc:
+        return _json_error("BAD_REQUEST", str(exc), 400)
+    try:
+        response = file_export_response(
+            "pdf", filters, title="Mis Solicitudes - SPM", filename="mis_solicitudes"
+        )
     except Exception as exc:
         return _json_error("EXPORT_ERROR", f"Error al exportar a PDF: {exc}", 500)
-
-
-
-
-
-
+    if response is None:
+        return _json_error("NO_DATA", "No hay solicitudes para exportar", 404)
+    return response
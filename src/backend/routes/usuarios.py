@@ -7,8 +7,10 @@ import re
 from flask import Blueprint, current_app, request, jsonify
 
 from ..core.db import get_connection
-from ..services.auth.auth import authenticate_request, get_current_user_id
-from ..services.db.security import hash_password, verify_password
+from ..services import org_directory
+from ..services.auth.auth import authenticate_request, get_current_user_id, invalidate_user_cache
+from ..services.auth import password_pool
+from ..services.auth.password_pool import PasswordPoolBusy
 
 bp = Blueprint("usuarios", __name__, url_prefix="/api/usuarios")
 
@@ -220,6 +222,8 @@ def actualizar_mi_usuario():
         params = tuple(updates[field] for field in updates) + (uid,)
         con.execute(f"UPDATE usuarios SET {assignments} WHERE id_spm=?", params)
         con.commit()
+        org_directory.invalidate()
+        invalidate_user_cache(uid)
         user.update(updates)
         return {"ok": True, "usuario": _serialize_user(user)}
 
@@ -257,12 +261,13 @@ def cambiar_password():
         }, 400
     with get_connection() as con:
         user = _get_user(con, uid)
-        if not user:
-            return {
-                "ok": False,
-                "error": {"code": "NOUSER", "message": "Usuario no encontrado"},
-            }, 404
-        valid, _needs_rehash = verify_password(user.get("contrasena"), current_password)
+    if not user:
+        return {
+            "ok": False,
+            "error": {"code": "NOUSER", "message": "Usuario no encontrado"},
+        }, 404
+    try:
+        valid, _needs_rehash = password_pool.verify_password(user.get("contrasena"), current_password)
         if not valid:
             return {
                 "ok": False,
@@ -271,7 +276,10 @@ def cambiar_password():
                     "message": "La contraseña actual es incorrecta",
                 },
             }, 400
-        new_hash = hash_password(new_password)
+        new_hash = password_pool.hash_password(new_password)
+    except PasswordPoolBusy as exc:
+        return {"ok": False, "error": {"code": "BUSY", "message": str(exc)}}, 429
+    with get_connection() as con:
         con.execute(
             "UPDATE usuarios SET contrasena=? WHERE id_spm=?",
             (new_hash, uid),
@@ -325,6 +333,8 @@ def update_me_fields():
     with get_connection() as con:
         con.execute(f"UPDATE usuarios SET {field} = ? WHERE id_spm = ?", (value, uid))
         con.commit()
+        org_directory.invalidate()
+        invalidate_user_cache(uid)
     return jsonify({"ok": True, "field": field, "value": value})
 
 
@@ -453,6 +463,9 @@ def _resolver_cambio(req_id: int, aprobar: bool):
             ("aprobado" if aprobar else "rechazado", uid, req_id),
         )
         con.commit()
+        if aprobar:
+            org_directory.invalidate()
+            invalidate_user_cache(data["user_id"])
     return {"ok": True}, 200
 
 
@@ -500,6 +513,8 @@ def eliminar_cuenta():
             (uid,),
         )
         con.commit()
+        org_directory.invalidate()
+        invalidate_user_cache(uid)
     return {"ok": True}
 
 
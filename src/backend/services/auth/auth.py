@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, Optional, Tuple
 
 import os
 import jwt
-from flask import Response, current_app, g, jsonify, request, Blueprint, make_response
+from flask import Response, current_app, g, has_request_context, jsonify, request, Blueprint, make_response
 import secrets, json
 from datetime import timedelta, datetime, timezone
 from ...middleware.csrf import issue_csrf
@@ -18,6 +20,7 @@ from ...middleware.decorators import require_auth
 from ...core.db import get_connection, get_user_by_username, get_db
 from .jwt_utils import create_access_token, verify_access_token, create_token, verify_token
 from ..db.security import hash_password, verify_password
+from . import password_pool
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -125,6 +128,55 @@ def load_user_by_id(user_id: Optional[str]) -> Optional[Dict[str, Any]]:
     return _serialize_user_row(dict(row))
 
 
+# Perfiles ya cargados por (base, id_spm, jti): LRU con TTL corto. Cambiar de token
+# fuerza una lectura nueva y las ediciones de usuarios llaman a invalidate_user_cache.
+_profile_lock = threading.Lock()
+_profile_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+def _copy_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    return {**user, "centros": list(user.get("centros") or [])}
+
+
+def _load_user_for_claims(claims: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    user_id = claims.get("sub")
+    ttl = Settings.USER_CACHE_TTL
+    if not user_id or ttl <= 0:
+        return load_user_by_id(user_id)
+    token_id = str(claims.get("jti") or f"{claims.get('iat')}:{claims.get('exp')}")
+    key = (Settings.DB_PATH, str(user_id).lower(), token_id)
+    now = time.monotonic()
+    with _profile_lock:
+        entry = _profile_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _profile_cache.move_to_end(key)
+            return _copy_profile(entry[1])
+    user = load_user_by_id(user_id)
+    if user is None:
+        return None
+    with _profile_lock:
+        _profile_cache[key] = (now + ttl, _copy_profile(user))
+        _profile_cache.move_to_end(key)
+        while len(_profile_cache) > max(Settings.USER_CACHE_SIZE, 1):
+            _profile_cache.popitem(last=False)
+    return user
+
+
+def invalidate_user_cache(user_id: Optional[str] = None) -> None:
+    """Descarta los perfiles cacheados de ``user_id`` (o todos) y el del pedido en curso."""
+    target = str(user_id).lower() if user_id else None
+    with _profile_lock:
+        if target is None:
+            _profile_cache.clear()
+        else:
+            for key in [key for key in _profile_cache if key[1] == target]:
+                del _profile_cache[key]
+    if has_request_context() and getattr(g, "_auth_evaluated", False):
+        current = str(getattr(g, "user_id", None) or "").lower()
+        if target is None or current == target:
+            setattr(g, "_auth_evaluated", False)  # type: ignore[attr-defined]
+
+
 def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     if not username or not password:
         return None
@@ -141,15 +193,14 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
             """,
             (username, username, username),
         ).fetchone()
-        if not row:
-            return None
-        valid, needs_rehash = verify_password(row["contrasena"], password)
-        if not valid:
-            return None
-        if needs_rehash:
-            new_hash = hash_password(password)
-            con.execute("UPDATE usuarios SET contrasena = ? WHERE id_spm = ?", (new_hash, row["id_spm"]))
-            con.commit()
+    if not row:
+        return None
+    # PBKDF2 fuera del hilo web y sin retener la conexión; puede levantar PasswordPoolBusy
+    valid, needs_rehash = password_pool.verify_password(row["contrasena"], password)
+    if not valid:
+        return None
+    if needs_rehash:
+        password_pool.schedule_rehash(row["id_spm"], password, row["contrasena"])
     return _serialize_user_row(dict(row))
 
 
@@ -219,7 +270,7 @@ def authenticate_request() -> bool:
         setattr(g, "_auth_evaluated", True)  # type: ignore[attr-defined]
         return False
 
-    user = load_user_by_id(claims.get("sub"))
+    user = _load_user_for_claims(claims)
     if not user:
         current_app.logger.warning("Authenticated token subject not found: %s", claims.get("sub"))
         _clear_auth_context()
@@ -247,6 +298,16 @@ def get_current_user_id() -> Optional[str]:
     return user.get("id") or user.get("id_spm")
 
 
+def current_profile_for(user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Perfil ya autenticado en este pedido si corresponde a ``user_id``; si no, ``None``."""
+    if not user_id or not has_request_context():
+        return None
+    user = getattr(g, "user", None)
+    if user and str(user.get("id_spm") or "").lower() == str(user_id).lower():
+        return user
+    return None
+
+
 def _sign(payload: dict) -> str:
     """JWT-like HS256 minimalista para sesión de desarrollo."""
     key = current_app.config["SECRET_KEY"].encode()
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import hashlib
+import hmac
+import threading
 import time
-from typing import Any, Dict, Optional
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
 
@@ -9,6 +14,14 @@ from ...core.config import Settings
 
 _ALGORITHM = "HS256"
 
+# Claims ya verificados, por firma del token. Se guarda también la parte firmada
+# (header.payload) para no aceptar una firma conocida con otro contenido, y la huella
+# de SECRET_KEY para descartar todo si la clave cambia. Las entradas vencen con ``exp``.
+_claims_lock = threading.Lock()
+_claims_cache: "OrderedDict[str, Tuple[str, float, Dict[str, Any]]]" = OrderedDict()
+_claims_key_fingerprint: Optional[str] = None
+_claims_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
 
 def _prepare_claims(claims: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     base: Dict[str, Any] = {}
@@ -46,6 +59,7 @@ def create_access_token(
 
     payload.setdefault("uid", subject)
     payload.setdefault("id_spm", subject)
+    payload.setdefault("jti", uuid.uuid4().hex)
 
     return _encode(payload)
 
@@ -80,10 +94,68 @@ def create_token(payload: dict) -> str:
     return create_access_token(subject=payload.get('sub'), claims=payload)
 
 
+def _key_fingerprint() -> str:
+    return hashlib.sha256(str(Settings.SECRET_KEY).encode("utf-8")).hexdigest()
+
+
+def _cached_claims(token: str) -> Optional[Dict[str, Any]]:
+    global _claims_key_fingerprint
+    signing_input, _, signature = token.rpartition(".")
+    now = time.time()
+    fingerprint = _key_fingerprint()
+    with _claims_lock:
+        if fingerprint != _claims_key_fingerprint:
+            _claims_cache.clear()
+            _claims_key_fingerprint = fingerprint
+        entry = _claims_cache.get(signature)
+        if entry is not None and hmac.compare_digest(entry[0], signing_input) and entry[1] > now:
+            _claims_cache.move_to_end(signature)
+            _claims_stats["hits"] += 1
+            return dict(entry[2])
+        if entry is not None:
+            del _claims_cache[signature]
+        _claims_stats["misses"] += 1
+    return None
+
+
+def _store_claims(token: str, claims: Dict[str, Any]) -> None:
+    exp = claims.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    signing_input, _, signature = token.rpartition(".")
+    with _claims_lock:
+        _claims_cache[signature] = (signing_input, float(exp), dict(claims))
+        _claims_cache.move_to_end(signature)
+        while len(_claims_cache) > Settings.JWT_CACHE_SIZE:
+            _claims_cache.popitem(last=False)
+            _claims_stats["evictions"] += 1
+
+
+def claims_cache_stats() -> Dict[str, Any]:
+    with _claims_lock:
+        stats: Dict[str, Any] = dict(_claims_stats, size=len(_claims_cache))
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_claims_cache() -> None:
+    with _claims_lock:
+        _claims_cache.clear()
+        for key in _claims_stats:
+            _claims_stats[key] = 0
+
+
 def _decode_and_validate(token: str) -> Dict[str, Any]:
     if not isinstance(token, str) or not token.strip():
         raise jwt.InvalidTokenError("Token must be a non-empty string")
-    return jwt.decode(token, Settings.SECRET_KEY, algorithms=[_ALGORITHM])
+    if Settings.JWT_CACHE_SIZE <= 0:
+        return jwt.decode(token, Settings.SECRET_KEY, algorithms=[_ALGORITHM])
+    claims = _cached_claims(token)
+    if claims is None:
+        claims = jwt.decode(token, Settings.SECRET_KEY, algorithms=[_ALGORITHM])
+        _store_claims(token, claims)
+    return claims
 
 
 def verify_access_token(token: str) -> Dict[str, Any]:
@@ -0,0 +1,211 @@
+"""
+Verificación y hash de contraseñas fuera de los hilos web.
+
+PBKDF2 (390.000 iteraciones) corre en un ``ProcessPoolExecutor`` de
+``Settings.PASSWORD_WORKERS`` procesos; con 0 se ejecuta en línea. Como mucho
+``Settings.PASSWORD_QUEUE_MAX`` operaciones esperan o corren a la vez: por encima
+de eso se levanta ``PasswordPoolBusy`` y las rutas responden 429 en lugar de dejar
+todos los hilos del worker bloqueados en un pico de logins. Un lugar de la cola se
+libera cuando la operación termina de verdad: si la espera vence se cancela el
+trabajo encolado, y uno que ya está corriendo sigue ocupando su lugar hasta
+terminar. Si un proceso hijo muere (OOM, kill) el pool queda roto: se descarta,
+la operación en curso responde ``PasswordPoolBusy`` y la siguiente crea un pool
+nuevo. La migración de contraseñas heredadas en texto plano se difiere a un
+hilo de fondo.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Tuple
+
+from ...core.config import Settings
+from ...core.db import get_connection
+from ..db import security
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """No hay lugar en la cola de hashing; el cliente debe reintentar."""
+
+    retry_after = 1
+
+
+_lock = threading.Lock()
+_executor: ProcessPoolExecutor | None = None
+_slots: threading.BoundedSemaphore | None = None
+_slots_size = 0
+_rehash_executor: ThreadPoolExecutor | None = None
+_stats: Dict[str, float] = {
+    "completed": 0,
+    "rejected": 0,
+    "timed_out": 0,
+    "pool_restarts": 0,
+    "in_flight": 0,
+    "rehash_pending": 0,
+    "last_ms": 0.0,
+    "max_ms": 0.0,
+    "total_ms": 0.0,
+}
+
+
+def _get_slots() -> threading.BoundedSemaphore:
+    global _slots, _slots_size
+    size = max(Settings.PASSWORD_QUEUE_MAX, 1)
+    with _lock:
+        if _slots is None or _slots_size != size:
+            _slots, _slots_size = threading.BoundedSemaphore(size), size
+        return _slots
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor
+    if Settings.PASSWORD_WORKERS <= 0:
+        return None
+    with _lock:
+        if _executor is None:
+            # spawn: mismo criterio que la cola de exportaciones
+            _executor = ProcessPoolExecutor(
+                max_workers=Settings.PASSWORD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _discard_executor(broken: ProcessPoolExecutor) -> None:
+    """Saca de servicio un pool roto; el próximo ``_get_executor`` arma otro."""
+    global _executor
+    with _lock:
+        if _executor is not broken:
+            return  # otro hilo ya lo reemplazó
+        _executor = None
+        _stats["pool_restarts"] += 1
+    logger.warning("Pool de contraseñas roto (proceso hijo caído); se recrea")
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _record(elapsed_ms: float) -> None:
+    with _lock:
+        _stats["completed"] += 1
+        _stats["last_ms"] = elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+        _stats["total_ms"] += elapsed_ms
+
+
+def _release(slots: threading.BoundedSemaphore) -> None:
+    with _lock:
+        _stats["in_flight"] -= 1
+    slots.release()
+
+
+def _run(func: Callable[..., Any], *args: Any) -> Any:
+    slots = _get_slots()
+    if not slots.acquire(blocking=False):
+        with _lock:
+            _stats["rejected"] += 1
+        raise PasswordPoolBusy("Demasiados inicios de sesión en curso, reintente en unos segundos")
+    with _lock:
+        _stats["in_flight"] += 1
+    started = time.perf_counter()
+    future: Future | None = None
+    try:
+        executor = _get_executor()
+        if executor is None:
+            result = func(*args)
+        else:
+            try:
+                future = executor.submit(func, *args)
+                # El lugar se libera cuando el trabajo termina (o se cancela), no al vencer la espera
+                future.add_done_callback(lambda _: _release(slots))
+                result = future.result(timeout=Settings.PASSWORD_TIMEOUT)
+            except FutureTimeout as exc:
+                future.cancel()
+                with _lock:
+                    _stats["timed_out"] += 1
+                raise PasswordPoolBusy("El servicio de contraseñas no respondió a tiempo") from exc
+            except BrokenProcessPool as exc:
+                _discard_executor(executor)
+                raise PasswordPoolBusy("El servicio de contraseñas se está reiniciando") from exc
+        _record((time.perf_counter() - started) * 1000)
+        return result
+    finally:
+        if future is None:
+            _release(slots)
+
+
+def verify_password(stored: str, candidate: str) -> Tuple[bool, bool]:
+    """``security.verify_password`` en el pool; ``PasswordPoolBusy`` si está saturado."""
+    return _run(security.verify_password, stored, candidate)
+
+
+def hash_password(password: str) -> str:
+    """``security.hash_password`` en el pool; ``PasswordPoolBusy`` si está saturado."""
+    return _run(security.hash_password, password)
+
+
+def _rehash(user_id: str, password: str, stored: str) -> None:
+    try:
+        new_hash = hash_password(password)
+        with get_connection() as con:
+            # Solo si no cambió: otro proceso pudo haberla migrado
+            con.execute(
+                "UPDATE usuarios SET contrasena = ? WHERE id_spm = ? AND contrasena = ?",
+                (new_hash, user_id, stored),
+            )
+            con.commit()
+    except PasswordPoolBusy:
+        logger.info("Rehash de %s postergado: pool saturado", user_id)
+    except Exception:
+        logger.exception("No se pudo migrar la contraseña de %s", user_id)
+    finally:
+        with _lock:
+            _stats["rehash_pending"] -= 1
+
+
+def schedule_rehash(user_id: str, password: str, stored: str) -> Future:
+    """Migra una contraseña heredada en segundo plano (se reintenta en el próximo login)."""
+    global _rehash_executor
+    with _lock:
+        if _rehash_executor is None:
+            _rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pwd-rehash")
+        _stats["rehash_pending"] += 1
+        executor = _rehash_executor
+    return executor.submit(_rehash, user_id, password, stored)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        snapshot = dict(_stats)
+    completed = snapshot["completed"]
+    return {
+        "workers": Settings.PASSWORD_WORKERS,
+        "queue_max": Settings.PASSWORD_QUEUE_MAX,
+        "in_flight": int(snapshot["in_flight"]),
+        "completed": int(completed),
+        "rejected": int(snapshot["rejected"]),
+        "timed_out": int(snapshot["timed_out"]),
+        "pool_restarts": int(snapshot["pool_restarts"]),
+        "rehash_pending": int(snapshot["rehash_pending"]),
+        "latency_ms": {
+            "last": round(snapshot["last_ms"], 2),
+            "max": round(snapshot["max_ms"], 2),
+            "avg": round(snapshot["total_ms"] / completed, 2) if completed else 0.0,
+        },
+    }
+
+
+def shutdown() -> None:
+    global _executor, _rehash_executor
+    with _lock:
+        executor, _executor = _executor, None
+        rehash, _rehash_executor = _rehash_executor, None
+    if rehash is not None:
+        rehash.shutdown(wait=True)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
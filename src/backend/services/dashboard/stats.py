@@ -4,64 +4,31 @@ Proporciona estadísticas y datos para el dashboard
 """
 from datetime import datetime, timedelta
 from ...core.db import get_db
-import json
-
-def _get_json_field(row, data_json_column):
-    """Helper para extraer datos de la columna data_json"""
-    try:
-        if isinstance(row[data_json_column], dict):
-            return row[data_json_column]
-        if isinstance(row[data_json_column], str):
-            return json.loads(row[data_json_column])
-    except:
-        pass
-    return {}
+from .. import material_catalog
+from ..solicitud_items import aggregate_demand
+from . import status_summary
 
 def get_user_stats(user_id):
     """Obtiene estadísticas del usuario"""
     try:
         db = get_db()
         
-        # Contar solicitudes por estado (usando 'status' en lugar de 'estado')
-        # Note: get_db() returns cursor with row_factory set to dict mode
-        pending = db.execute(
-            "SELECT COUNT(*) as count FROM solicitudes WHERE id_usuario = ? AND status = 'pendiente_de_aprobacion'",
-            (user_id,)
-        ).fetchone()
-        pending_count = pending['count'] if pending else 0
-        
-        approved = db.execute(
-            "SELECT COUNT(*) as count FROM solicitudes WHERE id_usuario = ? AND status = 'aprobada'",
-            (user_id,)
-        ).fetchone()
-        approved_count = approved['count'] if approved else 0
-        
-        in_process = db.execute(
-            "SELECT COUNT(*) as count FROM solicitudes WHERE id_usuario = ? AND status = 'en_proceso'",
-            (user_id,)
-        ).fetchone()
-        in_process_count = in_process['count'] if in_process else 0
-        
-        rejected = db.execute(
-            "SELECT COUNT(*) as count FROM solicitudes WHERE id_usuario = ? AND status = 'rechazada'",
-            (user_id,)
-        ).fetchone()
-        rejected_count = rejected['count'] if rejected else 0
-        
-        # Contar materiales
-        materials = db.execute(
-            "SELECT COUNT(*) as count FROM materiales"
-        ).fetchone()
-        total_materials = materials['count'] if materials else 0
+        # Conteos por estado desde el resumen materializado (una sola lectura)
+        counts = status_summary.status_counts(db, user_id)
+        pending_count = counts.get('pendiente_de_aprobacion', 0)
+        approved_count = counts.get('aprobada', 0)
+        in_process_count = counts.get('en_proceso', 0)
+        rejected_count = counts.get('rechazada', 0)
+        total_materials = material_catalog.material_count(db)
         
         # Calcular tasa de aprobación
         total_reviewed = approved_count + rejected_count
         approval_rate = int((approved_count / total_reviewed * 100) if total_reviewed > 0 else 0)
         
-        # Últimas solicitudes (extraer título de data_json)
+        # Últimas solicitudes (la justificación ya está en su propia columna)
         # db.row_factory already set to dict mode via get_db()
         recent = db.execute("""
-            SELECT id, data_json, status, created_at 
+            SELECT id, justificacion, status, created_at 
             FROM solicitudes 
             WHERE id_usuario = ? 
             ORDER BY created_at DESC 
@@ -70,8 +37,7 @@ def get_user_stats(user_id):
         
         recent_requests = []
         for r in recent:
-            data = _get_json_field(r, 'data_json')
-            titulo = data.get('justificacion', 'Sin título')[:50]
+            titulo = (r['justificacion'] or 'Sin título')[:50]
             recent_requests.append({
                 "id": r['id'],
                 "title": titulo,
@@ -111,7 +77,7 @@ def get_dashboard_activity():
         # Últimas acciones (solicitudes creadas/aprobadas)
         # Note: db already has row_factory set to dict mode via get_db()
         activity = db.execute("""
-            SELECT id, data_json, status, created_at, id_usuario
+            SELECT id, justificacion, status, created_at, id_usuario
             FROM solicitudes
             ORDER BY created_at DESC
             LIMIT 10
@@ -140,14 +106,7 @@ def get_dashboard_activity():
         
         for a in activity:
             try:
-                # Extraer datos de data_json
-                data_json_str = a.get('data_json', '{}')
-                if isinstance(data_json_str, str):
-                    data = json.loads(data_json_str) if data_json_str else {}
-                else:
-                    data = data_json_str if isinstance(data_json_str, dict) else {}
-                
-                titulo = data.get('justificacion', 'Sin descripción')[:40]
+                titulo = (a.get('justificacion') or 'Sin descripción')[:40]
                 status = a.get('status', 'unknown')
                 icon = status_map.get(status, '📝')
                 
@@ -176,27 +135,31 @@ def get_chart_data():
     try:
         db = get_db()
         
-        # Datos para gráfico de estados (usar 'status' en lugar de 'estado')
-        states = db.execute("""
-            SELECT status, COUNT(*) as count 
-            FROM solicitudes 
-            GROUP BY status
-        """).fetchall()
+        # Datos para gráfico de estados (resumen materializado)
+        states = [
+            {"status": status, "count": count}
+            for status, count in status_summary.status_counts(db).items()
+        ]
         
         # Datos para tendencia (últimos 7 días) - usar 'created_at' en lugar de 'fecha_creacion'
         today = datetime.now()
+        first_day = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+        # Un solo GROUP BY para los 7 días en lugar de una consulta por día
+        per_day = {
+            row['day']: row['count']
+            for row in db.execute(
+                "SELECT DATE(created_at) as day, COUNT(*) as count FROM solicitudes"
+                " WHERE created_at >= ? GROUP BY DATE(created_at)",
+                (first_day,)
+            ).fetchall()
+        }
         trend_data = []
         
         for i in range(6, -1, -1):
             date = (today - timedelta(days=i)).strftime('%Y-%m-%d')
-            count_row = db.execute(
-                "SELECT COUNT(*) as count FROM solicitudes WHERE DATE(created_at) = ?",
-                (date,)
-            ).fetchone()
-            count = count_row['count'] if count_row else 0
             trend_data.append({
                 "date": date.split('-')[2],  # Solo el día
-                "count": count
+                "count": per_day.get(date, 0)
             })
         
         # Distribución por centro
@@ -209,6 +172,9 @@ def get_chart_data():
             LIMIT 5
         """).fetchall()
         
+        # Materiales más pedidos (agregado en SQL sobre solicitud_items)
+        materials = aggregate_demand(db, limit=5)
+
         # Mapear estados a nombres más legibles
         status_names = {
             'pendiente_de_aprobacion': 'Pendiente Aprobación',
@@ -233,6 +199,10 @@ def get_chart_data():
             "centers": [
                 {"name": c['centro'] or 'Sin centro', "count": c['count']} 
                 for c in centers
+            ],
+            "materials": [
+                {"codigo": m['codigo'], "centro": m['centro'], "cantidad": m['cantidad_total']}
+                for m in materials
             ]
         }
     except Exception as e:
@@ -242,5 +212,6 @@ def get_chart_data():
         return {
             "states": [],
             "trend": [],
-            "centers": []
+            "centers": [],
+            "materials": []
         }
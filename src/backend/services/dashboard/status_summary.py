@@ -0,0 +1,87 @@
+"""
+Resumen materializado de solicitudes por estado.
+
+``solicitudes_status_counts`` guarda ``(id_usuario, status) -> total`` y lo
+mantienen triggers sobre ``solicitudes`` en la misma transacción que cada alta,
+baja o cambio de estado, así los dashboards leen unas pocas filas en lugar de
+contar la tabla de solicitudes en cada carga. Los totales globales suman ese
+resumen. Al no depender de invalidaciones en el código, el resumen es correcto
+también entre workers y para cualquier ruta que cambie un estado.
+
+Si la base todavía no tiene la migración 3 (el arranque la aplica, pero un proceso
+puede atender pedidos antes que el que migra), ``status_counts`` cuenta directo
+sobre ``solicitudes`` con ``GROUP BY status``.
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Optional
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS solicitudes_status_counts(
+    id_usuario TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY(id_usuario, status)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_sol_status_ai AFTER INSERT ON solicitudes BEGIN
+    INSERT INTO solicitudes_status_counts(id_usuario, status, total)
+    VALUES (lower(trim(COALESCE(new.id_usuario, ''))), COALESCE(new.status, ''), 1)
+    ON CONFLICT(id_usuario, status) DO UPDATE SET total = total + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_sol_status_ad AFTER DELETE ON solicitudes BEGIN
+    UPDATE solicitudes_status_counts SET total = MAX(total - 1, 0)
+     WHERE id_usuario = lower(trim(COALESCE(old.id_usuario, ''))) AND status = COALESCE(old.status, '');
+END;
+CREATE TRIGGER IF NOT EXISTS trg_sol_status_au AFTER UPDATE OF status, id_usuario ON solicitudes
+WHEN COALESCE(old.status, '') <> COALESCE(new.status, '')
+  OR lower(trim(COALESCE(old.id_usuario, ''))) <> lower(trim(COALESCE(new.id_usuario, ''))) BEGIN
+    UPDATE solicitudes_status_counts SET total = MAX(total - 1, 0)
+     WHERE id_usuario = lower(trim(COALESCE(old.id_usuario, ''))) AND status = COALESCE(old.status, '');
+    INSERT INTO solicitudes_status_counts(id_usuario, status, total)
+    VALUES (lower(trim(COALESCE(new.id_usuario, ''))), COALESCE(new.status, ''), 1)
+    ON CONFLICT(id_usuario, status) DO UPDATE SET total = total + 1;
+END;
+"""
+
+
+def backfill(con) -> None:
+    """Recalcula el resumen completo desde ``solicitudes``."""
+    con.execute("DELETE FROM solicitudes_status_counts")
+    con.execute(
+        """
+        INSERT INTO solicitudes_status_counts(id_usuario, status, total)
+        SELECT lower(trim(COALESCE(id_usuario, ''))), COALESCE(status, ''), COUNT(*)
+          FROM solicitudes
+         GROUP BY 1, 2
+        """
+    )
+
+
+def status_counts(con, user_id: Optional[str] = None) -> Dict[str, int]:
+    """``{status: total}`` de un usuario, o de todas las solicitudes si ``user_id`` es None."""
+    try:
+        if user_id is None:
+            rows = con.execute(
+                "SELECT status, SUM(total) AS total FROM solicitudes_status_counts GROUP BY status"
+            ).fetchall()
+        else:
+            rows = con.execute(
+                "SELECT status, total FROM solicitudes_status_counts WHERE id_usuario = ?",
+                (str(user_id).strip().lower(),),
+            ).fetchall()
+    except sqlite3.OperationalError as exc:
+        if "solicitudes_status_counts" not in str(exc):
+            raise
+        rows = _count_direct(con, user_id)
+    return {row["status"]: int(row["total"]) for row in rows if row["total"]}
+
+
+def _count_direct(con, user_id: Optional[str]):
+    """Mismo resultado que el resumen, contando ``solicitudes`` (base sin migrar)."""
+    sql = "SELECT COALESCE(status, '') AS status, COUNT(*) AS total FROM solicitudes"
+    params: tuple = ()
+    if user_id is not None:
+        sql += " WHERE lower(trim(COALESCE(id_usuario, ''))) = ?"
+        params = (str(user_id).strip().lower(),)
+    return con.execute(sql + " GROUP BY 1", params).fetchall()
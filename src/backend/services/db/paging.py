@@ -1,3 +1,10 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+
 def parse_paging_args(args, allowed_sort):
     try:
         page = max(1, int(args.get('page', 1)))
@@ -11,4 +18,23 @@ def parse_paging_args(args, allowed_sort):
     if sort not in allowed_sort: sort = 'created_at'
     order = args.get('order','desc').lower()
     order = 'asc' if order == 'asc' else 'desc'
-    return page, per_page, q, sort, order
\ No newline at end of file
+    return page, per_page, q, sort, order
+
+def encode_cursor(values: dict) -> str:
+    """Serializa la posición de keyset en un token opaco (base64 url-safe)."""
+    raw = json.dumps(values, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: str | None) -> dict | None:
+    """Decodifica un cursor emitido por encode_cursor; lanza ValueError si es inválido."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError) as exc:
+        raise ValueError('Cursor inválido') from exc
+    if not isinstance(data, dict):
+        raise ValueError('Cursor inválido')
+    return data
@@ -0,0 +1,361 @@
+"""
+Cola de exportaciones (Excel / PDF) en segundo plano.
+
+Los trabajos se registran en la tabla ``export_jobs`` (visible para todos los
+workers web) y se renderizan en un ``ProcessPoolExecutor``, de modo que reportlab y
+openpyxl no bloquean hilos web y usan más de un núcleo. Los resultados quedan en
+``Settings.DATA_DIR/exports`` durante ``Settings.EXPORT_TTL`` segundos; pedidos
+idénticos (mismo usuario, formato y filtros) reutilizan el trabajo vigente.
+
+Ciclo de vida: ``queued`` al registrarse, ``running`` cuando el proceso que
+renderiza lo toma (y desde ahí actualiza ``heartbeat_at`` periódicamente),
+``done``/``error`` al terminar. Un hilo del proceso que renderiza mantiene el latido
+durante todo el trabajo (lectura, armado y guardado del archivo). Un trabajo en
+cola o en curso sin latido durante ``Settings.EXPORT_STALE_AFTER`` segundos (p. ej.
+el proceso murió) se informa como error, deja de deduplicar pedidos y se purga.
+
+Un índice único parcial sobre ``dedupe_key`` admite un solo trabajo activo por
+pedido: si dos pedidos idénticos llegan a la vez, el segundo INSERT falla y
+devuelve el trabajo del primero. La tabla la crean las migraciones 4 y 5 de init_db.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Mapping, Optional
+
+from ..core.config import Settings
+from ..core.db import _connect, get_connection
+from .exports import EXPORT_FORMATS, iter_solicitudes
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+STATUS_EXPIRED = "expired"
+
+_PRUNE_INTERVAL = 60.0
+_HEARTBEAT_INTERVAL = 5.0
+_MAX_TASKS_PER_CHILD = 50
+_STALE_ERROR = "Trabajo abandonado: sin actividad del proceso de exportación"
+
+_executor_lock = threading.Lock()
+_executor: ProcessPoolExecutor | None = None
+_last_prune = 0.0
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    params_json TEXT NOT NULL,
+    status TEXT NOT NULL,
+    path TEXT,
+    rows INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_key ON export_jobs(dedupe_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs(status, expires_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_export_jobs_active ON export_jobs(dedupe_key)
+    WHERE status IN ('queued', 'running');
+"""
+
+
+class ExportJobError(RuntimeError):
+    """El trabajo recién registrado no se pudo leer (p. ej. lo purgó otro worker)."""
+
+
+def close_duplicate_active(con) -> int:
+    """Deja un solo trabajo activo por ``dedupe_key`` (el más nuevo); los demás pasan a error."""
+    now = time.time()
+    return con.execute(
+        """
+        UPDATE export_jobs SET status=?, error=?, finished_at=?, expires_at=?
+         WHERE status IN (?, ?)
+           AND rowid NOT IN (
+               SELECT MAX(rowid) FROM export_jobs WHERE status IN (?, ?) GROUP BY dedupe_key
+           )
+        """,
+        (STATUS_ERROR, _STALE_ERROR, now, now, STATUS_QUEUED, STATUS_RUNNING, STATUS_QUEUED, STATUS_RUNNING),
+    ).rowcount
+
+
+def exports_dir() -> str:
+    path = os.path.join(Settings.DATA_DIR, "exports")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class _Heartbeat:
+    """Hilo que actualiza ``heartbeat_at`` cada ``_HEARTBEAT_INTERVAL`` segundos mientras dura el bloque."""
+
+    def __init__(self, db_path: str, job_id: str) -> None:
+        self.db_path = db_path
+        self.job_id = job_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"export-heartbeat-{job_id[:8]}", daemon=True)
+
+    def _run(self) -> None:
+        con = _connect(self.db_path)
+        try:
+            while not self._stop.wait(_HEARTBEAT_INTERVAL):
+                try:
+                    con.execute("UPDATE export_jobs SET heartbeat_at=? WHERE id=?", (time.time(), self.job_id))
+                    con.commit()
+                except sqlite3.Error as exc:  # base ocupada: se reintenta en la próxima vuelta
+                    logger.warning("Export job %s heartbeat failed: %s", self.job_id, exc)
+        finally:
+            con.close()
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def render_export(
+    job_id: str, kind: str, db_path: str, filters: Mapping[str, Any], out_path: str, title: str, include_owner: bool
+) -> int:
+    """Punto de entrada del proceso hijo: abre su conexión, marca el trabajo en curso y escribe el archivo."""
+    con = _connect(db_path)
+    tmp_path = f"{out_path}.part"
+    try:
+        now = time.time()
+        con.execute(
+            "UPDATE export_jobs SET status=?, started_at=?, heartbeat_at=? WHERE id=?",
+            (STATUS_RUNNING, now, now, job_id),
+        )
+        con.commit()
+        with _Heartbeat(db_path, job_id):
+            count = EXPORT_FORMATS[kind]["writer"](
+                tmp_path,
+                iter_solicitudes(con, filters),
+                title=title,
+                include_owner=include_owner,
+            )
+            os.replace(tmp_path, out_path)
+        return count
+    finally:
+        con.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _get_executor() -> ProcessPoolExecutor | None:
+    global _executor
+    if Settings.EXPORT_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: hacer fork de un servidor con hilos puede heredar locks tomados
+            _executor = ProcessPoolExecutor(
+                max_workers=Settings.EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=_MAX_TASKS_PER_CHILD,
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _dedupe_key(kind: str, owner: str, params: Mapping[str, Any]) -> str:
+    raw = json.dumps({"kind": kind, "owner": owner.lower(), "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _stale_before(now: float) -> float:
+    return now - Settings.EXPORT_STALE_AFTER
+
+
+def _is_stale(row: Mapping[str, Any], now: float) -> bool:
+    last_seen = row["heartbeat_at"] or row["created_at"]
+    return row["status"] in (STATUS_QUEUED, STATUS_RUNNING) and last_seen <= _stale_before(now)
+
+
+def _public(row: Mapping[str, Any], now: float | None = None) -> Dict[str, Any]:
+    now = time.time() if now is None else now
+    status = row["status"]
+    error = row["error"]
+    if status == STATUS_DONE and (row["expires_at"] or 0) <= now:
+        status = STATUS_EXPIRED
+    elif _is_stale(row, now):
+        status, error = STATUS_ERROR, _STALE_ERROR
+    job = {
+        "id": row["id"],
+        "formato": row["kind"],
+        "status": status,
+        "rows": row["rows"],
+        "created_at": row["created_at"],
+        "finished_at": row["finished_at"],
+        "expires_at": row["expires_at"],
+    }
+    if error:
+        job["error"] = error
+    return job
+
+
+def _finish(job_id: str, future: Future) -> None:
+    now = time.time()
+    try:
+        count = future.result()
+    except Exception as exc:  # el error se informa al consultar el trabajo
+        logger.warning("Export job %s failed: %s", job_id, exc)
+        # Los errores también vencen: quedan visibles EXPORT_TTL segundos y luego se purgan
+        fields = {"status": STATUS_ERROR, "error": str(exc)[:500], "finished_at": now, "expires_at": now + Settings.EXPORT_TTL}
+    else:
+        fields = {"status": STATUS_DONE, "rows": count, "finished_at": now, "expires_at": now + Settings.EXPORT_TTL}
+    with get_connection() as con:
+        con.execute(
+            f"UPDATE export_jobs SET {', '.join(f'{col}=?' for col in fields)} WHERE id=?",
+            (*fields.values(), job_id),
+        )
+        con.commit()
+
+
+def prune_expired(*, force: bool = False) -> int:
+    """
+    Borra trabajos vencidos (resultados y errores) y abandonados, con sus archivos;
+    como mucho una vez por minuto.
+    """
+    global _last_prune
+    now = time.time()
+    if not force and now - _last_prune < _PRUNE_INTERVAL:
+        return 0
+    _last_prune = now
+    with get_connection() as con:
+        rows = con.execute(
+            """
+            SELECT id, path FROM export_jobs
+             WHERE (status IN (?, ?) AND expires_at <= ?)
+                OR (status IN (?, ?) AND COALESCE(heartbeat_at, created_at) <= ?)
+            """,
+            (STATUS_DONE, STATUS_ERROR, now, STATUS_QUEUED, STATUS_RUNNING, _stale_before(now)),
+        ).fetchall()
+        for row in rows:
+            for path in (row["path"], f"{row['path']}.part" if row["path"] else None):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        if rows:
+            con.executemany("DELETE FROM export_jobs WHERE id=?", [(row["id"],) for row in rows])
+            con.commit()
+    return len(rows)
+
+
+def submit(kind: str, owner: str, filters: Mapping[str, Any], *, title: str, include_owner: bool = False) -> Dict[str, Any]:
+    """Encola una exportación, o devuelve el trabajo vigente con los mismos parámetros."""
+    if kind not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación inválido: {kind}")
+    prune_expired()
+    params = {"filters": dict(filters), "title": title, "include_owner": include_owner}
+    key = _dedupe_key(kind, owner, params)
+    now = time.time()
+    with get_connection() as con:
+        existing = con.execute(
+            """
+            SELECT * FROM export_jobs
+             WHERE dedupe_key=?
+               AND ((status IN (?, ?) AND COALESCE(heartbeat_at, created_at) > ?)
+                    OR (status=? AND expires_at > ?))
+          ORDER BY created_at DESC
+             LIMIT 1
+            """,
+            (key, STATUS_QUEUED, STATUS_RUNNING, _stale_before(now), STATUS_DONE, now),
+        ).fetchone()
+        if existing and (existing["status"] != STATUS_DONE or os.path.exists(existing["path"] or "")):
+            return {**_public(existing, now), "deduplicated": True}
+        job_id = uuid.uuid4().hex
+        out_path = os.path.join(exports_dir(), f"{job_id}{EXPORT_FORMATS[kind]['suffix']}")
+        # Un abandonado con la misma clave ocupa el índice único de activos: se cierra
+        # (vence ya, así la próxima purga borra su archivo)
+        con.execute(
+            """
+            UPDATE export_jobs SET status=?, error=?, finished_at=?, expires_at=?
+             WHERE dedupe_key=? AND status IN (?, ?) AND COALESCE(heartbeat_at, created_at) <= ?
+            """,
+            (STATUS_ERROR, _STALE_ERROR, now, now, key, STATUS_QUEUED, STATUS_RUNNING, _stale_before(now)),
+        )
+        try:
+            con.execute(
+                """
+                INSERT INTO export_jobs (id, kind, owner, dedupe_key, params_json, status, path, created_at)
+                VALUES (?,?,?,?,?,?,?,?)
+                """,
+                (job_id, kind, owner.lower(), key, json.dumps(params, default=str), STATUS_QUEUED, out_path, now),
+            )
+            con.commit()
+        except sqlite3.IntegrityError:
+            con.rollback()
+            # Un pedido idéntico registró su trabajo entre la consulta y el INSERT
+            winner = con.execute(
+                "SELECT * FROM export_jobs WHERE dedupe_key=? AND status IN (?, ?)",
+                (key, STATUS_QUEUED, STATUS_RUNNING),
+            ).fetchone()
+            if winner is None:
+                raise
+            return {**_public(winner), "deduplicated": True}
+
+    args = (job_id, kind, Settings.DB_PATH, dict(filters), out_path, title, include_owner)
+    executor = _get_executor()
+    if executor is None:
+        future: Future = Future()
+        try:
+            future.set_result(render_export(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        _finish(job_id, future)
+    else:
+        executor.submit(render_export, *args).add_done_callback(lambda fut: _finish(job_id, fut))
+    job = get_job(job_id)
+    if job is None:
+        raise ExportJobError(f"Trabajo de exportación {job_id} no encontrado tras registrarlo")
+    return {**job, "deduplicated": False}
+
+
+def _load(job_id: str) -> Optional[Dict[str, Any]]:
+    with get_connection() as con:
+        return con.execute("SELECT * FROM export_jobs WHERE id=?", (job_id,)).fetchone()
+
+
+def get_job(job_id: str, owner: str | None = None) -> Optional[Dict[str, Any]]:
+    """Estado público del trabajo; ``owner`` restringe la búsqueda a sus trabajos."""
+    row = _load(job_id)
+    if not row or (owner is not None and row["owner"] != owner.lower()):
+        return None
+    return _public(row)
+
+
+def result_file(job_id: str, owner: str | None = None) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Devuelve (job, ruta) si el resultado está listo y vigente; ruta ``None`` si no."""
+    row = _load(job_id)
+    if not row or (owner is not None and row["owner"] != owner.lower()):
+        return None, None
+    job = _public(row)
+    if job["status"] != STATUS_DONE or not os.path.exists(row["path"] or ""):
+        return job, None
+    return job, row["path"]
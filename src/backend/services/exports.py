@@ -0,0 +1,281 @@
+"""
+Exportación de solicitudes a Excel y PDF.
+
+Las filas se leen por lotes (``fetchmany``) con el nombre del aprobador resuelto en
+el mismo JOIN y los ítems se cargan por lote desde ``solicitud_items``. El Excel se
+arma en modo ``write_only`` sobre un archivo, que luego se envía en chunks. Las
+funciones ``write_*`` solo reciben rutas y filas, así que también corren en los
+procesos de la cola de exportación (ver ``export_jobs``).
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .solicitud_items import load_items
+
+FETCH_CHUNK = 500
+STREAM_CHUNK = 64 * 1024
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MIMETYPE = "application/pdf"
+
+HEADERS = (
+    "ID", "Centro", "Sector", "Centro de Costos", "Almacén Virtual",
+    "Criticidad", "Fecha Necesidad", "Justificación", "Estado",
+    "Fecha Creación", "Última Actualización", "Total Estimado", "Aprobador",
+)
+ADMIN_HEADERS = HEADERS + ("Solicitante",)
+ITEM_HEADERS = ("Código", "Descripción", "Unidad", "Precio Unitario", "Cantidad", "Subtotal")
+# En modo write_only no se puede recorrer la hoja para autoajustar: anchos fijos
+COLUMN_WIDTHS = (10, 12, 14, 16, 16, 11, 15, 50, 24, 20, 20, 15, 30, 30)
+
+_SELECT = """
+    SELECT s.id, s.centro, s.sector, s.centro_costos, s.almacen_virtual, s.criticidad,
+           s.fecha_necesidad, s.justificacion, s.status, s.created_at, s.updated_at,
+           s.total_monto,
+           COALESCE(NULLIF(TRIM(COALESCE(a.nombre, '') || ' ' || COALESCE(a.apellido, '')), ''), s.aprobador_id, '') AS aprobador,
+           s.id_usuario, s.data_json
+      FROM solicitudes s
+      LEFT JOIN usuarios a ON lower(a.id_spm) = lower(s.aprobador_id)
+"""
+
+
+def solicitudes_query(filters: Mapping[str, Any]) -> Tuple[str, List[Any]]:
+    """Arma el SELECT filtrado; las fechas llegan ya normalizadas por la ruta."""
+    clauses: List[str] = []
+    params: List[Any] = []
+    if filters.get("id_usuario"):
+        clauses.append("lower(s.id_usuario) = ?")
+        params.append(str(filters["id_usuario"]).lower())
+    statuses = filters.get("status") or ()
+    if statuses:
+        clauses.append(f"s.status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    if filters.get("centro"):
+        clauses.append("s.centro = ?")
+        params.append(filters["centro"])
+    if filters.get("desde"):
+        clauses.append("s.created_at >= ?")
+        params.append(filters["desde"])
+    if filters.get("hasta"):
+        clauses.append("s.created_at < ?")
+        params.append(filters["hasta"])
+    if filters.get("q"):
+        like = f"%{str(filters['q']).lower()}%"
+        clauses.append("(lower(s.id_usuario) LIKE ? OR lower(s.centro) LIKE ? OR lower(s.sector) LIKE ?)")
+        params.extend([like, like, like])
+    where = " AND ".join(clauses) if clauses else "1=1"
+    return f"{_SELECT} WHERE {where} ORDER BY s.created_at DESC, s.id DESC", params
+
+
+def iter_solicitudes(con, filters: Mapping[str, Any], *, chunk_size: int = FETCH_CHUNK) -> Iterator[Dict[str, Any]]:
+    """Recorre las solicitudes por lotes, agregando ``items`` a cada fila."""
+    sql, params = solicitudes_query(filters)
+    cur = con.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            break
+        stored = load_items(con, [row["id"] for row in rows])
+        for row in rows:
+            items = stored.get(row["id"])
+            if items is None:
+                try:
+                    items = json.loads(row["data_json"] or "{}").get("items") or []
+                except (TypeError, ValueError, AttributeError):
+                    items = []
+            row["items"] = items
+            yield row
+
+
+def write_solicitudes_xlsx(path: str, rows: Iterator[Dict[str, Any]], *, title: str, include_owner: bool = False) -> int:
+    """Escribe el libro en ``path`` y devuelve la cantidad de solicitudes exportadas."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title)
+    headers = ADMIN_HEADERS if include_owner else HEADERS
+    for idx, width in enumerate(COLUMN_WIDTHS[: len(headers)], 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    alignment = Alignment(horizontal="center", vertical="center")
+    bold = Font(bold=True)
+
+    def styled(value: Any, *, font: Font, fill: PatternFill | None = None) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = font
+        if fill is not None:
+            cell.fill = fill
+            cell.alignment = alignment
+        return cell
+
+    ws.append([styled(h, font=header_font, fill=header_fill) for h in headers])
+    item_header = [styled(h, font=bold) for h in ITEM_HEADERS]
+
+    count = 0
+    for sol in rows:
+        values = [
+            sol["id"], sol["centro"] or "", sol["sector"] or "", sol["centro_costos"] or "",
+            sol["almacen_virtual"] or "", sol["criticidad"] or "", sol["fecha_necesidad"] or "",
+            sol["justificacion"] or "", sol["status"] or "", sol["created_at"] or "",
+            sol["updated_at"] or "", sol["total_monto"] or 0, sol["aprobador"] or "",
+        ]
+        if include_owner:
+            values.append(sol["id_usuario"] or "")
+        ws.append(values)
+        count += 1
+        items = [item for item in sol.get("items") or [] if isinstance(item, dict)]
+        if not items:
+            continue
+        ws.append([f"Items de Solicitud #{sol['id']}"])
+        ws.append(item_header)
+        for item in items:
+            ws.append([
+                item.get("codigo", ""),
+                item.get("descripcion", ""),
+                item.get("unidad", ""),
+                item.get("precio_unitario", 0),
+                item.get("cantidad", 0),
+                item.get("subtotal", 0),
+            ])
+    wb.save(path)
+    return count
+
+
+_PDF_SUMMARY_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('BACKGROUND', (1, 0), (1, -1), colors.white),
+])
+_PDF_ITEMS_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+    ('ALIGN', (3, 1), (5, -1), 'RIGHT'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+
+def _money(value: Any) -> str:
+    try:
+        return f"${float(value or 0):.2f}"
+    except (TypeError, ValueError):
+        return "$0.00"
+
+
+def write_solicitudes_pdf(path: str, rows: Iterable[Dict[str, Any]], *, title: str, include_owner: bool = False) -> int:
+    """Escribe el PDF en ``path`` y devuelve la cantidad de solicitudes exportadas."""
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=16, spaceAfter=30, alignment=1)
+    subtitle_style = ParagraphStyle('CustomSubtitle', parent=styles['Heading2'], fontSize=14, spaceAfter=20, alignment=0)
+    normal_style = styles['Normal']
+
+    story: List[Any] = [
+        Paragraph(escape(title), title_style),
+        Spacer(1, 12),
+        Paragraph(f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", normal_style),
+        Spacer(1, 20),
+    ]
+    count = 0
+    for sol in rows:
+        count += 1
+        story.append(Paragraph(f"Solicitud #{sol['id']}", subtitle_style))
+        summary = [
+            ["Centro:", sol["centro"] or "-"],
+            ["Sector:", sol["sector"] or "-"],
+            ["Centro de Costos:", sol["centro_costos"] or "-"],
+            ["Almacén Virtual:", sol["almacen_virtual"] or "-"],
+            ["Criticidad:", sol["criticidad"] or "-"],
+            ["Fecha Necesidad:", sol["fecha_necesidad"] or "-"],
+            ["Estado:", sol["status"] or "-"],
+            ["Fecha Creación:", sol["created_at"] or "-"],
+            ["Total Estimado:", _money(sol["total_monto"]) if sol["total_monto"] else "-"],
+        ]
+        if sol["aprobador"]:
+            summary.append(["Aprobador:", sol["aprobador"]])
+        if include_owner:
+            summary.append(["Solicitante:", sol["id_usuario"] or "-"])
+        summary_table = Table(summary, colWidths=[100, 300])
+        summary_table.setStyle(_PDF_SUMMARY_STYLE)
+        story.extend([summary_table, Spacer(1, 12)])
+
+        if sol["justificacion"]:
+            story.append(Paragraph("Justificación:", styles['Heading3']))
+            story.append(Paragraph(escape(sol["justificacion"]), normal_style))
+            story.append(Spacer(1, 12))
+
+        items = [item for item in sol.get("items") or [] if isinstance(item, dict)]
+        if items:
+            story.append(Paragraph("Items Solicitados:", styles['Heading3']))
+            item_data = [["Código", "Descripción", "Unidad", "Precio Unit.", "Cantidad", "Subtotal"]]
+            for item in items:
+                item_data.append([
+                    item.get('codigo', ''),
+                    item.get('descripcion', ''),
+                    item.get('unidad', ''),
+                    _money(item.get('precio_unitario')),
+                    str(item.get('cantidad', 0)),
+                    _money(item.get('subtotal')),
+                ])
+            item_table = Table(item_data, colWidths=[60, 150, 50, 70, 60, 70])
+            item_table.setStyle(_PDF_ITEMS_STYLE)
+            story.extend([item_table, Spacer(1, 20)])
+
+        story.append(Paragraph("-" * 80, normal_style))
+        story.append(Spacer(1, 20))
+    doc.build(story)
+    return count
+
+
+EXPORT_FORMATS: Dict[str, Dict[str, Any]] = {
+    "excel": {"suffix": ".xlsx", "mimetype": XLSX_MIMETYPE, "writer": write_solicitudes_xlsx},
+    "pdf": {"suffix": ".pdf", "mimetype": PDF_MIMETYPE, "writer": write_solicitudes_pdf},
+}
+
+
+def temp_export_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="spm_export_", suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def stream_file(path: str, *, chunk_size: int = STREAM_CHUNK, remove: bool = True) -> Iterator[bytes]:
+    """Lee el archivo en bloques; lo elimina al terminar (o si el cliente corta)."""
+    try:
+        with open(path, "rb") as handle:
+            while True:
+                chunk = handle.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
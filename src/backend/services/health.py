@@ -19,7 +19,9 @@ except Exception:  # pragma: no cover - fallback when requests is unavailable
     requests = None
 
 from ..core.config import Settings
-from ..core.db import get_connection
+from ..core.db import get_connection, pool_stats
+from .auth import password_pool
+from .auth.jwt_utils import claims_cache_stats
 
 try:
     import urllib.request
@@ -117,6 +119,7 @@ def check_backend() -> Dict[str, Any]:
         "python_version": platform.python_version(),
         "uptime_seconds": round(uptime_seconds, 2),
         "uptime_human": str(uptime),
+        "jwt_cache": claims_cache_stats(),
     }
     return {"status": "OK", "details": details}
 
@@ -127,7 +130,11 @@ def check_db() -> Dict[str, Any]:
         with get_connection() as con:
             con.execute("SELECT 1;")
         latency_ms = round((time.perf_counter() - started) * 1000, 2)
-        return {"status": "OK", "latency_ms": latency_ms, "details": {"message": "Conexión exitosa"}}
+        return {
+            "status": "OK",
+            "latency_ms": latency_ms,
+            "details": {"message": "Conexión exitosa", "pool": pool_stats()},
+        }
     except Exception as exc:
         latency_ms = round((time.perf_counter() - started) * 1000, 2)
         return {
@@ -186,10 +193,10 @@ def check_logs() -> Dict[str, Any]:
 
 
 def check_workers() -> Dict[str, Any]:
-    return {
-        "status": "N/A",
-        "details": {"message": "Sin workers locales configurados"},
-    }
+    details = {"password_hashing": password_pool.stats()}
+    hashing = details["password_hashing"]
+    status = "WARN" if hashing["in_flight"] >= max(hashing["queue_max"], 1) else "OK"
+    return {"status": status, "details": details}
 
 
 def check_ollama() -> Dict[str, Any]:
@@ -0,0 +1,63 @@
+"""
+Validación de materiales por lote.
+
+``material_details`` trae descripción, unidad y precio de varios códigos en una
+sola consulta; es también la verificación de existencia, así que siempre lee la
+base (un material borrado en otro worker se rechaza enseguida). ``material_count``
+cachea por proceso el total que muestran los dashboards
+(``Settings.MATERIAL_CODE_CACHE_TTL``; 0 lo desactiva): ahí un valor desactualizado
+solo afecta un número informativo.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+from ..core.config import Settings
+
+_IN_CHUNK = 500
+
+_lock = threading.Lock()
+_count_cache: Dict[str, tuple[float, int]] = {}
+
+
+def invalidate() -> None:
+    """Descarta el total cacheado (llamar tras escribir en ``materiales``)."""
+    with _lock:
+        _count_cache.clear()
+
+
+def material_count(con) -> int:
+    """``COUNT(*)`` de ``materiales`` cacheado por proceso (``Settings.MATERIAL_CODE_CACHE_TTL``)."""
+    ttl = Settings.MATERIAL_CODE_CACHE_TTL
+    now = time.monotonic()
+    with _lock:
+        entry = _count_cache.get(Settings.DB_PATH)
+        if ttl > 0 and entry is not None and now < entry[0]:
+            return entry[1]
+    row = con.execute("SELECT COUNT(*) AS total FROM materiales").fetchone()
+    total = int(row["total"]) if row else 0
+    if ttl > 0:
+        with _lock:
+            _count_cache[Settings.DB_PATH] = (now + ttl, total)
+    return total
+
+
+def material_details(con, codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """{codigo: {descripcion, unidad, precio_usd}} para los códigos que existen."""
+    unique = list(dict.fromkeys(code for code in codes if code))
+    details: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(unique), _IN_CHUNK):
+        chunk = unique[start:start + _IN_CHUNK]
+        rows = con.execute(
+            f"""
+            SELECT codigo, descripcion, unidad, precio_usd
+              FROM materiales
+             WHERE codigo IN ({','.join('?' * len(chunk))})
+            """,
+            chunk,
+        ).fetchall()
+        for row in rows:
+            details[row["codigo"]] = row
+    return details
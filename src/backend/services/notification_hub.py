@@ -0,0 +1,276 @@
+"""
+Entrega de notificaciones en tiempo real (Server-Sent Events).
+
+Cada proceso tiene un ``NotificationHub`` con un único hilo que lee las filas nuevas
+de ``notificaciones`` (``id > último visto``, por clave primaria) y las reparte a los
+streams abiertos en ese proceso. La tabla hace de bus compartido entre workers: una
+notificación creada en otro worker aparece en la siguiente vuelta
+(``Settings.SSE_POLL_INTERVAL``), y ``notify`` despierta al hilo en el momento cuando
+la escritura fue local. Así el costo es una consulta por proceso y por intervalo, no
+una por pestaña abierta. El hilo lee con su propia conexión a ``db_path`` (no ocupa
+una del pool de los pedidos) y termina cuando se cierra el último stream; la próxima
+suscripción lo vuelve a arrancar desde el ``MAX(id)`` de ese momento.
+
+Los streams emiten eventos ``notificacion`` (con ``id`` para reanudar vía
+``Last-Event-ID``) y ``unread`` con el contador de no leídas.
+
+Con workers síncronos cada stream retiene un hilo durante ``Settings.SSE_MAX_SECONDS``;
+``Settings.SSE_MAX_STREAMS`` limita los streams abiertos por proceso y, al llegar al
+tope, ``subscribe`` levanta ``StreamLimitReached`` para que el cliente consulte con
+``since_id`` en lugar de quedarse con un hilo.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from flask import g, has_request_context
+
+from ..core.config import Settings
+from ..core.db import _connect, get_connection
+from . import notification_store
+
+logger = logging.getLogger(__name__)
+
+_BATCH = 500
+_BACKLOG_LIMIT = 200
+_QUEUE_SIZE = 100
+
+_COLUMNS = "id, destinatario_id, solicitud_id, mensaje, leido, created_at"
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamLimitReached(RuntimeError):
+    """Se alcanzó ``Settings.SSE_MAX_STREAMS`` en este proceso."""
+
+
+class Subscription:
+    def __init__(self, user_id: str) -> None:
+        self.user_id = user_id
+        self.queue: "queue.Queue[tuple[str, Any]]" = queue.Queue(maxsize=_QUEUE_SIZE)
+        self.lagged = False
+
+    def put(self, event: str, data: Any) -> None:
+        try:
+            self.queue.put_nowait((event, data))
+        except queue.Full:
+            # Cliente lento: se corta el stream y reanuda desde Last-Event-ID
+            self.lagged = True
+
+
+class NotificationHub:
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._subs: Dict[str, Set[Subscription]] = {}
+        self._wake = threading.Event()
+        self._last_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -- suscripciones -------------------------------------------------
+    def subscribe(self, user_id: str) -> Subscription:
+        """Registra un stream; levanta ``StreamLimitReached`` si el proceso está al tope."""
+        sub = Subscription(user_id.lower())
+        with self._lock:
+            limit = Settings.SSE_MAX_STREAMS
+            if limit > 0 and sum(len(subs) for subs in self._subs.values()) >= limit:
+                raise StreamLimitReached(f"Límite de {limit} streams por proceso alcanzado")
+            if self._last_id is None:
+                # Fijar el punto de partida antes de arrancar el hilo: lo creado desde ahora
+                # se entrega aunque llegue antes de la primera vuelta del bucle
+                self._last_id = self._max_id()
+            self._subs.setdefault(sub.user_id, set()).add(sub)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notification-hub", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subs.values())
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def publish_unread(self, user_id: str, count: int) -> None:
+        """Empuja un contador actualizado (p.ej. después de marcar como leídas)."""
+        with self._lock:
+            subs = list(self._subs.get(user_id.lower(), ()))
+        for sub in subs:
+            sub.put("unread", {"unread": count})
+
+    # -- bucle de lectura ----------------------------------------------
+    def _open(self):
+        return closing(_connect(self.db_path))
+
+    def _max_id(self) -> int:
+        with self._open() as con:
+            return con.execute("SELECT COALESCE(MAX(id), 0) AS m FROM notificaciones").fetchone()["m"]
+
+    def poll_once(self, con=None) -> int:
+        """Lee filas nuevas y las reparte; devuelve cuántas se entregaron."""
+        if con is None:
+            with self._open() as own:
+                return self.poll_once(own)
+        with self._lock:
+            users = list(self._subs)
+        if self._last_id is None:
+            self._last_id = con.execute("SELECT COALESCE(MAX(id), 0) AS m FROM notificaciones").fetchone()["m"]
+            return 0
+        if not users:
+            self._last_id = con.execute(
+                "SELECT COALESCE(MAX(id), ?) AS m FROM notificaciones", (self._last_id,)
+            ).fetchone()["m"]
+            return 0
+        rows = con.execute(
+            f"SELECT {_COLUMNS} FROM notificaciones WHERE id > ? ORDER BY id LIMIT ?",
+            (self._last_id, _BATCH),
+        ).fetchall()
+        if not rows:
+            return 0
+        self._last_id = rows[-1]["id"]
+        wanted = set(users)
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            dest = notification_store.normalize_id(row["destinatario_id"])
+            if dest in wanted:
+                by_user.setdefault(dest, []).append(notification_store.serialize(row))
+        counts = notification_store.unread_counts(con, list(by_user))
+        delivered = 0
+        with self._lock:
+            targets = {uid: list(self._subs.get(uid, ())) for uid in by_user}
+        for uid, items in by_user.items():
+            for sub in targets[uid]:
+                for item in items:
+                    sub.put("notificacion", item)
+                sub.put("unread", {"unread": counts[uid]})
+            delivered += len(items)
+        return delivered
+
+    def _stop_if_idle(self) -> bool:
+        with self._lock:
+            if self._subs:
+                return False
+            # Sin streams no hay a quién entregar: el próximo subscribe vuelve a fijar
+            # el punto de partida y arranca otro hilo
+            self._thread = None
+            self._last_id = None
+            return True
+
+    def _run(self) -> None:
+        con = None
+        try:
+            while not self._stop_if_idle():
+                self._wake.wait(timeout=max(Settings.SSE_POLL_INTERVAL, 0.05))
+                self._wake.clear()
+                try:
+                    if con is None:
+                        con = _connect(self.db_path)
+                    self.poll_once(con)
+                except Exception:  # el hilo no debe morir por un error transitorio de la base
+                    logger.exception("Notification hub poll failed")
+                    if con is not None:
+                        con.close()
+                        con = None
+                    time.sleep(1.0)
+        finally:
+            if con is not None:
+                con.close()
+
+
+_hubs_lock = threading.Lock()
+_hubs: Dict[str, NotificationHub] = {}
+
+
+def get_hub() -> NotificationHub:
+    with _hubs_lock:
+        hub = _hubs.get(Settings.DB_PATH)
+        if hub is None:
+            hub = _hubs[Settings.DB_PATH] = NotificationHub(Settings.DB_PATH)
+        return hub
+
+
+def notify_later() -> None:
+    """Marca el pedido para despertar al hub al terminar (ya con la transacción confirmada)."""
+    if has_request_context():
+        setattr(g, "_notifications_pending", True)  # type: ignore[attr-defined]
+    else:
+        get_hub().notify()
+
+
+def flush_pending() -> None:
+    if has_request_context() and getattr(g, "_notifications_pending", False):
+        setattr(g, "_notifications_pending", False)  # type: ignore[attr-defined]
+        get_hub().notify()
+
+
+def event_stream(
+    user_id: str,
+    *,
+    last_event_id: Optional[int] = None,
+    unread_only: bool = False,
+    max_seconds: Optional[float] = None,
+    sub: Optional[Subscription] = None,
+) -> Iterator[str]:
+    """Generador SSE para ``user_id``; termina tras ``max_seconds`` (el cliente reconecta).
+
+    ``sub`` permite suscribir antes de crear la respuesta (y responder al tope sin
+    abrir el stream); si no se pasa, se suscribe al empezar.
+    """
+    hub = get_hub()
+    uid = notification_store.normalize_id(user_id)
+    if sub is None:
+        sub = hub.subscribe(uid)
+    deadline = time.monotonic() + (Settings.SSE_MAX_SECONDS if max_seconds is None else max_seconds)
+    last_sent = last_event_id or 0
+    try:
+        yield f"retry: {int(Settings.SSE_RETRY_MS)}\n\n"
+        with get_connection() as con:
+            backlog = []
+            if last_event_id is not None and not unread_only:
+                backlog = notification_store.list_since(con, uid, last_event_id, limit=_BACKLOG_LIMIT)
+            unread = notification_store.unread_count(con, uid)
+        for row in backlog:
+            last_sent = row["id"]
+            yield format_event("notificacion", notification_store.serialize(row), row["id"])
+        yield format_event("unread", {"unread": unread})
+
+        while not sub.lagged:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event, data = sub.queue.get(timeout=min(Settings.SSE_KEEPALIVE, remaining))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if event == "notificacion":
+                if unread_only or data["id"] <= last_sent:
+                    continue
+                last_sent = data["id"]
+                yield format_event(event, data, data["id"])
+            else:
+                yield format_event(event, data)
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,144 @@
+"""
+Lecturas y marcas de notificaciones.
+
+``destinatario_id`` se guarda una sola vez en minúsculas (un trigger normaliza lo
+que llegue distinto), así las consultas comparan contra el índice
+``idx_notif_dest_created`` sin ``lower()``. El contador de no leídas vive en
+``notificaciones_unread`` y lo mantienen triggers sobre ``notificaciones`` dentro
+de la misma transacción que el insert o la marca: leerlo es una búsqueda por clave
+en lugar de recorrer todas las notificaciones del usuario.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS notificaciones_unread(
+    destinatario_id TEXT PRIMARY KEY,
+    unread INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_notif_dest_created ON notificaciones(destinatario_id, created_at);
+CREATE TRIGGER IF NOT EXISTS trg_notif_normalize AFTER INSERT ON notificaciones
+WHEN new.destinatario_id <> lower(trim(new.destinatario_id)) BEGIN
+    UPDATE notificaciones SET destinatario_id = lower(trim(new.destinatario_id)) WHERE id = new.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_notif_unread_ai AFTER INSERT ON notificaciones
+WHEN new.leido = 0 BEGIN
+    INSERT INTO notificaciones_unread(destinatario_id, unread)
+    VALUES (lower(trim(new.destinatario_id)), 1)
+    ON CONFLICT(destinatario_id) DO UPDATE SET unread = unread + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_notif_unread_ad AFTER DELETE ON notificaciones
+WHEN old.leido = 0 BEGIN
+    UPDATE notificaciones_unread SET unread = MAX(unread - 1, 0)
+     WHERE destinatario_id = lower(trim(old.destinatario_id));
+END;
+CREATE TRIGGER IF NOT EXISTS trg_notif_unread_au AFTER UPDATE OF leido, destinatario_id ON notificaciones
+WHEN (old.leido = 0) <> (new.leido = 0)
+  OR lower(trim(old.destinatario_id)) <> lower(trim(new.destinatario_id)) BEGIN
+    UPDATE notificaciones_unread SET unread = MAX(unread - 1, 0)
+     WHERE old.leido = 0 AND destinatario_id = lower(trim(old.destinatario_id));
+    INSERT INTO notificaciones_unread(destinatario_id, unread)
+    SELECT lower(trim(new.destinatario_id)), 1 WHERE new.leido = 0
+    ON CONFLICT(destinatario_id) DO UPDATE SET unread = unread + 1;
+END;
+"""
+
+COLUMNS = "id, solicitud_id, mensaje, leido, created_at"
+
+MAX_PAGE = 200
+
+
+def backfill(con) -> None:
+    """Normaliza los destinatarios existentes y recalcula los contadores."""
+    con.execute(
+        "UPDATE notificaciones SET destinatario_id = lower(trim(destinatario_id))"
+        " WHERE destinatario_id <> lower(trim(destinatario_id))"
+    )
+    con.execute("DELETE FROM notificaciones_unread")
+    con.execute(
+        """
+        INSERT INTO notificaciones_unread(destinatario_id, unread)
+        SELECT destinatario_id, COUNT(*) FROM notificaciones WHERE leido = 0 GROUP BY destinatario_id
+        """
+    )
+
+
+def normalize_id(user_id: Any) -> str:
+    return str(user_id or "").strip().lower()
+
+
+def serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "solicitud_id": row["solicitud_id"],
+        "mensaje": row["mensaje"],
+        "leido": bool(row["leido"]),
+        "created_at": row["created_at"],
+    }
+
+
+def unread_counts(con, user_ids: Sequence[str]) -> Dict[str, int]:
+    keys = [normalize_id(uid) for uid in user_ids]
+    counts = {key: 0 for key in keys}
+    if not keys:
+        return counts
+    rows = con.execute(
+        f"SELECT destinatario_id, unread FROM notificaciones_unread"
+        f" WHERE destinatario_id IN ({','.join('?' * len(keys))})",
+        keys,
+    ).fetchall()
+    for row in rows:
+        counts[row["destinatario_id"]] = row["unread"]
+    return counts
+
+
+def unread_count(con, user_id: str) -> int:
+    return unread_counts(con, [user_id])[normalize_id(user_id)]
+
+
+def list_page(
+    con,
+    user_id: str,
+    *,
+    limit: Optional[int] = None,
+    before: Optional[tuple[str, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Notificaciones más nuevas primero; ``before`` es el ``(created_at, id)`` del cursor."""
+    clauses = ["destinatario_id = ?"]
+    params: List[Any] = [normalize_id(user_id)]
+    if before is not None:
+        clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params.extend([before[0], before[0], before[1]])
+    sql = f"SELECT {COLUMNS} FROM notificaciones WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return con.execute(sql, params).fetchall()
+
+
+def list_since(con, user_id: str, since_id: int, *, limit: int = MAX_PAGE) -> List[Dict[str, Any]]:
+    """Delta: notificaciones con ``id > since_id``, en orden de creación."""
+    return con.execute(
+        f"SELECT {COLUMNS} FROM notificaciones WHERE destinatario_id = ? AND id > ? ORDER BY id LIMIT ?",
+        (normalize_id(user_id), since_id, limit),
+    ).fetchall()
+
+
+def mark_read(con, user_id: str, ids: Optional[Iterable[int]] = None) -> int:
+    """Marca como leídas (todas si ``ids`` es None) y devuelve las que quedan sin leer.
+
+    No confirma la transacción: el contador se actualiza junto con la marca.
+    """
+    uid = normalize_id(user_id)
+    if ids is None:
+        con.execute("UPDATE notificaciones SET leido = 1 WHERE destinatario_id = ? AND leido = 0", (uid,))
+    else:
+        id_list = list(ids)
+        if id_list:
+            con.execute(
+                f"UPDATE notificaciones SET leido = 1 WHERE destinatario_id = ? AND leido = 0"
+                f" AND id IN ({','.join('?' * len(id_list))})",
+                (uid, *id_list),
+            )
+    return unread_count(con, uid)
@@ -0,0 +1,123 @@
+"""
+Mapa precomputado de la jerarquía de aprobación y de la asignación de planificadores.
+
+Se arma con dos consultas (``usuarios`` y ``planificador_asignaciones`` unida con
+``planificadores``) y se reutiliza entre pedidos. Las ediciones que tocan esas tablas
+llaman a ``invalidate()``, que sube la versión y descarta el snapshot.
+``Settings.ORG_CACHE_TTL`` acota cuánto puede quedar desactualizado un proceso
+respecto de cambios hechos por otro worker (o directamente en la base): durante esa
+ventana el snapshot puede seguir viendo activo a un usuario ya desactivado. Por eso
+quien resuelve un aprobador confirma ``estado_registro`` del elegido contra la base
+antes de asignarlo.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import Settings
+
+ACTIVE_STATES = ("activo", "active", "a", "1", "true")
+
+AssignmentKey = Tuple[str, Optional[str], Optional[str]]
+
+
+def _norm(value: Any) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def is_active(user: Dict[str, Any] | None) -> bool:
+    if not user:
+        return False
+    estado = _norm(user.get("estado_registro"))
+    return not estado or estado in ACTIVE_STATES
+
+
+@dataclass(frozen=True)
+class OrgDirectory:
+    version: int
+    users_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    users_by_mail: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    assignments: Dict[AssignmentKey, str] = field(default_factory=dict)
+
+    def by_id(self, uid: Any) -> Optional[Dict[str, Any]]:
+        return self.users_by_id.get(_norm(uid))
+
+    def by_mail(self, mail: Any) -> Optional[Dict[str, Any]]:
+        return self.users_by_mail.get(_norm(mail))
+
+    def find(self, ref: Any) -> Optional[Dict[str, Any]]:
+        """Busca por id_spm o, si no, por mail (mismo criterio que las consultas previas)."""
+        return self.by_id(ref) or self.by_mail(ref)
+
+    def planner_for(self, centro: Any, sector: Any, almacen_virtual: Any) -> Optional[str]:
+        """Asignación más específica: (centro, sector, almacén), (centro, sector), (centro)."""
+        for key in ((centro, sector, almacen_virtual), (centro, sector, None), (centro, None, None)):
+            planner = self.assignments.get(key)
+            if planner:
+                return planner
+        return None
+
+
+_lock = threading.Lock()
+_version = 0
+_snapshot: Optional[OrgDirectory] = None
+_snapshot_key: Optional[str] = None
+_snapshot_expires = 0.0
+
+
+def invalidate() -> None:
+    """Llamar después de modificar usuarios, planificadores o asignaciones."""
+    global _version, _snapshot
+    with _lock:
+        _version += 1
+        _snapshot = None
+
+
+def _build(con, version: int) -> OrgDirectory:
+    users_by_id: Dict[str, Dict[str, Any]] = {}
+    users_by_mail: Dict[str, Dict[str, Any]] = {}
+    rows = con.execute(
+        "SELECT id_spm, mail, rol, estado_registro FROM usuarios ORDER BY rowid"
+    ).fetchall()
+    for row in rows:
+        user = dict(row)
+        users_by_id.setdefault(_norm(user["id_spm"]), user)
+        if user.get("mail"):
+            # LIMIT 1 sin ORDER BY devolvía la primera fila: conservar la primera
+            users_by_mail.setdefault(_norm(user["mail"]), user)
+
+    assignments: Dict[AssignmentKey, str] = {}
+    rows = con.execute(
+        """
+        SELECT pa.centro, pa.sector, pa.almacen_virtual, p.usuario_id
+          FROM planificador_asignaciones pa
+          JOIN planificadores p ON pa.planificador_id = p.usuario_id
+         ORDER BY pa.created_at ASC, pa.id ASC
+        """
+    ).fetchall()
+    for row in rows:
+        if row["centro"] is None:
+            continue
+        key = (row["centro"], row["sector"], row["almacen_virtual"])
+        assignments.setdefault(key, row["usuario_id"])
+    return OrgDirectory(version, users_by_id, users_by_mail, assignments)
+
+
+def get_directory(con) -> OrgDirectory:
+    """Snapshot vigente; lo reconstruye si cambió la versión, la base o venció el TTL."""
+    global _snapshot, _snapshot_key, _snapshot_expires
+    now = time.monotonic()
+    with _lock:
+        snapshot, version = _snapshot, _version
+        if snapshot is not None and _snapshot_key == Settings.DB_PATH and now < _snapshot_expires:
+            return snapshot
+    built = _build(con, version)
+    with _lock:
+        # Si hubo una invalidación mientras se armaba, no publicar un snapshot viejo
+        if version == _version:
+            _snapshot, _snapshot_key = built, Settings.DB_PATH
+            _snapshot_expires = now + max(Settings.ORG_CACHE_TTL, 0)
+    return built
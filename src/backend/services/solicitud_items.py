@@ -0,0 +1,228 @@
+"""
+Ítems de solicitudes normalizados.
+
+Los ítems siguen viajando dentro de ``solicitudes.data_json`` (contrato de la API),
+pero cada escritura los replica en ``solicitud_items`` dentro de la misma
+transacción, de modo que las lecturas y agregaciones por material no necesiten
+parsear JSON fila por fila.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ..core.config import Settings
+
+SCHEMA_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS solicitud_items(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        solicitud_id INTEGER NOT NULL,
+        item_index INTEGER NOT NULL,
+        codigo TEXT NOT NULL,
+        descripcion TEXT,
+        unidad TEXT,
+        cantidad INTEGER NOT NULL DEFAULT 1,
+        precio_unitario REAL NOT NULL DEFAULT 0,
+        subtotal REAL NOT NULL DEFAULT 0,
+        comentario TEXT,
+        UNIQUE(solicitud_id, item_index),
+        FOREIGN KEY(solicitud_id) REFERENCES solicitudes(id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sol_items_codigo ON solicitud_items(codigo)",
+    "CREATE INDEX IF NOT EXISTS idx_sol_items_solicitud ON solicitud_items(solicitud_id)",
+)
+
+SCHEMA_SQL = ";\n".join(SCHEMA_STATEMENTS) + ";"
+
+_COLUMNS = ("codigo", "descripcion", "unidad", "cantidad", "precio_unitario", "subtotal", "comentario")
+
+_schema_lock = threading.Lock()
+_schema_ready: set[str] = set()
+
+
+def ensure_schema(con) -> None:
+    """
+    Garantiza la tabla en bases anteriores a la migración 1 de init_db.
+
+    Usa ``con.execute`` sentencia por sentencia (``executescript`` hace COMMIT
+    implícito) y no confirma: la creación y el backfill quedan dentro de la
+    transacción del llamador. La base se marca lista solo cuando la tabla
+    existe fuera de una transacción abierta.
+    """
+    if Settings.DB_PATH in _schema_ready:
+        return
+    with _schema_lock:
+        if Settings.DB_PATH in _schema_ready:
+            return
+        exists = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='solicitud_items'"
+        ).fetchone()
+        if exists:
+            if not con.in_transaction:
+                _schema_ready.add(Settings.DB_PATH)
+            return
+        for statement in SCHEMA_STATEMENTS:
+            con.execute(statement)
+        _backfill(con)
+
+
+def _normalize(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    codigo = str(raw.get("codigo") or "").strip()
+    if not codigo:
+        return None
+    try:
+        cantidad = int(raw.get("cantidad") or 0)
+    except (TypeError, ValueError):
+        cantidad = 0
+    cantidad = max(cantidad, 1)
+    precio_raw = raw.get("precio_unitario")
+    if precio_raw is None:
+        precio_raw = raw.get("precio")
+    try:
+        precio = max(float(precio_raw), 0.0)
+    except (TypeError, ValueError):
+        precio = 0.0
+    subtotal = raw.get("subtotal")
+    try:
+        subtotal = float(subtotal) if subtotal is not None else cantidad * precio
+    except (TypeError, ValueError):
+        subtotal = cantidad * precio
+    unidad = raw.get("unidad") or raw.get("uom") or raw.get("unidad_medida")
+    return {
+        "codigo": codigo,
+        "descripcion": str(raw.get("descripcion") or "").strip(),
+        "unidad": str(unidad).strip() if unidad else None,
+        "cantidad": cantidad,
+        "precio_unitario": round(precio, 2),
+        "subtotal": round(subtotal, 2),
+        "comentario": raw.get("comentario"),
+    }
+
+
+def replace_items(con, solicitud_id: int, items: Iterable[Any]) -> None:
+    """Reemplaza los ítems de la solicitud; no hace commit (usa la transacción del llamador)."""
+    ensure_schema(con)
+    _replace_items(con, solicitud_id, items)
+
+
+def _replace_items(con, solicitud_id: int, items: Iterable[Any]) -> None:
+    con.execute("DELETE FROM solicitud_items WHERE solicitud_id=?", (solicitud_id,))
+    rows = []
+    for raw in items or []:
+        if not isinstance(raw, dict):
+            continue
+        item = _normalize(raw)
+        if item is None:
+            continue
+        rows.append((solicitud_id, len(rows), *(item[col] for col in _COLUMNS)))
+    if rows:
+        con.executemany(
+            f"""
+            INSERT INTO solicitud_items (solicitud_id, item_index, {', '.join(_COLUMNS)})
+            VALUES ({', '.join('?' * (len(_COLUMNS) + 2))})
+            """,
+            rows,
+        )
+
+
+def _row_to_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    item = {
+        "codigo": row["codigo"],
+        "descripcion": row["descripcion"] or "",
+        "cantidad": int(row["cantidad"]),
+        "precio_unitario": round(float(row["precio_unitario"] or 0.0), 2),
+        "comentario": row["comentario"],
+        "subtotal": round(float(row["subtotal"] or 0.0), 2),
+    }
+    if row["unidad"]:
+        item["unidad"] = row["unidad"]
+    return item
+
+
+def load_items(con, solicitud_ids: Sequence[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Devuelve {solicitud_id: [items]} en una sola consulta; ids sin filas quedan fuera."""
+    ids = [int(sid) for sid in dict.fromkeys(solicitud_ids) if sid is not None]
+    if not ids:
+        return {}
+    ensure_schema(con)
+    result: Dict[int, List[Dict[str, Any]]] = {}
+    # SQLite limita la cantidad de parámetros por sentencia
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows = con.execute(
+            f"""
+            SELECT solicitud_id, {', '.join(_COLUMNS)}
+              FROM solicitud_items
+             WHERE solicitud_id IN ({','.join('?' * len(chunk))})
+          ORDER BY solicitud_id, item_index
+            """,
+            chunk,
+        ).fetchall()
+        for row in rows:
+            result.setdefault(row["solicitud_id"], []).append(_row_to_item(row))
+    return result
+
+
+def backfill(con) -> int:
+    """Completa solicitud_items desde data_json para las solicitudes que aún no tienen filas."""
+    ensure_schema(con)
+    return _backfill(con)
+
+
+def _backfill(con) -> int:
+    pending = con.execute(
+        """
+        SELECT s.id, s.data_json
+          FROM solicitudes s
+         WHERE NOT EXISTS (SELECT 1 FROM solicitud_items si WHERE si.solicitud_id = s.id)
+        """
+    ).fetchall()
+    migrated = 0
+    for row in pending:
+        try:
+            data = json.loads(row["data_json"] or "{}")
+        except (TypeError, ValueError):
+            continue
+        items = data.get("items") if isinstance(data, dict) else None
+        if items:
+            _replace_items(con, row["id"], items)
+            migrated += 1
+    return migrated
+
+
+def aggregate_demand(
+    con,
+    *,
+    centro: Optional[str] = None,
+    statuses: Optional[Sequence[str]] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Demanda agregada por material y centro, calculada en SQL."""
+    ensure_schema(con)
+    clauses = ["1=1"]
+    params: List[Any] = []
+    if centro:
+        clauses.append("s.centro = ?")
+        params.append(centro)
+    if statuses:
+        clauses.append(f"s.status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    params.append(int(limit))
+    return con.execute(
+        f"""
+        SELECT si.codigo, s.centro,
+               SUM(si.cantidad) AS cantidad_total,
+               SUM(si.subtotal) AS monto_total,
+               COUNT(DISTINCT si.solicitud_id) AS solicitudes
+          FROM solicitud_items si
+          JOIN solicitudes s ON s.id = si.solicitud_id
+         WHERE {' AND '.join(clauses)}
+      GROUP BY si.codigo, s.centro
+      ORDER BY cantidad_total DESC, si.codigo
+         LIMIT ?
+        """,
+        params,
+    ).fetchall()
@@ -1,48 +1,117 @@
+"""
+Persistencia de refresh tokens.
+
+La purga de tokens vencidos ya no corre en cada emisión: ``prune_expired_tokens``
+borra por lotes (apoyada en ``idx_refresh_tokens_expires``) y como mucho una vez
+cada ``_PRUNE_INTERVAL`` segundos. ``rotate_token`` marca el token viejo y registra
+el nuevo en una sola transacción. ``is_active_token`` cachea por proceso tanto los
+aciertos como los jti inexistentes durante ``Settings.TOKEN_CACHE_TTL`` segundos (0
+lo desactiva); las revocaciones locales lo invalidan en el momento y el TTL acota
+cuánto tarda en verse una revocación hecha por otro worker.
+"""
 from __future__ import annotations
 
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, Optional, Tuple
 
-from ..config import Settings
-from ..db import get_connection
+from ..core.config import Settings
+from ..core.db import get_connection
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    issued_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL,
+    rotated_at INTEGER,
+    revoked_at INTEGER,
+    revoke_reason TEXT,
+    parent_jti TEXT,
+    user_agent TEXT,
+    ip TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at);
+"""
+
+_PRUNE_INTERVAL = 300.0
+_PRUNE_BATCH = 1000
+_CACHE_SIZE = 4096
+
+_schema_lock = threading.Lock()
+_schema_ready: set[str] = set()
+_last_prune = 0.0
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+
+
+def _ensure_schema(con) -> None:
+    if Settings.DB_PATH in _schema_ready:
+        return
+    with _schema_lock:
+        if Settings.DB_PATH not in _schema_ready:
+            con.executescript(SCHEMA_SQL)
+            _schema_ready.add(Settings.DB_PATH)
 
 
 def init_refresh_token_store() -> None:
     """Ensure the refresh token persistence schema exists."""
     with get_connection() as con:
-        con.execute(
-            """
-            CREATE TABLE IF NOT EXISTS refresh_tokens (
-                jti TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                issued_at INTEGER NOT NULL,
-                expires_at INTEGER NOT NULL,
-                rotated_at INTEGER,
-                revoked_at INTEGER,
-                revoke_reason TEXT,
-                parent_jti TEXT,
-                user_agent TEXT,
-                ip TEXT
-            )
-            """
-        )
-        con.execute(
-            """
-            CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user
-            ON refresh_tokens(user_id)
-            """
-        )
+        _ensure_schema(con)
         con.commit()
 
 
-def prune_expired_tokens() -> None:
-    """Remove refresh tokens that are past the grace window to keep the table compact."""
-    boundary = int(time.time()) - Settings.REFRESH_GRACE_PERIOD
+def _forget(*jtis: str) -> None:
+    with _cache_lock:
+        for jti in jtis:
+            _cache.pop((Settings.DB_PATH, jti), None)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def prune_expired_tokens(*, force: bool = False) -> int:
+    """Remove refresh tokens past the grace window, in batches and at most every few minutes."""
+    global _last_prune
+    now = time.time()
+    if not force and now - _last_prune < _PRUNE_INTERVAL:
+        return 0
+    _last_prune = now
+    boundary = int(now) - Settings.REFRESH_GRACE_PERIOD
+    removed = 0
     with get_connection() as con:
-        con.execute(
-            "DELETE FROM refresh_tokens WHERE expires_at < ?", (boundary,)
-        )
-        con.commit()
+        _ensure_schema(con)
+        while True:
+            # Lotes cortos: no retener el lock de escritura con una sola DELETE enorme
+            cur = con.execute(
+                """
+                DELETE FROM refresh_tokens
+                 WHERE rowid IN (
+                       SELECT rowid FROM refresh_tokens WHERE expires_at < ? LIMIT ?
+                 )
+                """,
+                (boundary, _PRUNE_BATCH),
+            )
+            con.commit()
+            removed += cur.rowcount
+            if cur.rowcount < _PRUNE_BATCH:
+                break
+    return removed
+
+
+def _insert(con, *, jti, user_id, expires_at, parent_jti, user_agent, ip, now) -> None:
+    con.execute(
+        """
+        INSERT INTO refresh_tokens (jti, user_id, issued_at, expires_at, parent_jti, user_agent, ip)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (jti, user_id, now, expires_at, parent_jti, user_agent, ip),
+    )
 
 
 def register_refresh_token(
@@ -57,19 +126,17 @@ def register_refresh_token(
     prune_expired_tokens()
     now = int(time.time())
     with get_connection() as con:
-        con.execute(
-            """
-            INSERT INTO refresh_tokens (jti, user_id, issued_at, expires_at, parent_jti, user_agent, ip)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (jti, user_id, now, expires_at, parent_jti, user_agent, ip),
-        )
+        _ensure_schema(con)
+        _insert(con, jti=jti, user_id=user_id, expires_at=expires_at, parent_jti=parent_jti,
+                user_agent=user_agent, ip=ip, now=now)
         con.commit()
+    _forget(jti)
 
 
 def revoke_token(jti: str, *, reason: str = "revoked") -> None:
     now = int(time.time())
     with get_connection() as con:
+        _ensure_schema(con)
         con.execute(
             """
             UPDATE refresh_tokens
@@ -80,11 +147,13 @@ def revoke_token(jti: str, *, reason: str = "revoked") -> None:
             (now, reason, jti),
         )
         con.commit()
+    _forget(jti)
 
 
 def mark_rotated(jti: str) -> None:
     now = int(time.time())
     with get_connection() as con:
+        _ensure_schema(con)
         con.execute(
             """
             UPDATE refresh_tokens
@@ -96,11 +165,55 @@ def mark_rotated(jti: str) -> None:
             (now, now, jti),
         )
         con.commit()
+    _forget(jti)
+
+
+def rotate_token(
+    old_jti: str,
+    *,
+    jti: str,
+    user_id: str,
+    expires_at: int,
+    user_agent: Optional[str],
+    ip: Optional[str],
+) -> bool:
+    """Rota ``old_jti`` → ``jti`` atómicamente; ``False`` si el token viejo ya no estaba activo.
+
+    La marca solo aplica sobre un token no revocado, así dos refresh concurrentes con
+    el mismo token no pueden emitir dos sucesores.
+    """
+    prune_expired_tokens()
+    now = int(time.time())
+    with get_connection() as con:
+        _ensure_schema(con)
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            updated = con.execute(
+                """
+                UPDATE refresh_tokens
+                   SET rotated_at = ?, revoked_at = ?, revoke_reason = 'rotated'
+                 WHERE jti = ? AND revoked_at IS NULL AND expires_at + ? >= ?
+                """,
+                (now, now, old_jti, Settings.REFRESH_GRACE_PERIOD, now),
+            ).rowcount
+            if not updated:
+                con.rollback()
+                return False
+            _insert(con, jti=jti, user_id=user_id, expires_at=expires_at, parent_jti=old_jti,
+                    user_agent=user_agent, ip=ip, now=now)
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+    _forget(old_jti, jti)
+    return True
 
 
 def revoke_family(user_id: str, *, reason: str = "reused_token") -> None:
     now = int(time.time())
     with get_connection() as con:
+        _ensure_schema(con)
+        jtis = [row["jti"] for row in con.execute("SELECT jti FROM refresh_tokens WHERE user_id = ?", (user_id,))]
         con.execute(
             """
             UPDATE refresh_tokens
@@ -111,18 +224,40 @@ def revoke_family(user_id: str, *, reason: str = "reused_token") -> None:
             (now, reason, user_id),
         )
         con.commit()
+    _forget(*jtis)
 
 
 def get_refresh_token(jti: str) -> Optional[Dict[str, Any]]:
     with get_connection() as con:
+        _ensure_schema(con)
         row = con.execute(
             "SELECT * FROM refresh_tokens WHERE jti = ?", (jti,)
         ).fetchone()
     return dict(row) if row else None
 
 
-def is_active_token(jti: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+def _lookup(jti: str) -> Optional[Dict[str, Any]]:
+    ttl = Settings.TOKEN_CACHE_TTL
+    if ttl <= 0:
+        return get_refresh_token(jti)
+    key = (Settings.DB_PATH, jti)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(key)
+            return dict(entry[1]) if entry[1] is not None else None
     token = get_refresh_token(jti)
+    with _cache_lock:
+        _cache[key] = (now + ttl, dict(token) if token is not None else None)
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return token
+
+
+def is_active_token(jti: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    token = _lookup(jti)
     if not token:
         return False, None
 
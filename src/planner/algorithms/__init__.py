@@ -7,10 +7,13 @@ Componentes:
 - release_marginal_cost.py: Liberación de reservas sub-óptimas
 - disassembly_knapsack.py: Desensamble optimizado BOM
 - substitutes_graph.py: Búsqueda de sustitutos en grafo
+- equivalence_graph.py: Grafo de equivalencias indexado (CSR)
+- substitute_closure.py: Índice top-K de sustitutos con actualización incremental
 - ctp_johnson.py: Scheduling con algoritmo Johnson
 - transfer_tdabc.py: Transferencias con TDABC
 - expedite_probability.py: Aceleración probabilística
 - purchase_multicriterion.py: Compra multi-criterio
+- batch_planner.py: Planificación por lotes en pool de procesos
 """
 
 from .base_algorithm import (
@@ -21,6 +24,7 @@ from .base_algorithm import (
     BaseAlgorithm,
     AlgorithmRegistry,
     AlgorithmExecutor,
+    ParallelRunTelemetry,
     get_registry,
     get_executor,
     register_algorithm,
@@ -35,10 +39,13 @@ from .reserve_dynamic import (
 from .release_marginal_cost import ReleaseMarginalCostAlgorithm
 from .disassembly_knapsack import DisassemblyKnapsackAlgorithm
 from .substitutes_graph import SubstitutesGraphAlgorithm
+from .equivalence_graph import EquivalenceGraph, SubstituteSearchResult
+from .substitute_closure import SubstituteClosureIndex, ClosureEntry
 from .ctp_johnson import CTPJohnsonAlgorithm
 from .transfer_tdabc import TransferTDABCAlgorithm
 from .expedite_probability import ExpediteProbabilityAlgorithm
 from .purchase_multicriterion import PurchaseMulticriterionAlgorithm
+from .batch_planner import BatchPlanner, BatchItemResult, ReferenceData, get_reference_data
 
 __all__ = [
     # Types
@@ -51,6 +58,7 @@ __all__ = [
     "BaseAlgorithm",
     "AlgorithmRegistry",
     "AlgorithmExecutor",
+    "ParallelRunTelemetry",
     
     # Functions
     "get_registry",
@@ -68,6 +76,18 @@ __all__ = [
     "ExpediteProbabilityAlgorithm",
     "PurchaseMulticriterionAlgorithm",
     
+    # Equivalence graph
+    "EquivalenceGraph",
+    "SubstituteSearchResult",
+    "SubstituteClosureIndex",
+    "ClosureEntry",
+    
+    # Batch
+    "BatchPlanner",
+    "BatchItemResult",
+    "ReferenceData",
+    "get_reference_data",
+    
     # Support
     "LocalStockAllocation",
     "get_reserve_dynamic_algorithm",
@@ -9,10 +9,17 @@ Patrón Strategy con arquitectura común para todos los algoritmos:
 """
 
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import (
+    Executor, Future, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Deque, Dict, List, Optional, Any, Set, Tuple, Union
 from enum import Enum
 import logging
+import multiprocessing
+import threading
+import time
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -143,8 +150,6 @@ class BaseAlgorithm(ABC):
         """
         Wrapper que ejecuta el algoritmo con validación y telemetría.
         """
-        import time
-        
         start_time = time.time()
         
         try:
@@ -232,18 +237,73 @@ class AlgorithmRegistry:
         return algorithm_type in self._algorithms
 
 
+@dataclass
+class ParallelRunTelemetry:
+    """Telemetría agregada de una corrida de execute_parallel"""
+    item_id: str
+    algorithms: List[str]
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    wall_time_ms: float = 0.0
+    total_algorithm_time_ms: float = 0.0  # Lo que habría costado en serie
+    statuses: Dict[str, str] = field(default_factory=dict)
+    execution_times_ms: Dict[str, float] = field(default_factory=dict)
+    timeouts: List[str] = field(default_factory=list)
+    cancelled: List[str] = field(default_factory=list)  # Cancelados antes de arrancar
+    # Ya corriendo al vencer o al aceptar otro resultado: no se pueden interrumpir y
+    # siguen ocupando un worker hasta terminar
+    abandoned: List[str] = field(default_factory=list)
+    dedicated_pool: bool = False  # Pool propio porque el compartido estaba ocupado
+    rejected: bool = False  # Sin workers ni cupo de pool dedicado: vías devueltas con TIMEOUT
+    accepted_by: Optional[str] = None
+
+
+def _run_isolated(algorithm: BaseAlgorithm, input_data: AlgorithmInput) -> AlgorithmOutput:
+    """Punto de entrada en el proceso hijo (debe ser importable para spawn)"""
+    return algorithm.run(input_data)
+
+
 class AlgorithmExecutor:
     """
     Ejecutor de algoritmos con soporte para:
     - Selección automática
     - Fallback a alternativa
     - Estrategia de composición
+    - Ejecución concurrente con timeouts y corte por primer resultado aceptable
     """
     
-    def __init__(self, registry: AlgorithmRegistry):
-        """Inicializa executor"""
+    HISTORY_SIZE = 100
+    
+    def __init__(
+        self,
+        registry: AlgorithmRegistry,
+        max_workers: Optional[int] = None,
+        use_processes: bool = False,
+        default_timeout_s: Optional[float] = None,
+        max_dedicated_pools: int = 2
+    ):
+        """
+        Inicializa executor.
+        
+        Args:
+            registry: Registry de algoritmos
+            max_workers: Tamaño del pool (default: una vía por worker)
+            use_processes: Pool de procesos en lugar de hilos (algoritmos CPU-bound)
+            default_timeout_s: Timeout por algoritmo si la llamada no indica otro
+            max_dedicated_pools: Pools dedicados vivos a la vez (con procesos, cada
+                uno lanza los suyos); al llegar al tope la corrida se rechaza
+        """
         self.registry = registry
         self.logger = logger
+        self.max_workers = max_workers or len(AlgorithmType)
+        self.use_processes = use_processes
+        self.default_timeout_s = default_timeout_s
+        self.last_run: Optional[ParallelRunTelemetry] = None
+        self.run_history: Deque[ParallelRunTelemetry] = deque(maxlen=self.HISTORY_SIZE)
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._abandoned: Set[Future] = set()  # Vías abandonadas que siguen en el pool compartido
+        self.max_dedicated_pools = max(0, max_dedicated_pools)
+        self._dedicated_live = 0  # Pools dedicados con vías todavía en curso
     
     def execute(
         self,
@@ -265,14 +325,7 @@ class AlgorithmExecutor:
         # 1. Obtener algoritmo
         algorithm = self.registry.get(algorithm_type)
         if algorithm is None:
-            self.logger.error(f"Algoritmo no encontrado: {algorithm_type.value}")
-            return AlgorithmOutput(
-                algorithm_type=algorithm_type,
-                item_id=input_data.item_id,
-                success=False,
-                status=AlgorithmStatus.FAILED,
-                error_message=f"Algoritmo no registrado: {algorithm_type.value}"
-            )
+            return self._not_registered(algorithm_type, input_data)
         
         # 2. Ejecutar
         output = algorithm.run(input_data)
@@ -286,27 +339,253 @@ class AlgorithmExecutor:
         
         return output
     
+    def _not_registered(self, algorithm_type: AlgorithmType, input_data: AlgorithmInput) -> AlgorithmOutput:
+        self.logger.error(f"Algoritmo no encontrado: {algorithm_type.value}")
+        return AlgorithmOutput(
+            algorithm_type=algorithm_type,
+            item_id=input_data.item_id,
+            success=False,
+            status=AlgorithmStatus.FAILED,
+            error_message=f"Algoritmo no registrado: {algorithm_type.value}"
+        )
+    
+    def _new_pool(self, max_workers: int) -> Executor:
+        if self.use_processes:
+            return ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="algorithm")
+    
+    def _acquire_pool(self, lanes: int) -> Tuple[Optional[Executor], bool]:
+        """
+        Pool para una corrida de ``lanes`` vías; ``(pool, dedicado)``.
+        
+        Si las vías abandonadas en corridas anteriores dejan al pool compartido sin
+        workers para todas, las nuevas quedarían en cola detrás de ellas y sus
+        timeouts (contados desde el envío) vencerían sin llegar a correr: en ese caso
+        se usa un pool propio de la corrida. Como lo abandonado también puede quedar
+        en los pools dedicados, hay a lo sumo ``max_dedicated_pools`` vivos; pasado
+        ese tope devuelve ``(None, False)`` y la corrida se rechaza.
+        """
+        with self._pool_lock:
+            if not self._abandoned or len(self._abandoned) + lanes <= self.max_workers:
+                if self._pool is None:
+                    self._pool = self._new_pool(self.max_workers)
+                return self._pool, False
+            if self._dedicated_live >= self.max_dedicated_pools:
+                self.logger.warning(
+                    f"Pool compartido ocupado por {len(self._abandoned)} vías abandonadas y "
+                    f"{self._dedicated_live} pools dedicados en uso; corrida rechazada"
+                )
+                return None, False
+            self._dedicated_live += 1
+        self.logger.warning(
+            f"Pool compartido ocupado por {len(self._abandoned)} vías abandonadas; "
+            f"se usa un pool dedicado de {lanes} workers"
+        )
+        try:
+            return self._new_pool(lanes), True
+        except Exception:
+            self._release_dedicated()
+            raise
+    
+    def _release_dedicated(self) -> None:
+        with self._pool_lock:
+            self._dedicated_live -= 1
+    
+    def _track_dedicated(self, futures: List[Future]) -> None:
+        """Libera el cupo del pool dedicado cuando terminan (o se cancelan) todas sus vías"""
+        remaining = [len(futures)]
+        
+        def done(_: Future) -> None:
+            with self._pool_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._dedicated_live -= 1
+        
+        for future in futures:
+            future.add_done_callback(done)
+    
+    def _abandon(self, future: Future) -> None:
+        with self._pool_lock:
+            self._abandoned.add(future)
+        future.add_done_callback(self._release_abandoned)
+    
+    def _release_abandoned(self, future: Future) -> None:
+        with self._pool_lock:
+            self._abandoned.discard(future)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Libera el pool (se vuelve a crear en la próxima ejecución)"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+            self._abandoned.clear()
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+    
+    def _collect(
+        self,
+        future: Future,
+        algorithm: BaseAlgorithm,
+        input_data: AlgorithmInput
+    ) -> AlgorithmOutput:
+        try:
+            output = future.result()
+        except Exception as e:  # Errores de pickling / proceso hijo caído
+            self.logger.error(f"Error en {algorithm.algorithm_type.value}: {e}")
+            return AlgorithmOutput(
+                algorithm_type=algorithm.algorithm_type,
+                item_id=input_data.item_id,
+                success=False,
+                status=AlgorithmStatus.FAILED,
+                error_message=str(e)
+            )
+        if self.use_processes and output.status == AlgorithmStatus.COMPLETED:
+            # La telemetría de run() quedó en la copia del proceso hijo
+            algorithm.execution_count += 1
+            algorithm.total_execution_time += output.execution_time_ms
+        return output
+    
     def execute_parallel(
         self,
         algorithm_types: List[AlgorithmType],
         input_data: AlgorithmInput,
-        select_best: bool = True
+        select_best: bool = True,
+        timeout_s: Optional[Union[float, Dict[AlgorithmType, float]]] = None,
+        accept_confidence: Optional[float] = None
     ) -> List[AlgorithmOutput]:
         """
         Ejecuta múltiples algoritmos en paralelo.
         
+        El costo es el del algoritmo más lento (no la suma). Los timeouts se
+        cuentan desde el envío al pool, que por defecto tiene un worker por vía.
+        Un algoritmo que vence su timeout devuelve status TIMEOUT.
+        
+        Limitación: solo se cancelan las vías que todavía no arrancaron
+        (``telemetry.cancelled``). Las que ya corren, al vencer o al aceptarse
+        otro resultado, no se pueden interrumpir (ni hilos ni procesos): quedan
+        en ``telemetry.abandoned`` y ocupan su worker hasta terminar. Mientras
+        esas vías saturen el pool compartido, la corrida usa un pool dedicado
+        (``telemetry.dedicated_pool``). Si además ya hay ``max_dedicated_pools``
+        pools dedicados con vías en curso, la corrida no se envía: todas sus vías
+        vuelven con status TIMEOUT y ``telemetry.rejected``.
+        
         Args:
             algorithm_types: Lista de tipos de algoritmos
             input_data: Input compartido
-            select_best: Si True, retorna solo el mejor resultado
+            select_best: Si True, ordena los resultados del mejor al peor
+            timeout_s: Timeout en segundos, global o por tipo de algoritmo
+            accept_confidence: Si se indica, corta al primer resultado exitoso
+                con confidence_score >= umbral y cancela el resto
         
         Returns:
-            Lista de outputs o el mejor si select_best=True
+            Lista de outputs (ordenada por calidad si select_best=True)
         """
-        outputs = []
-        for algo_type in algorithm_types:
-            output = self.execute(algo_type, input_data)
-            outputs.append(output)
+        started = time.perf_counter()
+        telemetry = ParallelRunTelemetry(
+            item_id=input_data.item_id,
+            algorithms=[algo_type.value for algo_type in algorithm_types]
+        )
+        if timeout_s is None:
+            timeout_s = self.default_timeout_s
+        
+        results: Dict[int, AlgorithmOutput] = {}
+        pending: Dict[Future, Tuple[int, BaseAlgorithm, Optional[float]]] = {}
+        lanes: List[Tuple[int, AlgorithmType, BaseAlgorithm]] = []
+        for idx, algo_type in enumerate(algorithm_types):
+            algorithm = self.registry.get(algo_type)
+            if algorithm is None:
+                results[idx] = self._not_registered(algo_type, input_data)
+            else:
+                lanes.append((idx, algo_type, algorithm))
+        
+        pool, dedicated = self._acquire_pool(len(lanes)) if lanes else (None, False)
+        telemetry.dedicated_pool = dedicated
+        if lanes and pool is None:
+            telemetry.rejected = True
+            for idx, _, algorithm in lanes:
+                telemetry.timeouts.append(algorithm.algorithm_type.value)
+                results[idx] = AlgorithmOutput(
+                    algorithm_type=algorithm.algorithm_type,
+                    item_id=input_data.item_id,
+                    success=False,
+                    status=AlgorithmStatus.TIMEOUT,
+                    error_message="Sin workers disponibles",
+                    reasoning="Pool compartido y pools dedicados ocupados por vías abandonadas"
+                )
+            lanes = []
+        
+        def stop(future: Future, algorithm: BaseAlgorithm) -> None:
+            """Cancela si no arrancó; si ya corre, la registra como abandonada"""
+            if future.cancel():
+                telemetry.cancelled.append(algorithm.algorithm_type.value)
+                return
+            telemetry.abandoned.append(algorithm.algorithm_type.value)
+            if not dedicated:
+                self._abandon(future)
+        
+        for idx, algo_type, algorithm in lanes:
+            if self.use_processes:
+                future = pool.submit(_run_isolated, algorithm, input_data)
+            else:
+                future = pool.submit(algorithm.run, input_data)
+            limit = timeout_s.get(algo_type) if isinstance(timeout_s, dict) else timeout_s
+            deadline = started + limit if limit is not None else None
+            pending[future] = (idx, algorithm, deadline)
+        if dedicated:
+            self._track_dedicated(list(pending))
+        
+        while pending:
+            deadlines = [d for _, _, d in pending.values() if d is not None]
+            wait_for = max(min(deadlines) - time.perf_counter(), 0) if deadlines else None
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                idx, algorithm, _ = pending.pop(future)
+                output = self._collect(future, algorithm, input_data)
+                results[idx] = output
+                if (
+                    accept_confidence is not None
+                    and telemetry.accepted_by is None
+                    and output.success
+                    and output.confidence_score >= accept_confidence
+                ):
+                    telemetry.accepted_by = algorithm.algorithm_type.value
+            
+            if telemetry.accepted_by is not None:
+                for future, (_, algorithm, _) in pending.items():
+                    stop(future, algorithm)
+                break
+            
+            now = time.perf_counter()
+            for future in [f for f, (_, _, d) in pending.items() if d is not None and d <= now]:
+                idx, algorithm, deadline = pending.pop(future)
+                stop(future, algorithm)
+                telemetry.timeouts.append(algorithm.algorithm_type.value)
+                results[idx] = AlgorithmOutput(
+                    algorithm_type=algorithm.algorithm_type,
+                    item_id=input_data.item_id,
+                    success=False,
+                    status=AlgorithmStatus.TIMEOUT,
+                    error_message="Timeout excedido",
+                    reasoning=f"Sin resultado tras {deadline - started:.2f}s",
+                    execution_time_ms=(now - started) * 1000
+                )
+        
+        if dedicated:
+            # Lo abandonado termina en los workers de este pool sin bloquear al llamador
+            pool.shutdown(wait=False)
+        
+        outputs = [results[idx] for idx in sorted(results)]
+        for output in outputs:
+            key = output.algorithm_type.value
+            telemetry.statuses[key] = output.status.value
+            telemetry.execution_times_ms[key] = output.execution_time_ms
+            telemetry.total_algorithm_time_ms += output.execution_time_ms
+        telemetry.wall_time_ms = (time.perf_counter() - started) * 1000
+        self.last_run = telemetry
+        self.run_history.append(telemetry)
         
         if select_best:
             # Ranking por confidence score
@@ -316,6 +595,23 @@ class AlgorithmExecutor:
             )
         
         return outputs
+    
+    def get_telemetry(self) -> Dict[str, Any]:
+        """Resumen de las últimas corridas paralelas"""
+        runs = list(self.run_history)
+        return {
+            "runs": len(runs),
+            "avg_wall_time_ms": sum(r.wall_time_ms for r in runs) / len(runs) if runs else 0.0,
+            "avg_serial_time_ms": sum(r.total_algorithm_time_ms for r in runs) / len(runs) if runs else 0.0,
+            "timeouts": sum(len(r.timeouts) for r in runs),
+            "cancelled": sum(len(r.cancelled) for r in runs),
+            "abandoned": sum(len(r.abandoned) for r in runs),
+            "abandoned_running": len(self._abandoned),
+            "dedicated_pools": sum(1 for r in runs if r.dedicated_pool),
+            "dedicated_running": self._dedicated_live,
+            "rejected_runs": sum(1 for r in runs if r.rejected),
+            "early_accepts": sum(1 for r in runs if r.accepted_by),
+        }
 
 
 # Instancias globales
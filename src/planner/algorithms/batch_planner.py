@@ -0,0 +1,231 @@
+"""
+Planificación por lotes
+=======================
+Evalúa miles de AlgorithmInput por llamada (corrida nocturna de MRP).
+
+Arquitectura:
+- Los inputs se agrupan en chunks y se reparten en un ProcessPoolExecutor (spawn)
+- Los algoritmos y los datos de referencia de solo lectura (grafo de sustitutos,
+  BOMs, red de almacenes) se envían UNA vez por worker, en el initializer del pool;
+  cada chunk viaja solo con sus inputs
+- Los resultados se devuelven en streaming a medida que terminan los chunks, con
+  un máximo de chunks en vuelo para acotar la memoria
+- max_workers=0 ejecuta en línea (tests / entornos chicos)
+
+Los algoritmos acceden a los datos de referencia vía
+``input_data.execution_context["reference_data"]`` o ``get_reference_data()``.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .base_algorithm import AlgorithmInput, AlgorithmOutput, BaseAlgorithm
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Datos de referencia compartidos por todos los ítems de un lote (solo lectura)"""
+    substitutes: Dict[str, List[Any]] = field(default_factory=dict)       # item_id → [EquivalentItem]
+    boms: Dict[str, Dict[str, float]] = field(default_factory=dict)       # item_id → {componente: cantidad}
+    warehouse_network: Dict[str, Dict[str, float]] = field(default_factory=dict)  # origen → {destino: días}
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchItemResult:
+    """Resultado de planificar un ítem del lote"""
+    index: int                                  # Posición en el iterable de entrada
+    item_id: str
+    best: Optional[AlgorithmOutput]
+    outputs: List[AlgorithmOutput] = field(default_factory=list)  # Solo con keep_all=True
+
+
+def _rank(output: AlgorithmOutput) -> Tuple[bool, float]:
+    # Mismo criterio que AlgorithmExecutor.execute_parallel
+    return output.success, output.confidence_score
+
+
+class _PlanState:
+    """Algoritmos y referencia cargados en un worker"""
+
+    def __init__(self, algorithms: Sequence[BaseAlgorithm], reference: ReferenceData):
+        self.algorithms = list(algorithms)
+        self.reference = reference
+
+    def prepare(self, input_data: AlgorithmInput) -> AlgorithmInput:
+        bom = input_data.bom_components
+        if not bom and input_data.item_id in self.reference.boms:
+            bom = dict(self.reference.boms[input_data.item_id])
+        context = dict(input_data.execution_context or {})
+        context.setdefault("reference_data", self.reference)
+        return replace(input_data, bom_components=bom, execution_context=context)
+
+    def plan_chunk(
+        self,
+        start: int,
+        inputs: List[AlgorithmInput],
+        keep_all: bool
+    ) -> List[BatchItemResult]:
+        results = []
+        for offset, input_data in enumerate(inputs):
+            prepared = self.prepare(input_data)
+            outputs = [algorithm.run(prepared) for algorithm in self.algorithms]
+            results.append(BatchItemResult(
+                index=start + offset,
+                item_id=input_data.item_id,
+                best=max(outputs, key=_rank) if outputs else None,
+                outputs=outputs if keep_all else []
+            ))
+        return results
+
+
+_worker_state: Optional[_PlanState] = None
+
+
+def _init_worker(algorithms: Sequence[BaseAlgorithm], reference: ReferenceData) -> None:
+    global _worker_state
+    _worker_state = _PlanState(algorithms, reference)
+
+
+def _plan_chunk(start: int, inputs: List[AlgorithmInput], keep_all: bool) -> List[BatchItemResult]:
+    if _worker_state is None:
+        raise RuntimeError("Worker de planificación sin inicializar")
+    return _worker_state.plan_chunk(start, inputs, keep_all)
+
+
+def get_reference_data() -> Optional[ReferenceData]:
+    """Datos de referencia del worker actual (None fuera de un lote)"""
+    return _worker_state.reference if _worker_state is not None else None
+
+
+class BatchPlanner:
+    """
+    Planifica lotes de AlgorithmInput en un pool de procesos.
+
+    Uso:
+        with BatchPlanner(algorithms, reference) as planner:
+            for result in planner.plan(inputs):
+                guardar(result)
+    """
+
+    def __init__(
+        self,
+        algorithms: Sequence[BaseAlgorithm],
+        reference: Optional[ReferenceData] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 256,
+        keep_all: bool = False
+    ):
+        """
+        Args:
+            algorithms: Algoritmos a evaluar por ítem (se copian a cada worker)
+            reference: Datos de referencia de solo lectura
+            max_workers: Procesos del pool (default: CPUs); 0 = en línea
+            chunk_size: Inputs por tarea enviada al pool
+            keep_all: Si True, devuelve todos los outputs además del mejor
+        """
+        self.algorithms = list(algorithms)
+        self.reference = reference or ReferenceData()
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.chunk_size = max(int(chunk_size), 1)
+        self.keep_all = keep_all
+        self.max_in_flight = max(self.max_workers, 1) * 2
+        self.last_run: Dict[str, Any] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "BatchPlanner":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.algorithms, self.reference)
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Cierra el pool (los workers pierden la referencia cargada)"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _chunks(self, inputs: Iterable[AlgorithmInput]) -> Iterator[Tuple[int, List[AlgorithmInput]]]:
+        chunk: List[AlgorithmInput] = []
+        start = 0
+        for input_data in inputs:
+            chunk.append(input_data)
+            if len(chunk) >= self.chunk_size:
+                yield start, chunk
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield start, chunk
+
+    def plan(self, inputs: Iterable[AlgorithmInput]) -> Iterator[BatchItemResult]:
+        """
+        Planifica los inputs y devuelve resultados a medida que terminan.
+
+        El orden es el de finalización de los chunks; ``BatchItemResult.index``
+        indica la posición original. ``inputs`` puede ser un generador.
+        """
+        started = time.perf_counter()
+        planned = 0
+        chunks = 0
+
+        if self.max_workers <= 0:
+            state = _PlanState(self.algorithms, self.reference)
+            for start, chunk in self._chunks(inputs):
+                chunks += 1
+                for result in state.plan_chunk(start, chunk, self.keep_all):
+                    planned += 1
+                    yield result
+        else:
+            pool = self._get_pool()
+            pending: Set[Future] = set()
+            try:
+                for start, chunk in self._chunks(inputs):
+                    chunks += 1
+                    pending.add(pool.submit(_plan_chunk, start, chunk, self.keep_all))
+                    if len(pending) >= self.max_in_flight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            for result in future.result():
+                                planned += 1
+                                yield result
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for result in future.result():
+                            planned += 1
+                            yield result
+            finally:
+                # El consumidor pudo cortar el stream: no seguir ocupando el pool
+                for future in pending:
+                    future.cancel()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_run = {
+            "items": planned,
+            "chunks": chunks,
+            "workers": self.max_workers,
+            "elapsed_ms": elapsed_ms,
+            "items_per_second": planned / (elapsed_ms / 1000) if elapsed_ms > 0 else 0.0,
+        }
+        logger.info(f"Lote planificado: {planned} ítems en {elapsed_ms:.0f}ms")
+
+    def plan_all(self, inputs: Iterable[AlgorithmInput]) -> List[BatchItemResult]:
+        """Planifica y devuelve los resultados en el orden de entrada"""
+        return sorted(self.plan(inputs), key=lambda result: result.index)
@@ -13,7 +13,17 @@ Aplicación en supply chain:
 - Recuperar componentes valiosos para otros proyectos
 - Optimizar decisión: desensamblar completo vs. parcial vs. no desensamblar
 
-Complejidad: O(n*W) donde n = # componentes, W = capacity
+Solver:
+- Exacto: DP 0/1 con un único vector de NumPy (rolling) sobre la capacity
+  discretizada (``resolution`` pasos por unidad) y bitset de decisiones por
+  componente para reconstruir la selección. Tiempo O(n*W) vectorizado,
+  memoria O(W) floats + n*W bits.
+- Aproximado (FPTAS): si n*W supera ``max_dp_cells`` se escala el valor con
+  K = eps*LB/n (LB = cota greedy >= OPT/2) y se resuelve la DP de peso mínimo
+  por valor escalado. Garantía: valor >= (1 - eps) * OPT, con pesos exactos
+  (sin discretizar). Tiempo O(n²/eps).
+
+Complejidad: O(n*W) donde n = # componentes, W = capacity discretizada
 """
 
 from dataclasses import dataclass
@@ -21,6 +31,8 @@ from enum import Enum
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
+import numpy as np
+
 from .base_algorithm import (
     BaseAlgorithm, AlgorithmType, AlgorithmInput, AlgorithmOutput,
     AlgorithmStatus
@@ -58,6 +70,152 @@ class DisassemblyAnalysis:
     capacity_utilization: float    # % del capacity usado
     efficiency_score: float        # net_profit / total_disassembly_cost
     confidence_score: float        # 0-1, basado en value certainty
+    solver_mode: str = "dp"        # "dp" (exacto) o "fptas" (aproximado)
+    approximation_bound: float = 1.0  # Valor garantizado >= bound * óptimo
+
+
+@dataclass
+class KnapsackSolution:
+    """Selección devuelta por los solvers 0/1"""
+    selected: List[int]            # Índices de los ítems elegidos
+    total_weight: float
+    total_value: float
+    mode: str                      # "dp" | "fptas"
+    approximation_bound: float     # 1.0 en modo exacto, 1 - eps en FPTAS
+
+
+def solve_knapsack_dp(
+    weights: np.ndarray,
+    values: np.ndarray,
+    capacity: float,
+    resolution: int = 10
+) -> KnapsackSolution:
+    """
+    Knapsack 0/1 exacto sobre capacity discretizada.
+
+    Los pesos se redondean hacia arriba al paso 1/resolution, por lo que la
+    selección siempre es factible con los pesos reales. Una sola fila de DP
+    (dp[j] = mejor valor con peso <= j) se actualiza por ítem con operaciones
+    vectoriales; las decisiones se guardan como bits empaquetados.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(weights)
+    cap = int(np.floor(capacity * resolution + 1e-9))
+    if n == 0 or cap < 0:
+        return KnapsackSolution([], 0.0, 0.0, "dp", 1.0)
+
+    int_weights = np.ceil(weights * resolution - 1e-9).astype(np.int64)
+    np.maximum(int_weights, 0, out=int_weights)
+
+    dp = np.zeros(cap + 1, dtype=np.float64)
+    decisions = np.zeros((n, (cap + 8) // 8), dtype=np.uint8)
+    for i in range(n):
+        wi = int(int_weights[i])
+        vi = values[i]
+        if vi <= 0 or wi > cap:
+            continue
+        candidate = dp[:cap + 1 - wi] + vi
+        take = candidate > dp[wi:]
+        if not take.any():
+            continue
+        dp[wi:] = np.where(take, candidate, dp[wi:])
+        mask = np.zeros(cap + 1, dtype=bool)
+        mask[wi:] = take
+        decisions[i] = np.packbits(mask)
+
+    # Reconstrucción: recorrer los bits de atrás hacia adelante
+    selected = []
+    j = cap
+    for i in range(n - 1, -1, -1):
+        if decisions[i, j >> 3] & (0x80 >> (j & 7)):
+            selected.append(i)
+            j -= int(int_weights[i])
+    selected.reverse()
+
+    return KnapsackSolution(
+        selected=selected,
+        total_weight=float(weights[selected].sum()) if selected else 0.0,
+        total_value=float(values[selected].sum()) if selected else 0.0,
+        mode="dp",
+        approximation_bound=1.0
+    )
+
+
+def _greedy_lower_bound(weights: np.ndarray, values: np.ndarray, capacity: float) -> float:
+    """max(greedy por ratio, mejor ítem individual) >= OPT/2"""
+    order = np.argsort(-values / np.maximum(weights, 1e-12), kind="stable")
+    cumulative = np.cumsum(weights[order])
+    fits = order[cumulative <= capacity + 1e-9]
+    greedy = float(values[fits].sum()) if len(fits) else 0.0
+    return max(greedy, float(values.max()))
+
+
+def solve_knapsack_fptas(
+    weights: np.ndarray,
+    values: np.ndarray,
+    capacity: float,
+    epsilon: float = 0.05
+) -> KnapsackSolution:
+    """
+    Knapsack 0/1 aproximado (FPTAS por escalado de valores).
+
+    Con LB = cota greedy (OPT <= 2*LB) y K = eps*LB/n, los valores escalados
+    suman como mucho 2n/eps, y la DP de peso mínimo por valor escalado pierde
+    a lo sumo n*K = eps*LB <= eps*OPT. Garantía: valor >= (1 - eps) * OPT.
+    """
+    if not 0 < epsilon < 1:
+        raise ValueError("epsilon debe estar en (0, 1)")
+    weights = np.asarray(weights, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+
+    # Solo ítems con valor positivo que caben solos
+    candidates = np.flatnonzero((values > 0) & (weights <= capacity + 1e-9))
+    if len(candidates) == 0:
+        return KnapsackSolution([], 0.0, 0.0, "fptas", 1.0 - epsilon)
+    w = weights[candidates]
+    v = values[candidates]
+    n = len(candidates)
+
+    lower = _greedy_lower_bound(w, v, capacity)
+    scale = epsilon * lower / n
+    profits = np.floor(v / scale).astype(np.int64)
+    max_profit = int(min(profits.sum(), np.floor(2 * lower / scale)))
+
+    # min_weight[p] = peso mínimo para lograr valor escalado exactamente p
+    min_weight = np.full(max_profit + 1, np.inf)
+    min_weight[0] = 0.0
+    decisions = np.zeros((n, (max_profit + 8) // 8), dtype=np.uint8)
+    for i in range(n):
+        pi = int(profits[i])
+        if pi == 0 or pi > max_profit:
+            continue
+        candidate = min_weight[:max_profit + 1 - pi] + w[i]
+        take = candidate < min_weight[pi:]
+        if not take.any():
+            continue
+        min_weight[pi:] = np.where(take, candidate, min_weight[pi:])
+        mask = np.zeros(max_profit + 1, dtype=bool)
+        mask[pi:] = take
+        decisions[i] = np.packbits(mask)
+
+    feasible = np.flatnonzero(min_weight <= capacity + 1e-9)
+    p = int(feasible[-1])
+    chosen = []
+    for i in range(n - 1, -1, -1):
+        if decisions[i, p >> 3] & (0x80 >> (p & 7)):
+            chosen.append(i)
+            p -= int(profits[i])
+    chosen.reverse()
+    selected = [int(candidates[i]) for i in chosen]
+
+    return KnapsackSolution(
+        selected=selected,
+        total_weight=float(weights[selected].sum()) if selected else 0.0,
+        total_value=float(values[selected].sum()) if selected else 0.0,
+        mode="fptas",
+        approximation_bound=1.0 - epsilon
+    )
 
 
 class DisassemblyKnapsackAlgorithm(BaseAlgorithm):
@@ -81,8 +239,24 @@ class DisassemblyKnapsackAlgorithm(BaseAlgorithm):
     FULL_DISASSEMBLY_THRESHOLD = 0.30   # Si eficiencia >= 30%, desensamblar completo
     PARTIAL_DISASSEMBLY_THRESHOLD = 0.10  # Si 10% <= eficiencia < 30%, parcial
     
-    def __init__(self):
+    def __init__(
+        self,
+        resolution: int = 10,
+        max_dp_cells: int = 50_000_000,
+        fptas_epsilon: float = 0.05
+    ):
+        """
+        Args:
+            resolution: Pasos de discretización por unidad de capacity (10 → 0.1)
+            max_dp_cells: Tope de n*W para la DP exacta; por encima se usa FPTAS
+            fptas_epsilon: Error relativo máximo del modo aproximado
+        """
         super().__init__(AlgorithmType.DISASSEMBLY_KNAPSACK)
+        if resolution < 1:
+            raise ValueError("resolution debe ser >= 1")
+        self.resolution = int(resolution)
+        self.max_dp_cells = int(max_dp_cells)
+        self.fptas_epsilon = fptas_epsilon
         self.execution_history: List[Dict] = []
     
     def validate_input(self, input_data: AlgorithmInput) -> Tuple[bool, str]:
@@ -289,49 +463,28 @@ class DisassemblyKnapsackAlgorithm(BaseAlgorithm):
         input_data: AlgorithmInput
     ) -> DisassemblyAnalysis:
         """
-        Resuelve problema 0/1 knapsack usando programación dinámica.
+        Resuelve problema 0/1 knapsack (DP vectorizada o FPTAS).
         
         Items: componentes (costo = disassembly_cost*qty, valor = market_value*qty)
         Capacity: capacity disponible
         Goal: Maximizar valor recuperado bajo constraint de costo
         """
-        n = len(components)
-        w = int(capacity * 10)  # Discretizar a escala 0.1
-        
-        # DP table: dp[i][j] = max value usando primeros i items con capacity j
-        dp = [[0.0 for _ in range(w + 1)] for _ in range(n + 1)]
+        weights = np.array([c.component_cost * c.component_qty for c in components], dtype=np.float64)
+        values = np.array([c.component_value * c.component_qty for c in components], dtype=np.float64)
         
-        # Llenar tabla DP
-        for i in range(1, n + 1):
-            comp = components[i - 1]
-            comp_cost = int(comp.component_cost * comp.component_qty * 10)
-            comp_value = comp.component_value * comp.component_qty
-            
-            for j in range(w + 1):
-                # Opción 1: No incluir componente i
-                dp[i][j] = dp[i - 1][j]
-                
-                # Opción 2: Incluir componente i (si cabe)
-                if comp_cost <= j:
-                    dp[i][j] = max(dp[i][j], dp[i - 1][j - comp_cost] + comp_value)
-        
-        # Backtracking: recuperar qué componentes incluir
-        selected = []
-        remaining_capacity = w
-        total_cost = 0.0
-        total_value = 0.0
+        cells = len(components) * (int(capacity * self.resolution) + 1)
+        if cells <= self.max_dp_cells:
+            solution = solve_knapsack_dp(weights, values, capacity, self.resolution)
+        else:
+            solution = solve_knapsack_fptas(weights, values, capacity, self.fptas_epsilon)
         
-        for i in range(n, 0, -1):
-            if dp[i][remaining_capacity] != dp[i - 1][remaining_capacity]:
-                selected.append(components[i - 1])
-                comp_cost = int(components[i - 1].component_cost * 
-                               components[i - 1].component_qty * 10)
-                remaining_capacity -= comp_cost
-                total_cost += components[i - 1].component_cost * components[i - 1].component_qty
-                total_value += components[i - 1].component_value * components[i - 1].component_qty
+        selected = [components[i] for i in solution.selected]
+        total_cost = solution.total_weight
+        total_value = solution.total_value
         
         selected_ids = [c.component_id for c in selected]
-        skipped_ids = [c.component_id for c in components if c.component_id not in selected_ids]
+        selected_set = set(solution.selected)
+        skipped_ids = [c.component_id for i, c in enumerate(components) if i not in selected_set]
         
         # Calcular métricas
         net_profit = total_value - total_cost
@@ -347,7 +500,9 @@ class DisassemblyKnapsackAlgorithm(BaseAlgorithm):
             skipped_components=skipped_ids,
             capacity_utilization=min(utilization, 100.0),
             efficiency_score=efficiency,
-            confidence_score=0.0  # Se calcula después
+            confidence_score=0.0,  # Se calcula después
+            solver_mode=solution.mode,
+            approximation_bound=solution.approximation_bound
         )
     
     def _determine_strategy(self, analysis: DisassemblyAnalysis) -> DisassemblyStrategy:
@@ -418,4 +573,9 @@ class DisassemblyKnapsackAlgorithm(BaseAlgorithm):
             f"Eficiencia: {analysis.efficiency_score:.1f}%. "
             f"Utilización capacity: {analysis.capacity_utilization:.1f}%. "
         )
+        if analysis.solver_mode != "dp":
+            reasoning += (
+                f"Solución aproximada ({analysis.solver_mode}, "
+                f">= {analysis.approximation_bound:.0%} del óptimo). "
+            )
         return reasoning
@@ -0,0 +1,409 @@
+"""
+Grafo de equivalencias indexado (CSR)
+=====================================
+Almacén compacto del grafo de sustitutos para SubstitutesGraphAlgorithm.
+
+Representación:
+- Nodos: lista de item_id + índice item_id → posición
+- Aristas dirigidas (ítem → equivalente) en formato CSR: ``indptr`` (n+1) e
+  ``indices`` (destinos), con columnas de atributos por arista
+  (compatibilidad técnica, diferencial de costo, confiabilidad, lead time,
+  factor de conversión). Dentro de cada fila las aristas van ordenadas por
+  compatibilidad descendente.
+- Se construye desde ``planner.models.items.EquivalentItem`` (o desde
+  ``ItemMaster.equivalent_items``) y se persiste en disco como ``.npz``.
+
+Búsqueda:
+- Best-first iterativo (heap) sobre el score de ruta = producto de
+  compatibilidades, con poda por compatibilidad mínima y profundidad máxima
+- Reconstrucción de rutas por punteros a padre (sin copiar listas por paso)
+- Resultados por (ítem, profundidad, compatibilidad mínima) memoizados;
+  el grafo es de solo lectura, así que la memo no se invalida
+
+Ediciones:
+- ``with_equivalent`` / ``without_equivalent`` devuelven un grafo nuevo (copy
+  on write); ``ancestors`` da los ítems cuya búsqueda puede cambiar
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from heapq import heappop, heappush
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SubstituteSearchResult:
+    """Nodos alcanzados desde un ítem, en orden de score de ruta descendente"""
+    source: int                   # Índice del ítem original (-1 si no existe)
+    nodes: np.ndarray             # Índices alcanzados (sin el original)
+    scores: np.ndarray            # Producto de compatibilidades de la ruta
+    depths: np.ndarray            # Saltos desde el original
+    parent_edge: Dict[int, int]   # nodo → arista CSR por la que se alcanzó
+    edges_explored: int
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+
+class EquivalenceGraph:
+    """
+    Grafo de equivalencias de solo lectura en formato CSR.
+
+    Uso:
+        graph = EquivalenceGraph.from_items(item_masters)
+        result = graph.search("ITEM-001", max_depth=3, min_compatibility=0.7)
+        for node in result.nodes:
+            graph.path(result, node)
+    """
+
+    MEMO_MAX_ENTRIES = 4096
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        compatibility: np.ndarray,
+        cost_differential: np.ndarray,
+        supplier_reliability: np.ndarray,
+        lead_time_days: np.ndarray,
+        conversion_factor: np.ndarray
+    ):
+        self.node_ids = list(node_ids)
+        self.index: Dict[str, int] = {item_id: i for i, item_id in enumerate(self.node_ids)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.compatibility = np.asarray(compatibility, dtype=np.float64)
+        self.cost_differential = np.asarray(cost_differential, dtype=np.float64)
+        self.supplier_reliability = np.asarray(supplier_reliability, dtype=np.float64)
+        self.lead_time_days = np.asarray(lead_time_days, dtype=np.float64)
+        self.conversion_factor = np.asarray(conversion_factor, dtype=np.float64)
+        if len(self.indptr) != len(self.node_ids) + 1:
+            raise ValueError("indptr debe tener len(node_ids) + 1 posiciones")
+        self._reverse: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._memo: "OrderedDict[Tuple[int, int, float], SubstituteSearchResult]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    # ===== Construcción =====
+
+    @classmethod
+    def from_equivalents(cls, equivalents: Mapping[str, Iterable[Any]]) -> "EquivalenceGraph":
+        """
+        Construye el grafo desde ``{item_id: [EquivalentItem]}``.
+
+        Acepta cualquier objeto con los atributos de EquivalentItem
+        (equivalent_id, technical_specs_match, cost_differential,
+        supplier_reliability, lead_time_delta, conversion_factor).
+        """
+        index: Dict[str, int] = {}
+        node_ids: List[str] = []
+
+        def node(item_id: str) -> int:
+            position = index.get(item_id)
+            if position is None:
+                position = index[item_id] = len(node_ids)
+                node_ids.append(item_id)
+            return position
+
+        sources, targets = [], []
+        compat, cost, reliability, lead_time, conversion = [], [], [], [], []
+        for item_id, items in equivalents.items():
+            source = node(item_id)
+            for equiv in items:
+                sources.append(source)
+                targets.append(node(equiv.equivalent_id))
+                compat.append(equiv.technical_specs_match)
+                cost.append(equiv.cost_differential)
+                reliability.append(equiv.supplier_reliability)
+                delta = equiv.lead_time_delta
+                lead_time.append(delta.total_seconds() / 86400 if hasattr(delta, "total_seconds") else float(delta))
+                conversion.append(equiv.conversion_factor)
+
+        return cls._from_edge_arrays(
+            node_ids,
+            np.asarray(sources, dtype=np.int64),
+            np.asarray(targets, dtype=np.int64),
+            np.asarray(compat, dtype=np.float64),
+            np.asarray(cost, dtype=np.float64),
+            np.asarray(reliability, dtype=np.float64),
+            np.asarray(lead_time, dtype=np.float64),
+            np.asarray(conversion, dtype=np.float64)
+        )
+
+    @classmethod
+    def from_items(cls, items: Iterable[Any]) -> "EquivalenceGraph":
+        """Construye el grafo desde ``ItemMaster.equivalent_items``"""
+        return cls.from_equivalents({item.item_id: item.equivalent_items for item in items})
+
+    @classmethod
+    def _from_edge_arrays(
+        cls,
+        node_ids: List[str],
+        sources: np.ndarray,
+        targets: np.ndarray,
+        compatibility: np.ndarray,
+        *columns: np.ndarray
+    ) -> "EquivalenceGraph":
+        # Orden CSR: por origen y, dentro de cada fila, por compatibilidad descendente
+        order = np.lexsort((-compatibility, sources))
+        counts = np.bincount(sources, minlength=len(node_ids))
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(
+            node_ids,
+            indptr,
+            targets[order],
+            compatibility[order],
+            *(column[order] for column in columns)
+        )
+
+    # ===== Ediciones (copy on write) =====
+
+    def _edge_sources(self) -> np.ndarray:
+        return np.repeat(np.arange(self.node_count, dtype=np.int64), np.diff(self.indptr))
+
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (
+            self.cost_differential, self.supplier_reliability,
+            self.lead_time_days, self.conversion_factor
+        )
+
+    def with_equivalent(self, item_id: str, equivalent: Any) -> "EquivalenceGraph":
+        """Grafo nuevo con la arista ``item_id`` → ``equivalent`` agregada"""
+        extra = EquivalenceGraph.from_equivalents({item_id: [equivalent]})
+        node_ids = list(self.node_ids)
+        remap = np.zeros(extra.node_count, dtype=np.int64)
+        for position, node_id in enumerate(extra.node_ids):
+            existing = self.index.get(node_id)
+            if existing is None:
+                existing = len(node_ids)
+                node_ids.append(node_id)
+            remap[position] = existing
+        return EquivalenceGraph._from_edge_arrays(
+            node_ids,
+            np.concatenate([self._edge_sources(), remap[extra._edge_sources()]]),
+            np.concatenate([self.indices.astype(np.int64), remap[extra.indices]]),
+            np.concatenate([self.compatibility, extra.compatibility]),
+            *(np.concatenate(pair) for pair in zip(self._columns(), extra._columns()))
+        )
+
+    def without_equivalent(self, item_id: str, equivalent_id: str) -> "EquivalenceGraph":
+        """Grafo nuevo sin las aristas ``item_id`` → ``equivalent_id``"""
+        source, target = self.index.get(item_id), self.index.get(equivalent_id)
+        if source is None or target is None:
+            return self
+        keep = ~((self._edge_sources() == source) & (self.indices == target))
+        return EquivalenceGraph._from_edge_arrays(
+            self.node_ids,
+            self._edge_sources()[keep],
+            self.indices[keep].astype(np.int64),
+            self.compatibility[keep],
+            *(column[keep] for column in self._columns())
+        )
+
+    def ancestors(self, item_id: str, max_depth: int) -> np.ndarray:
+        """
+        Ítems desde los que ``item_id`` se alcanza en < ``max_depth`` saltos
+        (incluye al propio ítem): las búsquedas con ese límite de profundidad
+        que pueden pasar por sus aristas salientes.
+        """
+        start = self.index.get(item_id)
+        if start is None:
+            return np.zeros(0, dtype=np.int64)
+        if self._reverse is None:
+            order = np.argsort(self.indices, kind="stable")
+            counts = np.bincount(self.indices, minlength=self.node_count)
+            rev_indptr = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(counts, out=rev_indptr[1:])
+            self._reverse = (rev_indptr, self._edge_sources()[order])
+        rev_indptr, rev_indices = self._reverse
+
+        seen = {start}
+        frontier = [start]
+        for _ in range(max_depth - 1):
+            following = []
+            for v in frontier:
+                for u in rev_indices[rev_indptr[v]:rev_indptr[v + 1]].tolist():
+                    if u not in seen:
+                        seen.add(u)
+                        following.append(u)
+            if not following:
+                break
+            frontier = following
+        return np.fromiter(sorted(seen), dtype=np.int64, count=len(seen))
+
+    # ===== Persistencia =====
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Columnas del grafo para persistir (ver ``from_arrays``)"""
+        return {
+            "node_ids": np.asarray(self.node_ids, dtype=np.str_),
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "compatibility": self.compatibility,
+            "cost_differential": self.cost_differential,
+            "supplier_reliability": self.supplier_reliability,
+            "lead_time_days": self.lead_time_days,
+            "conversion_factor": self.conversion_factor,
+        }
+
+    @classmethod
+    def from_arrays(cls, data: Mapping[str, np.ndarray]) -> "EquivalenceGraph":
+        return cls(
+            data["node_ids"].tolist(),
+            data["indptr"],
+            data["indices"],
+            data["compatibility"],
+            data["cost_differential"],
+            data["supplier_reliability"],
+            data["lead_time_days"],
+            data["conversion_factor"]
+        )
+
+    def save(self, path: str) -> None:
+        """Guarda el grafo como ``.npz`` comprimido"""
+        np.savez_compressed(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "EquivalenceGraph":
+        """Carga un grafo guardado con ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays(data)
+
+    # ===== Consultas =====
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.index
+
+    def out_degree(self, item_id: str) -> int:
+        """Cantidad de equivalentes directos (0 si el ítem no existe)"""
+        i = self.index.get(item_id)
+        return 0 if i is None else int(self.indptr[i + 1] - self.indptr[i])
+
+    def search(
+        self,
+        item_id: str,
+        max_depth: int = 4,
+        min_compatibility: float = 0.0
+    ) -> SubstituteSearchResult:
+        """
+        Búsqueda best-first desde ``item_id``.
+
+        Cada nodo se fija con su mejor score de ruta (producto de
+        compatibilidades); no se expanden rutas con score menor a
+        ``min_compatibility`` ni más largas que ``max_depth`` saltos.
+        Los resultados se memoizan por (ítem, max_depth, min_compatibility).
+        """
+        source = self.index.get(item_id, -1)
+        key = (source, int(max_depth), float(min_compatibility))
+        with self._memo_lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                return cached
+
+        result = self._best_first(source, int(max_depth), float(min_compatibility))
+
+        with self._memo_lock:
+            self._memo[key] = result
+            if len(self._memo) > self.MEMO_MAX_ENTRIES:
+                self._memo.popitem(last=False)
+        return result
+
+    def reachable(self, item_id: str, max_depth: int = 4, min_compatibility: float = 0.0) -> np.ndarray:
+        """Índices alcanzables desde ``item_id`` (memoizado vía ``search``)"""
+        return self.search(item_id, max_depth, min_compatibility).nodes
+
+    def path(self, result: SubstituteSearchResult, node: int) -> List[str]:
+        """Ruta original → ``node`` reconstruida con los punteros a padre"""
+        return [self.node_ids[i] for i in self._path_nodes(result, node)]
+
+    def path_edges(self, result: SubstituteSearchResult, node: int) -> List[int]:
+        """Aristas CSR de la ruta original → ``node``, en orden"""
+        edges = []
+        while node != result.source:
+            edge = result.parent_edge[node]
+            edges.append(edge)
+            node = self._edge_source(edge)
+        edges.reverse()
+        return edges
+
+    def clear_memo(self) -> None:
+        with self._memo_lock:
+            self._memo.clear()
+
+    # ===== Internos =====
+
+    def _edge_source(self, edge: int) -> int:
+        return int(np.searchsorted(self.indptr, edge, side="right") - 1)
+
+    def _path_nodes(self, result: SubstituteSearchResult, node: int) -> List[int]:
+        nodes = [node]
+        while node != result.source:
+            node = self._edge_source(result.parent_edge[node])
+            nodes.append(node)
+        nodes.reverse()
+        return nodes
+
+    def _best_first(self, source: int, max_depth: int, min_compatibility: float) -> SubstituteSearchResult:
+        if source < 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return SubstituteSearchResult(source, empty, np.zeros(0), empty, {}, 0)
+
+        indptr, indices, compatibility = self.indptr, self.indices, self.compatibility
+        best: Dict[int, float] = {source: 1.0}
+        parent_edge: Dict[int, int] = {}
+        settled = {source}
+        nodes: List[int] = []
+        scores: List[float] = []
+        depths: List[int] = []
+        edges_explored = 0
+        heap: List[Tuple[float, int, int]] = [(-1.0, 0, source)]
+
+        while heap:
+            neg_score, depth, u = heappop(heap)
+            if u != source:
+                if u in settled:
+                    continue
+                settled.add(u)
+                nodes.append(u)
+                scores.append(-neg_score)
+                depths.append(depth)
+            if depth >= max_depth:
+                continue
+
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            edges_explored += end - start
+            if start == end:
+                continue
+            candidate = compatibility[start:end] * -neg_score
+            # Filas ordenadas por compatibilidad: el resto tampoco pasa la poda
+            keep = int(np.count_nonzero(candidate >= min_compatibility))
+            for offset in range(keep):
+                v = int(indices[start + offset])
+                score = float(candidate[offset])
+                if v in settled or score <= best.get(v, -1.0):
+                    continue
+                best[v] = score
+                parent_edge[v] = start + offset
+                heappush(heap, (-score, depth + 1, v))
+
+        return SubstituteSearchResult(
+            source=source,
+            nodes=np.asarray(nodes, dtype=np.int64),
+            scores=np.asarray(scores, dtype=np.float64),
+            depths=np.asarray(depths, dtype=np.int64),
+            parent_edge=parent_edge,
+            edges_explored=edges_explored
+        )
@@ -0,0 +1,300 @@
+"""
+Índice de clausura de sustitutos (top-K por ítem)
+=================================================
+Precalcula, para cada ítem del grafo de equivalencias, sus K mejores
+sustitutos alcanzables con el score de ruta, para que
+SubstitutesGraphAlgorithm responda en O(K) sin recorrer el grafo.
+
+Tabla (una fila por ítem, K columnas, -1 = vacío):
+- node: índice del sustituto en el grafo
+- score: producto de compatibilidades de la mejor ruta
+- depth: saltos de esa ruta
+- prev: posición (en la misma fila) del nodo anterior de la ruta; -1 = directo.
+  El anterior tiene score mayor o igual, así que siempre está en el top-K
+- cost_factor: producto de (1 + cost_differential) a lo largo de la ruta
+- reliability: confiabilidad de la última arista
+
+Mantenimiento:
+- ``rebuild`` / ``rebuild_async`` recalculan todo (job nocturno o de arranque)
+- ``add_equivalence`` / ``remove_equivalence`` solo recalculan los ancestros
+  del ítem editado dentro de la profundidad de búsqueda
+- Las actualizaciones arman una tabla nueva y publican el par (grafo, tabla)
+  en un único atributo inmutable; las lecturas toman ese par de una vez, así
+  que nunca combinan un grafo con la tabla de otro ni ven filas a medio escribir
+- ``save`` / ``load`` persisten grafo + tabla en un ``.npz``
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .equivalence_graph import EquivalenceGraph
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ClosureEntry:
+    """Sustituto precalculado de un ítem"""
+    item_id: str
+    score: float
+    depth: int
+    path: List[str]
+    cost_factor: float
+    reliability: float
+
+
+@dataclass(frozen=True)
+class _ClosureTable:
+    node: np.ndarray          # (n, K) int32
+    score: np.ndarray         # (n, K) float32
+    depth: np.ndarray         # (n, K) int8
+    prev: np.ndarray          # (n, K) int16
+    cost_factor: np.ndarray   # (n, K) float32
+    reliability: np.ndarray   # (n, K) float32
+
+    @classmethod
+    def empty(cls, rows: int, k: int) -> "_ClosureTable":
+        return cls(
+            node=np.full((rows, k), -1, dtype=np.int32),
+            score=np.zeros((rows, k), dtype=np.float32),
+            depth=np.zeros((rows, k), dtype=np.int8),
+            prev=np.full((rows, k), -1, dtype=np.int16),
+            cost_factor=np.ones((rows, k), dtype=np.float32),
+            reliability=np.zeros((rows, k), dtype=np.float32)
+        )
+
+    def copy(self, rows: int) -> "_ClosureTable":
+        """Copia para escribir, extendida a ``rows`` filas si el grafo creció"""
+        k = self.node.shape[1]
+        table = _ClosureTable.empty(rows, k)
+        current = min(rows, self.node.shape[0])
+        for name in ("node", "score", "depth", "prev", "cost_factor", "reliability"):
+            getattr(table, name)[:current] = getattr(self, name)[:current]
+        return table
+
+
+class SubstituteClosureIndex:
+    """
+    Top-K de sustitutos por ítem sobre un EquivalenceGraph.
+
+    Uso:
+        index = SubstituteClosureIndex(graph, k=10)
+        index.rebuild_async(path="equivalencias_closure.npz")
+        ...
+        if index.is_ready:
+            index.lookup("ITEM-001", max_depth=3, min_compatibility=0.7)
+    """
+
+    def __init__(
+        self,
+        graph: EquivalenceGraph,
+        k: int = 10,
+        max_depth: int = 5,
+        min_compatibility: float = 0.4
+    ):
+        """
+        Args:
+            graph: Grafo de equivalencias
+            k: Sustitutos guardados por ítem
+            max_depth: Profundidad con la que se construye (la consulta puede pedir menos)
+            min_compatibility: Score mínimo con el que se construye
+        """
+        if not 1 <= k <= np.iinfo(np.int16).max:
+            raise ValueError("k fuera de rango")
+        self.k = int(k)
+        self.max_depth = int(max_depth)
+        self.min_compatibility = float(min_compatibility)
+        # (grafo, tabla) publicados juntos: se reemplaza la tupla, nunca se muta
+        self._snapshot: Tuple[EquivalenceGraph, Optional[_ClosureTable]] = (graph, None)
+        self._write_lock = threading.Lock()
+        self.last_build: dict = {}
+
+    @property
+    def graph(self) -> EquivalenceGraph:
+        return self._snapshot[0]
+
+    @property
+    def is_ready(self) -> bool:
+        return self._snapshot[1] is not None
+
+    # ===== Construcción =====
+
+    def _fill_rows(self, graph: EquivalenceGraph, table: _ClosureTable, rows: Iterable[int]) -> int:
+        count = 0
+        for row in rows:
+            count += 1
+            result = graph._best_first(int(row), self.max_depth, self.min_compatibility)
+            table.node[row] = -1
+            table.prev[row] = -1
+            table.score[row] = 0.0
+            table.depth[row] = 0
+            table.cost_factor[row] = 1.0
+            table.reliability[row] = 0.0
+            position = {}
+            for slot in range(min(self.k, len(result))):
+                node = int(result.nodes[slot])
+                edge = result.parent_edge[node]
+                parent = graph._edge_source(edge)
+                prev = position.get(parent, -1)
+                position[node] = slot
+                parent_cost = float(table.cost_factor[row, prev]) if prev >= 0 else 1.0
+                table.node[row, slot] = node
+                table.score[row, slot] = result.scores[slot]
+                table.depth[row, slot] = result.depths[slot]
+                table.prev[row, slot] = prev
+                table.cost_factor[row, slot] = parent_cost * (1 + graph.cost_differential[edge])
+                table.reliability[row, slot] = graph.supplier_reliability[edge]
+        return count
+
+    def rebuild(self, path: Optional[str] = None) -> None:
+        """Recalcula la tabla completa y, si se indica, la guarda en ``path``"""
+        started = time.perf_counter()
+        with self._write_lock:
+            graph = self.graph
+            table = _ClosureTable.empty(graph.node_count, self.k)
+            self._fill_rows(graph, table, range(graph.node_count))
+            self._snapshot = (graph, table)
+        self.last_build = {
+            "mode": "full",
+            "rows": graph.node_count,
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+        logger.info(f"Clausura de sustitutos construida: {graph.node_count} ítems")
+        if path:
+            self.save(path)
+
+    def rebuild_async(self, path: Optional[str] = None) -> threading.Thread:
+        """Ejecuta ``rebuild`` en un thread daemon; mientras tanto ``is_ready`` sigue igual"""
+        worker = threading.Thread(
+            target=self.rebuild, kwargs={"path": path},
+            name="substitute-closure-build", daemon=True
+        )
+        worker.start()
+        return worker
+
+    # ===== Ediciones incrementales =====
+
+    def _apply(self, new_graph: EquivalenceGraph, item_id: str, old_graph: EquivalenceGraph) -> int:
+        # Filas afectadas: quien alcance al ítem editado (antes o después del cambio)
+        affected = np.union1d(
+            old_graph.ancestors(item_id, self.max_depth),
+            new_graph.ancestors(item_id, self.max_depth)
+        )
+        current = self._snapshot[1]
+        if current is None:
+            self._snapshot = (new_graph, None)
+            return 0
+        table = current.copy(new_graph.node_count)
+        count = self._fill_rows(new_graph, table, affected)
+        self._snapshot = (new_graph, table)
+        return count
+
+    def add_equivalence(self, item_id: str, equivalent: Any) -> int:
+        """Agrega ``item_id`` → ``equivalent`` (EquivalentItem); devuelve filas recalculadas"""
+        started = time.perf_counter()
+        with self._write_lock:
+            old_graph = self.graph
+            rows = self._apply(old_graph.with_equivalent(item_id, equivalent), item_id, old_graph)
+        self.last_build = {"mode": "add", "rows": rows, "elapsed_ms": (time.perf_counter() - started) * 1000}
+        return rows
+
+    def remove_equivalence(self, item_id: str, equivalent_id: str) -> int:
+        """Quita las aristas ``item_id`` → ``equivalent_id``; devuelve filas recalculadas"""
+        started = time.perf_counter()
+        with self._write_lock:
+            old_graph = self.graph
+            new_graph = old_graph.without_equivalent(item_id, equivalent_id)
+            rows = 0 if new_graph is old_graph else self._apply(new_graph, item_id, old_graph)
+        self.last_build = {"mode": "remove", "rows": rows, "elapsed_ms": (time.perf_counter() - started) * 1000}
+        return rows
+
+    # ===== Consultas =====
+
+    def lookup(
+        self,
+        item_id: str,
+        max_depth: Optional[int] = None,
+        min_compatibility: Optional[float] = None
+    ) -> List[ClosureEntry]:
+        """
+        Sustitutos precalculados de ``item_id`` (score descendente), filtrados
+        por límites iguales o más estrictos que los de construcción. O(K).
+        """
+        graph, table = self._snapshot
+        if table is None:
+            raise RuntimeError("Índice de clausura sin construir")
+        row = graph.index.get(item_id)
+        if row is None:
+            return []
+        max_depth = self.max_depth if max_depth is None else max_depth
+        min_compatibility = self.min_compatibility if min_compatibility is None else min_compatibility
+
+        nodes = table.node[row]
+        prevs = table.prev[row].tolist()
+        entries = []
+        for slot in range(self.k):
+            node = int(nodes[slot])
+            if node < 0:
+                break
+            depth = int(table.depth[row, slot])
+            score = float(table.score[row, slot])
+            # Scores en float32: tolerancia para no descartar empates con el umbral
+            if depth > max_depth or score < min_compatibility - 1e-6:
+                continue
+            path = [graph.node_ids[node]]
+            prev = prevs[slot]
+            while prev >= 0:
+                path.append(graph.node_ids[int(nodes[prev])])
+                prev = prevs[prev]
+            path.append(item_id)
+            path.reverse()
+            entries.append(ClosureEntry(
+                item_id=graph.node_ids[node],
+                score=score,
+                depth=depth,
+                path=path,
+                cost_factor=float(table.cost_factor[row, slot]),
+                reliability=float(table.reliability[row, slot])
+            ))
+        return entries
+
+    # ===== Persistencia =====
+
+    def save(self, path: str) -> None:
+        """Guarda grafo y tabla en un ``.npz``"""
+        graph, table = self._snapshot
+        if table is None:
+            raise RuntimeError("Índice de clausura sin construir")
+        np.savez_compressed(
+            path,
+            params=np.asarray([self.k, self.max_depth, self.min_compatibility], dtype=np.float64),
+            **graph.to_arrays(),
+            closure_node=table.node,
+            closure_score=table.score,
+            closure_depth=table.depth,
+            closure_prev=table.prev,
+            closure_cost_factor=table.cost_factor,
+            closure_reliability=table.reliability
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SubstituteClosureIndex":
+        """Carga un índice guardado con ``save`` (listo para consultar)"""
+        with np.load(path, allow_pickle=False) as data:
+            graph = EquivalenceGraph.from_arrays(data)
+            k, max_depth, min_compatibility = data["params"].tolist()
+            index = cls(graph, int(k), int(max_depth), min_compatibility)
+            index._snapshot = (graph, _ClosureTable(
+                node=data["closure_node"],
+                score=data["closure_score"],
+                depth=data["closure_depth"],
+                prev=data["closure_prev"],
+                cost_factor=data["closure_cost_factor"],
+                reliability=data["closure_reliability"]
+            ))
+        return index
@@ -6,32 +6,43 @@ Busca items equivalentes/sustitutos en un grafo de equivalencias.
 Responsabilidad:
 - Dado un item, encontrar alternativas técnicamente compatibles
 - Objetivo: Maximizar disponibilidad minimizando costo/impacto técnico
-- Estrategia: DFS/BFS en grafo de equivalencias con restricciones
+- Estrategia: best-first iterativo en grafo de equivalencias (CSR) con poda
+  por compatibilidad y profundidad
+
+Fuente del grafo (en orden):
+1. ``execution_context["reference_data"].substitutes`` (lotes de BatchPlanner)
+2. Índice de clausura top-K (``SubstituteClosureIndex``): lectura O(K), sin búsqueda
+3. Grafo inyectado en el constructor (``EquivalenceGraph``, p. ej. cargado de disco)
+4. Grafo de ejemplo para ITEM-001
 
 Aplicación en supply chain:
 - Cuando no hay stock del item original
 - Encontrar sustitutos técnicamente compatibles
 - Evaluar trade-off: compatibilidad vs costo vs disponibilidad
 
-Complejidad: O(V+E) donde V=nodos (items), E=aristas (equivalencias)
+Complejidad: O(E' log V') donde V', E' = nodos/aristas que pasan la poda
 """
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Tuple, Optional, Set
-from collections import deque
-from datetime import datetime
+from typing import Dict, List, Tuple, Optional
+from datetime import datetime, timedelta
 
 from .base_algorithm import (
     BaseAlgorithm, AlgorithmType, AlgorithmInput, AlgorithmOutput,
     AlgorithmStatus
 )
+from .equivalence_graph import EquivalenceGraph, SubstituteSearchResult
+from .substitute_closure import SubstituteClosureIndex
+from ..models.items import EquivalentItem
 
 
 class SearchStrategy(str, Enum):
     """Estrategia de búsqueda en grafo"""
     DFS = "dfs"  # Depth-First Search (exploración profunda)
     BFS = "bfs"  # Breadth-First Search (exploración por niveles)
+    BEST_FIRST = "best_first"  # Mejor score de ruta primero (heap)
+    CLOSURE = "closure"  # Lectura del índice top-K precalculado
 
 
 @dataclass
@@ -53,7 +64,7 @@ class SubstituteOption:
     item_id: str
     search_depth: int
     path: List[str]                  # Ruta en el grafo
-    technical_score: float           # 0-1
+    technical_score: float           # 0-1 (producto de compatibilidades de la ruta)
     cost_score: float                # 0-1 (lower cost = higher score)
     reliability_score: float         # 0-1
     overall_score: float             # 0-1 (agregado)
@@ -73,9 +84,41 @@ class GraphAnalysis:
     confidence_score: float = 0.0
 
 
+def _demo_equivalents() -> Dict[str, List[EquivalentItem]]:
+    """Equivalencias de ejemplo (ITEM-001) usadas cuando no hay grafo cargado"""
+    def equiv(item_id, match, cost, reliability, days):
+        return EquivalentItem(
+            equivalent_id=item_id,
+            equivalent_code=item_id,
+            technical_specs_match=match,
+            cost_differential=cost,
+            supplier_reliability=reliability,
+            lead_time_delta=timedelta(days=days)
+        )
+
+    return {
+        "ITEM-001": [
+            equiv("EQUIV-001-A", 0.95, -0.05, 0.90, 2),
+            equiv("EQUIV-001-B", 0.85, 0.10, 0.92, 1),
+        ],
+        "EQUIV-001-A": [equiv("EQUIV-001-A-I", 0.80, -0.15, 0.85, 5)],
+        "EQUIV-001-B": [equiv("EQUIV-001-B-I", 0.75, 0.20, 0.88, 3)],
+    }
+
+
+_demo_graph: Optional[EquivalenceGraph] = None
+
+
+def _get_demo_graph() -> EquivalenceGraph:
+    global _demo_graph
+    if _demo_graph is None:
+        _demo_graph = EquivalenceGraph.from_equivalents(_demo_equivalents())
+    return _demo_graph
+
+
 class SubstitutesGraphAlgorithm(BaseAlgorithm):
     """
-    Busca items equivalentes en un grafo usando DFS/BFS.
+    Busca items equivalentes en un grafo indexado usando best-first.
     
     Entrada:
     - item_id: str (item original)
@@ -88,10 +131,30 @@ class SubstitutesGraphAlgorithm(BaseAlgorithm):
     - selected_option: str ("substitute_found/no_substitute")
     """
     
-    def __init__(self):
+    # Poda por criticidad: (profundidad máxima, compatibilidad mínima de ruta)
+    SEARCH_LIMITS = {
+        "CRITICAL": (2, 0.80),
+        "HIGH": (3, 0.70),
+        "MEDIUM": (4, 0.50),
+        "LOW": (5, 0.40),
+    }
+    
+    def __init__(
+        self,
+        graph: Optional[EquivalenceGraph] = None,
+        closure: Optional[SubstituteClosureIndex] = None
+    ):
+        """
+        Args:
+            graph: Grafo de equivalencias (default: grafo de ejemplo)
+            closure: Índice top-K precalculado; se usa cuando está construido
+        """
         super().__init__(AlgorithmType.SUBSTITUTES_GRAPH)
         self.execution_history: List[Dict] = []
-        self.search_strategy = SearchStrategy.BFS  # Default
+        self.search_strategy = SearchStrategy.BEST_FIRST
+        self.graph = graph
+        self.closure = closure
+        self._reference_graph: Optional[Tuple[object, EquivalenceGraph]] = None
     
     def validate_input(self, input_data: AlgorithmInput) -> Tuple[bool, str]:
         """Valida entrada del algoritmo"""
@@ -107,9 +170,9 @@ class SubstitutesGraphAlgorithm(BaseAlgorithm):
         
         Pasos:
         1. Validar entrada
-        2. Construir grafo de equivalencias (mock)
-        3. Seleccionar estrategia de búsqueda (DFS/BFS según criticality)
-        4. Ejecutar búsqueda con constraints
+        2. Resolver grafo de equivalencias
+        3. Seleccionar límites de búsqueda según criticality
+        4. Ejecutar búsqueda best-first con poda
         5. Evaluar alternativas encontradas
         6. Calcular confidence basado en compatibilidad
         7. Retornar resultado
@@ -130,10 +193,10 @@ class SubstitutesGraphAlgorithm(BaseAlgorithm):
             )
         
         try:
-            # 2. Construir grafo
-            graph = self._build_equivalence_graph(input_data)
+            # 2. Resolver grafo
+            graph = self._resolve_graph(input_data)
             
-            if not graph:
+            if not graph.out_degree(input_data.item_id):
                 return AlgorithmOutput(
                     algorithm_type=self.algorithm_type,
                     item_id=input_data.item_id,
@@ -145,14 +208,15 @@ class SubstitutesGraphAlgorithm(BaseAlgorithm):
                     selected_option="substitute_none"
                 )
             
-            # 3. Seleccionar estrategia
-            self.search_strategy = self._select_search_strategy(input_data)
+            # 3. Seleccionar límites
+            max_depth, min_compatibility = self._select_search_limits(input_data)
             
-            # 4. Ejecutar búsqueda
-            if self.search_strategy == SearchStrategy.DFS:
-                analysis = self._search_dfs(input_data.item_id, graph, input_data)
+            # 4. Ejecutar búsqueda (o leer la clausura precalculada)
+            if self.closure is not None and graph is self.closure.graph:
+                analysis = self._search_closure(input_data.item_id, max_depth, min_compatibility)
             else:
-                analysis = self._search_bfs(input_data.item_id, graph, input_data)
+                analysis = self._search(input_data.item_id, graph, max_depth, min_compatibility)
+            self.search_strategy = analysis.search_strategy
             
             # 5. Evaluar alternativas
             best_option = self._evaluate_alternatives(analysis, input_data)
@@ -216,199 +280,120 @@ class SubstitutesGraphAlgorithm(BaseAlgorithm):
             "type": self.algorithm_type.value,
             "execution_count": self.execution_count,
             "algorithm_name": "SubstitutesGraph",
-            "description": "DFS/BFS graph search para encontrar items equivalentes",
-            "complexity": "O(V+E) graph traversal",
+            "description": "Best-first graph search (CSR) para encontrar items equivalentes",
+            "complexity": "O(E' log V') graph traversal con poda",
             "search_strategy": self.search_strategy.value,
             "last_execution": self.execution_history[-1] if self.execution_history else None
         }
     
     # ===== Métodos Privados =====
     
-    def _build_equivalence_graph(self, input_data: AlgorithmInput) -> Dict[str, List[EquivalentNode]]:
+    def _resolve_graph(self, input_data: AlgorithmInput) -> EquivalenceGraph:
         """
-        Construye grafo de equivalencias (mock).
-        En producción: consultaría base de datos de equivalencias.
+        Grafo a usar: sustitutos de la referencia del lote, el de la clausura,
+        el inyectado o el de ejemplo.
+        El grafo de la referencia se construye una vez por instancia de ReferenceData.
         """
-        # Grafo de ejemplo: item_id → [lista de equivalentes]
-        graph = {
-            "ITEM-001": [
-                EquivalentNode(
-                    item_id="ITEM-001",
-                    description="Item original",
-                    technical_compatibility=1.0,
-                    cost_differential=0.0,
-                    supplier_reliability=0.95,
-                    lead_time_delta=0,
-                    availability=0.6,
-                    is_original=True
-                ),
-                EquivalentNode(
-                    item_id="EQUIV-001-A",
-                    description="Equivalente nivel 1",
-                    technical_compatibility=0.95,
-                    cost_differential=-0.05,
-                    supplier_reliability=0.90,
-                    lead_time_delta=2,
-                    availability=0.85
-                ),
-                EquivalentNode(
-                    item_id="EQUIV-001-B",
-                    description="Equivalente nivel 1",
-                    technical_compatibility=0.85,
-                    cost_differential=0.10,
-                    supplier_reliability=0.92,
-                    lead_time_delta=1,
-                    availability=0.92
-                ),
-            ],
-            "EQUIV-001-A": [
-                EquivalentNode(
-                    item_id="EQUIV-001-A-I",
-                    description="Equivalente nivel 2",
-                    technical_compatibility=0.80,
-                    cost_differential=-0.15,
-                    supplier_reliability=0.85,
-                    lead_time_delta=5,
-                    availability=0.75
-                ),
-            ],
-            "EQUIV-001-B": [
-                EquivalentNode(
-                    item_id="EQUIV-001-B-I",
-                    description="Equivalente nivel 2",
-                    technical_compatibility=0.75,
-                    cost_differential=0.20,
-                    supplier_reliability=0.88,
-                    lead_time_delta=3,
-                    availability=0.88
-                ),
-            ]
-        }
-        
-        return graph if input_data.item_id == "ITEM-001" else {}
+        reference = (input_data.execution_context or {}).get("reference_data")
+        substitutes = getattr(reference, "substitutes", None)
+        if substitutes:
+            if self._reference_graph is None or self._reference_graph[0] is not reference:
+                self._reference_graph = (reference, EquivalenceGraph.from_equivalents(substitutes))
+            return self._reference_graph[1]
+        if self.closure is not None and self.closure.is_ready:
+            return self.closure.graph
+        if self.graph is not None:
+            return self.graph
+        return _get_demo_graph()
     
-    def _select_search_strategy(self, input_data: AlgorithmInput) -> SearchStrategy:
+    def _select_search_limits(self, input_data: AlgorithmInput) -> Tuple[int, float]:
         """
-        Selecciona estrategia basado en criticality.
-        - CRITICAL: DFS (exploración profunda, máxima compatibilidad)
-        - LOW: BFS (exploración ancha, opciones variadas)
+        Límites de búsqueda según criticality.
+        - CRITICAL: rutas cortas y muy compatibles
+        - LOW: exploración más amplia, opciones variadas
         """
-        if input_data.criticality in ["CRITICAL", "HIGH"]:
-            return SearchStrategy.DFS
-        else:
-            return SearchStrategy.BFS
+        return self.SEARCH_LIMITS.get(input_data.criticality, self.SEARCH_LIMITS["MEDIUM"])
     
-    def _search_dfs(
+    def _search(
         self,
         start_item: str,
-        graph: Dict[str, List[EquivalentNode]],
-        input_data: AlgorithmInput
+        graph: EquivalenceGraph,
+        max_depth: int,
+        min_compatibility: float
     ) -> GraphAnalysis:
-        """Búsqueda DFS (profundidad) en grafo"""
-        visited: Set[str] = set()
-        all_alternatives: List[SubstituteOption] = []
-        max_depth_reached = 0
-        edges_explored = 0
-        
-        def dfs_recursive(node_id: str, path: List[str], depth: int):
-            nonlocal edges_explored, max_depth_reached
-            
-            visited.add(node_id)
-            max_depth_reached = max(max_depth_reached, depth)
-            
-            if node_id not in graph:
-                return
-            
-            for neighbor in graph[node_id]:
-                edges_explored += 1
-                
-                if neighbor.item_id not in visited:
-                    new_path = path + [neighbor.item_id]
-                    
-                    # Evaluar este nodo como alternativa
-                    if not neighbor.is_original and neighbor.item_id != start_item:
-                        option = SubstituteOption(
-                            item_id=neighbor.item_id,
-                            search_depth=depth,
-                            path=new_path,
-                            technical_score=neighbor.technical_compatibility,
-                            cost_score=1 - abs(neighbor.cost_differential),
-                            reliability_score=neighbor.supplier_reliability,
-                            overall_score=0.0,
-                            recommendation="",
-                            alternatives_count=0
-                        )
-                        all_alternatives.append(option)
-                    
-                    # Continuar búsqueda
-                    dfs_recursive(neighbor.item_id, new_path, depth + 1)
-        
-        dfs_recursive(start_item, [start_item], 0)
+        """Búsqueda best-first en grafo y armado de alternativas"""
+        result = graph.search(start_item, max_depth, min_compatibility)
+        alternatives = [
+            self._build_option(graph, result, i)
+            for i in range(len(result))
+        ]
         
         return GraphAnalysis(
-            search_strategy=SearchStrategy.DFS,
-            total_nodes_explored=len(visited),
-            total_edges_explored=edges_explored,
-            max_depth=max_depth_reached,
+            search_strategy=SearchStrategy.BEST_FIRST,
+            total_nodes_explored=len(result) + 1,
+            total_edges_explored=result.edges_explored,
+            max_depth=int(result.depths.max()) if len(result) else 0,
             best_substitute=None,
-            alternatives_found=all_alternatives
+            alternatives_found=alternatives
         )
     
-    def _search_bfs(
+    def _search_closure(
         self,
         start_item: str,
-        graph: Dict[str, List[EquivalentNode]],
-        input_data: AlgorithmInput
+        max_depth: int,
+        min_compatibility: float
     ) -> GraphAnalysis:
-        """Búsqueda BFS (amplitud) en grafo"""
-        visited: Set[str] = set()
-        all_alternatives: List[SubstituteOption] = []
-        queue = deque([(start_item, [start_item], 0)])
-        max_depth_reached = 0
-        edges_explored = 0
-        
-        while queue:
-            current_item, path, depth = queue.popleft()
-            
-            if current_item in visited:
-                continue
-            
-            visited.add(current_item)
-            max_depth_reached = max(max_depth_reached, depth)
-            
-            if current_item not in graph:
-                continue
-            
-            for neighbor in graph[current_item]:
-                edges_explored += 1
-                
-                if neighbor.item_id not in visited:
-                    new_path = path + [neighbor.item_id]
-                    
-                    # Evaluar este nodo como alternativa
-                    if not neighbor.is_original and neighbor.item_id != start_item:
-                        option = SubstituteOption(
-                            item_id=neighbor.item_id,
-                            search_depth=depth,
-                            path=new_path,
-                            technical_score=neighbor.technical_compatibility,
-                            cost_score=1 - abs(neighbor.cost_differential),
-                            reliability_score=neighbor.supplier_reliability,
-                            overall_score=0.0,
-                            recommendation="",
-                            alternatives_count=0
-                        )
-                        all_alternatives.append(option)
-                    
-                    queue.append((neighbor.item_id, new_path, depth + 1))
+        """Alternativas leídas del índice de clausura (O(K), sin recorrer el grafo)"""
+        entries = self.closure.lookup(start_item, max_depth, min_compatibility)
+        alternatives = [
+            SubstituteOption(
+                item_id=entry.item_id,
+                search_depth=entry.depth - 1,
+                path=entry.path,
+                technical_score=entry.score,
+                cost_score=1 - abs(entry.cost_factor - 1),
+                reliability_score=entry.reliability,
+                overall_score=0.0,
+                recommendation="",
+                alternatives_count=0
+            )
+            for entry in entries
+        ]
         
         return GraphAnalysis(
-            search_strategy=SearchStrategy.BFS,
-            total_nodes_explored=len(visited),
-            total_edges_explored=edges_explored,
-            max_depth=max_depth_reached,
+            search_strategy=SearchStrategy.CLOSURE,
+            total_nodes_explored=len(entries) + 1,
+            total_edges_explored=0,
+            max_depth=max((entry.depth for entry in entries), default=0),
             best_substitute=None,
-            alternatives_found=all_alternatives
+            alternatives_found=alternatives
+        )
+    
+    def _build_option(
+        self,
+        graph: EquivalenceGraph,
+        result: SubstituteSearchResult,
+        position: int
+    ) -> SubstituteOption:
+        """Opción para el nodo ``position`` del resultado (atributos agregados por ruta)"""
+        node = int(result.nodes[position])
+        edges = graph.path_edges(result, node)
+        
+        # Diferencial de costo compuesto a lo largo de la ruta
+        cost_factor = 1.0
+        for edge in edges:
+            cost_factor *= 1 + graph.cost_differential[edge]
+        
+        return SubstituteOption(
+            item_id=graph.node_ids[node],
+            search_depth=int(result.depths[position]) - 1,  # 0 = equivalente directo
+            path=graph.path(result, node),
+            technical_score=float(result.scores[position]),
+            cost_score=1 - abs(cost_factor - 1),
+            reliability_score=float(graph.supplier_reliability[edges[-1]]),
+            overall_score=0.0,
+            recommendation="",
+            alternatives_count=0
         )
     
     def _evaluate_alternatives(
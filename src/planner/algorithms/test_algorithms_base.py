@@ -16,6 +16,29 @@ from src.planner.algorithms.base_algorithm import (
     BaseAlgorithm, AlgorithmRegistry, AlgorithmExecutor
 )
 from src.planner.algorithms.reserve_dynamic import ReserveDynamicAlgorithm
+import time
+
+
+class SleepyAlgorithm(BaseAlgorithm):
+    """Algoritmo de prueba con latencia y confianza fijas"""
+    
+    def __init__(self, algorithm_type, delay_s, confidence=0.5):
+        super().__init__(algorithm_type)
+        self.delay_s = delay_s
+        self.confidence = confidence
+    
+    def validate_input(self, input_data):
+        return True, ""
+    
+    def execute(self, input_data):
+        time.sleep(self.delay_s)
+        return AlgorithmOutput(
+            algorithm_type=self.algorithm_type,
+            item_id=input_data.item_id,
+            success=True,
+            status=AlgorithmStatus.RUNNING,
+            confidence_score=self.confidence
+        )
 
 
 class TestBaseAlgorithmInterface:
@@ -306,6 +329,106 @@ class TestAlgorithmExecutor:
         
         assert output.success is False
         assert output.status == AlgorithmStatus.FAILED
+    
+    def _sleepy_executor(self, delays, **kwargs):
+        registry = AlgorithmRegistry()
+        types = list(AlgorithmType)[:len(delays)]
+        for algo_type, (delay, confidence) in zip(types, delays):
+            registry.register(SleepyAlgorithm(algo_type, delay, confidence))
+        return AlgorithmExecutor(registry, **kwargs), types
+    
+    def test_execute_parallel_cuesta_el_maximo(self):
+        """Las vías corren concurrentemente: el tiempo total es el del más lento"""
+        executor, types = self._sleepy_executor([(0.2, 0.3)] * 4 + [(0.0, 0.9)])
+        input_data = AlgorithmInput(item_id="MAT001", demand_quantity=1.0, required_date="2025-01-01")
+        
+        outputs = executor.execute_parallel(types, input_data)
+        
+        assert len(outputs) == 5
+        assert outputs[0].confidence_score == 0.9
+        assert executor.last_run.wall_time_ms < 600
+        assert executor.last_run.total_algorithm_time_ms >= 800
+        assert set(executor.last_run.statuses.values()) == {"completed"}
+        executor.shutdown()
+    
+    def test_execute_parallel_timeout_por_algoritmo(self):
+        """Un algoritmo lento queda en TIMEOUT sin frenar al resto"""
+        executor, types = self._sleepy_executor([(0.0, 0.5), (1.0, 0.9)])
+        input_data = AlgorithmInput(item_id="MAT001", demand_quantity=1.0, required_date="2025-01-01")
+        
+        outputs = executor.execute_parallel(types, input_data, select_best=False, timeout_s={types[1]: 0.1})
+        
+        assert outputs[0].status == AlgorithmStatus.COMPLETED
+        assert outputs[1].status == AlgorithmStatus.TIMEOUT
+        assert outputs[1].success is False
+        assert executor.last_run.timeouts == [types[1].value]
+        assert executor.last_run.wall_time_ms < 900
+        executor.shutdown(wait=False)
+    
+    def test_execute_parallel_primer_resultado_aceptable(self):
+        """Con accept_confidence corta al primer resultado suficientemente bueno"""
+        executor, types = self._sleepy_executor([(0.0, 0.95), (1.0, 0.99)], max_workers=2)
+        input_data = AlgorithmInput(item_id="MAT001", demand_quantity=1.0, required_date="2025-01-01")
+        
+        outputs = executor.execute_parallel(types, input_data, accept_confidence=0.9)
+        
+        assert [o.algorithm_type for o in outputs] == [types[0]]
+        assert executor.last_run.accepted_by == types[0].value
+        # La otra vía ya corría: no se pudo cancelar, queda abandonada
+        assert executor.last_run.cancelled == []
+        assert executor.last_run.abandoned == [types[1].value]
+        assert executor.get_telemetry()["early_accepts"] == 1
+        executor.shutdown(wait=False)
+    
+    def test_execute_parallel_pool_saturado_usa_pool_dedicado(self):
+        """Solo se cuenta como cancelado lo que no arrancó; lo abandonado no bloquea la próxima corrida"""
+        executor, types = self._sleepy_executor([(0.5, 0.9), (0.5, 0.9), (0.0, 0.8)], max_workers=1)
+        input_data = AlgorithmInput(item_id="MAT001", demand_quantity=1.0, required_date="2025-01-01")
+        
+        executor.execute_parallel(types[:2], input_data, timeout_s=0.1)
+        
+        run = executor.last_run
+        assert run.timeouts == [types[0].value, types[1].value]
+        assert run.abandoned == [types[0].value]  # Corriendo en el único worker
+        assert run.cancelled == [types[1].value]  # En cola: cancelado de verdad
+        assert executor.get_telemetry()["abandoned_running"] == 1
+        
+        outputs = executor.execute_parallel([types[2]], input_data, timeout_s=0.2)
+        
+        assert outputs[0].status == AlgorithmStatus.COMPLETED
+        assert executor.last_run.dedicated_pool is True
+        assert executor.get_telemetry()["dedicated_pools"] == 1
+        
+        time.sleep(0.6)
+        assert executor.get_telemetry()["abandoned_running"] == 0
+        executor.execute_parallel([types[2]], input_data)
+        assert executor.last_run.dedicated_pool is False
+        executor.shutdown()
+    
+    def test_execute_parallel_tope_de_pools_dedicados_rechaza(self):
+        """Con el compartido saturado y el tope de dedicados alcanzado no se crean más pools"""
+        executor, types = self._sleepy_executor(
+            [(0.5, 0.9), (0.5, 0.9), (0.0, 0.8)], max_workers=1, max_dedicated_pools=1
+        )
+        input_data = AlgorithmInput(item_id="MAT001", demand_quantity=1.0, required_date="2025-01-01")
+        
+        executor.execute_parallel([types[0]], input_data, timeout_s=0.05)  # Satura el compartido
+        executor.execute_parallel([types[1]], input_data, timeout_s=0.05)  # Dedicado, queda abandonado
+        assert executor.last_run.dedicated_pool is True
+        assert executor.get_telemetry()["dedicated_running"] == 1
+        
+        outputs = executor.execute_parallel([types[2]], input_data, timeout_s=0.2)
+        
+        assert outputs[0].status == AlgorithmStatus.TIMEOUT
+        assert executor.last_run.rejected is True
+        assert executor.last_run.timeouts == [types[2].value]
+        assert executor.get_telemetry()["rejected_runs"] == 1
+        
+        time.sleep(0.6)
+        assert executor.get_telemetry()["dedicated_running"] == 0
+        outputs = executor.execute_parallel([types[2]], input_data)
+        assert outputs[0].status == AlgorithmStatus.COMPLETED
+        executor.shutdown()
 
 
 class TestIntegration:
@@ -0,0 +1,77 @@
+"""
+Tests para la planificación por lotes
+
+Cubre:
+- Modo en línea (max_workers=0) y pool de procesos
+- Datos de referencia compartidos por worker
+- Streaming y orden de resultados
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.planner.algorithms.base_algorithm import AlgorithmInput, AlgorithmStatus
+from src.planner.algorithms.batch_planner import BatchPlanner, ReferenceData
+from src.planner.algorithms.reserve_dynamic import ReserveDynamicAlgorithm
+
+
+def _inputs(count):
+    required = (datetime.now() + timedelta(days=5)).isoformat()
+    return [
+        AlgorithmInput(
+            item_id=f"MAT{idx:03d}",
+            demand_quantity=10.0,
+            required_date=required,
+            local_stock={"bin_A": float(idx % 3) * 10}
+        )
+        for idx in range(count)
+    ]
+
+
+class TestBatchPlanner:
+    """Tests del planificador por lotes"""
+
+    def test_plan_en_linea_mantiene_indices(self):
+        """Cada resultado conserva la posición del input original"""
+        planner = BatchPlanner([ReserveDynamicAlgorithm()], max_workers=0, chunk_size=4)
+        inputs = _inputs(10)
+
+        results = planner.plan_all(iter(inputs))
+
+        assert [r.index for r in results] == list(range(10))
+        assert [r.item_id for r in results] == [i.item_id for i in inputs]
+        assert all(r.best is not None and r.outputs == [] for r in results)
+        assert results[1].best.status == AlgorithmStatus.COMPLETED
+        assert planner.last_run["items"] == 10
+        assert planner.last_run["chunks"] == 3
+
+    def test_referencia_completa_bom_sin_modificar_input(self):
+        """Los BOMs de la referencia se aplican sobre una copia del input"""
+        reference = ReferenceData(boms={"MAT000": {"COMP-1": 2.0}})
+        planner = BatchPlanner([ReserveDynamicAlgorithm()], reference, max_workers=0, keep_all=True)
+        inputs = _inputs(1)
+
+        prepared = []
+        algo = planner.algorithms[0]
+        original_run = algo.run
+        algo.run = lambda data: prepared.append(data) or original_run(data)
+        planner.plan_all(inputs)
+
+        assert prepared[0].bom_components == {"COMP-1": 2.0}
+        assert prepared[0].execution_context["reference_data"] is reference
+        assert inputs[0].bom_components == {}
+        assert inputs[0].execution_context is None
+
+    def test_plan_en_pool_de_procesos(self):
+        """Con workers los resultados llegan por chunk y cubren todo el lote"""
+        with BatchPlanner([ReserveDynamicAlgorithm()], max_workers=2, chunk_size=8) as planner:
+            results = list(planner.plan(_inputs(40)))
+
+        assert sorted(r.index for r in results) == list(range(40))
+        assert all(r.best.item_id == r.item_id for r in results)
+        assert planner.last_run["chunks"] == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+"""
+Tests para el solver knapsack de desarme
+
+Cubre:
+- DP vectorizada exacta contra fuerza bruta
+- Factibilidad con pesos discretizados hacia arriba
+- Modo FPTAS y su cota de aproximación
+- Integración con DisassemblyKnapsackAlgorithm
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from src.planner.algorithms.base_algorithm import AlgorithmInput, AlgorithmStatus
+from src.planner.algorithms.disassembly_knapsack import (
+    DisassemblyKnapsackAlgorithm,
+    solve_knapsack_dp,
+    solve_knapsack_fptas,
+)
+
+
+def _brute_force(weights, values, capacity):
+    best = 0.0
+    for mask in itertools.product((0, 1), repeat=len(weights)):
+        weight = sum(w for w, m in zip(weights, mask) if m)
+        if weight <= capacity + 1e-9:
+            best = max(best, sum(v for v, m in zip(values, mask) if m))
+    return best
+
+
+class TestKnapsackSolvers:
+    """Tests de los solvers 0/1"""
+
+    def test_dp_coincide_con_fuerza_bruta(self):
+        """Con pesos múltiplos de la resolución la DP es exacta"""
+        rng = np.random.default_rng(7)
+        for _ in range(20):
+            weights = rng.integers(1, 40, size=10) / 10
+            values = rng.uniform(-2, 20, size=10)
+            capacity = float(rng.integers(5, 80)) / 10
+
+            solution = solve_knapsack_dp(weights, values, capacity, resolution=10)
+
+            assert solution.total_value == pytest.approx(_brute_force(weights, values, capacity))
+            assert solution.total_weight <= capacity + 1e-9
+            assert solution.mode == "dp"
+
+    def test_dp_redondea_pesos_hacia_arriba(self):
+        """Un peso apenas mayor a la capacity nunca entra por discretización"""
+        solution = solve_knapsack_dp([1.04, 0.5], [10.0, 1.0], 1.0, resolution=10)
+
+        assert solution.selected == [1]
+
+    def test_fptas_respeta_cota(self):
+        """El modo aproximado logra al menos (1 - eps) del óptimo"""
+        rng = np.random.default_rng(11)
+        for _ in range(10):
+            weights = rng.uniform(0.1, 5.0, size=12)
+            values = rng.uniform(0.5, 30.0, size=12)
+            capacity = float(weights.sum() / 3)
+
+            solution = solve_knapsack_fptas(weights, values, capacity, epsilon=0.1)
+
+            optimum = _brute_force(weights, values, capacity)
+            assert solution.total_value >= 0.9 * optimum - 1e-9
+            assert solution.total_weight <= capacity + 1e-9
+            assert solution.approximation_bound == pytest.approx(0.9)
+
+    def test_fptas_valida_epsilon(self):
+        """epsilon fuera de (0, 1) es un error de configuración"""
+        with pytest.raises(ValueError):
+            solve_knapsack_fptas([1.0], [1.0], 1.0, epsilon=0)
+
+
+class TestDisassemblyKnapsackAlgorithm:
+    """Tests de integración del algoritmo"""
+
+    def _input(self, criticality="MEDIUM"):
+        return AlgorithmInput(
+            item_id="ITEM-001",
+            demand_quantity=10.0,
+            required_date="2030-01-01",
+            local_stock={},
+            criticality=criticality
+        )
+
+    def test_bom_simulado_seleccion_optima(self):
+        """Con el BOM simulado elige el subconjunto de mayor valor bajo capacity"""
+        algo = DisassemblyKnapsackAlgorithm()
+        components = algo._calculate_component_profit(algo._build_bom_components(self._input()), self._input())
+
+        weights = [c.component_cost * c.component_qty for c in components]
+        values = [c.component_value * c.component_qty for c in components]
+
+        analysis = algo._solve_knapsack(components, 10.0, self._input())
+
+        assert analysis.solver_mode == "dp"
+        assert analysis.total_recovery_value == pytest.approx(_brute_force(weights, values, 10.0))
+        assert analysis.total_disassembly_cost <= 10.0
+        assert len(analysis.selected_components) + len(analysis.skipped_components) == len(components)
+
+    def test_instancia_grande_usa_fptas(self):
+        """Por encima de max_dp_cells se cambia al modo aproximado"""
+        algo = DisassemblyKnapsackAlgorithm(max_dp_cells=10)
+
+        output = algo.run(self._input())
+
+        assert output.status == AlgorithmStatus.COMPLETED
+        assert "Solución aproximada (fptas" in output.reasoning
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
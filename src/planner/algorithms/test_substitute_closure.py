@@ -0,0 +1,129 @@
+"""
+Tests para el índice de clausura de sustitutos
+
+Cubre:
+- Top-K coincide con la búsqueda best-first del grafo
+- Ediciones incrementales (solo ancestros) equivalentes a un rebuild completo
+- Persistencia .npz y construcción en background
+- Lectura desde SubstitutesGraphAlgorithm
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from src.planner.algorithms.base_algorithm import AlgorithmInput
+from src.planner.algorithms.equivalence_graph import EquivalenceGraph
+from src.planner.algorithms.substitute_closure import SubstituteClosureIndex
+from src.planner.algorithms.substitutes_graph import SearchStrategy, SubstitutesGraphAlgorithm
+from src.planner.models.items import EquivalentItem
+
+
+def _equiv(item_id, match, cost=0.0, reliability=0.9):
+    return EquivalentItem(
+        equivalent_id=item_id,
+        equivalent_code=item_id,
+        technical_specs_match=match,
+        cost_differential=cost,
+        supplier_reliability=reliability,
+        lead_time_delta=timedelta(days=1)
+    )
+
+
+def _graph():
+    return EquivalenceGraph.from_equivalents({
+        "A": [_equiv("B", 0.9), _equiv("C", 0.95)],
+        "B": [_equiv("D", 0.9, cost=0.10)],
+        "C": [_equiv("D", 0.5)],
+        "D": [_equiv("E", 0.8, reliability=0.7)],
+        "X": [_equiv("Y", 0.9)],
+    })
+
+
+def _rows(index):
+    return {
+        item_id: [(e.item_id, round(e.score, 5), e.depth, tuple(e.path)) for e in index.lookup(item_id)]
+        for item_id in index.graph.node_ids
+    }
+
+
+class TestSubstituteClosureIndex:
+    """Tests del índice top-K"""
+
+    def test_lookup_con_rutas_y_atributos(self):
+        """Cada entrada trae score, ruta y atributos agregados de la mejor ruta"""
+        index = SubstituteClosureIndex(_graph(), k=3)
+        index.rebuild()
+
+        entries = index.lookup("A")
+
+        assert [e.item_id for e in entries] == ["C", "B", "D"]   # k=3 corta E
+        assert entries[2].path == ["A", "B", "D"]
+        assert entries[2].cost_factor == pytest.approx(1.10)
+        assert index.lookup("A", max_depth=1)[1].item_id == "B"
+        assert [e.item_id for e in index.lookup("A", min_compatibility=0.9)] == ["C", "B"]
+        assert index.lookup("NO-EXISTE") == []
+
+    def test_ediciones_incrementales_igual_a_rebuild(self):
+        """Agregar y quitar aristas recalcula solo ancestros y coincide con un rebuild"""
+        index = SubstituteClosureIndex(_graph(), k=5)
+        index.rebuild()
+
+        rows = index.add_equivalence("D", _equiv("F", 0.95))
+        assert rows == 4                                  # D, B, C, A (X no alcanza a D)
+        fresh = SubstituteClosureIndex(index.graph, k=5)
+        fresh.rebuild()
+        assert _rows(index) == _rows(fresh)
+        assert "F" in [e.item_id for e in index.lookup("A")]
+
+        index.remove_equivalence("B", "D")
+        fresh = SubstituteClosureIndex(index.graph, k=5)
+        fresh.rebuild()
+        assert _rows(index) == _rows(fresh)
+        assert index.lookup("A")[2].path == ["A", "C", "D"]
+        assert index.remove_equivalence("B", "NO-EXISTE") == 0
+
+    def test_edicion_publica_un_snapshot_nuevo(self):
+        """Grafo y tabla se reemplazan juntos; el snapshot anterior queda intacto"""
+        index = SubstituteClosureIndex(_graph(), k=5)
+        index.rebuild()
+        old_graph, old_table = before = index._snapshot
+        old_nodes = old_table.node.copy()
+
+        index.add_equivalence("D", _equiv("F", 0.95))
+
+        graph, table = index._snapshot
+        assert index._snapshot is not before
+        assert graph is index.graph and graph is not old_graph
+        assert table.node.shape[0] == graph.node_count > old_graph.node_count
+        assert (old_table.node == old_nodes).all()
+
+    def test_persistencia_y_build_en_background(self, tmp_path):
+        """rebuild_async guarda el índice y load lo deja listo para consultar"""
+        path = tmp_path / "closure.npz"
+        index = SubstituteClosureIndex(_graph(), k=4)
+        assert not index.is_ready
+
+        index.rebuild_async(path=str(path)).join(timeout=10)
+        loaded = SubstituteClosureIndex.load(str(path))
+
+        assert index.is_ready and loaded.is_ready
+        assert (loaded.k, loaded.max_depth) == (4, 5)
+        assert _rows(loaded) == _rows(index)
+
+    def test_algoritmo_lee_la_clausura(self):
+        """Con el índice construido execute no recorre el grafo"""
+        index = SubstituteClosureIndex(_graph())
+        index.rebuild()
+        algo = SubstitutesGraphAlgorithm(closure=index)
+        data = AlgorithmInput(item_id="A", demand_quantity=1.0, required_date="2030-01-01")
+
+        output = algo.run(data)
+
+        assert output.selected_option == "substitute_found"
+        assert algo.search_strategy == SearchStrategy.CLOSURE
+        assert "Nodos explorados" in output.reasoning
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,136 @@
+"""
+Tests para el grafo de equivalencias y SubstitutesGraphAlgorithm
+
+Cubre:
+- Construcción CSR desde EquivalentItem y persistencia .npz
+- Búsqueda best-first con poda y reconstrucción de rutas
+- Memoización de alcanzables
+- Fuentes del grafo en el algoritmo (ejemplo, inyectado, referencia del lote)
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from src.planner.algorithms.base_algorithm import AlgorithmInput, AlgorithmStatus
+from src.planner.algorithms.batch_planner import ReferenceData
+from src.planner.algorithms.equivalence_graph import EquivalenceGraph
+from src.planner.algorithms.substitutes_graph import SubstitutesGraphAlgorithm
+from src.planner.models.items import EquivalentItem
+
+
+def _equiv(item_id, match, cost=0.0, reliability=0.9, days=0):
+    return EquivalentItem(
+        equivalent_id=item_id,
+        equivalent_code=item_id,
+        technical_specs_match=match,
+        cost_differential=cost,
+        supplier_reliability=reliability,
+        lead_time_delta=timedelta(days=days)
+    )
+
+
+def _graph():
+    # A → B (0.9) → D (0.9): 0.81 gana a A → C (0.95) → D (0.5): 0.475
+    return EquivalenceGraph.from_equivalents({
+        "A": [_equiv("C", 0.95), _equiv("B", 0.9)],
+        "B": [_equiv("D", 0.9, cost=0.10)],
+        "C": [_equiv("D", 0.5), _equiv("A", 1.0)],
+        "D": [_equiv("E", 0.6)],
+    })
+
+
+def _input(item_id, criticality="MEDIUM", context=None):
+    return AlgorithmInput(
+        item_id=item_id,
+        demand_quantity=5.0,
+        required_date="2030-01-01",
+        criticality=criticality,
+        execution_context=context
+    )
+
+
+class TestEquivalenceGraph:
+    """Tests del almacén CSR"""
+
+    def test_csr_ordenado_por_compatibilidad(self):
+        """Cada fila queda ordenada por compatibilidad descendente"""
+        graph = _graph()
+        a = graph.index["A"]
+        row = slice(graph.indptr[a], graph.indptr[a + 1])
+
+        assert [graph.node_ids[i] for i in graph.indices[row]] == ["C", "B"]
+        assert graph.edge_count == 6
+        assert graph.out_degree("E") == 0
+        assert graph.out_degree("Z") == 0
+
+    def test_best_first_mejor_ruta_y_poda(self):
+        """Cada nodo se alcanza por la ruta de mayor producto de compatibilidades"""
+        graph = _graph()
+        result = graph.search("A", max_depth=4, min_compatibility=0.5)
+        found = {graph.node_ids[n]: (s, d) for n, s, d in zip(result.nodes, result.scores, result.depths)}
+
+        assert list(found) == ["C", "B", "D"]          # E queda podado (0.81*0.6 < 0.5)
+        assert found["D"] == (pytest.approx(0.81), 2)
+        assert graph.path(result, graph.index["D"]) == ["A", "B", "D"]
+        assert graph.reachable("A", 1, 0.5).tolist() == [graph.index["C"], graph.index["B"]]
+
+    def test_busqueda_memoizada(self):
+        """La misma consulta devuelve el resultado cacheado"""
+        graph = _graph()
+
+        assert graph.search("A", 3, 0.4) is graph.search("A", 3, 0.4)
+        graph.clear_memo()
+        assert len(graph.search("A", 3, 0.4)) == 4
+
+    def test_persistencia_npz(self, tmp_path):
+        """save/load conserva nodos, aristas y atributos"""
+        graph = _graph()
+        path = tmp_path / "equivalencias.npz"
+        graph.save(str(path))
+
+        loaded = EquivalenceGraph.load(str(path))
+
+        assert loaded.node_ids == graph.node_ids
+        assert loaded.indices.tolist() == graph.indices.tolist()
+        assert loaded.cost_differential.tolist() == graph.cost_differential.tolist()
+
+
+class TestSubstitutesGraphAlgorithm:
+    """Tests del algoritmo sobre el grafo indexado"""
+
+    def test_grafo_de_ejemplo(self):
+        """Sin grafo cargado usa las equivalencias de ejemplo de ITEM-001"""
+        output = SubstitutesGraphAlgorithm().run(_input("ITEM-001"))
+
+        assert output.status == AlgorithmStatus.COMPLETED
+        assert output.selected_option == "substitute_found"
+        assert "EQUIV-001-A" in output.reasoning
+
+    def test_grafo_inyectado_y_criticidad(self):
+        """CRITICAL restringe la búsqueda a rutas muy compatibles"""
+        algo = SubstitutesGraphAlgorithm(_graph())
+        analysis = algo._search("A", algo.graph, *algo._select_search_limits(_input("A", "CRITICAL")))
+
+        assert sorted(o.item_id for o in analysis.alternatives_found) == ["B", "C", "D"]
+        option_d = next(o for o in analysis.alternatives_found if o.item_id == "D")
+        assert option_d.path == ["A", "B", "D"]
+        assert option_d.search_depth == 1
+        assert option_d.cost_score == pytest.approx(0.9)
+
+    def test_sustitutos_desde_referencia_del_lote(self):
+        """Los sustitutos de ReferenceData tienen prioridad y se indexan una vez"""
+        reference = ReferenceData(substitutes={"MAT-1": [_equiv("MAT-2", 0.9)]})
+        algo = SubstitutesGraphAlgorithm()
+
+        output = algo.run(_input("MAT-1", context={"reference_data": reference}))
+        graph = algo._reference_graph[1]
+        algo.run(_input("MAT-1", context={"reference_data": reference}))
+
+        assert output.selected_option == "substitute_found"
+        assert algo._reference_graph[1] is graph
+        assert algo.run(_input("MAT-9")).selected_option == "substitute_none"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
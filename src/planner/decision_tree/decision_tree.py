@@ -16,14 +16,27 @@ Flujo:
 12. Resultado final
 
 Cada nodo tiene gates (puertas de decisión) que determinan si continuar.
+
+Un gate puede ser:
+- Declarativo (``field`` + ``operator`` + ``threshold``/``reference_field``):
+  se evalúa igual sobre un dict, un objeto o columnas NumPy
+- Opaco (``condition_func``): se evalúa fila por fila
+- Sin condición: siempre abre
+
+``CompiledDecisionTree`` aplana el árbol en tablas de nodos y gates (índices
+de éxito/falla, rango de gates por nodo) para evaluarlo sin recorrer objetos
+y, en lote, sobre columnas de contextos.
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Callable, Tuple, Union
+from typing import Dict, List, Optional, Any, Callable, Mapping, Tuple, Union
 from enum import Enum
 import logging
+import operator as _operator
 from datetime import datetime
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,6 +69,22 @@ class GateType(Enum):
     COMPLEX = "complex"                   # Decision lógica compleja
 
 
+GATE_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    ">=": _operator.ge,
+    ">": _operator.gt,
+    "<=": _operator.le,
+    "<": _operator.lt,
+    "==": _operator.eq,
+    "!=": _operator.ne,
+}
+
+
+def _context_value(context: Union[Mapping[str, Any], Any], name: str) -> Any:
+    if isinstance(context, Mapping):
+        return context[name]
+    return getattr(context, name)
+
+
 @dataclass
 class Gate:
     """Puerta de decisión en un nodo."""
@@ -65,11 +94,37 @@ class Gate:
     condition_func: Optional[Callable[[Union[Dict[str, Any], Any]], bool]] = None
     threshold: Optional[float] = None
     
-    def evaluate(self, context: Union[Dict[str, Any], Any]) -> bool:
-        """Evalúa si el gate se abre (True) o cierra (False)."""
+    # Condición declarativa: context[field] <operator> (context[reference_field] o threshold)
+    field: Optional[str] = None
+    operator: str = ">="
+    reference_field: Optional[str] = None
+    
+    def __post_init__(self):
+        if self.operator not in GATE_OPERATORS:
+            raise ValueError(f"Operador de gate no soportado: {self.operator}")
+    
+    @property
+    def is_declarative(self) -> bool:
+        """True si el gate se puede evaluar sobre columnas (sin condition_func)"""
+        return self.condition_func is None
+    
+    def evaluate(self, context: Union[Dict[str, Any], Any]) -> Any:
+        """
+        Evalúa si el gate se abre (True) o cierra (False).
+        
+        Con condición declarativa ``context`` puede ser un dict de columnas
+        NumPy; el resultado es entonces un array booleano.
+        """
         if self.condition_func:
             return self.condition_func(context)
-        return True
+        if self.field is None:
+            return True
+        value = _context_value(context, self.field)
+        if self.reference_field is not None:
+            reference = _context_value(context, self.reference_field)
+        else:
+            reference = self.threshold if self.threshold is not None else 0.0
+        return GATE_OPERATORS[self.operator](value, reference)
 
 
 @dataclass
@@ -243,14 +298,26 @@ class DecisionTreeBuilder:
         gate_id: str,
         gate_type: GateType,
         description: str,
-        condition_func: Optional[Callable] = None
+        condition_func: Optional[Callable] = None,
+        threshold: Optional[float] = None,
+        field: Optional[str] = None,
+        operator: str = ">=",
+        reference_field: Optional[str] = None
     ) -> "DecisionTreeBuilder":
-        """Agrega un gate a un nodo."""
+        """
+        Agrega un gate a un nodo.
+        
+        Sin ``condition_func``, ``field``/``operator``/``threshold``/``reference_field``
+        definen una condición declarativa (evaluable en lote).
+        """
         if node_id not in self.all_nodes:
             raise ValueError(f"Nodo {node_id} no existe")
         
         node = self.all_nodes[node_id]
-        gate = Gate(gate_id, gate_type, description, condition_func)
+        gate = Gate(
+            gate_id, gate_type, description, condition_func, threshold,
+            field=field, operator=operator, reference_field=reference_field
+        )
         node.add_gate(gate)
         
         return self
@@ -292,6 +359,242 @@ class DecisionTreeBuilder:
     def get_all_nodes(self) -> Dict[str, DecisionNode]:
         """Retorna todos los nodos."""
         return self.all_nodes.copy()
+    
+    def compile(self) -> "CompiledDecisionTree":
+        """Compila el árbol a tablas planas (ver CompiledDecisionTree)."""
+        return CompiledDecisionTree.from_root(self.build())
+
+
+@dataclass
+class CompiledTreeResult:
+    """
+    Resultado de evaluar un lote de contextos sobre un árbol compilado.
+    
+    Una fila por contexto; los nodos y gates se refieren a los índices de
+    ``tree.node_ids`` / ``tree.gates``.
+    """
+    tree: "CompiledDecisionTree"
+    route_nodes: np.ndarray      # (n, max_depth) int32, índices de nodos visitados en orden; -1 = vacío
+    failed_gates: np.ndarray     # (n, n_gates) bool, gates evaluados que cerraron
+    final_node: np.ndarray       # (n,) int32, nodo terminal; -1 = profundidad máxima alcanzada
+    success: np.ndarray          # (n,) bool
+    
+    def __len__(self) -> int:
+        return self.final_node.shape[0]
+    
+    @property
+    def route_number(self) -> np.ndarray:
+        """Número de vía (SourceRoute.value) del nodo terminal; 0 sin resultado"""
+        table = np.append(self.tree.route_number, 0)
+        return table[self.final_node]
+    
+    @property
+    def lead_time(self) -> np.ndarray:
+        """Lead time estimado del resultado (inf en falla, 0 sin resultado)"""
+        table = np.append(self.tree.lead_time, 0.0)
+        return np.where(self.success | (self.final_node < 0), table[self.final_node], np.inf)
+    
+    @property
+    def cost(self) -> np.ndarray:
+        """Costo estimado del resultado (inf en falla, 0 sin resultado)"""
+        table = np.append(self.tree.cost, 0.0)
+        return np.where(self.success | (self.final_node < 0), table[self.final_node], np.inf)
+    
+    def visited(self, i: int) -> List[str]:
+        """IDs de nodos visitados por la fila ``i``, en orden"""
+        return [self.tree.node_ids[k] for k in self.route_nodes[i] if k >= 0]
+    
+    def failed_gate_ids(self, i: int) -> List[str]:
+        """IDs de gates que cerraron en la fila ``i``"""
+        return [self.tree.gates[g].gate_id for g in np.flatnonzero(self.failed_gates[i])]
+    
+    def route_counts(self) -> Dict[str, int]:
+        """Cantidad de filas exitosas por vía"""
+        finals, counts = np.unique(self.final_node[self.success], return_counts=True)
+        return {self.tree.routes[k].name: int(c) for k, c in zip(finals, counts)}
+    
+    def to_path(self, i: int, path_id: str, item_id: str, demand_quantity: float,
+                required_date: str) -> ExecutionPath:
+        """Materializa la fila ``i`` como ExecutionPath"""
+        path = ExecutionPath(
+            path_id=path_id,
+            item_id=item_id,
+            demand_quantity=demand_quantity,
+            required_date=required_date
+        )
+        failed_by_node: Dict[int, List[str]] = {}
+        for g in np.flatnonzero(self.failed_gates[i]).tolist():
+            failed_by_node.setdefault(int(self.tree.gate_node[g]), []).append(self.tree.gates[g].gate_id)
+        for k in self.route_nodes[i].tolist():
+            if k < 0:
+                break
+            node_failed = failed_by_node.get(k, [])
+            path.add_node_visit(self.tree.node_ids[k], not node_failed, node_failed)
+        k = int(self.final_node[i])
+        if k >= 0:
+            ok = bool(self.success[i])
+            path.set_result(
+                success=ok,
+                route=self.tree.routes[k],
+                source=self.tree.names[k],
+                lead_time=float(self.tree.lead_time[k]) if ok else float('inf'),
+                cost=float(self.tree.cost[k]) if ok else float('inf')
+            )
+        return path
+
+
+class CompiledDecisionTree:
+    """
+    Árbol de decisión aplanado.
+    
+    Tablas por nodo (índice = posición en ``node_ids``, raíz = 0):
+    - on_success / on_failure: índice del siguiente nodo; -1 = terminal
+    - gate_start: los gates del nodo k son ``gates[gate_start[k]:gate_start[k+1]]``
+    - route_number, lead_time, cost, names, routes: metadata del resultado
+    
+    Los gates declarativos se evalúan una vez por lote sobre columnas; los
+    opacos (``condition_func``) solo para las filas que llegan a su nodo.
+    """
+    
+    def __init__(self, nodes: List[DecisionNode]):
+        self.node_ids: List[str] = [n.node_id for n in nodes]
+        self.names: List[str] = [n.name for n in nodes]
+        self.routes: List[SourceRoute] = [n.route for n in nodes]
+        index = {node_id: k for k, node_id in enumerate(self.node_ids)}
+        
+        def target(node: Optional[DecisionNode]) -> int:
+            return -1 if node is None else index[node.node_id]
+        
+        self.on_success = np.array([target(n.next_on_success) for n in nodes], dtype=np.int32)
+        self.on_failure = np.array([target(n.next_on_failure) for n in nodes], dtype=np.int32)
+        self.route_number = np.array([n.route.value for n in nodes], dtype=np.int32)
+        self.lead_time = np.array([n.estimated_lead_time_days for n in nodes], dtype=np.float64)
+        self.cost = np.array([n.estimated_cost for n in nodes], dtype=np.float64)
+        
+        self.gates: List[Gate] = [gate for n in nodes for gate in n.gates]
+        self.gate_start = np.cumsum([0] + [len(n.gates) for n in nodes]).astype(np.int32)
+        self.gate_node = np.repeat(np.arange(len(nodes), dtype=np.int32), np.diff(self.gate_start))
+        self.declarative = np.array([g.is_declarative for g in self.gates], dtype=bool)
+        self.fields = sorted({
+            name for g in self.gates if g.is_declarative
+            for name in (g.field, g.reference_field) if name is not None
+        })
+    
+    @classmethod
+    def from_root(cls, root: DecisionNode) -> "CompiledDecisionTree":
+        """Compila los nodos alcanzables desde ``root`` (en orden BFS)"""
+        nodes, seen, queue = [], {root.node_id}, [root]
+        while queue:
+            node = queue.pop(0)
+            nodes.append(node)
+            for child in (node.next_on_success, node.next_on_failure):
+                if child is not None and child.node_id not in seen:
+                    seen.add(child.node_id)
+                    queue.append(child)
+        return cls(nodes)
+    
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+    
+    def _evaluate_gate(self, gate: Gate, context: Any) -> bool:
+        try:
+            return bool(gate.evaluate(context))
+        except Exception as e:
+            logger.error(f"Error evaluando gate {gate.gate_id}: {e}")
+            return False
+    
+    def run(self, context: Any, max_depth: int = 12) -> Tuple[List[Tuple[int, List[str]]], int, bool]:
+        """
+        Evalúa un contexto (dict u objeto).
+        
+        Returns:
+            (visitas [(nodo, gates_fallidos)], nodo_terminal o -1, éxito)
+        """
+        visits: List[Tuple[int, List[str]]] = []
+        k = 0
+        for _ in range(max_depth):
+            failed = [
+                gate.gate_id
+                for gate in self.gates[self.gate_start[k]:self.gate_start[k + 1]]
+                if not self._evaluate_gate(gate, context)
+            ]
+            visits.append((k, failed))
+            following = self.on_failure[k] if failed else self.on_success[k]
+            if following < 0:
+                return visits, k, not failed
+            k = int(following)
+        return visits, -1, False
+    
+    def evaluate_columns(
+        self,
+        columns: Mapping[str, Any],
+        n: Optional[int] = None,
+        row_context: Optional[Callable[[int], Any]] = None,
+        max_depth: int = 12
+    ) -> CompiledTreeResult:
+        """
+        Evalúa un lote de contextos dados como columnas.
+        
+        Args:
+            columns: Campo → array (n,) (o escalar común al lote); debe
+                incluir ``self.fields``
+            n: Tamaño del lote (default: largo de la primera columna)
+            row_context: Contexto de la fila i para gates opacos (default:
+                dict con los valores de ``columns`` en esa fila)
+            max_depth: Profundidad máxima del recorrido
+        """
+        if n is None:
+            n = len(next(iter(columns.values()))) if columns else 0
+        if row_context is None:
+            def row_context(i: int) -> Dict[str, Any]:
+                return {name: (col[i] if np.ndim(col) else col) for name, col in columns.items()}
+        
+        gate_open = np.ones((n, len(self.gates)), dtype=bool)
+        for g, gate in enumerate(self.gates):
+            if gate.is_declarative and gate.field is not None:
+                gate_open[:, g] = np.broadcast_to(np.asarray(gate.evaluate(columns), dtype=bool), (n,))
+        
+        route_nodes = np.full((n, max_depth), -1, dtype=np.int32)
+        final_node = np.full(n, -1, dtype=np.int32)
+        success = np.zeros(n, dtype=bool)
+        visited = np.zeros((n, len(self.node_ids)), dtype=bool)
+        current = np.zeros(n, dtype=np.int32)
+        active = np.arange(n)
+        opaque = np.flatnonzero(~self.declarative)
+        
+        for step in range(max_depth):
+            if active.size == 0:
+                break
+            nodes = current[active]
+            route_nodes[active, step] = nodes
+            visited[active, nodes] = True
+            
+            # Gates opacos: solo filas que están en su nodo
+            for g in opaque:
+                rows = active[nodes == self.gate_node[g]]
+                for i in rows:
+                    gate_open[i, g] = self._evaluate_gate(self.gates[g], row_context(int(i)))
+            
+            # El nodo pasa si ninguno de sus gates cerró
+            own = self.gate_node[None, :] == nodes[:, None]
+            passed = ~(own & ~gate_open[active]).any(axis=1)
+            
+            following = np.where(passed, self.on_success[nodes], self.on_failure[nodes])
+            done = following < 0
+            final_node[active[done]] = nodes[done]
+            success[active[done]] = passed[done]
+            current[active] = following
+            active = active[~done]
+        
+        failed_gates = ~gate_open & visited[:, self.gate_node]
+        return CompiledTreeResult(
+            tree=self,
+            route_nodes=route_nodes,
+            failed_gates=failed_gates,
+            final_node=final_node,
+            success=success
+        )
 
 
 def create_standard_decision_tree() -> DecisionTreeBuilder:
@@ -6,16 +6,22 @@ Responsabilidades:
 - Evaluar contexto en cada nodo
 - Registrar ejecución
 - Retornar camino y resultado
+
+El árbol se compila una vez (``CompiledDecisionTree``); ``evaluate_batch`` /
+``evaluate_columns`` lo evalúan vectorizado para lotes grandes (simulaciones
+what-if) y devuelven rutas y gates fallidos por fila sin crear objetos.
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Mapping, Optional, Any, Sequence, Tuple
 from datetime import datetime
 import logging
 
+import numpy as np
+
 from .decision_tree import (
-    DecisionNode, ExecutionPath, DecisionTreeBuilder, 
-    create_standard_decision_tree, SourceRoute, GateType
+    DecisionNode, ExecutionPath, DecisionTreeBuilder, CompiledDecisionTree,
+    CompiledTreeResult, create_standard_decision_tree, SourceRoute, GateType
 )
 
 logger = logging.getLogger(__name__)
@@ -71,6 +77,33 @@ class ExecutionContext:
         }
 
 
+# Campos visibles para los gates → accessor sobre ExecutionContext
+CONTEXT_ACCESSORS: Dict[str, Callable[[ExecutionContext], Any]] = {
+    "item_id": lambda c: c.item_id,
+    "demand": lambda c: c.demand_quantity,
+    "local_stock": lambda c: c.local_stock_available,
+    "local_assets": lambda c: c.local_assets_available,
+    "bom_components": lambda c: c.bom_components_available,
+    "substitutes": lambda c: c.substitutes_available,
+    "transfer_centers": lambda c: c.transfer_centers_available,
+    "intercompany": lambda c: c.intercompany_available,
+    "vmi": lambda c: c.vmi_contract_active,
+    "loan_partner": lambda c: c.loan_partner_available,
+    "days_to_deadline": lambda c: c.days_to_deadline,
+    "can_expedite": lambda c: c.can_expedite,
+    "expedite_budget": lambda c: c.expedite_budget_available,
+    "supplier_available": lambda c: c.supplier_available,
+    "supplier_lead_time": lambda c: c.supplier_lead_time_days,
+    "criticality": lambda c: c.criticality,
+    "budget": lambda c: c.budget_available,
+    "max_cost": lambda c: c.max_acceptable_cost,
+    # Derivados numéricos (para gates declarativos)
+    "bom_count": lambda c: len(c.bom_components_available),
+    "substitutes_count": lambda c: len(c.substitutes_available),
+    "transfer_total": lambda c: sum(c.transfer_centers_available.values()),
+}
+
+
 class DecisionTreeExecutor:
     """Ejecutor del árbol de decisión."""
     
@@ -81,6 +114,7 @@ class DecisionTreeExecutor:
         
         self.tree = tree_builder.build()
         self.all_nodes = tree_builder.get_all_nodes()
+        self.compiled = CompiledDecisionTree.from_root(self.tree)
         self.logger = logger
     
     def execute(
@@ -109,91 +143,97 @@ class DecisionTreeExecutor:
         self.logger.info(f"Iniciando ejecución árbol: {context.item_id}, "
                         f"demanda={context.demand_quantity}, deadline={context.required_date}")
         
-        current_node = self.tree
-        depth = 0
+        compiled = self.compiled
+        visits, final, success = compiled.run(self._context_to_dict(context), max_depth)
+        for k, failed_gates in visits:
+            path.add_node_visit(compiled.node_ids[k], not failed_gates, failed_gates)
+            self.logger.debug(f"Nodo {compiled.node_ids[k]} ({compiled.names[k]}): "
+                            f"gates_pass={not failed_gates}, failed={failed_gates}")
         
-        while current_node is not None and depth < max_depth:
-            # Evaluar gates del nodo actual
-            gates_pass, failed_gates = current_node.evaluate_gates(self._context_to_dict(context))
-            path.add_node_visit(current_node.node_id, gates_pass, failed_gates)
-            
-            self.logger.debug(f"Nodo {current_node.node_id} ({current_node.name}): "
-                            f"gates_pass={gates_pass}, failed={failed_gates}")
-            
-            # Determinar próximo nodo
-            if gates_pass:
-                # Gates abiertos: seguir por success path
-                if current_node.next_on_success is None:
-                    # Nodo terminal
-                    path.set_result(
-                        success=True,
-                        route=current_node.route,
-                        source=current_node.name,
-                        lead_time=current_node.estimated_lead_time_days,
-                        cost=current_node.estimated_cost
-                    )
-                    self.logger.info(f"Ejecución exitosa: ruta={current_node.route.name}")
-                    break
-                
-                current_node = current_node.next_on_success
-            else:
-                # Gates cerrados: seguir por failure path
-                if current_node.next_on_failure is None:
-                    # No hay alternate: fallar
-                    path.set_result(
-                        success=False,
-                        route=current_node.route,
-                        source=current_node.name,
-                        lead_time=float('inf'),
-                        cost=float('inf')
-                    )
-                    self.logger.warning(f"Ejecución fallida en nodo {current_node.node_id}: "
-                                      f"gates={failed_gates}")
-                    break
-                
-                current_node = current_node.next_on_failure
-            
-            depth += 1
-        
-        if depth >= max_depth:
+        if final < 0:
             self.logger.warning(f"Ejecución alcanzó profundidad máxima")
+        elif success:
+            path.set_result(
+                success=True,
+                route=compiled.routes[final],
+                source=compiled.names[final],
+                lead_time=float(compiled.lead_time[final]),
+                cost=float(compiled.cost[final])
+            )
+            self.logger.info(f"Ejecución exitosa: ruta={compiled.routes[final].name}")
+        else:
+            # Gates cerrados sin alternativa: fallar
+            path.set_result(
+                success=False,
+                route=compiled.routes[final],
+                source=compiled.names[final],
+                lead_time=float('inf'),
+                cost=float('inf')
+            )
+            self.logger.warning(f"Ejecución fallida en nodo {compiled.node_ids[final]}: "
+                              f"gates={visits[-1][1]}")
         
         return path
     
     def execute_batch(
         self,
-        contexts: List[ExecutionContext]
+        contexts: List[ExecutionContext],
+        max_depth: int = 12
     ) -> List[ExecutionPath]:
-        """Ejecuta múltiples contextos."""
-        paths = []
-        for context in contexts:
-            path = self.execute(context)
-            paths.append(path)
+        """Ejecuta múltiples contextos (evaluación compilada en lote)."""
+        result = self.evaluate_batch(contexts, max_depth)
+        stamp = datetime.now().isoformat()
+        return [
+            result.to_path(
+                i, f"{context.item_id}_{stamp}_{i}",
+                context.item_id, context.demand_quantity, context.required_date
+            )
+            for i, context in enumerate(contexts)
+        ]
+    
+    def evaluate_batch(
+        self,
+        contexts: Sequence[ExecutionContext],
+        max_depth: int = 12
+    ) -> CompiledTreeResult:
+        """
+        Evalúa el árbol para un lote de contextos sin crear ExecutionPath.
+        
+        Solo se extraen las columnas que usan los gates declarativos; los
+        gates con ``condition_func`` reciben el dict de la fila.
+        """
+        columns = {
+            name: np.array([CONTEXT_ACCESSORS[name](c) for c in contexts])
+            for name in self.compiled.fields
+        }
+        return self.compiled.evaluate_columns(
+            columns,
+            n=len(contexts),
+            row_context=lambda i: self._context_to_dict(contexts[i]),
+            max_depth=max_depth
+        )
+    
+    def evaluate_columns(
+        self,
+        columns: Mapping[str, Any],
+        n: Optional[int] = None,
+        max_depth: int = 12
+    ) -> CompiledTreeResult:
+        """
+        Evalúa el árbol sobre columnas ya armadas (campos de CONTEXT_ACCESSORS).
         
-        return paths
+        Para simulaciones what-if: barrer parámetros como arrays sin
+        construir un ExecutionContext por escenario.
+        """
+        result = self.compiled.evaluate_columns(columns, n=n, max_depth=max_depth)
+        unfinished = int((result.final_node < 0).sum())
+        if unfinished:
+            self.logger.warning(f"{unfinished} ejecuciones alcanzaron profundidad máxima")
+        return result
     
     def _context_to_dict(self, context: ExecutionContext) -> Dict[str, Any]:
         """Convierte ExecutionContext a diccionario para gates."""
-        return {
-            "item_id": context.item_id,
-            "demand": context.demand_quantity,
-            "local_stock": context.local_stock_available,
-            "local_assets": context.local_assets_available,
-            "bom_components": context.bom_components_available,
-            "substitutes": context.substitutes_available,
-            "transfer_centers": context.transfer_centers_available,
-            "intercompany": context.intercompany_available,
-            "vmi": context.vmi_contract_active,
-            "loan_partner": context.loan_partner_available,
-            "days_to_deadline": context.days_to_deadline,
-            "can_expedite": context.can_expedite,
-            "expedite_budget": context.expedite_budget_available,
-            "supplier_available": context.supplier_available,
-            "supplier_lead_time": context.supplier_lead_time_days,
-            "criticality": context.criticality,
-            "budget": context.budget_available,
-            "max_cost": context.max_acceptable_cost
-        }
+        return {name: accessor(context) for name, accessor in CONTEXT_ACCESSORS.items()}
     
     def get_execution_statistics(self, paths: List[ExecutionPath]) -> Dict[str, Any]:
         """Estadísticas de ejecución."""
@@ -8,9 +8,11 @@ Tests:
 - Ejecución de árbol (individual y batch)
 - Evaluación de caminos
 - Gate manager
+- Árbol compilado (gates declarativos, evaluación en lote)
 - Integration tests
 """
 
+import numpy as np
 import pytest
 from datetime import datetime, timedelta
 from typing import List
@@ -563,6 +565,127 @@ class TestGateManager:
         assert 'total_evaluations' in stats
 
 
+def _gated_builder() -> DecisionTreeBuilder:
+    """Árbol chico con gates declarativos y uno opaco"""
+    builder = DecisionTreeBuilder()
+    builder.create_node("stock", SourceRoute.STOCK_LOCAL, "Stock", "Stock local", lead_time=1, cost=10)
+    builder.create_node("transfer", SourceRoute.TRANSFER, "Transferencia", "Otro centro", lead_time=3, cost=35)
+    builder.create_node("expedite", SourceRoute.EXPEDITE, "Acelerar", "Rush", lead_time=1, cost=100)
+    builder.create_node("purchase", SourceRoute.PURCHASE, "Compra", "Proveedor", lead_time=14, cost=50)
+    builder.create_node("final", SourceRoute.FINAL_RESULT, "Resultado Final", "Fin")
+    builder.add_gate_to_node("stock", "gate_stock", GateType.AVAILABILITY, "Stock suficiente",
+                             field="local_stock", reference_field="demand")
+    builder.add_gate_to_node("transfer", "gate_transfer", GateType.AVAILABILITY, "Stock en otros centros",
+                             field="transfer_total", reference_field="demand")
+    builder.add_gate_to_node("transfer", "gate_time", GateType.TIMING, "Hay tiempo",
+                             field="days_to_deadline", threshold=3)
+    builder.add_gate_to_node("expedite", "gate_expedite", GateType.COST, "Presupuesto rush",
+                             condition_func=lambda ctx: ctx["can_expedite"] and ctx["expedite_budget"] > 0)
+    builder.add_gate_to_node("purchase", "gate_supplier", GateType.AVAILABILITY, "Proveedor",
+                             field="supplier_available", operator="==", threshold=True)
+    builder.connect_nodes("stock", "final", "transfer")
+    builder.connect_nodes("transfer", "final", "expedite")
+    builder.connect_nodes("expedite", "final", "purchase")
+    builder.connect_nodes("purchase", "final")
+    return builder
+
+
+def _random_contexts(count: int, seed: int = 11) -> List[ExecutionContext]:
+    rng = np.random.default_rng(seed)
+    return [
+        ExecutionContext(
+            item_id=f"MAT{i:03d}",
+            demand_quantity=100.0,
+            required_date="2026-01-01",
+            local_stock_available=float(rng.integers(0, 200)),
+            transfer_centers_available={"C1": float(rng.integers(0, 80)), "C2": float(rng.integers(0, 80))},
+            days_to_deadline=float(rng.integers(0, 10)),
+            can_expedite=bool(rng.random() < 0.5),
+            expedite_budget_available=float(rng.integers(0, 2)) * 500,
+            supplier_available=bool(rng.random() < 0.8)
+        )
+        for i in range(count)
+    ]
+
+
+class TestCompiledTree:
+    """Tests del árbol compilado y la evaluación en lote"""
+    
+    def test_gate_declarativo(self):
+        """Un gate declarativo evalúa igual sobre objetos, dicts y columnas"""
+        gate = Gate("g", GateType.AVAILABILITY, "Stock", field="local_stock", reference_field="demand")
+        
+        assert gate.evaluate({"local_stock": 100, "demand": 100}) is True
+        assert gate.evaluate({"local_stock": 99, "demand": 100}) is False
+        columns = {"local_stock": np.array([50.0, 150.0]), "demand": np.array([100.0, 100.0])}
+        assert gate.evaluate(columns).tolist() == [False, True]
+        with pytest.raises(ValueError):
+            Gate("g", GateType.COST, "x", field="budget", operator="=>")
+    
+    def test_lote_igual_a_ejecucion_individual(self):
+        """execute_batch reproduce execute fila a fila (nodos, gates fallidos, resultado)"""
+        executor = DecisionTreeExecutor(_gated_builder())
+        contexts = _random_contexts(200)
+        
+        batch = executor.execute_batch(contexts)
+        
+        for context, path in zip(contexts, batch):
+            single = executor.execute(context)
+            assert path.visited_nodes == single.visited_nodes
+            assert path.node_results == single.node_results
+            assert path.final_route == single.final_route
+            assert path.final_success == single.final_success
+            assert path.total_cost == single.total_cost
+        assert len({p.path_id for p in batch}) == len(batch)
+    
+    def test_arbol_estandar_compilado(self):
+        """El árbol estándar se compila con sus 12 nodos y coincide con execute"""
+        executor = DecisionTreeExecutor()
+        context = _random_contexts(1)[0]
+        
+        result = executor.evaluate_batch([context])
+        path = executor.execute(context)
+        
+        assert executor.compiled.node_count == 12
+        assert result.visited(0) == path.visited_nodes
+        assert result.route_number[0] == path.final_route.value
+    
+    def test_evaluate_columns_what_if(self):
+        """Barrido what-if sobre columnas: rutas y gates fallidos por fila"""
+        executor = DecisionTreeExecutor(_gated_builder())
+        stock = np.arange(0, 200, 10, dtype=float)
+        n = len(stock)
+        result = executor.evaluate_columns({
+            "local_stock": stock,
+            "demand": 100.0,
+            "transfer_total": np.full(n, 120.0),
+            "days_to_deadline": np.where(stock < 50, 1.0, 5.0),
+            "supplier_available": True,
+            "can_expedite": False,
+            "expedite_budget": 0.0,
+        })
+        
+        assert result.success.all()
+        assert result.route_number.tolist()[-1] == SourceRoute.FINAL_RESULT.value
+        assert result.failed_gate_ids(0) == ["gate_stock", "gate_time", "gate_expedite"]
+        assert result.failed_gate_ids(6) == ["gate_stock"]
+        assert result.failed_gate_ids(n - 1) == []
+        assert result.visited(0) == ["stock", "transfer", "expedite", "purchase", "final"]
+        assert result.route_counts() == {"FINAL_RESULT": n}
+    
+    def test_profundidad_maxima(self):
+        """Sin nodo terminal dentro de max_depth la fila queda sin resultado"""
+        executor = DecisionTreeExecutor(_gated_builder())
+        contexts = _random_contexts(5)
+        
+        result = executor.evaluate_batch(contexts, max_depth=1)
+        paths = executor.execute_batch(contexts, max_depth=1)
+        
+        assert (result.final_node == -1).all()
+        assert not result.success.any()
+        assert all(p.final_route is None and len(p.visited_nodes) == 1 for p in paths)
+
+
 class TestIntegration:
     """Tests de integración entre componentes"""
     
@@ -12,6 +12,9 @@ from .base_scorer import (
     NormalizedScore,
     ScoringContext,
     ScoringDimension,
+    OptionBatch,
+    ScoredBatch,
+    ScoringSession,
 )
 
 from .criticality_scorer import (
@@ -20,6 +23,7 @@ from .criticality_scorer import (
     ScoringRuleSet,
     DEFAULT_RULES,
     ScoringCutResult,
+    CriticalityCutBatch,
 )
 
 from .feature_extractor import (
@@ -28,6 +32,11 @@ from .feature_extractor import (
     Feature,
     FeatureCategory,
     FeatureStatistics,
+    FeatureColumn,
+    FeatureMatrix,
+    RunningStatistics,
+    PercentileReservoir,
+    FEATURE_SCHEMA,
 )
 
 __all__ = [
@@ -40,6 +49,9 @@ __all__ = [
     "NormalizedScore",
     "ScoringContext",
     "ScoringDimension",
+    "OptionBatch",
+    "ScoredBatch",
+    "ScoringSession",
     
     # Criticality Scorer
     "CriticalityAwareScorer",
@@ -47,6 +59,7 @@ __all__ = [
     "ScoringRuleSet",
     "DEFAULT_RULES",
     "ScoringCutResult",
+    "CriticalityCutBatch",
     
     # Feature Extractor
     "FeatureExtractor",
@@ -54,4 +67,9 @@ __all__ = [
     "Feature",
     "FeatureCategory",
     "FeatureStatistics",
+    "FeatureColumn",
+    "FeatureMatrix",
+    "RunningStatistics",
+    "PercentileReservoir",
+    "FEATURE_SCHEMA",
 ]
@@ -1,14 +1,30 @@
 """
 Motor base de scoring probabilístico
 Calcula CTE (Costo + Atraso + Riesgo) para opciones de abastecimiento
+
+Dos caminos:
+- Escalar: ``BaseScorer.calculate_cte`` por opción (objetos de evaluación)
+- Columnar: ``OptionBatch`` (una columna NumPy por atributo) y
+  ``BaseScorer.calculate_cte_batch``, que calcula normalización, P(on-time)
+  con ``ndtr`` y CTE ponderado en unas pocas operaciones vectoriales; los
+  ``CTEScore`` se materializan solo al pedirlos
+
+Estado del scorer:
+- El rango de normalización de costos vive en una ``ScoringSession`` (por
+  ítem o por batch), no en el scorer: ítems distintos no se mezclan
+- El historial (``scored_options``) es un ring buffer de tamaño fijo
+- ``CTEScore`` y ``NormalizedScore`` usan ``__slots__``
 """
 
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Sequence
 from enum import Enum
 import math
+import numpy as np
 from scipy import stats
+from scipy.special import ndtr
 from pydantic import BaseModel, Field, validator
 
 
@@ -62,7 +78,7 @@ class TimeRiskAssessment:
         """
         available_days = (required_date - order_date).days
         z_score = (available_days - self.lead_time_mean) / max(self.lead_time_std, 0.1)
-        return stats.norm.cdf(z_score)  # CDF de normal estándar
+        return float(ndtr(z_score))  # CDF de normal estándar
     
     def calculate_service_level_lead_time(self, sl_target: float = 0.95) -> float:
         """
@@ -111,7 +127,7 @@ class QualityRiskAssessment:
         return math.prod(factors)
 
 
-@dataclass
+@dataclass(slots=True)
 class NormalizedScore:
     """Score normalizado (0-1) para una dimensión"""
     dimension: ScoringDimension
@@ -137,7 +153,7 @@ class NormalizedScore:
         return self.value < 0.4
 
 
-@dataclass
+@dataclass(slots=True)
 class CTEScore:
     """CTE Score para una opción (Costo + Tiempo + Riesgo)"""
     option_id: str
@@ -226,30 +242,301 @@ class ScoringContext:
         return self.item_criticality in ["CRITICAL", "HIGH"]
 
 
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "cost": 0.4,
+    "time": 0.3,
+    "risk": 0.3,
+}
+
+
+@dataclass
+class OptionBatch:
+    """
+    Opciones de abastecimiento en formato columnar (una fila por opción).
+
+    Las columnas numéricas son arrays float64 de igual largo; ``reliability``
+    usa NaN para "sin dato" (equivale a ``reliability_score=None``).
+    """
+    option_id: np.ndarray
+    item_id: np.ndarray
+    unit_cost: np.ndarray
+    transport: np.ndarray
+    customs: np.ndarray
+    handling: np.ndarray
+    lead_time_mean: np.ndarray
+    lead_time_std: np.ndarray
+    quality_rate: np.ndarray
+    availability: np.ndarray
+    reliability: np.ndarray
+    sourcing_path: np.ndarray
+    supplier_id: np.ndarray
+
+    # Columna → (clave en el dict de score_and_cut, default)
+    COLUMNS = {
+        "unit_cost": ("cost", 0.0),
+        "transport": ("transport", 0.0),
+        "customs": ("customs", 0.0),
+        "handling": ("handling", 0.0),
+        "lead_time_mean": ("lead_time_mean", 0.0),
+        "lead_time_std": ("lead_time_std", 0.0),
+        "quality_rate": ("quality_rate", 0.99),
+        "availability": ("availability", 0.95),
+        "reliability": ("reliability", None),
+    }
+
+    def __len__(self) -> int:
+        return len(self.option_id)
+
+    @property
+    def total_cost(self) -> np.ndarray:
+        return self.unit_cost + self.transport + self.customs + self.handling
+
+    @classmethod
+    def from_options(cls, options_data: Sequence[Dict[str, Any]]) -> "OptionBatch":
+        """Construye el batch desde el formato de dict de ``score_and_cut``"""
+        columns = {}
+        for name, (key, default) in cls.COLUMNS.items():
+            values = [opt.get(key, default) for opt in options_data]
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return cls(
+            option_id=np.array([opt["option_id"] for opt in options_data], dtype=object),
+            item_id=np.array([opt["item_id"] for opt in options_data], dtype=object),
+            sourcing_path=np.array([opt.get("sourcing_path", "PURCHASE") for opt in options_data], dtype=object),
+            supplier_id=np.array([opt.get("supplier_id") for opt in options_data], dtype=object),
+            **columns
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        option_id: Sequence[str],
+        item_id: Any,
+        unit_cost: Any,
+        lead_time_mean: Any,
+        lead_time_std: Any,
+        quality_rate: Any = 0.99,
+        availability: Any = 0.95,
+        reliability: Any = np.nan,
+        transport: Any = 0.0,
+        customs: Any = 0.0,
+        handling: Any = 0.0,
+        sourcing_path: Any = "PURCHASE",
+        supplier_id: Any = None
+    ) -> "OptionBatch":
+        """Construye el batch desde arrays (los escalares se expanden al largo del batch)"""
+        n = len(option_id)
+
+        def numeric(values):
+            return np.broadcast_to(np.asarray(values, dtype=np.float64), (n,)).copy()
+
+        def labels(values):
+            if isinstance(values, str) or values is None:
+                return np.full(n, values, dtype=object)
+            return np.asarray(values, dtype=object)
+
+        return cls(
+            option_id=np.asarray(option_id, dtype=object),
+            item_id=labels(item_id),
+            unit_cost=numeric(unit_cost),
+            transport=numeric(transport),
+            customs=numeric(customs),
+            handling=numeric(handling),
+            lead_time_mean=numeric(lead_time_mean),
+            lead_time_std=numeric(lead_time_std),
+            quality_rate=numeric(quality_rate),
+            availability=numeric(availability),
+            reliability=numeric(reliability),
+            sourcing_path=labels(sourcing_path),
+            supplier_id=labels(supplier_id)
+        )
+
+
+class ScoredBatch:
+    """
+    Resultado columnar de ``calculate_cte_batch``.
+
+    Las columnas (``cte``, ``cost_score``, ``prob_on_time``...) son arrays; los
+    ``CTEScore`` se construyen recién al indexar o iterar.
+    """
+
+    def __init__(
+        self,
+        batch: OptionBatch,
+        total_cost: np.ndarray,
+        cost_score: np.ndarray,
+        prob_on_time: np.ndarray,
+        time_score: np.ndarray,
+        risk_score: np.ndarray,
+        cte: np.ndarray,
+        weights: Dict[str, float]
+    ):
+        self.batch = batch
+        self.total_cost = total_cost
+        self.cost_score = cost_score
+        self.prob_on_time = prob_on_time
+        self.time_score = time_score
+        self.risk_score = risk_score
+        self.cte = cte
+        self.weights = weights
+        self.calculated_at = datetime.utcnow()
+
+    def __len__(self) -> int:
+        return len(self.cte)
+
+    def __getitem__(self, i: int) -> CTEScore:
+        return self.score(i)
+
+    def __iter__(self) -> Iterator[CTEScore]:
+        for i in range(len(self)):
+            yield self.score(i)
+
+    def score(self, i: int) -> CTEScore:
+        """CTEScore de la fila ``i``"""
+        i = int(i)
+        return CTEScore(
+            option_id=self.batch.option_id[i],
+            item_id=self.batch.item_id[i],
+            cost_score=NormalizedScore(
+                dimension=ScoringDimension.COST,
+                value=float(self.cost_score[i]),
+                raw_value=float(self.total_cost[i]),
+            ),
+            time_score=NormalizedScore(
+                dimension=ScoringDimension.TIME,
+                value=float(self.time_score[i]),
+                raw_value=float(self.prob_on_time[i]),
+            ),
+            risk_score=NormalizedScore(
+                dimension=ScoringDimension.RISK,
+                value=float(self.risk_score[i]),
+                raw_value=float(self.risk_score[i]),
+            ),
+            cte_value=float(self.cte[i]),
+            weight_cost=self.weights["cost"],
+            weight_time=self.weights["time"],
+            weight_risk=self.weights["risk"],
+            sourcing_path=self.batch.sourcing_path[i],
+            supplier_id=self.batch.supplier_id[i],
+            calculated_at=self.calculated_at,
+        )
+
+    def top_indices(self, limit: int = 5, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Índices de las ``limit`` filas de mayor CTE (opcionalmente dentro de ``mask``)"""
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        if len(candidates) > limit:
+            part = np.argpartition(-self.cte[candidates], limit - 1)[:limit]
+            candidates = candidates[part]
+        return candidates[np.argsort(-self.cte[candidates], kind="stable")]
+
+    def top(self, limit: int = 5) -> List[CTEScore]:
+        """Top N opciones ordenadas por CTE"""
+        return [self.score(i) for i in self.top_indices(limit)]
+
+
+class ScoringSession:
+    """
+    Contexto de una corrida de scoring (un ítem o un batch de opciones).
+
+    Guarda el rango [min, max] de costos observado, usado para normalizar.
+    Como context manager se resetea al salir:
+
+        with scorer.session("MAT-001") as session:
+            scorer.calculate_cte(..., session=session)
+    """
+    __slots__ = ("key", "min_cost", "max_cost", "count")
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.reset()
+
+    def reset(self) -> None:
+        self.min_cost = float('inf')
+        self.max_cost = 0.0
+        self.count = 0
+
+    def observe_cost(self, cost: float) -> None:
+        """Extiende el rango de normalización con ``cost``"""
+        self.min_cost = min(self.min_cost, cost)
+        self.max_cost = max(self.max_cost, cost)
+        self.count += 1
+
+    def __enter__(self) -> "ScoringSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.reset()
+
+
 class BaseScorer:
     """Calculador base de scores CTE"""
     
-    def __init__(self):
-        self.scored_options: List[CTEScore] = []
-        self.min_cost: float = float('inf')
-        self.max_cost: float = 0.0
+    def __init__(self, history_size: Optional[int] = 1000, max_sessions: int = 256):
+        """
+        Args:
+            history_size: Últimos CTEScore guardados en ``scored_options``
+                (0 = sin historial, None = sin límite)
+            max_sessions: Sesiones por ítem retenidas (LRU) cuando no se pasa una explícita
+        """
+        self.history_size = history_size
+        self.max_sessions = max_sessions
+        self.scored_options: deque = deque(maxlen=history_size)
+        self._sessions: "OrderedDict[str, ScoringSession]" = OrderedDict()
+        self._last_session = ScoringSession()
+    
+    @property
+    def min_cost(self) -> float:
+        """Mínimo de costos de la última sesión usada"""
+        return self._last_session.min_cost
     
-    def normalize_cost(self, cost: float, context: Optional[ScoringContext] = None) -> float:
+    @property
+    def max_cost(self) -> float:
+        """Máximo de costos de la última sesión usada"""
+        return self._last_session.max_cost
+    
+    def session(self, key: Optional[str] = None) -> ScoringSession:
+        """Sesión explícita (per-batch), independiente de las sesiones por ítem"""
+        return ScoringSession(key)
+    
+    def session_for_item(self, item_id: str) -> ScoringSession:
+        """Sesión implícita del ítem (LRU acotada a ``max_sessions``)"""
+        session = self._sessions.get(item_id)
+        if session is None:
+            session = self._sessions[item_id] = ScoringSession(item_id)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(item_id)
+        return session
+    
+    def reset(self) -> None:
+        """Descartar historial y rangos de normalización"""
+        self.scored_options.clear()
+        self._sessions.clear()
+        self._last_session = ScoringSession()
+    
+    def normalize_cost(
+        self,
+        cost: float,
+        context: Optional[ScoringContext] = None,
+        session: Optional[ScoringSession] = None
+    ) -> float:
         """
         Normalizar costo a escala 0-1 (invertida: menor costo = mayor score)
         
         Args:
             cost: Costo por unidad
             context: Contexto de scoring
+            session: Sesión con el rango de costos (default: última usada)
         
         Returns:
             Score normalizado 0-1
         """
-        if self.max_cost <= self.min_cost:
+        session = session or self._last_session
+        if session.max_cost <= session.min_cost:
             return 0.5
         
         # Normalizar en rango [min, max]
-        normalized = 1 - (cost - self.min_cost) / (self.max_cost - self.min_cost)
+        normalized = 1 - (cost - session.min_cost) / (session.max_cost - session.min_cost)
         
         # Aplicar castigo si hay contexto con urgencia
         if context and context.is_urgent and context.cost_penalty_multiplier > 1.0:
@@ -307,6 +594,7 @@ class BaseScorer:
         sourcing_path: str = "PURCHASE",
         supplier_id: Optional[str] = None,
         weights: Optional[Dict[str, float]] = None,
+        session: Optional[ScoringSession] = None,
     ) -> CTEScore:
         """
         Calcular CTE (Costo + Tiempo + Riesgo) para una opción
@@ -321,19 +609,21 @@ class BaseScorer:
             sourcing_path: Tipo de ruta (STOCK_LOCAL, PURCHASE, etc.)
             supplier_id: ID del proveedor
             weights: Pesos personalizados {cost, time, risk}
+            session: Sesión de normalización (default: la del ítem)
         
         Returns:
             CTEScore con componentes
         """
-        # Actualizar rangos de costo
+        # Actualizar rango de costos de la sesión
+        session = session or self.session_for_item(item_id)
         total_cost = cost_breakdown.total_cost_per_unit
-        self.min_cost = min(self.min_cost, total_cost)
-        self.max_cost = max(self.max_cost, total_cost)
+        session.observe_cost(total_cost)
+        self._last_session = session
         
         # Calcular componentes normalizados
         cost_score = NormalizedScore(
             dimension=ScoringDimension.COST,
-            value=self.normalize_cost(total_cost, context),
+            value=self.normalize_cost(total_cost, context, session),
             raw_value=total_cost,
         )
         
@@ -353,11 +643,7 @@ class BaseScorer:
         )
         
         # Aplicar pesos
-        default_weights = {
-            "cost": 0.4,
-            "time": 0.3,
-            "risk": 0.3,
-        }
+        default_weights = dict(DEFAULT_WEIGHTS)
         if weights:
             default_weights.update(weights)
         
@@ -386,6 +672,70 @@ class BaseScorer:
         self.scored_options.append(cte)
         return cte
     
+    def calculate_cte_batch(
+        self,
+        batch: OptionBatch,
+        context: ScoringContext,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> ScoredBatch:
+        """
+        Calcular CTE para todas las opciones de ``batch`` con operaciones vectoriales.
+        
+        Mismas fórmulas que ``calculate_cte``, con una diferencia: el costo se
+        normaliza contra el rango [min, max] del batch completo (en el camino
+        escalar, contra las opciones vistas hasta ese momento). No modifica
+        ``scored_options`` ni el rango de costos del scorer.
+        
+        Args:
+            batch: Opciones en formato columnar
+            context: Contexto de scoring (común a todo el batch)
+            weights: Pesos personalizados {cost, time, risk}
+        
+        Returns:
+            ScoredBatch con columnas de scores y CTEScore bajo demanda
+        """
+        applied_weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            applied_weights.update(weights)
+        
+        # Costo: normalización invertida sobre el rango del batch
+        total_cost = batch.total_cost
+        if len(total_cost) and total_cost.max() > total_cost.min():
+            low, high = total_cost.min(), total_cost.max()
+            cost_score = 1 - (total_cost - low) / (high - low)
+            if context.is_urgent and context.cost_penalty_multiplier > 1.0:
+                cost_score *= 1 / context.cost_penalty_multiplier
+            np.clip(cost_score, 0.0, 1.0, out=cost_score)
+        else:
+            cost_score = np.full(len(total_cost), 0.5)
+        
+        # Tiempo: P(LT <= días disponibles) con LT ~ Normal(mean, std)
+        z_score = (context.days_to_deadline - batch.lead_time_mean) / np.maximum(batch.lead_time_std, 0.1)
+        prob_on_time = ndtr(z_score)
+        time_score = prob_on_time ** 1.5 if context.is_urgent else prob_on_time
+        
+        # Riesgo: quality × availability × reliability (si hay dato)
+        risk_score = batch.quality_rate * batch.availability * np.where(
+            np.isnan(batch.reliability), 1.0, batch.reliability
+        )
+        
+        cte = (
+            cost_score * applied_weights["cost"] +
+            time_score * applied_weights["time"] +
+            risk_score * applied_weights["risk"]
+        )
+        
+        return ScoredBatch(
+            batch=batch,
+            total_cost=total_cost,
+            cost_score=cost_score,
+            prob_on_time=prob_on_time,
+            time_score=time_score,
+            risk_score=risk_score,
+            cte=cte,
+            weights=applied_weights,
+        )
+    
     def get_top_options(self, limit: int = 5) -> List[CTEScore]:
         """Obtener top N opciones ordenadas por CTE"""
         return sorted(
@@ -3,13 +3,16 @@ Scorer especializado con reglas de criticidad
 Adapta scoring según criticidad del ítem y contexto
 """
 
+from collections import deque
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
 from .base_scorer import (
     BaseScorer, CTEScore, CostBreakdown, TimeRiskAssessment,
-    QualityRiskAssessment, ScoringContext, NormalizedScore, ScoringDimension
+    QualityRiskAssessment, ScoringContext, NormalizedScore, ScoringDimension,
+    OptionBatch, ScoredBatch, ScoringSession
 )
 
 
@@ -79,7 +82,7 @@ DEFAULT_RULES: Dict[CriticalityLevel, ScoringRuleSet] = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class ScoringCutResult:
     """Resultado del cut (aceptado o rechazado)"""
     option_id: str
@@ -89,15 +92,85 @@ class ScoringCutResult:
     score: Optional[CTEScore] = None
 
 
+class CriticalityCutBatch(ScoredBatch):
+    """
+    ScoredBatch con los cortes de criticidad aplicados por fila.
+
+    ``rejected_by`` vale "" para las aceptadas y TIME/RISK/COST según el
+    primer corte que falló (mismo orden que ``apply_criticality_cut``).
+    """
+
+    def __init__(self, scored: ScoredBatch, rules: ScoringRuleSet, max_cost: np.ndarray):
+        super().__init__(
+            scored.batch, scored.total_cost, scored.cost_score, scored.prob_on_time,
+            scored.time_score, scored.risk_score, scored.cte, scored.weights
+        )
+        self.rules = rules
+        self.max_cost = max_cost
+        self.rejected_by = np.full(len(self), "", dtype=object)
+        cost_cut = self.total_cost > max_cost
+        risk_cut = self.risk_score < (1 - rules.max_acceptable_risk)
+        time_cut = self.prob_on_time < rules.min_acceptable_service_level
+        # Se asignan en orden inverso de prioridad: el primer corte gana
+        self.rejected_by[cost_cut] = "COST"
+        self.rejected_by[risk_cut] = "RISK"
+        self.rejected_by[time_cut] = "TIME"
+        self.accepted = ~(cost_cut | risk_cut | time_cut)
+
+    def accepted_scores(self) -> Iterator[CTEScore]:
+        """CTEScore de las opciones aceptadas, en el orden del batch"""
+        for i in np.flatnonzero(self.accepted):
+            yield self.score(i)
+
+    def top_accepted(self, limit: int = 5) -> List[CTEScore]:
+        """Top N aceptadas ordenadas por CTE"""
+        return [self.score(i) for i in self.top_indices(limit, self.accepted)]
+
+    def cut_result(self, i: int) -> ScoringCutResult:
+        """ScoringCutResult de la fila ``i`` (mismos textos que el camino escalar)"""
+        i = int(i)
+        rules = self.rules
+        rejected_by = self.rejected_by[i]
+        if rejected_by == "TIME":
+            reason = f"Time/SL insuficiente: {self.prob_on_time[i]:.1%} < {rules.min_acceptable_service_level:.1%}"
+        elif rejected_by == "RISK":
+            reason = f"Riesgo demasiado alto: {1 - self.risk_score[i]:.1%} > {rules.max_acceptable_risk:.1%}"
+        elif rejected_by == "COST":
+            reason = f"Costo excesivo: ${self.total_cost[i]:.2f} > ${self.max_cost[i]:.2f}"
+        else:
+            reason = f"Aceptado (CTE={self.cte[i]:.3f})"
+        return ScoringCutResult(
+            option_id=self.batch.option_id[i],
+            accepted=bool(self.accepted[i]),
+            reason=reason,
+            rejected_by=rejected_by or None,
+            score=self.score(i)
+        )
+
+    def cut_results(self) -> Iterator[ScoringCutResult]:
+        for i in range(len(self)):
+            yield self.cut_result(i)
+
+
 class CriticalityAwareScorer(BaseScorer):
     """Scorer que adapta reglas según criticidad del ítem"""
     
-    def __init__(self, custom_rules: Optional[Dict[CriticalityLevel, ScoringRuleSet]] = None):
-        super().__init__()
+    def __init__(
+        self,
+        custom_rules: Optional[Dict[CriticalityLevel, ScoringRuleSet]] = None,
+        history_size: Optional[int] = 1000,
+        max_sessions: int = 256
+    ):
+        super().__init__(history_size=history_size, max_sessions=max_sessions)
         self.rules = custom_rules or DEFAULT_RULES
-        self.cut_results: List[ScoringCutResult] = []
+        self.cut_results: deque = deque(maxlen=history_size)  # Ring buffer, como scored_options
         self.reference_costs: Dict[str, float] = {}  # cost reference por ítem
     
+    def reset(self) -> None:
+        """Descartar historial de scores y de cuts"""
+        super().reset()
+        self.cut_results.clear()
+    
     def set_reference_cost(self, item_id: str, cost: float):
         """Establecer costo de referencia para comparaciones"""
         self.reference_costs[item_id] = cost
@@ -179,6 +252,7 @@ class CriticalityAwareScorer(BaseScorer):
         self,
         options_data: List[Dict[str, Any]],
         context: ScoringContext,
+        session: Optional[ScoringSession] = None,
     ) -> tuple[List[CTEScore], List[ScoringCutResult]]:
         """
         Scorer completo: calcular CTE + aplicar reglas de corte
@@ -186,9 +260,10 @@ class CriticalityAwareScorer(BaseScorer):
         Args:
             options_data: Lista de opciones con datos de costo/tiempo/riesgo
             context: Contexto de scoring
+            session: Sesión de normalización (default: una nueva para esta llamada)
         
         Returns:
-            (opciones_aceptadas, resultados_cut)
+            (opciones_aceptadas, resultados_cut de esta llamada)
         
         Format de cada opción en options_data:
             {
@@ -208,6 +283,8 @@ class CriticalityAwareScorer(BaseScorer):
             }
         """
         accepted_ctes = []
+        call_results = []
+        session = session or self.session()
         
         for opt_data in options_data:
             # Construir objetos de evaluación
@@ -245,16 +322,55 @@ class CriticalityAwareScorer(BaseScorer):
                     'cost': rules.weight_cost,
                     'time': rules.weight_time,
                     'risk': rules.weight_risk,
-                }
+                },
+                session=session,
             )
             
             # Aplicar cut
             cut_result = self.apply_criticality_cut(cte, context)
+            call_results.append(cut_result)
             
             if cut_result.accepted:
                 accepted_ctes.append(cte)
         
-        return accepted_ctes, self.cut_results
+        return accepted_ctes, call_results
+    
+    def score_and_cut_batch(
+        self,
+        batch: OptionBatch,
+        context: ScoringContext,
+    ) -> CriticalityCutBatch:
+        """
+        Versión columnar de ``score_and_cut``: CTE y cortes de criticidad en
+        operaciones vectoriales sobre todo el batch.
+        
+        No agrega a ``cut_results``; los CTEScore/ScoringCutResult se
+        construyen solo al pedirlos al resultado.
+        
+        Args:
+            batch: Opciones en formato columnar (``OptionBatch.from_options`` acepta el formato dict)
+            context: Contexto de scoring
+        
+        Returns:
+            CriticalityCutBatch con máscara ``accepted`` y motivo por fila
+        """
+        rules = self.get_rules_for_criticality(context.item_criticality)
+        scored = self.calculate_cte_batch(
+            batch,
+            context,
+            weights={
+                'cost': rules.weight_cost,
+                'time': rules.weight_time,
+                'risk': rules.weight_risk,
+            }
+        )
+        
+        # Costo de referencia por fila (inf = sin referencia, nunca corta)
+        items, inverse = np.unique(batch.item_id.astype(str), return_inverse=True)
+        reference = np.array([self.reference_costs.get(item, np.inf) for item in items], dtype=np.float64)
+        max_cost = reference[inverse] * rules.cost_threshold_multiplier
+        
+        return CriticalityCutBatch(scored, rules, max_cost)
     
     def get_feasible_set(self) -> List[CTEScore]:
         """Obtener conjunto factible (aceptadas)"""
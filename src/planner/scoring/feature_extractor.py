@@ -1,14 +1,30 @@
 """
 Feature scorer: genera features para machine learning y análisis
 Extrae características técnicas, económicas y de riesgo
+
+Representación densa:
+- ``FEATURE_SCHEMA`` fija el orden de columnas y guarda una sola vez el
+  nombre, categoría, unidad y descripción de cada feature
+- ``FeatureExtractor.extract_matrix`` genera una matriz NumPy (opciones ×
+  features) para lotes grandes; las features operacionales sin contexto
+  quedan en NaN
+- ``RunningStatistics`` acumula media/varianza (Welford, con merge por
+  lote), mínimo y máximo por columna; ``normalize_feature`` la usa cuando
+  no se le pasan estadísticas explícitas
+- ``PercentileReservoir`` guarda una muestra acotada por columna (reservoir
+  sampling) para mediana y percentiles; ``calculate_statistics`` combina
+  ambas sin volver a recorrer las filas vistas
+- ``extract_features`` y ``extract_matrix`` alimentan las dos estructuras por
+  el mismo camino; ``feature_vectors`` es un historial acotado
 """
 
+from collections import deque
 from dataclasses import dataclass, field, asdict
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Deque, List, Dict, Any, Optional, Sequence, Tuple, Union
 from datetime import datetime, timedelta
-import statistics as stats_module
 from enum import Enum
-from .base_scorer import NormalizedScore, ScoringDimension
+import numpy as np
+from .base_scorer import NormalizedScore, ScoringDimension, OptionBatch
 
 
 class FeatureCategory(str, Enum):
@@ -102,12 +118,197 @@ class FeatureStatistics:
         return self.coefficient_variation > 0.5
 
 
+@dataclass(frozen=True)
+class FeatureColumn:
+    """Metadata de una columna del esquema de features"""
+    name: str
+    category: FeatureCategory
+    unit: str = ""
+    description: str = ""
+
+
+# Orden fijo de columnas (mismo orden que extract_features)
+FEATURE_SCHEMA: Tuple[FeatureColumn, ...] = (
+    FeatureColumn("total_cost_per_unit", FeatureCategory.ECONOMIC, "USD", "Costo total por unidad"),
+    FeatureColumn("logistics_cost_ratio", FeatureCategory.ECONOMIC, "ratio", "Costo logístico / Total"),
+    FeatureColumn("lead_time_mean", FeatureCategory.TEMPORAL, "days", "Lead time promedio"),
+    FeatureColumn("lead_time_variability", FeatureCategory.TEMPORAL, "ratio", "Variabilidad: std / mean"),
+    FeatureColumn("on_time_percentage", FeatureCategory.TEMPORAL, "ratio", "Porcentaje histórico on-time"),
+    FeatureColumn("quality_acceptance_rate", FeatureCategory.RELIABILITY, "ratio", "Tasa de aceptación QC"),
+    FeatureColumn("availability_percentage", FeatureCategory.RELIABILITY, "ratio", "Disponibilidad del proveedor"),
+    FeatureColumn("integrated_reliability", FeatureCategory.RELIABILITY, "ratio", "Quality × Availability × Reliability"),
+    FeatureColumn("urgency_flag", FeatureCategory.OPERATIONAL, "binary", "¿Es urgente? (<=5 días)"),
+    FeatureColumn("criticality_score", FeatureCategory.OPERATIONAL, "ratio", "Criticidad del ítem"),
+    FeatureColumn("demand_volume", FeatureCategory.OPERATIONAL, "units", "Cantidad demandada"),
+    FeatureColumn("abc_classification_value", FeatureCategory.OPERATIONAL, "ratio", "Valor ABC (A=1, B=0.5, C=0.2)"),
+    FeatureColumn("feature_vector_dimension", FeatureCategory.CONTEXTUAL, "count", "Número de features extraídas"),
+)
+
+FEATURE_INDEX: Dict[str, int] = {column.name: i for i, column in enumerate(FEATURE_SCHEMA)}
+
+_CRITICALITY_VALUES = {'CRITICAL': 1.0, 'HIGH': 0.75, 'MEDIUM': 0.5, 'LOW': 0.25}
+_ABC_VALUES = {'A': 1.0, 'B': 0.5, 'C': 0.2}
+_OPERATIONAL_COLUMNS = [i for i, c in enumerate(FEATURE_SCHEMA) if c.category == FeatureCategory.OPERATIONAL]
+
+
+@dataclass
+class FeatureMatrix:
+    """Features de un lote de opciones: una fila por opción, columnas según FEATURE_SCHEMA"""
+    option_ids: np.ndarray
+    item_ids: np.ndarray
+    values: np.ndarray                      # (n_opciones, len(FEATURE_SCHEMA)) float64
+    schema: Tuple[FeatureColumn, ...] = FEATURE_SCHEMA
+    generated_at: datetime = field(default_factory=datetime.utcnow)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [column.name for column in self.schema]
+
+    def column(self, name: str) -> np.ndarray:
+        """Columna de un feature por nombre"""
+        return self.values[:, FEATURE_INDEX[name]]
+
+    def to_vector(self, i: int) -> "FeatureVector":
+        """FeatureVector de la fila ``i`` (omite columnas NaN)"""
+        features = [
+            Feature(
+                name=column.name,
+                category=column.category,
+                value=float(value),
+                unit=column.unit,
+                description=column.description,
+            )
+            for column, value in zip(self.schema, self.values[i])
+            if not np.isnan(value)
+        ]
+        return FeatureVector(
+            option_id=self.option_ids[i],
+            item_id=self.item_ids[i],
+            features=features,
+            generated_at=self.generated_at,
+        )
+
+
+class RunningStatistics:
+    """
+    Estadísticas incrementales por columna (Welford / merge de Chan por lote).
+
+    Ignora NaN por columna. Memoria O(columnas), independiente de las filas vistas.
+    """
+
+    def __init__(self, n_columns: int = len(FEATURE_SCHEMA)):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+        self.min_val = np.full(n_columns, np.inf)
+        self.max_val = np.full(n_columns, -np.inf)
+
+    def update(self, values: np.ndarray) -> None:
+        """Incorpora un lote de filas (o una sola fila)"""
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        present = ~np.isnan(values)
+        batch_count = present.sum(axis=0)
+        has_data = batch_count > 0
+        if not has_data.any():
+            return
+
+        safe_count = np.maximum(batch_count, 1)
+        batch_mean = np.where(present, values, 0.0).sum(axis=0) / safe_count
+        batch_m2 = np.where(present, (values - batch_mean) ** 2, 0.0).sum(axis=0)
+
+        total = self.count + batch_count
+        safe_total = np.maximum(total, 1)
+        delta = batch_mean - self.mean
+        self.mean = np.where(has_data, self.mean + delta * batch_count / safe_total, self.mean)
+        self.m2 = np.where(has_data, self.m2 + batch_m2 + delta ** 2 * self.count * batch_count / safe_total, self.m2)
+        self.count = total
+        with np.errstate(invalid="ignore"):
+            self.min_val = np.fmin(self.min_val, np.nanmin(np.where(present, values, np.inf), axis=0))
+            self.max_val = np.fmax(self.max_val, np.nanmax(np.where(present, values, -np.inf), axis=0))
+
+    @property
+    def std_dev(self) -> np.ndarray:
+        """Desvío estándar muestral por columna (0 con menos de 2 observaciones)"""
+        return np.sqrt(np.where(self.count > 1, self.m2 / np.maximum(self.count - 1, 1), 0.0))
+
+    def normalize(self, values: np.ndarray) -> np.ndarray:
+        """Min-max por columna (0.5 donde el rango es 0 o no hay datos)"""
+        span = self.max_val - self.min_val
+        valid = (self.count > 0) & (span > 0)
+        return np.where(valid, (values - self.min_val) / np.where(valid, span, 1.0), 0.5)
+
+    def reset(self) -> None:
+        self.__init__(len(self.count))
+
+
+class PercentileReservoir:
+    """
+    Muestra uniforme acotada por columna (reservoir sampling, algoritmo R).
+
+    Ignora NaN por columna. Mientras una columna vio ``capacity`` valores o menos
+    la muestra es la población completa y los percentiles son exactos; después
+    son aproximados. Memoria O(capacity × columnas).
+    """
+
+    def __init__(self, n_columns: int = len(FEATURE_SCHEMA), capacity: int = 4096, seed: Optional[int] = None):
+        if capacity < 1:
+            raise ValueError("capacity debe ser >= 1")
+        self.capacity = int(capacity)
+        self.seen = np.zeros(n_columns, dtype=np.int64)
+        self.samples = np.full((self.capacity, n_columns), np.nan)
+        self._rng = np.random.default_rng(seed)
+        self._seed = seed
+
+    def update(self, values: np.ndarray) -> None:
+        """Incorpora un lote de filas (o una sola fila)"""
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        for column in range(values.shape[1]):
+            present = values[:, column]
+            present = present[~np.isnan(present)]
+            if len(present) == 0:
+                continue
+            seen = int(self.seen[column])
+            fill = min(max(self.capacity - seen, 0), len(present))
+            if fill:
+                self.samples[seen:seen + fill, column] = present[:fill]
+            rest = present[fill:]
+            if len(rest):
+                # El i-ésimo valor visto reemplaza un lugar al azar con prob. capacity / i
+                slots = self._rng.integers(0, np.arange(seen + fill + 1, seen + len(present) + 1))
+                keep = slots < self.capacity
+                self.samples[slots[keep], column] = rest[keep]
+            self.seen[column] = seen + len(present)
+
+    def sample(self, column: int) -> np.ndarray:
+        """Valores muestreados de la columna, ordenados"""
+        return np.sort(self.samples[:min(int(self.seen[column]), self.capacity), column])
+
+    def reset(self) -> None:
+        self.__init__(self.samples.shape[1], self.capacity, self._seed)
+
+
 class FeatureExtractor:
     """Extrae features de opciones de abastecimiento"""
     
-    def __init__(self):
-        self.feature_vectors: List[FeatureVector] = []
+    def __init__(self, history_size: Optional[int] = 1000, reservoir_size: int = 4096):
+        """
+        Args:
+            history_size: Últimos FeatureVector guardados en ``feature_vectors``
+                (0 = sin historial, None = sin límite)
+            reservoir_size: Valores muestreados por columna para percentiles
+        """
+        self.feature_vectors: Deque[FeatureVector] = deque(maxlen=history_size)
         self.feature_stats: Dict[str, FeatureStatistics] = {}
+        self.running_stats = RunningStatistics()
+        self.percentiles = PercentileReservoir(capacity=reservoir_size)
+    
+    def _observe(self, values: np.ndarray) -> None:
+        """Único punto de entrada de filas a las estadísticas de población"""
+        self.running_stats.update(values)
+        self.percentiles.update(values)
     
     def extract_features(
         self,
@@ -272,41 +473,151 @@ class FeatureExtractor:
             features=features,
         )
         
+        row = np.full(len(FEATURE_SCHEMA), np.nan)
+        for feat in features:
+            row[FEATURE_INDEX[feat.name]] = feat.value
+        self._observe(row)
+        
         self.feature_vectors.append(fv)
         return fv
     
+    def extract_matrix(
+        self,
+        option_ids: Sequence[str],
+        item_ids: Union[str, Sequence[str]],
+        cost_data: Dict[str, Any],
+        time_data: Dict[str, Any],
+        reliability_data: Dict[str, Any],
+        context_data: Optional[Dict[str, Any]] = None,
+    ) -> FeatureMatrix:
+        """
+        Extraer features de un lote de opciones como matriz densa
+        
+        Mismas claves y fórmulas que ``extract_features``; cada valor puede ser
+        un escalar (común al lote) o un array con un valor por opción. Alimenta
+        las estadísticas de población pero no guarda FeatureVector por fila.
+        
+        Returns:
+            FeatureMatrix (n_opciones × len(FEATURE_SCHEMA))
+        """
+        n = len(option_ids)
+        
+        def col(data: Dict[str, Any], key: str, default: float) -> np.ndarray:
+            value = data.get(key, default)
+            return np.broadcast_to(np.asarray(default if value is None else value, dtype=np.float64), (n,))
+        
+        values = np.full((n, len(FEATURE_SCHEMA)), np.nan)
+        
+        # === ECONOMIC ===
+        total_cost = (
+            col(cost_data, 'unit', 0) + col(cost_data, 'transportation', 0) +
+            col(cost_data, 'customs', 0) + col(cost_data, 'handling', 0)
+        )
+        values[:, FEATURE_INDEX["total_cost_per_unit"]] = total_cost
+        values[:, FEATURE_INDEX["logistics_cost_ratio"]] = (
+            col(cost_data, 'transportation', 0) + col(cost_data, 'customs', 0)
+        ) / np.maximum(total_cost, 0.01)
+        
+        # === TEMPORAL ===
+        lt_mean = col(time_data, 'mean', 0)
+        values[:, FEATURE_INDEX["lead_time_mean"]] = lt_mean
+        values[:, FEATURE_INDEX["lead_time_variability"]] = col(time_data, 'std', 0) / np.maximum(lt_mean, 1.0)
+        values[:, FEATURE_INDEX["on_time_percentage"]] = col(time_data, 'on_time_pct', 0.95)
+        
+        # === RELIABILITY ===
+        quality = col(reliability_data, 'quality', 0.99)
+        availability = col(reliability_data, 'availability', 0.95)
+        reliability = col(reliability_data, 'reliability', np.nan)
+        values[:, FEATURE_INDEX["quality_acceptance_rate"]] = quality
+        values[:, FEATURE_INDEX["availability_percentage"]] = availability
+        # Sin dato (NaN) o 0 → factor 1, como en extract_features
+        values[:, FEATURE_INDEX["integrated_reliability"]] = quality * availability * np.where(
+            np.isnan(reliability) | (reliability == 0), 1.0, reliability
+        )
+        
+        # === OPERATIONAL ===
+        dimension = 8
+        if context_data:
+            values[:, FEATURE_INDEX["urgency_flag"]] = (col(context_data, 'days_to_deadline', 999) <= 5).astype(np.float64)
+            values[:, FEATURE_INDEX["criticality_score"]] = self._lookup(
+                context_data.get('criticality', 'MEDIUM'), _CRITICALITY_VALUES, n
+            )
+            values[:, FEATURE_INDEX["demand_volume"]] = col(context_data, 'demand_quantity', 1.0)
+            values[:, FEATURE_INDEX["abc_classification_value"]] = self._lookup(
+                context_data.get('abc_class', 'B'), _ABC_VALUES, n
+            )
+            dimension += len(_OPERATIONAL_COLUMNS)
+        
+        # === CONTEXTUAL ===
+        values[:, FEATURE_INDEX["feature_vector_dimension"]] = dimension
+        
+        self._observe(values)
+        return FeatureMatrix(
+            option_ids=np.asarray(option_ids, dtype=object),
+            item_ids=np.full(n, item_ids, dtype=object) if isinstance(item_ids, str) else np.asarray(item_ids, dtype=object),
+            values=values,
+        )
+    
+    def extract_from_batch(
+        self,
+        batch: OptionBatch,
+        context_data: Optional[Dict[str, Any]] = None,
+    ) -> FeatureMatrix:
+        """Atajo de ``extract_matrix`` para un OptionBatch del scoring columnar"""
+        return self.extract_matrix(
+            batch.option_id,
+            batch.item_id,
+            cost_data={
+                'unit': batch.unit_cost,
+                'transportation': batch.transport,
+                'customs': batch.customs,
+                'handling': batch.handling,
+            },
+            time_data={'mean': batch.lead_time_mean, 'std': batch.lead_time_std},
+            reliability_data={
+                'quality': batch.quality_rate,
+                'availability': batch.availability,
+                'reliability': batch.reliability,
+            },
+            context_data=context_data,
+        )
+    
+    @staticmethod
+    def _lookup(labels: Any, table: Dict[str, float], n: int) -> np.ndarray:
+        if isinstance(labels, str):
+            return np.full(n, table.get(labels, 0.5))
+        return np.array([table.get(label, 0.5) for label in labels], dtype=np.float64)
+    
     def calculate_statistics(self, feature_name: str) -> Optional[FeatureStatistics]:
         """
         Calcular estadísticas de un feature en población
         
+        Media, desvío, mínimo y máximo salen de ``running_stats`` (exactos);
+        mediana y percentiles de la muestra de ``percentiles``.
+        
         Args:
             feature_name: Nombre del feature
         
         Returns:
             FeatureStatistics o None si no existe feature
         """
-        values = []
-        
-        for fv in self.feature_vectors:
-            feat = fv.get_feature_by_name(feature_name)
-            if feat:
-                values.append(feat.value)
-        
-        if not values:
+        column = FEATURE_INDEX.get(feature_name)
+        if column is None or self.running_stats.count[column] == 0:
             return None
         
-        values_sorted = sorted(values)
-        
+        running = self.running_stats
+        values_sorted = self.percentiles.sample(column)
+        n = len(values_sorted)
         stats_obj = FeatureStatistics(
             feature_name=feature_name,
-            mean=stats_module.mean(values),
-            median=stats_module.median(values),
-            std_dev=stats_module.stdev(values) if len(values) > 1 else 0.0,
-            min_val=min(values),
-            max_val=max(values),
-            percentile_25=values_sorted[len(values_sorted) // 4],
-            percentile_75=values_sorted[3 * len(values_sorted) // 4],
-            percentile_95=values_sorted[int(0.95 * len(values_sorted))] if len(values_sorted) > 1 else values_sorted[0],
+            mean=float(running.mean[column]),
+            median=float(np.median(values_sorted)),
+            std_dev=float(running.std_dev[column]),
+            min_val=float(running.min_val[column]),
+            max_val=float(running.max_val[column]),
+            percentile_25=float(values_sorted[n // 4]),
+            percentile_75=float(values_sorted[3 * n // 4]),
+            percentile_95=float(values_sorted[int(0.95 * n)]) if n > 1 else float(values_sorted[0]),
         )
         
         self.feature_stats[feature_name] = stats_obj
@@ -318,7 +629,8 @@ class FeatureExtractor:
         
         Args:
             feature: Feature a normalizar
-            stats: Estadísticas de población (si no se proporciona, usa min/max del feature)
+            stats: Estadísticas de población (si no se proporciona, usa las
+                estadísticas incrementales de la columna o una heurística)
         
         Returns:
             Valor normalizado 0-1
@@ -328,6 +640,13 @@ class FeatureExtractor:
                 return 0.5
             return (feature.value - stats.min_val) / stats.range
         
+        column = FEATURE_INDEX.get(feature.name)
+        if column is not None and self.running_stats.count[column] > 0:
+            span = self.running_stats.max_val[column] - self.running_stats.min_val[column]
+            if span == 0:
+                return 0.5
+            return float((feature.value - self.running_stats.min_val[column]) / span)
+        
         # Sin estadísticas, usar heurística
         if feature.category == FeatureCategory.TEMPORAL:
             # Normalizar LT a 0-1 (días)
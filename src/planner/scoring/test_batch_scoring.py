@@ -0,0 +1,146 @@
+"""
+Tests para el scoring columnar (OptionBatch / ScoredBatch)
+
+Cubre:
+- Equivalencia con calculate_cte escalar
+- Cortes de criticidad vectorizados vs apply_criticality_cut
+- Materialización perezosa y top-N
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.planner.scoring import (
+    BaseScorer,
+    CostBreakdown,
+    CriticalityAwareScorer,
+    OptionBatch,
+    QualityRiskAssessment,
+    ScoringContext,
+    TimeRiskAssessment,
+)
+
+
+def _context(days=10, criticality="HIGH"):
+    now = datetime(2030, 1, 1)
+    return ScoringContext(required_date=now + timedelta(days=days), order_date=now, item_criticality=criticality)
+
+
+def _options(count=50, seed=3):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'option_id': f'OPT-{i:03d}',
+            'item_id': 'MAT-001' if i % 2 else 'MAT-002',
+            'cost': float(rng.uniform(40, 60)),
+            'transport': float(rng.uniform(0, 10)),
+            'customs': 2.0,
+            'handling': 1.0,
+            'lead_time_mean': float(rng.uniform(2, 12)),
+            'lead_time_std': float(rng.uniform(0, 3)),
+            'quality_rate': float(rng.uniform(0.95, 1.0)),
+            'availability': float(rng.uniform(0.97, 1.0)),
+            'reliability': None if i % 5 == 0 else float(rng.uniform(0.97, 1.0)),
+            'supplier_id': f'SUP-{i % 7}',
+        }
+        for i in range(count)
+    ]
+
+
+def _scalar(scorer, opt, context, low, high, weights=None):
+    # Mismo rango de normalización que el batch
+    session = scorer.session()
+    session.observe_cost(low)
+    session.observe_cost(high)
+    return scorer.calculate_cte(
+        option_id=opt['option_id'],
+        item_id=opt['item_id'],
+        cost_breakdown=CostBreakdown(opt['cost'], opt['transport'], opt['customs'], opt['handling']),
+        time_risk=TimeRiskAssessment(opt['lead_time_mean'], opt['lead_time_std']),
+        quality_risk=QualityRiskAssessment(opt['quality_rate'], opt['availability'], opt['reliability']),
+        context=context,
+        supplier_id=opt['supplier_id'],
+        weights=weights,
+        session=session,
+    )
+
+
+class TestCalculateCteBatch:
+    """Tests del camino columnar de BaseScorer"""
+
+    @pytest.mark.parametrize("days", [3, 10])
+    def test_coincide_con_camino_escalar(self, days):
+        """Cada fila reproduce calculate_cte con el mismo rango de costos"""
+        options = _options()
+        context = _context(days)
+        batch = OptionBatch.from_options(options)
+        scorer = BaseScorer()
+
+        scored = scorer.calculate_cte_batch(batch, context)
+
+        low, high = batch.total_cost.min(), batch.total_cost.max()
+        for i, opt in enumerate(options):
+            expected = _scalar(BaseScorer(), opt, context, low, high)
+            actual = scored[i]
+            assert actual.cte_value == pytest.approx(expected.cte_value)
+            assert actual.time_score.raw_value == pytest.approx(expected.time_score.raw_value)
+            assert actual.risk_score.value == pytest.approx(expected.risk_score.value)
+            assert actual.supplier_id == expected.supplier_id
+        assert len(scorer.scored_options) == 0
+
+    def test_from_arrays_y_top(self):
+        """from_arrays expande escalares y top devuelve las de mayor CTE"""
+        batch = OptionBatch.from_arrays(
+            option_id=["A", "B", "C"],
+            item_id="MAT-001",
+            unit_cost=[10.0, 20.0, 30.0],
+            lead_time_mean=[5.0, 5.0, 5.0],
+            lead_time_std=1.0,
+        )
+
+        scored = BaseScorer().calculate_cte_batch(batch, _context())
+
+        assert [c.option_id for c in scored.top(2)] == ["A", "B"]
+        assert list(scored.cost_score) == [1.0, 0.5, 0.0]
+        assert len(list(scored)) == 3
+
+
+class TestScoreAndCutBatch:
+    """Tests de los cortes de criticidad vectorizados"""
+
+    @pytest.mark.parametrize("criticality", ["CRITICAL", "MEDIUM", "LOW"])
+    def test_cortes_iguales_a_apply_criticality_cut(self, criticality):
+        """Aceptación y motivo por fila iguales al corte escalar"""
+        options = _options()
+        context = _context(8, criticality)
+        scorer = CriticalityAwareScorer()
+        scorer.set_reference_cost('MAT-001', 60.0)
+
+        result = scorer.score_and_cut_batch(OptionBatch.from_options(options), context)
+
+        rules = scorer.get_rules_for_criticality(criticality)
+        weights = {'cost': rules.weight_cost, 'time': rules.weight_time, 'risk': rules.weight_risk}
+        low, high = result.total_cost.min(), result.total_cost.max()
+        for i, opt in enumerate(options):
+            expected = scorer.apply_criticality_cut(_scalar(BaseScorer(), opt, context, low, high, weights), context)
+            actual = result.cut_result(i)
+            assert (actual.accepted, actual.rejected_by, actual.reason) == (
+                expected.accepted, expected.rejected_by, expected.reason
+            )
+        assert len(list(result.accepted_scores())) == int(result.accepted.sum())
+
+    def test_top_aceptadas(self):
+        """top_accepted solo considera filas aceptadas"""
+        scorer = CriticalityAwareScorer()
+        result = scorer.score_and_cut_batch(OptionBatch.from_options(_options(200)), _context(10, "LOW"))
+
+        top = result.top_accepted(5)
+        accepted_cte = np.sort(result.cte[result.accepted])[::-1][:5]
+
+        assert [c.cte_value for c in top] == pytest.approx(list(accepted_cte))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+"""
+Tests para la extracción de features en matriz densa
+
+Cubre:
+- Paridad de extract_matrix con extract_features fila a fila
+- Esquema fijo de columnas (NaN sin contexto)
+- Estadísticas incrementales (Welford) contra el cálculo directo
+- normalize_feature con estadísticas incrementales
+- calculate_statistics desde Welford + reservoir, igual para ambos caminos
+"""
+
+import numpy as np
+import pytest
+
+from src.planner.scoring import (
+    FEATURE_SCHEMA,
+    FeatureExtractor,
+    OptionBatch,
+    PercentileReservoir,
+    RunningStatistics,
+)
+
+
+def _lote(n=50, seed=7):
+    rng = np.random.default_rng(seed)
+    return {
+        "cost": {
+            "unit": rng.uniform(10, 500, n),
+            "transportation": rng.uniform(0, 50, n),
+            "customs": rng.uniform(0, 20, n),
+            "handling": 5.0,
+        },
+        "time": {"mean": rng.uniform(0, 40, n), "std": rng.uniform(0, 8, n), "on_time_pct": 0.9},
+        "reliability": {
+            "quality": rng.uniform(0.8, 1.0, n),
+            "availability": 0.97,
+            "reliability": np.where(rng.random(n) < 0.3, 0.0, rng.uniform(0.7, 1.0, n)),
+        },
+    }
+
+
+def _fila(data, i):
+    return {
+        key: {k: (v[i] if isinstance(v, np.ndarray) else v) for k, v in values.items()}
+        for key, values in data.items()
+    }
+
+
+class TestFeatureMatrix:
+    """Tests de la extracción por lote"""
+
+    def test_paridad_con_extract_features(self):
+        """Cada fila coincide con la extracción escalar de la misma opción"""
+        data = _lote()
+        context = {"days_to_deadline": 3, "criticality": "HIGH", "demand_quantity": 12, "abc_class": "A"}
+        ids = [f"OPT-{i}" for i in range(50)]
+
+        matrix = FeatureExtractor().extract_matrix(
+            ids, "ITEM-1", data["cost"], data["time"], data["reliability"], context
+        )
+
+        scalar = FeatureExtractor()
+        assert matrix.values.shape == (50, len(FEATURE_SCHEMA))
+        for i in (0, 17, 49):
+            row = _fila(data, i)
+            fv = scalar.extract_features(ids[i], "ITEM-1", row["cost"], row["time"], row["reliability"], context)
+            expected = {f.name: f.value for f in fv.features}
+            got = {f.name: f.value for f in matrix.to_vector(i).features}
+            assert got.keys() == expected.keys()
+            for name, value in expected.items():
+                assert got[name] == pytest.approx(value)
+            assert matrix.to_vector(i).option_id == ids[i]
+
+    def test_sin_contexto_columnas_operacionales_nan(self):
+        """Sin contexto las features operacionales quedan en NaN y no se exportan"""
+        data = _lote(5)
+        matrix = FeatureExtractor().extract_matrix(
+            list("abcde"), "ITEM-1", data["cost"], data["time"], data["reliability"]
+        )
+
+        assert np.isnan(matrix.column("urgency_flag")).all()
+        assert (matrix.column("feature_vector_dimension") == 8).all()
+        names = [f.name for f in matrix.to_vector(0).features]
+        assert "criticality_score" not in names and len(names) == 9
+
+    def test_desde_option_batch(self):
+        """extract_from_batch toma las columnas del OptionBatch del scoring"""
+        batch = OptionBatch.from_options([
+            {"option_id": "A", "item_id": "X", "unit_cost": 100.0, "transport": 10.0,
+             "lead_time_mean": 10.0, "lead_time_std": 2.0},
+            {"option_id": "B", "item_id": "X", "unit_cost": 50.0, "lead_time_mean": 20.0},
+        ])
+        matrix = FeatureExtractor().extract_from_batch(batch)
+
+        assert list(matrix.option_ids) == ["A", "B"]
+        assert matrix.column("lead_time_variability")[0] == pytest.approx(0.2)
+
+
+class TestRunningStatistics:
+    """Tests de las estadísticas incrementales"""
+
+    def test_welford_por_lotes_igual_a_directo(self):
+        """Acumular por lotes (con NaN) da la misma media, desvío y rango"""
+        rng = np.random.default_rng(3)
+        values = rng.normal(100, 15, (300, 4))
+        values[rng.random((300, 4)) < 0.1] = np.nan
+
+        running = RunningStatistics(4)
+        for chunk in np.array_split(values, 7):
+            running.update(chunk)
+        running.update(values[0])
+
+        full = np.vstack([values, values[:1]])
+        assert running.count.tolist() == (~np.isnan(full)).sum(axis=0).tolist()
+        assert np.allclose(running.mean, np.nanmean(full, axis=0))
+        assert np.allclose(running.std_dev, np.nanstd(full, axis=0, ddof=1))
+        assert np.allclose(running.min_val, np.nanmin(full, axis=0))
+        assert np.allclose(running.max_val, np.nanmax(full, axis=0))
+
+    def test_normalize_feature_usa_estadisticas_incrementales(self):
+        """Sin stats explícitas, normaliza con el rango acumulado de la columna"""
+        extractor = FeatureExtractor()
+        data = _lote()
+        matrix = extractor.extract_matrix(
+            [str(i) for i in range(50)], "ITEM-1", data["cost"], data["time"], data["reliability"]
+        )
+        cost = matrix.column("total_cost_per_unit")
+        feature = matrix.to_vector(int(np.argmax(cost))).get_feature_by_name("total_cost_per_unit")
+
+        assert extractor.normalize_feature(feature) == pytest.approx(1.0)
+        # extract_matrix no guarda FeatureVector por fila, pero sí alimenta las estadísticas
+        stats = extractor.calculate_statistics("total_cost_per_unit")
+        assert stats.mean == pytest.approx(cost.mean())
+        assert stats.median == pytest.approx(np.median(cost))
+        assert (stats.min_val, stats.max_val) == pytest.approx((cost.min(), cost.max()))
+
+    def test_ambos_caminos_dan_las_mismas_estadisticas(self):
+        """Fila a fila o por lote, calculate_statistics coincide con el cálculo directo"""
+        data = _lote(40)
+        ids = [str(i) for i in range(40)]
+        batch = FeatureExtractor()
+        batch.extract_matrix(ids, "ITEM-1", data["cost"], data["time"], data["reliability"])
+        scalar = FeatureExtractor(history_size=5)
+        for i in range(40):
+            row = _fila(data, i)
+            scalar.extract_features(ids[i], "ITEM-1", row["cost"], row["time"], row["reliability"])
+
+        values = np.sort(data["time"]["mean"])
+        for extractor in (batch, scalar):
+            stats = extractor.calculate_statistics("lead_time_mean")
+            assert stats.mean == pytest.approx(values.mean())
+            assert stats.std_dev == pytest.approx(values.std(ddof=1))
+            assert stats.percentile_25 == pytest.approx(values[10])
+            assert stats.percentile_95 == pytest.approx(values[38])
+        assert len(scalar.feature_vectors) == 5  # Historial acotado
+
+    def test_reservoir_acotado(self):
+        """Más allá de la capacidad la muestra no crece y los percentiles se aproximan"""
+        rng = np.random.default_rng(11)
+        values = rng.uniform(0, 100, (20000, 2))
+        values[:5000, 1] = np.nan
+
+        reservoir = PercentileReservoir(2, capacity=1000, seed=5)
+        for chunk in np.array_split(values, 13):
+            reservoir.update(chunk)
+
+        assert reservoir.seen.tolist() == [20000, 15000]
+        assert reservoir.samples.shape == (1000, 2)
+        for column in range(2):
+            sample = reservoir.sample(column)
+            assert len(sample) == 1000 and not np.isnan(sample).any()
+            assert np.median(sample) == pytest.approx(50, abs=5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""
+Tests para el estado acotado de los scorers
+
+Cubre:
+- Sesiones de normalización por ítem / por batch
+- Historial en ring buffer y reset
+- Registros compactos (__slots__)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.planner.scoring import (
+    BaseScorer,
+    CostBreakdown,
+    CriticalityAwareScorer,
+    CTEScore,
+    QualityRiskAssessment,
+    ScoringContext,
+    ScoringCutResult,
+    TimeRiskAssessment,
+)
+
+
+def _context():
+    now = datetime(2030, 1, 1)
+    return ScoringContext(required_date=now + timedelta(days=10), order_date=now, item_criticality="LOW")
+
+
+def _cte(scorer, item_id, cost, session=None):
+    return scorer.calculate_cte(
+        option_id=f"{item_id}-{cost}",
+        item_id=item_id,
+        cost_breakdown=CostBreakdown(unit_cost=cost),
+        time_risk=TimeRiskAssessment(lead_time_mean=5, lead_time_std=1),
+        quality_risk=QualityRiskAssessment(quality_acceptance_rate=0.99),
+        context=_context(),
+        session=session,
+    )
+
+
+def _option(i, cost):
+    return {'option_id': f'OPT-{i}', 'item_id': 'MAT-001', 'cost': cost, 'lead_time_mean': 3, 'lead_time_std': 1}
+
+
+class TestScoringSessions:
+    """Tests del rango de normalización por sesión"""
+
+    def test_items_distintos_no_comparten_rango(self):
+        """El costo de un ítem caro no distorsiona la normalización de otro"""
+        scorer = BaseScorer()
+        _cte(scorer, "BARATO", 10.0)
+        _cte(scorer, "BARATO", 20.0)
+        _cte(scorer, "CARO", 5000.0)
+
+        score = _cte(scorer, "BARATO", 15.0)
+
+        assert score.cost_score.value == pytest.approx(0.5)
+        assert (scorer.min_cost, scorer.max_cost) == (10.0, 20.0)
+
+    def test_sesion_explicita_y_reset_al_salir(self):
+        """La sesión explícita aísla el batch y se resetea como context manager"""
+        scorer = BaseScorer()
+        with scorer.session("lote-1") as session:
+            _cte(scorer, "MAT", 10.0, session)
+            high = _cte(scorer, "MAT", 30.0, session)
+            assert high.cost_score.value == 0.0
+            assert session.count == 2
+
+        assert session.count == 0
+        assert _cte(scorer, "MAT", 30.0).cost_score.value == 0.5   # Sesión del ítem, vacía
+
+    def test_score_and_cut_usa_sesion_por_llamada(self):
+        """Cada llamada normaliza solo sus opciones y devuelve solo sus cuts"""
+        scorer = CriticalityAwareScorer()
+        scorer.score_and_cut([_option(1, 1000.0), _option(2, 2000.0)], _context())
+
+        accepted, cuts = scorer.score_and_cut([_option(3, 10.0), _option(4, 20.0)], _context())
+
+        assert [c.option_id for c in cuts] == ["OPT-3", "OPT-4"]
+        assert accepted[1].cost_score.value == 0.0
+        assert len(scorer.cut_results) == 4
+
+    def test_sesiones_por_item_acotadas(self):
+        """Las sesiones implícitas son LRU con tope"""
+        scorer = BaseScorer(max_sessions=3)
+        for i in range(10):
+            _cte(scorer, f"MAT-{i}", 10.0)
+
+        assert list(scorer._sessions) == ["MAT-7", "MAT-8", "MAT-9"]
+
+
+class TestBoundedHistory:
+    """Tests del historial acotado"""
+
+    def test_ring_buffer_y_reset(self):
+        """El historial conserva solo los últimos N y reset lo vacía"""
+        scorer = CriticalityAwareScorer(history_size=5)
+        for i in range(4):
+            scorer.score_and_cut([_option(i * 3 + j, 10.0 + j) for j in range(3)], _context())
+
+        assert len(scorer.scored_options) == 5
+        assert len(scorer.cut_results) == 5
+        assert scorer.cut_results[-1].option_id == "OPT-11"
+
+        scorer.reset()
+        assert len(scorer.scored_options) == 0 and len(scorer.cut_results) == 0
+        assert scorer.get_scoring_report() == "No options scored yet"
+
+    def test_historial_deshabilitado(self):
+        """history_size=0 no guarda nada"""
+        scorer = BaseScorer(history_size=0)
+        _cte(scorer, "MAT", 10.0)
+
+        assert len(scorer.scored_options) == 0
+
+    def test_registros_con_slots(self):
+        """Los registros de score no llevan __dict__ por instancia"""
+        score = _cte(BaseScorer(), "MAT", 10.0)
+        cut = ScoringCutResult(option_id="X", accepted=True)
+
+        assert isinstance(score, CTEScore)
+        assert not hasattr(score, "__dict__")
+        assert not hasattr(score.cost_score, "__dict__")
+        assert not hasattr(cut, "__dict__")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
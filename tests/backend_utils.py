@@ -0,0 +1,78 @@
+"""
+Helpers compartidos por los tests del backend (usuarios, tokens y filas de prueba).
+
+Módulo común en lugar de ``conftest``: con ``pytest tests`` el nombre
+``conftest`` puede resolver a tests/integration/conftest.py.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+
+def create_user(con, user_id: str, *, rol: str = "Solicitante", mail: str | None = None, **extra) -> None:
+    columns = {
+        "id_spm": user_id,
+        "nombre": extra.pop("nombre", user_id.title()),
+        "apellido": extra.pop("apellido", "Test"),
+        "rol": rol,
+        "contrasena": extra.pop("contrasena", "x"),
+        "mail": mail or f"{user_id}@example.com",
+        "estado_registro": extra.pop("estado_registro", "Activo"),
+        **extra,
+    }
+    con.execute(
+        f"INSERT INTO usuarios ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        tuple(columns.values()),
+    )
+
+
+def auth_headers(user_id: str) -> dict[str, str]:
+    from src.backend.services.auth.jwt_utils import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token(subject=user_id)}"}
+
+
+def insert_solicitud(
+    con,
+    owner: str,
+    *,
+    status: str = "draft",
+    centro: str = "C1",
+    sector: str = "S1",
+    justificacion: str = "x",
+    data: dict[str, Any] | None = None,
+    **extra,
+) -> int:
+    """Inserta una solicitud y devuelve su id (``extra``: columnas adicionales)."""
+    columns = {
+        "id_usuario": owner,
+        "centro": centro,
+        "sector": sector,
+        "justificacion": justificacion,
+        "data_json": json.dumps(data or {}),
+        "status": status,
+        **extra,
+    }
+    return con.execute(
+        f"INSERT INTO solicitudes ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        tuple(columns.values()),
+    ).lastrowid
+
+
+def insert_notificacion(con, dest: str, mensaje: str, **extra) -> int:
+    """Inserta una notificación no leída y devuelve su id."""
+    columns = {"destinatario_id": dest, "solicitud_id": None, "mensaje": mensaje, "leido": 0, **extra}
+    return con.execute(
+        f"INSERT INTO notificaciones ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        tuple(columns.values()),
+    ).lastrowid
+
+
+def undo_migration(con, version: int, schema_sql: str) -> None:
+    """Deja la base como antes de ``version``: borra lo que crea ``schema_sql`` y su registro."""
+    for kind, name in re.findall(r"CREATE (TABLE|INDEX|TRIGGER) IF NOT EXISTS (\w+)", schema_sql):
+        con.execute(f"DROP {kind} IF EXISTS {name}")
+    con.execute("DELETE FROM schema_migrations WHERE version = ?", (version,))
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.fixture
+def spm_db(tmp_path, monkeypatch):
+    """Base SQLite temporal con el esquema de init_db (sin cargar CSVs)."""
+    from src.backend.core import db as db_module
+    from src.backend.core.config import Settings
+    from src.backend.core.init_db import build_db
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    monkeypatch.setattr(Settings, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(Settings, "DB_PATH", str(data_dir / "spm.db"))
+    monkeypatch.setattr(Settings, "UPLOADS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(Settings, "LOG_PATH", str(tmp_path / "logs" / "app.log"))
+    db_module.close_pool()
+    build_db(force=True)
+    yield Settings.DB_PATH
+    db_module.close_pool()
+
+
+@pytest.fixture
+def api_client(spm_db):
+    from src.backend.app import app as flask_app
+
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        yield client
@@ -0,0 +1,89 @@
+"""
+Tests del resumen materializado de solicitudes por estado
+"""
+
+from backend_utils import auth_headers, create_user, insert_solicitud, undo_migration
+
+from src.backend.core.db import get_connection
+from src.backend.services import material_catalog
+from src.backend.services.dashboard import status_summary
+
+
+def _recount(con):
+    return {
+        (row["u"], row["status"]): row["c"]
+        for row in con.execute(
+            "SELECT lower(id_usuario) AS u, status, COUNT(*) AS c FROM solicitudes GROUP BY 1, 2"
+        )
+    }
+
+
+def test_triggers_mantienen_el_resumen(spm_db):
+    with get_connection() as con:
+        create_user(con, "ana")
+        create_user(con, "beto")
+        a = insert_solicitud(con, "ana", status="draft")
+        b = insert_solicitud(con, "ana", status="pendiente_de_aprobacion")
+        insert_solicitud(con, "beto", status="aprobada")
+        con.execute("UPDATE solicitudes SET status='aprobada' WHERE id=?", (b,))
+        con.execute("UPDATE solicitudes SET justificacion='y' WHERE id=?", (a,))
+        con.execute("DELETE FROM solicitudes WHERE id=?", (a,))
+        con.commit()
+
+        assert status_summary.status_counts(con, "ANA") == {"aprobada": 1}
+        assert status_summary.status_counts(con) == {"aprobada": 2}
+        stored = {
+            (row["id_usuario"], row["status"]): row["total"]
+            for row in con.execute("SELECT * FROM solicitudes_status_counts WHERE total > 0")
+        }
+        assert stored == _recount(con)
+
+        # Un backfill desde cero llega al mismo resultado
+        status_summary.backfill(con)
+        assert status_summary.status_counts(con) == {"aprobada": 2}
+
+
+def test_dashboards_leen_el_resumen(api_client):
+    with get_connection() as con:
+        create_user(con, "ana")
+        create_user(con, "root", rol="Administrador")
+        for status in ("draft", "pendiente_de_aprobacion", "aprobada", "aprobada", "rechazada", "finalizada"):
+            insert_solicitud(con, "ana", status=status)
+        con.execute("INSERT INTO materiales (codigo, descripcion) VALUES ('M1', 'Material')")
+        con.commit()
+    material_catalog.invalidate()
+
+    body = api_client.get("/api/auth/dashboard/stats", headers=auth_headers("ana")).get_json()
+    stats = body["stats"]
+    assert (stats["pending"], stats["approved"], stats["rejected"]) == (1, 2, 1)
+    assert stats["approval_rate"] == 66
+    assert stats["total_materials"] == 1
+    states = {item["status"]: item["count"] for item in body["chart_data"]["states"]}
+    assert states["aprobada"] == 2
+
+    totals = api_client.get("/api/admin/summary", headers=auth_headers("root")).get_json()["totals"]
+    assert totals["solicitudes"] == 6
+    assert (totals["pendientes"], totals["finalizadas"], totals["borradores"]) == (1, 1, 1)
+    assert totals["materiales"] == 1
+
+
+def test_base_previa_a_la_migracion(api_client):
+    from src.backend.app import _bootstrap_database
+
+    with get_connection() as con:
+        undo_migration(con, 3, status_summary.SCHEMA_SQL)
+        create_user(con, "plan", rol="Planificador")
+        for status in ("pending_approval", "approved", "approved"):
+            insert_solicitud(con, "plan", status=status)
+        con.commit()
+        # Sin la tabla todavía: cuenta directo con GROUP BY status
+        assert status_summary.status_counts(con) == {"pending_approval": 1, "approved": 2}
+        assert status_summary.status_counts(con, "PLAN") == {"pending_approval": 1, "approved": 2}
+
+    _bootstrap_database()
+
+    resp = api_client.get("/api/planner/dashboard", headers=auth_headers("plan"))
+    assert resp.status_code == 200
+    assert (resp.get_json()["pending"], resp.get_json()["approved"]) == (1, 2)
+    with get_connection() as con:
+        assert con.execute("SELECT SUM(total) AS t FROM solicitudes_status_counts").fetchone()["t"] == 3
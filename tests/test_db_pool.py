@@ -0,0 +1,156 @@
+"""
+Tests para el pool de conexiones SQLite de core.db
+"""
+
+import threading
+
+import pytest
+
+from src.backend.core import db as db_module
+from src.backend.core.config import Settings
+
+
+@pytest.fixture
+def pool_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, "DB_PATH", str(tmp_path / "pool.db"))
+    monkeypatch.setattr(Settings, "UPLOADS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(Settings, "LOG_PATH", str(tmp_path / "logs" / "app.log"))
+    monkeypatch.setattr(Settings, "DB_POOL_SIZE", 2)
+    monkeypatch.setattr(Settings, "DB_POOL_TIMEOUT", 0.2)
+    db_module.close_pool()
+    yield
+    db_module.close_pool()
+
+
+def test_reutiliza_conexion_en_el_mismo_hilo(pool_db):
+    with db_module.get_connection() as con:
+        first = con
+    with db_module.get_connection() as con:
+        assert con is first
+    stats = db_module.pool_stats()
+    assert stats["created"] == 1
+    assert stats["in_use"] == 0
+    assert stats["same_thread_reuse"] == 1
+
+
+def test_checkout_anidado_reutiliza_la_conexion_del_hilo(pool_db):
+    with db_module.get_connection() as outer:
+        with db_module.get_connection() as inner:
+            assert inner is outer
+            assert db_module.pool_stats()["in_use"] == 1
+        # La salida del checkout interno no devuelve ni revierte la conexión
+        assert db_module.pool_stats()["in_use"] == 1
+    stats = db_module.pool_stats()
+    assert stats["in_use"] == 0
+    assert stats["nested_checkouts"] == 1
+
+
+def test_checkout_anidado_no_se_bloquea_con_pool_lleno(pool_db, monkeypatch):
+    monkeypatch.setattr(Settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(Settings, "DB_POOL_TIMEOUT", 5.0)
+    db_module.close_pool()
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(10):
+                with db_module.get_connection() as outer:
+                    with db_module.get_connection() as inner:
+                        inner.execute("SELECT 1").fetchone()
+                    outer.execute("SELECT 1").fetchone()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    stats = db_module.pool_stats()
+    assert stats["created"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_pool_acotado_lanza_timeout(pool_db):
+    held = threading.Barrier(3)
+    done = threading.Event()
+
+    def holder():
+        with db_module.get_connection():
+            held.wait(5)
+            done.wait(5)
+
+    threads = [threading.Thread(target=holder) for _ in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        held.wait(5)
+        with pytest.raises(db_module.PoolTimeout):
+            with db_module.get_connection():
+                pass
+    finally:
+        done.set()
+        for t in threads:
+            t.join()
+    assert db_module.pool_stats()["waits"] == 1
+
+
+def test_sonda_de_salud_solo_tras_inactividad(pool_db, monkeypatch):
+    monkeypatch.setattr(Settings, "DB_POOL_HEALTH_IDLE", 60.0)
+    db_module.close_pool()
+    for _ in range(3):
+        with db_module.get_connection() as con:
+            con.execute("SELECT 1").fetchone()
+    assert db_module.pool_stats()["health_checks"] == 0
+
+    pool = db_module.get_pool()
+    for con in list(pool._idle_since):
+        pool._idle_since[con] -= 120.0
+    with db_module.get_connection():
+        pass
+    assert db_module.pool_stats()["health_checks"] == 1
+
+
+def test_pragmas_y_row_factory_se_conservan(pool_db):
+    with db_module.get_connection() as con:
+        con.row_factory = None
+        assert con.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    with db_module.get_connection() as con:
+        assert con.execute("SELECT 1 AS uno").fetchone() == {"uno": 1}
+
+
+def test_transaccion_pendiente_se_revierte_al_devolver(pool_db):
+    with db_module.get_connection() as con:
+        con.execute("CREATE TABLE t(x INTEGER)")
+        con.commit()
+        con.execute("INSERT INTO t VALUES (1)")
+    with db_module.get_connection() as con:
+        assert con.execute("SELECT COUNT(*) AS n FROM t").fetchone()["n"] == 0
+
+
+def test_conexion_cerrada_se_reemplaza(pool_db):
+    with db_module.get_connection() as con:
+        con.close()
+    with db_module.get_connection() as con:
+        assert con.execute("SELECT 1 AS ok").fetchone()["ok"] == 1
+
+
+def test_conexiones_compartidas_entre_hilos(pool_db):
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                with db_module.get_connection() as con:
+                    con.execute("SELECT 1").fetchone()
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert db_module.pool_stats()["created"] <= 2
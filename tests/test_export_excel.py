@@ -0,0 +1,68 @@
+"""
+Tests de la exportación de solicitudes a Excel (write-only, respuesta en chunks)
+"""
+
+from io import BytesIO
+
+from backend_utils import auth_headers, create_user, insert_solicitud
+from openpyxl import load_workbook
+
+from src.backend.core.db import get_connection
+from src.backend.services.solicitud_items import replace_items
+
+
+def _seed():
+    with get_connection() as con:
+        create_user(con, "ana")
+        create_user(con, "beto")
+        create_user(con, "jefe", rol="Aprobador", nombre="Julia", apellido="Jefe")
+        create_user(con, "root", rol="Administrador")
+        rows = [
+            ("ana", "C1", "pendiente_de_aprobacion", "jefe", "2025-01-01 10:00:00"),
+            ("ana", "C2", "aprobada", None, "2025-01-02 10:00:00"),
+            ("beto", "C1", "aprobada", "jefe", "2025-01-03 10:00:00"),
+        ]
+        for owner, centro, status, aprobador, created in rows:
+            sol_id = insert_solicitud(
+                con, owner, status=status, centro=centro, justificacion=f"sol {owner}",
+                aprobador_id=aprobador, created_at=created,
+            )
+            replace_items(con, sol_id, [{"codigo": "M1", "cantidad": 2, "precio_unitario": 5}])
+        con.commit()
+
+
+def _sheet_rows(resp):
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    wb = load_workbook(BytesIO(resp.get_data()))
+    return [row for row in wb.active.iter_rows(values_only=True)]
+
+
+def test_export_usuario_con_aprobador_e_items(api_client):
+    _seed()
+    rows = _sheet_rows(api_client.get("/api/solicitudes/export/excel", headers=auth_headers("ana")))
+    headers, first = rows[0], rows[1]
+    assert headers[0] == "ID" and headers[-1] == "Aprobador"
+    assert first[1] == "C2" and first[-1] is None  # la más reciente, sin aprobador
+    solicitudes = [row for row in rows[1:] if isinstance(row[0], int)]
+    assert len(solicitudes) == 2
+    assert solicitudes[1][-1] == "Julia Jefe"
+    assert ("M1", None, None, 5, 2, 10) in [row[:6] for row in rows]
+
+
+def test_export_usuario_filtrado_sin_datos(api_client):
+    _seed()
+    resp = api_client.get("/api/solicitudes/export/excel?status=cancelada", headers=auth_headers("ana"))
+    assert resp.status_code == 404
+
+
+def test_export_admin_filtra_todas_las_solicitudes(api_client):
+    _seed()
+    resp = api_client.get("/api/admin/solicitudes/export/excel?centro=C1", headers=auth_headers("root"))
+    rows = _sheet_rows(resp)
+    assert rows[0][-1] == "Solicitante"
+    owners = [row[-1] for row in rows[1:] if isinstance(row[0], int)]
+    assert owners == ["beto", "ana"]
+
+    resp = api_client.get("/api/admin/solicitudes/export/excel", headers=auth_headers("ana"))
+    assert resp.status_code == 403
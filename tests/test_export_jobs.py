@@ -0,0 +1,203 @@
+"""
+Tests de la cola de exportaciones en segundo plano
+"""
+
+import os
+import time
+
+import pytest
+from backend_utils import auth_headers, create_user, insert_solicitud, undo_migration
+
+from src.backend.core.config import Settings
+from src.backend.core.db import _connect, get_connection
+from src.backend.services import export_jobs
+
+
+@pytest.fixture
+def inline_jobs(monkeypatch):
+    monkeypatch.setattr(Settings, "EXPORT_WORKERS", 0)
+
+
+def _seed():
+    with get_connection() as con:
+        create_user(con, "ana")
+        create_user(con, "beto")
+        create_user(con, "root", rol="Administrador")
+        for owner in ("ana", "ana", "beto"):
+            insert_solicitud(
+                con, owner, status="aprobada", justificacion=f"sol {owner}",
+                data={"items": [{"codigo": "M1", "cantidad": 1}]},
+            )
+        con.commit()
+
+
+def test_job_en_linea_descarga_y_deduplica(api_client, inline_jobs):
+    _seed()
+    headers = auth_headers("ana")
+    resp = api_client.post("/api/exportaciones", json={"formato": "pdf"}, headers=headers)
+    assert resp.status_code == 202
+    job = resp.get_json()["job"]
+    assert job["status"] == "done" and job["rows"] == 2 and job["deduplicated"] is False
+
+    again = api_client.post("/api/exportaciones", json={"formato": "pdf"}, headers=headers).get_json()["job"]
+    assert again["id"] == job["id"] and again["deduplicated"] is True
+
+    download = api_client.get(f"/api/exportaciones/{job['id']}/descarga", headers=headers)
+    assert download.status_code == 200
+    assert download.mimetype == "application/pdf"
+    assert download.get_data().startswith(b"%PDF")
+
+    # Otro usuario no ve el trabajo
+    assert api_client.get(f"/api/exportaciones/{job['id']}", headers=auth_headers("beto")).status_code == 404
+
+
+def test_alcance_todas_solo_admin(api_client, inline_jobs):
+    _seed()
+    resp = api_client.post("/api/exportaciones", json={"alcance": "todas"}, headers=auth_headers("ana"))
+    assert resp.status_code == 403
+    resp = api_client.post("/api/exportaciones", json={"alcance": "todas", "formato": "excel"}, headers=auth_headers("root"))
+    assert resp.get_json()["job"]["rows"] == 3
+
+
+def test_resultado_vencido_se_purga(api_client, inline_jobs):
+    _seed()
+    headers = auth_headers("ana")
+    job = api_client.post("/api/exportaciones", json={"formato": "excel"}, headers=headers).get_json()["job"]
+    with get_connection() as con:
+        path = con.execute("SELECT path FROM export_jobs WHERE id=?", (job["id"],)).fetchone()["path"]
+        con.execute("UPDATE export_jobs SET expires_at=? WHERE id=?", (time.time() - 1, job["id"]))
+        con.commit()
+    assert api_client.get(f"/api/exportaciones/{job['id']}/descarga", headers=headers).status_code == 410
+    assert export_jobs.prune_expired(force=True) == 1
+    assert not os.path.exists(path)
+    assert api_client.get(f"/api/exportaciones/{job['id']}", headers=headers).status_code == 404
+
+
+def test_job_en_pool_de_procesos(api_client, monkeypatch):
+    _seed()
+    monkeypatch.setattr(Settings, "EXPORT_WORKERS", 1)
+    headers = auth_headers("ana")
+    try:
+        job = api_client.post("/api/exportaciones", json={"formato": "excel"}, headers=headers).get_json()["job"]
+        deadline = time.time() + 60
+        while job["status"] in ("queued", "running") and time.time() < deadline:
+            time.sleep(0.2)
+            job = api_client.get(f"/api/exportaciones/{job['id']}", headers=headers).get_json()["job"]
+    finally:
+        export_jobs.shutdown()
+    assert job["status"] == "done" and job["rows"] == 2
+
+
+def test_trabajo_abandonado_no_deduplica_y_se_purga(api_client, inline_jobs):
+    _seed()
+    headers = auth_headers("ana")
+    job = api_client.post("/api/exportaciones", json={"formato": "excel"}, headers=headers).get_json()["job"]
+    # Simula un proceso que murió a mitad de la exportación
+    stale = time.time() - Settings.EXPORT_STALE_AFTER - 1
+    with get_connection() as con:
+        con.execute(
+            "UPDATE export_jobs SET status='running', expires_at=NULL, created_at=?, heartbeat_at=? WHERE id=?",
+            (stale, stale, job["id"]),
+        )
+        con.commit()
+
+    viejo = api_client.get(f"/api/exportaciones/{job['id']}", headers=headers).get_json()["job"]
+    assert viejo["status"] == "error" and "abandonado" in viejo["error"]
+
+    nuevo = api_client.post("/api/exportaciones", json={"formato": "excel"}, headers=headers).get_json()["job"]
+    assert nuevo["id"] != job["id"] and nuevo["deduplicated"] is False and nuevo["status"] == "done"
+
+    assert export_jobs.prune_expired(force=True) == 1
+    assert api_client.get(f"/api/exportaciones/{job['id']}", headers=headers).status_code == 404
+
+
+def test_errores_vencen_y_se_purgan(spm_db, inline_jobs, monkeypatch):
+    def boom(*args, **kwargs):
+        raise RuntimeError("sin espacio")
+
+    monkeypatch.setitem(export_jobs.EXPORT_FORMATS["excel"], "writer", boom)
+    job = export_jobs.submit("excel", "ana", {}, title="x")
+    assert job["status"] == "error" and job["error"] == "sin espacio"
+    with get_connection() as con:
+        con.execute("UPDATE export_jobs SET expires_at=? WHERE id=?", (time.time() - 1, job["id"]))
+        con.commit()
+    assert export_jobs.prune_expired(force=True) == 1
+
+
+def test_latido_durante_todo_el_trabajo(spm_db, inline_jobs, monkeypatch):
+    def lento(path, rows, **kwargs):
+        # Armado/guardado largo sin recorrer filas: el latido sigue igual
+        time.sleep(0.3)
+        open(path, "wb").close()
+        return 0
+
+    monkeypatch.setattr(export_jobs, "_HEARTBEAT_INTERVAL", 0.02)
+    monkeypatch.setitem(export_jobs.EXPORT_FORMATS["excel"], "writer", lento)
+    job = export_jobs.submit("excel", "ana", {}, title="x")
+    assert job["status"] == "done"
+    with get_connection() as con:
+        row = con.execute("SELECT started_at, heartbeat_at FROM export_jobs WHERE id=?", (job["id"],)).fetchone()
+    assert row["heartbeat_at"] - row["started_at"] >= 0.2
+
+
+def test_pedidos_identicos_concurrentes_un_solo_trabajo(spm_db, monkeypatch):
+    monkeypatch.setattr(Settings, "EXPORT_WORKERS", 1)
+    monkeypatch.setattr(export_jobs, "_get_executor", lambda: pytest.fail("no debe encolar un segundo trabajo"))
+    params = {"filters": {}, "title": "x", "include_owner": False}
+    key = export_jobs._dedupe_key("excel", "ana", params)
+    real_dir = export_jobs.exports_dir
+
+    def carrera():
+        # Otro worker registra el mismo pedido entre la consulta y el INSERT
+        other = _connect(Settings.DB_PATH)
+        other.execute(
+            "INSERT INTO export_jobs (id, kind, owner, dedupe_key, params_json, status, created_at)"
+            " VALUES ('ganador', 'excel', 'ana', ?, '{}', 'queued', ?)",
+            (key, time.time()),
+        )
+        other.commit()
+        other.close()
+        return real_dir()
+
+    monkeypatch.setattr(export_jobs, "exports_dir", carrera)
+    job = export_jobs.submit("excel", "ana", {}, title="x")
+
+    assert (job["id"], job["deduplicated"]) == ("ganador", True)
+    with get_connection() as con:
+        assert con.execute("SELECT COUNT(*) AS n FROM export_jobs").fetchone()["n"] == 1
+
+
+def test_base_previa_a_la_migracion(api_client, inline_jobs):
+    from src.backend.app import _bootstrap_database
+
+    _seed()
+    with get_connection() as con:
+        undo_migration(con, 5, "")
+        undo_migration(con, 4, export_jobs.SCHEMA_SQL)
+        con.commit()
+
+    _bootstrap_database()
+
+    resp = api_client.post("/api/exportaciones", json={"formato": "excel"}, headers=auth_headers("ana"))
+    assert resp.status_code == 202
+    assert resp.get_json()["job"]["rows"] == 2
+
+
+def test_migracion_deja_un_activo_por_pedido(spm_db):
+    from src.backend.core.init_db import migrate_db
+
+    with get_connection() as con:
+        con.execute("DROP INDEX idx_export_jobs_active")
+        con.execute("DELETE FROM schema_migrations WHERE version = 5")
+        for job_id, created in (("viejo", 1.0), ("nuevo", 2.0)):
+            con.execute(
+                "INSERT INTO export_jobs (id, kind, owner, dedupe_key, params_json, status, created_at)"
+                " VALUES (?, 'excel', 'ana', 'k', '{}', 'running', ?)",
+                (job_id, created),
+            )
+        con.commit()
+
+    assert migrate_db() == [5]
+    with get_connection() as con:
+        statuses = {row["id"]: row["status"] for row in con.execute("SELECT id, status FROM export_jobs")}
+    assert statuses == {"viejo": "error", "nuevo": "running"}
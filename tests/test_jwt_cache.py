@@ -0,0 +1,49 @@
+"""
+Tests del cache de claims JWT verificados
+"""
+
+import jwt
+import pytest
+
+from src.backend.core.config import Settings
+from src.backend.services.auth import jwt_utils
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    jwt_utils.clear_claims_cache()
+    yield
+    jwt_utils.clear_claims_cache()
+
+
+def test_token_repetido_usa_el_cache():
+    token = jwt_utils.create_access_token(subject="ana", claims={"roles": ["planner"]})
+    first = jwt_utils.verify_access_token(token)
+    first["roles"] = ["admin"]  # mutar el resultado no altera el cache
+    again = jwt_utils.verify_access_token(token)
+    assert again["sub"] == "ana" and again["roles"] == ["planner"]
+    stats = jwt_utils.claims_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_firma_conocida_con_otro_contenido_se_rechaza():
+    token = jwt_utils.create_access_token(subject="ana")
+    jwt_utils.verify_access_token(token)
+    other = jwt_utils.create_access_token(subject="root", claims={"rol": "admin"})
+    forged = other.rpartition(".")[0] + "." + token.rpartition(".")[2]
+    with pytest.raises(jwt.InvalidSignatureError):
+        jwt_utils.verify_access_token(forged)
+
+
+def test_respeta_exp_y_cambio_de_clave(monkeypatch):
+    token = jwt_utils.create_access_token(subject="ana", ttl=60)
+    jwt_utils.verify_access_token(token)
+    real_time = jwt_utils.time.time
+    monkeypatch.setattr(jwt_utils.time, "time", lambda: real_time() + 120)
+    assert jwt_utils._cached_claims(token) is None
+    monkeypatch.setattr(jwt_utils.time, "time", real_time)
+
+    jwt_utils.verify_access_token(token)
+    monkeypatch.setattr(Settings, "SECRET_KEY", "otra-clave-" + Settings.SECRET_KEY)
+    with pytest.raises(jwt.InvalidSignatureError):
+        jwt_utils.verify_access_token(token)
@@ -0,0 +1,74 @@
+"""
+Tests de búsqueda de materiales con el índice FTS5
+"""
+
+from src.backend.core.db import get_connection
+
+
+def _seed_materiales():
+    with get_connection() as con:
+        con.executemany(
+            "INSERT INTO materiales (codigo, descripcion, descripcion_larga, unidad, precio_usd) VALUES (?,?,?,?,?)",
+            [
+                ("1000000001", "VALVULA ESFERICA 2 PULG", "Válvula de acero inoxidable", "UN", 10.0),
+                ("1000000002", "BOMBA CENTRIFUGA", "Bomba para agua con válvula de retención", "UN", 250.0),
+                ("2000000003", "TORNILLO HEXAGONAL", None, "UN", 0.5),
+            ],
+        )
+        con.commit()
+
+
+def test_busqueda_por_prefijo_y_sin_acentos(api_client):
+    _seed_materiales()
+    resp = api_client.get("/api/materiales?q=valv")
+    codigos = [row["codigo"] for row in resp.get_json()]
+    assert codigos[0] == "1000000001"  # coincide en la descripción corta: mejor ranking
+    assert set(codigos) == {"1000000001", "1000000002"}
+
+    resp = api_client.get("/api/materiales?descripcion=válvula acero")
+    assert [row["codigo"] for row in resp.get_json()] == ["1000000001"]
+
+
+def test_busqueda_por_codigo_en_q(api_client):
+    _seed_materiales()
+    resp = api_client.get("/api/materiales?q=2000")
+    assert [row["codigo"] for row in resp.get_json()] == ["2000000003"]
+
+
+def test_triggers_mantienen_el_indice(api_client):
+    _seed_materiales()
+    with get_connection() as con:
+        con.execute("UPDATE materiales SET descripcion='ARANDELA PLANA' WHERE codigo='2000000003'")
+        con.execute("DELETE FROM materiales WHERE codigo='1000000002'")
+        con.commit()
+    assert [row["codigo"] for row in api_client.get("/api/materiales?q=arandela").get_json()] == ["2000000003"]
+    assert api_client.get("/api/materiales?q=tornillo").get_json() == []
+    assert [row["codigo"] for row in api_client.get("/api/materiales?q=bomba").get_json()] == []
+
+
+def test_sin_indice_fts_usa_like(api_client):
+    _seed_materiales()
+    with get_connection() as con:
+        # Sin la tabla los triggers romperían cualquier escritura en materiales
+        con.executescript(
+            """
+            DROP TRIGGER trg_materiales_fts_ai;
+            DROP TRIGGER trg_materiales_fts_ad;
+            DROP TRIGGER trg_materiales_fts_au;
+            DROP TABLE materiales_fts;
+            """
+        )
+        con.execute("UPDATE materiales SET precio_usd = 12.0 WHERE codigo = '1000000001'")
+        con.commit()
+    resp = api_client.get("/api/materiales?q=CENTRI")
+    assert [row["codigo"] for row in resp.get_json()] == ["1000000002"]
+
+
+def test_q_encuentra_fragmentos_internos_del_codigo(api_client):
+    _seed_materiales()
+    resp = api_client.get("/api/materiales?q=00003")
+    assert [row["codigo"] for row in resp.get_json()] == ["2000000003"]
+
+    # Los resultados rankeados por FTS van primero y no se repiten
+    resp = api_client.get("/api/materiales?q=1000")
+    assert [row["codigo"] for row in resp.get_json()] == ["1000000001", "1000000002"]
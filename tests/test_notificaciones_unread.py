@@ -0,0 +1,94 @@
+"""
+Tests del contador de no leídas y la paginación de notificaciones
+"""
+
+from backend_utils import auth_headers, create_user, insert_notificacion, undo_migration
+
+from src.backend.core.db import get_connection
+from src.backend.services import notification_store
+
+
+def _notificar(con, dest, mensaje, created_at="2024-01-01 10:00:00", **extra):
+    return insert_notificacion(con, dest, mensaje, created_at=created_at, **extra)
+
+
+def test_contador_mantenido_por_triggers(spm_db):
+    with get_connection() as con:
+        a = _notificar(con, " Ana ", "uno")
+        b = _notificar(con, "ANA", "dos")
+        _notificar(con, "beto", "tres")
+        con.commit()
+        # El destinatario queda normalizado una sola vez
+        stored = {row["destinatario_id"] for row in con.execute("SELECT destinatario_id FROM notificaciones")}
+        assert stored == {"ana", "beto"}
+        assert notification_store.unread_counts(con, ["ana", "Beto", "nadie"]) == {"ana": 2, "beto": 1, "nadie": 0}
+
+        assert notification_store.mark_read(con, "ana", [a]) == 1
+        # Marcar dos veces no descuenta de más
+        assert notification_store.mark_read(con, "ana", [a]) == 1
+        con.execute("DELETE FROM notificaciones WHERE id=?", (b,))
+        assert notification_store.unread_count(con, "ana") == 0
+        assert notification_store.mark_read(con, "beto") == 0
+        con.commit()
+
+        plan = " ".join(
+            row["detail"]
+            for row in con.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM notificaciones WHERE destinatario_id=? ORDER BY created_at DESC, id DESC",
+                ("ana",),
+            )
+        )
+    assert "idx_notif_dest_created" in plan
+
+
+def test_paginacion_por_cursor_y_since_id(api_client):
+    with get_connection() as con:
+        create_user(con, "ana")
+        ids = [_notificar(con, "ana", f"n{idx}", f"2024-01-01 10:00:0{idx}") for idx in range(5)]
+        con.commit()
+    headers = auth_headers("ana")
+
+    resp = api_client.get("/api/notificaciones?limit=2", headers=headers)
+    body = resp.get_json()
+    assert [item["id"] for item in body["items"]] == [ids[4], ids[3]]
+    assert body["unread"] == 5
+    seen = [item["id"] for item in body["items"]]
+    while body["next_cursor"]:
+        body = api_client.get(f"/api/notificaciones?limit=2&cursor={body['next_cursor']}", headers=headers).get_json()
+        seen.extend(item["id"] for item in body["items"])
+    assert seen == ids[::-1]
+
+    body = api_client.get(f"/api/notificaciones?since_id={ids[2]}", headers=headers).get_json()
+    assert [item["id"] for item in body["items"]] == [ids[3], ids[4]]
+
+    # Sin parámetros se mantiene la lista completa
+    assert len(api_client.get("/api/notificaciones", headers=headers).get_json()["items"]) == 5
+    assert api_client.get("/api/notificaciones?cursor=%%%", headers=headers).status_code == 400
+
+    resp = api_client.post("/api/notificaciones/marcar", json={"mark_all": True}, headers=headers)
+    assert resp.get_json()["unread"] == 0
+
+
+def test_base_previa_a_la_migracion_se_actualiza_al_arrancar(api_client):
+    from src.backend.app import _bootstrap_database
+    from src.backend.core.init_db import migrate_db
+
+    with get_connection() as con:
+        undo_migration(con, 2, notification_store.SCHEMA_SQL)
+        create_user(con, "ana")
+        # Datos de una instalación vieja: destinatario sin normalizar y sin contador
+        _notificar(con, " ANA ", "vieja")
+        _notificar(con, "ana", "leída", leido=1)
+        con.commit()
+
+    _bootstrap_database()
+
+    resp = api_client.get("/api/notificaciones", headers=auth_headers("ana"))
+    assert resp.status_code == 200
+    assert resp.get_json()["unread"] == 1
+    with get_connection() as con:
+        assert notification_store.unread_count(con, "ana") == 1
+        versions = {row["version"] for row in con.execute("SELECT version FROM schema_migrations")}
+        assert 2 in versions
+    # Otro worker que arranca después no vuelve a aplicar nada
+    assert migrate_db() == []
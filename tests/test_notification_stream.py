@@ -0,0 +1,167 @@
+"""
+Tests de la entrega de notificaciones por Server-Sent Events
+"""
+
+import pytest
+from backend_utils import auth_headers, create_user, insert_notificacion
+
+from src.backend.core.config import Settings
+from src.backend.core.db import get_connection, pool_stats
+from src.backend.services import notification_hub
+
+
+def _notificar(dest, mensaje):
+    with get_connection() as con:
+        notif_id = insert_notificacion(con, dest, mensaje)
+        con.commit()
+        return notif_id
+
+
+@pytest.fixture
+def hub(spm_db, monkeypatch):
+    # Intervalo largo: los tests conducen al hub con poll_once
+    monkeypatch.setattr(Settings, "SSE_POLL_INTERVAL", 3600)
+    monkeypatch.setattr(Settings, "SSE_KEEPALIVE", 0.05)
+    hub = notification_hub.get_hub()
+    hub.poll_once()
+    return hub
+
+
+def test_reanuda_desde_last_event_id(api_client, hub):
+    with get_connection() as con:
+        create_user(con, "ana")
+        con.commit()
+    primero = _notificar("ana", "uno")
+    segundo = _notificar("ANA", "dos")
+    _notificar("otro", "ajena")
+
+    headers = {**auth_headers("ana"), "Last-Event-ID": str(primero)}
+    resp = api_client.get("/api/notificaciones/stream", headers=headers, buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    resp.close()
+
+    chunks = list(notification_hub.event_stream("ana", last_event_id=primero, max_seconds=0))
+    body = "".join(chunks)
+    assert chunks[0].startswith("retry:")
+    assert f"id: {segundo}\nevent: notificacion" in body
+    assert "ajena" not in body and '"uno"' not in body
+    assert 'event: unread\ndata: {"unread": 2}' in body
+
+
+def test_hub_reparte_notificaciones_nuevas(hub):
+    stream = notification_hub.event_stream("ana", max_seconds=5)
+    assert next(stream).startswith("retry:")
+    assert '"unread": 0' in next(stream)
+    assert hub.subscriber_count() == 1
+
+    nuevo = _notificar("ana", "hola")
+    _notificar("beto", "no es para ana")
+    assert hub.poll_once() == 1
+    assert next(stream) == notification_hub.format_event("notificacion", _row(nuevo), nuevo)
+    assert '"unread": 1' in next(stream)
+
+    hub.publish_unread("ANA", 0)
+    assert '"unread": 0' in next(stream)
+    stream.close()
+    assert hub.subscriber_count() == 0
+
+
+def _row(notif_id):
+    with get_connection() as con:
+        row = con.execute(
+            "SELECT id, solicitud_id, mensaje, leido, created_at FROM notificaciones WHERE id=?", (notif_id,)
+        ).fetchone()
+    return {**row, "leido": bool(row["leido"])}
+
+
+def test_canal_unread_y_marcar(api_client, hub):
+    with get_connection() as con:
+        create_user(con, "ana")
+        con.commit()
+    stream = notification_hub.event_stream("ana", unread_only=True, max_seconds=5)
+    next(stream)
+    next(stream)
+
+    nuevo = _notificar("ana", "hola")
+    hub.poll_once()
+    # Solo el contador, sin el cuerpo de la notificación
+    assert next(stream) == notification_hub.format_event("unread", {"unread": 1})
+
+    resp = api_client.post("/api/notificaciones/marcar", json={"ids": [nuevo]}, headers=auth_headers("ana"))
+    assert resp.get_json()["unread"] == 0
+    assert next(stream) == notification_hub.format_event("unread", {"unread": 0})
+    assert next(stream) == ": keepalive\n\n"
+    stream.close()
+
+
+def test_suscripcion_fija_el_punto_de_partida(spm_db, monkeypatch):
+    # Sin poll_once previo: lo creado entre subscribe y la primera vuelta no se pierde
+    monkeypatch.setattr(Settings, "SSE_POLL_INTERVAL", 3600)
+    _notificar("ana", "anterior")
+    hub = notification_hub.get_hub()
+    sub = hub.subscribe("ana")
+    try:
+        nuevo = _notificar("ana", "después de suscribir")
+        assert hub.poll_once() == 1
+        event, data = sub.queue.get_nowait()
+        assert (event, data["id"]) == ("notificacion", nuevo)
+    finally:
+        hub.unsubscribe(sub)
+
+
+def test_tope_de_streams_responde_503(api_client, hub, monkeypatch):
+    monkeypatch.setattr(Settings, "SSE_MAX_STREAMS", 1)
+    with get_connection() as con:
+        create_user(con, "ana")
+        con.commit()
+    abierto = notification_hub.event_stream("beto", max_seconds=5)
+    next(abierto)
+
+    resp = api_client.get("/api/notificaciones/stream?last_event_id=7", headers=auth_headers("ana"))
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    body = resp.get_json()
+    assert body["error"]["code"] == "STREAMS_BUSY"
+    assert body["fallback"] == {"poll": "/api/notificaciones", "since_id": 7}
+
+    abierto.close()
+    resp = api_client.get("/api/notificaciones/stream", headers=auth_headers("ana"), buffered=False)
+    assert resp.status_code == 200
+    resp.close()
+    # Cerrar la respuesta libera el lugar aunque el generador no haya arrancado
+    assert hub.subscriber_count() == 0
+
+
+def test_hilo_del_hub_termina_sin_suscriptores(spm_db, monkeypatch):
+    monkeypatch.setattr(Settings, "SSE_POLL_INTERVAL", 0.05)
+    hub = notification_hub.get_hub()
+    sub = hub.subscribe("ana")
+    thread = hub._thread
+    assert thread is not None and thread.is_alive()
+
+    hub.unsubscribe(sub)
+    hub.notify()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert hub._thread is None
+
+    # Una suscripción nueva vuelve a arrancar el hilo desde el MAX(id) actual
+    _notificar("ana", "sin streams abiertos")
+    sub = hub.subscribe("ana")
+    try:
+        assert hub._thread is not None and hub._thread.is_alive()
+        assert sub.queue.empty()
+    finally:
+        hub.unsubscribe(sub)
+
+
+def test_hub_no_ocupa_conexiones_del_pool(hub):
+    sub = hub.subscribe("ana")
+    try:
+        _notificar("ana", "hola")
+        before = pool_stats()["checkouts"]
+        assert hub.poll_once() == 1
+        assert pool_stats()["checkouts"] == before
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,116 @@
+"""
+Tests del directorio cacheado de aprobadores y planificadores
+"""
+
+from backend_utils import auth_headers, create_user
+
+from src.backend.core.db import get_connection
+from src.backend.routes.solicitudes import (
+    _assign_planner_automatically,
+    _resolve_approver,
+    _resolve_planner,
+)
+from src.backend.services import org_directory
+
+
+class _CountingCon:
+    """Envuelve una conexión y cuenta las consultas ejecutadas."""
+
+    def __init__(self, con):
+        self._con = con
+        self.queries = 0
+
+    def execute(self, *args, **kwargs):
+        self.queries += 1
+        return self._con.execute(*args, **kwargs)
+
+
+def _seed_planners(con):
+    create_user(con, "plan1", rol="Planificador")
+    create_user(con, "plan2", rol="Planificador")
+    con.executemany(
+        "INSERT INTO planificadores (usuario_id, nombre) VALUES (?, ?)",
+        [("plan1", "Plan Uno"), ("plan2", "Plan Dos")],
+    )
+    con.executemany(
+        "INSERT INTO planificador_asignaciones (planificador_id, centro, sector, almacen_virtual) VALUES (?,?,?,?)",
+        [("plan1", "C1", None, None), ("plan2", "C1", "S1", "AV1")],
+    )
+    con.commit()
+
+
+def test_asignacion_por_especificidad(spm_db):
+    with get_connection() as con:
+        _seed_planners(con)
+        assert _assign_planner_automatically(con, "C1", "S1", "AV1") == "plan2"
+        assert _assign_planner_automatically(con, "C1", "S1", "AV2") == "plan1"
+        assert _assign_planner_automatically(con, "C2", "S1", "AV1") is None
+
+
+def test_aprobador_por_mail_y_estado(spm_db):
+    with get_connection() as con:
+        create_user(con, "jefa", mail="Jefa@Example.com", rol="Aprobador")
+        create_user(con, "gerente", mail="gerente@example.com", rol="Aprobador", estado_registro="Inactivo")
+        con.commit()
+        user = {"jefe": "gerente@example.com", "gerente1": "jefa@example.com"}
+        assert _resolve_approver(con, user) == "jefa"
+        assert _resolve_approver(con, {"jefe": "nadie@example.com"}) is None
+
+
+def test_invalidacion_refleja_cambios(api_client):
+    with get_connection() as con:
+        create_user(con, "jefa", mail="jefa@example.com", rol="Aprobador")
+        create_user(con, "root", rol="Administrador")
+        con.commit()
+        assert _resolve_approver(con, {"jefe": "jefa@example.com"}) == "jefa"
+
+    resp = api_client.put(
+        "/api/admin/usuarios/jefa",
+        json={"mail": "jefa.nueva@example.com"},
+        headers=auth_headers("root"),
+    )
+    assert resp.status_code == 200
+
+    with get_connection() as con:
+        assert _resolve_approver(con, {"jefe": "jefa@example.com"}) is None
+        assert _resolve_approver(con, {"jefe": "jefa.nueva@example.com"}) == "jefa"
+
+
+def test_usuario_nuevo_se_encuentra_sin_invalidar(spm_db):
+    with get_connection() as con:
+        org_directory.get_directory(con)
+        create_user(con, "tardio", mail="tardio@example.com", rol="Aprobador")
+        con.commit()
+        assert _resolve_approver(con, {"jefe": "tardio@example.com"}) == "tardio"
+
+
+def test_directorio_ahorra_consultas(spm_db):
+    with get_connection() as con:
+        _seed_planners(con)
+        create_user(con, "jefa", mail="jefa@example.com", rol="Aprobador")
+        con.commit()
+        org_directory.get_directory(con)
+
+        counting = _CountingCon(con)
+        user = {"jefe": "jefa@example.com", "gerente1": "plan1"}
+        for _ in range(5):
+            assert _resolve_approver(counting, user) == "jefa"
+            assert _assign_planner_automatically(counting, "C1", "S1", "AV1") == "plan2"
+            assert _resolve_planner(user, counting) == "plan1"
+    # Quedan en vivo la confirmación del aprobador elegido y la carga del planificador
+    assert counting.queries == 10
+
+
+def test_aprobador_desactivado_en_otro_worker_no_se_asigna(spm_db):
+    with get_connection() as con:
+        create_user(con, "jefa", mail="jefa@example.com", rol="Aprobador")
+        create_user(con, "gerente", mail="gerente@example.com", rol="Aprobador")
+        con.commit()
+        user = {"jefe": "jefa@example.com", "gerente1": "gerente@example.com"}
+        assert _resolve_approver(con, user) == "jefa"
+
+        # Cambio sin invalidate(): el snapshot todavía la ve activa
+        con.execute("UPDATE usuarios SET estado_registro = 'Inactivo' WHERE id_spm = 'jefa'")
+        con.commit()
+        assert org_directory.is_active(org_directory.get_directory(con).by_id("jefa"))
+        assert _resolve_approver(con, user) == "gerente"
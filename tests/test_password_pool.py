@@ -0,0 +1,128 @@
+"""
+Tests del pool de hashing de contraseñas
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from backend_utils import create_user
+
+from src.backend.core.config import Settings
+from src.backend.core.db import get_connection
+from src.backend.services.auth import password_pool
+from src.backend.services.db.security import hash_password, verify_password
+
+
+@pytest.fixture
+def inline_hashing(monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_WORKERS", 0)
+    yield
+    password_pool.shutdown()
+
+
+def test_login_migra_texto_plano_en_segundo_plano(api_client, inline_hashing):
+    with get_connection() as con:
+        create_user(con, "ana", contrasena="secreto123")
+        con.commit()
+    resp = api_client.post("/api/auth/login", json={"username": "ana", "password": "secreto123"})
+    assert resp.status_code == 200
+
+    password_pool.shutdown()  # espera la migración pendiente
+    with get_connection() as con:
+        stored = con.execute("SELECT contrasena FROM usuarios WHERE id_spm='ana'").fetchone()["contrasena"]
+    assert stored != "secreto123"
+    assert verify_password(stored, "secreto123") == (True, False)
+    assert password_pool.stats()["rehash_pending"] == 0
+
+
+def test_pool_saturado_responde_429(api_client, inline_hashing, monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_QUEUE_MAX", 1)
+    with get_connection() as con:
+        create_user(con, "ana", contrasena=hash_password("secreto123"))
+        con.commit()
+    rejected = password_pool.stats()["rejected"]
+    slots = password_pool._get_slots()
+    slots.acquire()
+    try:
+        resp = api_client.post("/api/auth/login", json={"username": "ana", "password": "secreto123"})
+    finally:
+        slots.release()
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    assert password_pool.stats()["rejected"] == rejected + 1
+
+    resp = api_client.post("/api/auth/login", json={"username": "ana", "password": "secreto123"})
+    assert resp.status_code == 200
+    assert password_pool.stats()["latency_ms"]["last"] > 0
+
+
+def test_verificacion_en_proceso_hijo(monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_WORKERS", 1)
+    stored = hash_password("secreto123")
+    try:
+        assert password_pool.verify_password(stored, "secreto123") == (True, False)
+        assert password_pool.verify_password(stored, "otra") == (False, False)
+    finally:
+        password_pool.shutdown()
+
+
+def test_timeout_retiene_el_lugar_hasta_que_termina(monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_QUEUE_MAX", 1)
+    monkeypatch.setattr(Settings, "PASSWORD_TIMEOUT", 0.05)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(password_pool, "_get_executor", lambda: executor)
+    release = threading.Event()
+    base = password_pool.stats()
+    try:
+        # Ya corriendo: no se puede cancelar y sigue ocupando el único lugar
+        with pytest.raises(password_pool.PasswordPoolBusy):
+            password_pool._run(release.wait)
+        with pytest.raises(password_pool.PasswordPoolBusy):
+            password_pool._run(release.wait)
+        stats = password_pool.stats()
+        assert stats["in_flight"] == base["in_flight"] + 1
+        assert (stats["timed_out"], stats["rejected"]) == (base["timed_out"] + 1, base["rejected"] + 1)
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert password_pool.stats()["in_flight"] == base["in_flight"]
+
+
+def test_timeout_cancela_el_trabajo_encolado(monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_QUEUE_MAX", 2)
+    monkeypatch.setattr(Settings, "PASSWORD_TIMEOUT", 0.05)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(password_pool, "_get_executor", lambda: executor)
+    release = threading.Event()
+    calls = []
+    base = password_pool.stats()
+    try:
+        with pytest.raises(password_pool.PasswordPoolBusy):
+            password_pool._run(release.wait)
+        # Encolado detrás del anterior: se cancela y devuelve su lugar al vencer la espera
+        with pytest.raises(password_pool.PasswordPoolBusy):
+            password_pool._run(calls.append, "encolado")
+        assert password_pool.stats()["in_flight"] == base["in_flight"] + 1
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert calls == []
+    assert password_pool.stats()["in_flight"] == base["in_flight"]
+
+
+def test_proceso_hijo_caido_recrea_el_pool(monkeypatch):
+    monkeypatch.setattr(Settings, "PASSWORD_WORKERS", 1)
+    monkeypatch.setattr(Settings, "PASSWORD_TIMEOUT", 60)
+    base = password_pool.stats()
+    try:
+        assert password_pool._run(abs, -3) == 3
+        # El hijo muere a mitad de la operación: el pool queda BrokenProcessPool
+        with pytest.raises(password_pool.PasswordPoolBusy):
+            password_pool._run(os._exit, 1)
+        assert password_pool.stats()["pool_restarts"] == base["pool_restarts"] + 1
+        assert password_pool._run(abs, -4) == 4
+    finally:
+        password_pool.shutdown()
+    assert password_pool.stats()["in_flight"] == base["in_flight"]
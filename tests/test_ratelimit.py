@@ -0,0 +1,85 @@
+"""
+Tests del rate limiter con backend compartido
+"""
+
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from src.backend.middleware import ratelimit
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    ratelimit.set_backend(ratelimit.SQLiteBackend(path))
+    yield path
+    ratelimit.set_backend(None)
+
+
+def test_ventana_fija_y_purga_en_memoria():
+    backend = ratelimit.MemoryBackend()
+    hits = [backend.hit("k", 2, 60, 120.0 + i) for i in range(3)]
+    assert [hit.allowed for hit in hits] == [True, True, False]
+    assert backend.metrics()["k"]["blocked"] == 1
+    # Ventana nueva: el contador vuelve a empezar
+    assert backend.hit("k", 2, 60, 180.0).count == 1
+    assert backend.evict(240.0) == 1
+    assert backend.metrics() == {}
+
+
+def test_sqlite_comparte_el_limite_entre_procesos(sqlite_path):
+    # Dos instancias sobre el mismo archivo equivalen a dos workers
+    worker_a = ratelimit.SQLiteBackend(sqlite_path)
+    worker_b = ratelimit.SQLiteBackend(sqlite_path)
+    assert worker_a.hit("login:1.2.3.4", 2, 60, 60.0).allowed
+    assert worker_b.hit("login:1.2.3.4", 2, 60, 61.0).allowed
+    assert not worker_a.hit("login:1.2.3.4", 2, 60, 62.0).allowed
+    assert worker_b.hit("login:5.6.7.8", 2, 60, 62.0).allowed
+
+    stats = worker_b.metrics("login:1.2.3.4")
+    assert stats == {"login:1.2.3.4": {"window_start": 60, "count": 3, "reset_at": 120, "blocked": 1}}
+    assert worker_a.evict(120.0) == 2
+
+
+def test_decorador_responde_429(sqlite_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_now", lambda: 1000.0)
+    app = Flask(__name__)
+
+    @app.post("/login")
+    @ratelimit.limit(key="test_login", limit=2, window=60)
+    def login():
+        return {"ok": True}
+
+    client = app.test_client()
+    statuses = [client.post("/login").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert client.post("/login").headers["Retry-After"] == "20"
+    assert ratelimit.metrics("test_login:")["test_login:127.0.0.1"]["blocked"] == 2
+
+
+def test_base_bloqueada_deja_pasar(sqlite_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_now", lambda: 1000.0)
+    backend = ratelimit.SQLiteBackend(sqlite_path, timeout=0.05)
+    ratelimit.set_backend(backend)
+    assert backend.hit("k", 1, 60, 1000.0).count == 1
+
+    locker = sqlite3.connect(sqlite_path, isolation_level=None)
+    locker.execute("BEGIN EXCLUSIVE")
+    try:
+        app = Flask(__name__)
+
+        @app.post("/login")
+        @ratelimit.limit(key="test_login", limit=1, window=60)
+        def login():
+            return {"ok": True}
+
+        # Sin poder contar: no hay 500 ni 429, el pedido pasa
+        assert [app.test_client().post("/login").status_code for _ in range(3)] == [200, 200, 200]
+        assert backend.hit("k", 1, 60, 1000.0) == ratelimit.Hit(True, 0, 1020)
+        assert backend.evict(2000.0) == 0
+    finally:
+        locker.execute("ROLLBACK")
+        locker.close()
+    assert not backend.hit("k", 1, 60, 1000.0).allowed
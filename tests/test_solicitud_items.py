@@ -0,0 +1,129 @@
+"""
+Tests de la tabla normalizada solicitud_items
+"""
+
+from backend_utils import auth_headers, create_user, insert_solicitud
+
+from src.backend.core.db import get_connection
+from src.backend.services import solicitud_items
+from src.backend.services.solicitud_items import (
+    aggregate_demand,
+    backfill,
+    load_items,
+    replace_items,
+)
+
+_PAYLOAD = {
+    "centro": "C1",
+    "sector": "S1",
+    "justificacion": "Reposición de válvulas",
+    "centro_costos": "CC1",
+    "almacen_virtual": "AV1",
+    "fecha_necesidad": "2030-01-01",
+}
+
+
+def _seed_materiales(con):
+    con.executemany(
+        "INSERT INTO materiales (codigo, descripcion, unidad, precio_usd) VALUES (?,?,?,?)",
+        [("M1", "VALVULA", "UN", 10.0), ("M2", "BOMBA", "UN", 100.0)],
+    )
+
+
+def test_backfill_desde_data_json(spm_db):
+    items = [
+        {"codigo": "M1", "descripcion": "VALVULA", "cantidad": 3, "precio_unitario": 10},
+        {"codigo": "", "cantidad": 1},
+        {"codigo": "M2", "cantidad": "2", "precio_unitario": 100, "uom": "UN"},
+    ]
+    with get_connection() as con:
+        create_user(con, "ana")
+        sol_id = insert_solicitud(con, "ana", status="aprobada", justificacion="legacy", data={"items": items})
+        assert backfill(con) == 1
+        assert backfill(con) == 0
+        con.commit()
+        stored = load_items(con, [sol_id])[sol_id]
+    assert [item["codigo"] for item in stored] == ["M1", "M2"]
+    assert stored[0]["subtotal"] == 30.0
+    assert stored[1]["cantidad"] == 2 and stored[1]["unidad"] == "UN"
+
+
+def test_borrador_y_finalizacion_escriben_items(api_client):
+    with get_connection() as con:
+        create_user(con, "ana")
+        _seed_materiales(con)
+        con.commit()
+    headers = auth_headers("ana")
+    sol_id = api_client.post("/api/solicitudes/drafts", json=_PAYLOAD, headers=headers).get_json()["id"]
+
+    resp = api_client.patch(
+        f"/api/solicitudes/{sol_id}/draft",
+        json={"items": [{"codigo": "M1", "cantidad": 2, "precio_unitario": 10}]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    with get_connection() as con:
+        assert [item["codigo"] for item in load_items(con, [sol_id])[sol_id]] == ["M1"]
+
+    resp = api_client.put(
+        f"/api/solicitudes/{sol_id}",
+        json={"items": [{"codigo": "M2", "cantidad": 1, "precio_unitario": 100}, {"codigo": "M1", "cantidad": 5, "precio_unitario": 10}]},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    body = api_client.get(f"/api/solicitudes/{sol_id}", headers=headers).get_json()
+    assert [item["codigo"] for item in body["solicitud"]["items"]] == ["M2", "M1"]
+    assert body["solicitud"]["total_monto"] == 150.0
+
+    with get_connection() as con:
+        demanda = {row["codigo"]: row["cantidad_total"] for row in aggregate_demand(con, centro="C1")}
+    assert demanda == {"M1": 5, "M2": 1}
+
+
+def test_crear_solicitud_directa_escribe_items(api_client):
+    with get_connection() as con:
+        create_user(con, "ana")
+        _seed_materiales(con)
+        con.commit()
+    resp = api_client.post(
+        "/api/solicitudes",
+        json={**_PAYLOAD, "items": [{"codigo": "M2", "cantidad": 4, "precio_unitario": 100}]},
+        headers=auth_headers("ana"),
+    )
+    sol_id = resp.get_json()["id"]
+    with get_connection() as con:
+        stored = load_items(con, [sol_id])[sol_id]
+    assert stored == [
+        {"codigo": "M2", "descripcion": "BOMBA", "cantidad": 4, "precio_unitario": 100.0, "comentario": None, "subtotal": 400.0, "unidad": "UN"}
+    ]
+
+
+def _drop_items_table(con):
+    con.execute("DROP TABLE solicitud_items")
+    con.execute("DELETE FROM schema_migrations WHERE version=1")
+    con.commit()
+    solicitud_items._schema_ready.clear()
+
+
+def test_base_previa_a_la_migracion_respeta_la_transaccion(spm_db):
+    with get_connection() as con:
+        create_user(con, "ana")
+        legacy = insert_solicitud(con, "ana", data={"items": [{"codigo": "M1", "cantidad": 2}]})
+        sol_id = insert_solicitud(con, "ana")
+        con.commit()
+        _drop_items_table(con)
+
+        # Rollback del llamador: ni el UPDATE ni la tabla creada al vuelo quedan confirmados
+        con.execute("UPDATE solicitudes SET justificacion='nueva' WHERE id=?", (sol_id,))
+        replace_items(con, sol_id, [{"codigo": "M2", "cantidad": 1}])
+        assert con.in_transaction
+        con.rollback()
+        assert con.execute("SELECT justificacion FROM solicitudes WHERE id=?", (sol_id,)).fetchone()["justificacion"] == "x"
+        assert not con.execute("SELECT 1 FROM sqlite_master WHERE name='solicitud_items'").fetchone()
+
+        con.execute("UPDATE solicitudes SET justificacion='nueva' WHERE id=?", (sol_id,))
+        replace_items(con, sol_id, [{"codigo": "M2", "cantidad": 1}])
+        con.commit()
+        stored = load_items(con, [legacy, sol_id])
+    assert [item["codigo"] for item in stored[legacy]] == ["M1"]
+    assert [item["codigo"] for item in stored[sol_id]] == ["M2"]
@@ -9,10 +9,10 @@ Prueba los 4 fixes implementados:
 """
 
 import json
-import pytest
 from datetime import datetime
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import MagicMock, Mock, patch
 
+import pytest
 
 # Constantes de estado
 STATUS_DRAFT = "DRAFT"
@@ -59,29 +59,41 @@ class TestMaterialValidation:
         # No debe llamar a la BD
         mock_con.execute.assert_not_called()
     
-    def test_normalize_items_rechaza_materiales_invalidos(self):
+    @pytest.fixture
+    def catalog_con(self):
+        """Conexión en memoria con un catálogo mínimo de materiales"""
+        import sqlite3
+
+        from src.backend.services import material_catalog
+
+        con = sqlite3.connect(":memory:")
+        con.row_factory = lambda cur, row: {col[0]: row[idx] for idx, col in enumerate(cur.description)}
+        con.execute("CREATE TABLE materiales (codigo TEXT PRIMARY KEY, descripcion TEXT, unidad TEXT, precio_usd REAL)")
+        con.execute("INSERT INTO materiales VALUES ('1000000006', 'VALVULA', 'UN', 42.0)")
+        material_catalog.invalidate()
+        yield con
+        material_catalog.invalidate()
+        con.close()
+
+    def test_normalize_items_rechaza_materiales_invalidos(self, catalog_con):
         """Verificar que _normalize_items rechaza materiales inválidos"""
-        mock_con = Mock()
-        mock_con.execute.return_value.fetchone.side_effect = [None, None]  # Materiales no encontrados
-        
         from src.backend.routes.solicitudes import _normalize_items
         
         raw_items = [
             {"codigo": "MAT_INVALIDO_1", "cantidad": 5, "precio": 100.0},
+            {"codigo": "1000000006", "cantidad": 1, "precio": 10.0},
             {"codigo": "MAT_INVALIDO_2", "cantidad": 3, "precio": 150.0},
         ]
         
         with pytest.raises(ValueError) as exc_info:
-            _normalize_items(raw_items, con=mock_con)
+            _normalize_items(raw_items, con=catalog_con)
         
         assert "MAT_INVALIDO_1" in str(exc_info.value)
         assert "MAT_INVALIDO_2" in str(exc_info.value)
+        assert "1000000006" not in str(exc_info.value)
     
-    def test_normalize_items_acepta_materiales_validos(self):
+    def test_normalize_items_acepta_materiales_validos(self, catalog_con):
         """Verificar que _normalize_items acepta materiales válidos"""
-        mock_con = Mock()
-        mock_con.execute.return_value.fetchone.return_value = {"codigo": "1000000006"}
-        
         from src.backend.routes.solicitudes import _normalize_items
         
         raw_items = [
@@ -89,10 +101,41 @@ class TestMaterialValidation:
             {"codigo": "1000000006", "cantidad": 3, "precio": 150.0},
         ]
         
-        items, total = _normalize_items(raw_items, con=mock_con)
+        items, total = _normalize_items(raw_items, con=catalog_con)
         
         assert len(items) == 2
         assert total == 950.0  # (5 * 100) + (3 * 150)
+        # Datos faltantes se completan desde el catálogo
+        assert items[0]["descripcion"] == "VALVULA"
+        assert items[0]["unidad"] == "UN"
+
+    def test_normalize_items_valida_en_una_sola_consulta(self, catalog_con):
+        """Verificar que el lote se valida con una sola consulta, aunque los ítems vengan completos"""
+        from src.backend.routes.solicitudes import _normalize_items
+
+        statements = []
+        catalog_con.set_trace_callback(statements.append)
+        raw_items = [{"codigo": "1000000006", "cantidad": 1} for _ in range(50)]
+
+        items, total = _normalize_items(raw_items, con=catalog_con)
+        assert total == 50 * 42.0
+        assert len([sql for sql in statements if "FROM materiales" in sql]) == 1
+
+        statements.clear()
+        completo = [{"codigo": "1000000006", "descripcion": "V", "unidad": "UN", "cantidad": 1, "precio": 1.0}]
+        _normalize_items(completo * 50, con=catalog_con)
+        assert len([sql for sql in statements if "FROM materiales" in sql]) == 1
+
+    def test_normalize_items_rechaza_material_borrado_aunque_venga_completo(self, catalog_con):
+        """Un material borrado (p. ej. en otro worker) se rechaza aunque el ítem traiga sus datos"""
+        from src.backend.routes.solicitudes import _normalize_items
+
+        completo = {"codigo": "1000000006", "descripcion": "V", "unidad": "UN", "cantidad": 1, "precio": 1.0}
+        _normalize_items([completo], con=catalog_con)
+        catalog_con.execute("DELETE FROM materiales WHERE codigo = '1000000006'")
+
+        with pytest.raises(ValueError, match="1000000006"):
+            _normalize_items([completo], con=catalog_con)
 
 
 class TestApproverValidation:
@@ -0,0 +1,68 @@
+"""
+Tests de paginación por cursor (keyset) en GET /api/solicitudes
+"""
+
+
+from backend_utils import auth_headers, create_user, insert_solicitud
+
+from src.backend.core.db import get_connection
+
+
+def _seed(count: int, owner: str = "ana") -> None:
+    with get_connection() as con:
+        create_user(con, owner)
+        create_user(con, "otro")
+        for idx in range(count):
+            status = "draft" if idx % 2 else "pendiente_de_aprobacion"
+            insert_solicitud(
+                con, owner, status=status, justificacion=f"sol {idx}", data={"items": []},
+                created_at=f"2025-01-{1 + idx // 3:02d} 10:00:00",
+            )
+        insert_solicitud(con, "otro", justificacion="ajena")
+        con.commit()
+
+
+def test_sin_limit_devuelve_lista_completa(api_client):
+    _seed(7)
+    resp = api_client.get("/api/solicitudes", headers=auth_headers("ana"))
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["total"] == 7
+    assert "next_cursor" not in body
+
+
+def test_recorre_todas_las_paginas_sin_duplicados(api_client):
+    _seed(7)
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/solicitudes?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        body = api_client.get(url, headers=auth_headers("ana")).get_json()
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if not body["has_more"]:
+            assert cursor is None
+            break
+    assert len(seen) == len(set(seen)) == 7
+    expected = sorted(seen, reverse=True)
+    assert seen == expected
+
+
+def test_filtros_de_estado_fecha_y_conteo(api_client):
+    _seed(7)
+    body = api_client.get(
+        "/api/solicitudes?limit=10&status=draft&count=1", headers=auth_headers("ana")
+    ).get_json()
+    assert body["total"] == 3
+    assert {item["status"] for item in body["items"]} == {"draft"}
+
+    body = api_client.get(
+        "/api/solicitudes?limit=10&desde=2025-01-02&hasta=2025-01-02", headers=auth_headers("ana")
+    ).get_json()
+    assert len(body["items"]) == 3
+
+
+def test_cursor_invalido_responde_400(api_client):
+    _seed(1)
+    resp = api_client.get("/api/solicitudes?cursor=%%%", headers=auth_headers("ana"))
+    assert resp.status_code == 400
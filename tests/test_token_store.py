@@ -0,0 +1,76 @@
+"""
+Tests del almacén de refresh tokens
+"""
+
+import time
+
+import pytest
+
+from src.backend.core.db import get_connection
+from src.backend.services import token_store
+
+
+@pytest.fixture
+def store(spm_db):
+    token_store.clear_cache()
+    token_store.init_refresh_token_store()
+    yield
+    token_store.clear_cache()
+
+
+def _register(jti, *, expires_in=3600, user_id="ana"):
+    token_store.register_refresh_token(
+        jti=jti, user_id=user_id, expires_at=int(time.time()) + expires_in,
+        parent_jti=None, user_agent="pytest", ip="127.0.0.1",
+    )
+
+
+def test_indice_y_purga_por_lotes(store, monkeypatch):
+    with get_connection() as con:
+        indexes = {row["name"] for row in con.execute("PRAGMA index_list(refresh_tokens)")}
+    assert "idx_refresh_tokens_expires" in indexes
+
+    monkeypatch.setattr(token_store, "_PRUNE_BATCH", 2)
+    for idx in range(5):
+        _register(f"old-{idx}", expires_in=-10_000)
+    _register("vigente")
+    assert token_store.prune_expired_tokens(force=True) == 5
+    # Sin force no vuelve a purgar dentro del intervalo
+    _register("old-5", expires_in=-10_000)
+    assert token_store.prune_expired_tokens() == 0
+    assert token_store.get_refresh_token("vigente") is not None
+
+
+def test_rotacion_atomica(store):
+    _register("a")
+    assert token_store.rotate_token("a", jti="b", user_id="ana", expires_at=int(time.time()) + 3600,
+                                    user_agent=None, ip=None)
+    assert token_store.is_active_token("a")[0] is False
+    active, token = token_store.is_active_token("b")
+    assert active and token["parent_jti"] == "a"
+    # Reusar el token viejo no emite otro sucesor
+    assert not token_store.rotate_token("a", jti="c", user_id="ana", expires_at=int(time.time()) + 3600,
+                                        user_agent=None, ip=None)
+    assert token_store.get_refresh_token("c") is None
+
+
+def test_cache_positivo_y_negativo(store, monkeypatch):
+    _register("a")
+    calls = []
+    original = token_store.get_refresh_token
+
+    def counting(jti):
+        calls.append(jti)
+        return original(jti)
+
+    monkeypatch.setattr(token_store, "get_refresh_token", counting)
+    for _ in range(3):
+        assert token_store.is_active_token("a")[0]
+        assert token_store.is_active_token("desconocido") == (False, None)
+    assert calls == ["a", "desconocido"]
+
+    # Las revocaciones locales invalidan el cache al instante
+    token_store.revoke_token("a")
+    assert token_store.is_active_token("a")[0] is False
+    _register("desconocido")
+    assert token_store.is_active_token("desconocido")[0]
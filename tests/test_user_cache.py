@@ -0,0 +1,86 @@
+"""
+Tests del cache de perfiles de usuario autenticados
+"""
+
+import json
+
+from backend_utils import auth_headers, create_user
+
+from src.backend.core.db import get_connection
+from src.backend.services.auth import auth as auth_module
+
+
+def _count_loads(monkeypatch):
+    calls = []
+    original = auth_module.load_user_by_id
+
+    def counting(user_id):
+        calls.append(user_id)
+        return original(user_id)
+
+    monkeypatch.setattr(auth_module, "load_user_by_id", counting)
+    return calls
+
+
+def test_mismo_token_carga_el_perfil_una_vez(api_client, monkeypatch):
+    with get_connection() as con:
+        create_user(con, "ger", rol="Gerente2")
+        con.commit()
+    calls = _count_loads(monkeypatch)
+    headers = auth_headers("ger")
+    for _ in range(3):
+        assert api_client.get("/api/presupuestos/mis", headers=headers).status_code == 200
+    assert calls == ["ger"]
+
+    # Un token nuevo (otro jti) vuelve a leer el perfil
+    assert api_client.get("/api/presupuestos/mis", headers=auth_headers("ger")).status_code == 200
+    assert calls == ["ger", "ger"]
+
+
+def test_edicion_de_admin_invalida_el_perfil(api_client):
+    with get_connection() as con:
+        create_user(con, "ger", rol="Gerente2")
+        create_user(con, "root", rol="Administrador")
+        con.commit()
+    headers = auth_headers("ger")
+    assert api_client.get("/api/presupuestos/mis", headers=headers).status_code == 200
+
+    resp = api_client.put("/api/admin/usuarios/ger", json={"rol": "Solicitante"}, headers=auth_headers("root"))
+    assert resp.status_code == 200
+    assert api_client.get("/api/presupuestos/mis", headers=headers).status_code == 403
+
+
+def test_cache_desactivado_consulta_siempre(api_client, monkeypatch):
+    from src.backend.core.config import Settings
+
+    with get_connection() as con:
+        create_user(con, "ger", rol="Gerente2")
+        con.commit()
+    monkeypatch.setattr(Settings, "USER_CACHE_TTL", 0)
+    calls = _count_loads(monkeypatch)
+    headers = auth_headers("ger")
+    for _ in range(2):
+        api_client.get("/api/presupuestos/mis", headers=headers)
+    assert len(calls) == 2
+
+
+def test_aprobar_centros_invalida_el_perfil(api_client):
+    with get_connection() as con:
+        create_user(con, "ana", centros="C1")
+        create_user(con, "root", rol="Administrador")
+        request_id = con.execute(
+            "INSERT INTO user_profile_requests (usuario_id, tipo, payload) VALUES (?,?,?)",
+            ("ana", "centros", json.dumps({"centros": "C2"})),
+        ).lastrowid
+        con.commit()
+    headers = auth_headers("ana")
+    assert api_client.get("/api/auth/me", headers=headers).get_json()["centros"] == ["C1"]
+
+    resp = api_client.post(
+        f"/api/notificaciones/centros/{request_id}/decision",
+        json={"accion": "aprobar"},
+        headers=auth_headers("root"),
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()["centros"] == ["C1", "C2"]
+    assert api_client.get("/api/auth/me", headers=headers).get_json()["centros"] == ["C1", "C2"]